@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['entity_type', 'entity_id', '-timestamp'], name='audit_entity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp', '-id'], name='audit_timestamp_id_idx'),
+        ),
+    ]
@@ -28,6 +28,10 @@ class AuditLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['entity_type', 'entity_id', '-timestamp'], name='audit_entity_idx'),
+            models.Index(fields=['-timestamp', '-id'], name='audit_timestamp_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.action} - {self.entity_type} at {self.timestamp}"
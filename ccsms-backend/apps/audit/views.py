@@ -8,12 +8,14 @@ from django.http import HttpResponse
 from .models import AuditLog
 from .serializers import AuditLogSerializer
 from utils.permissions import IsAdmin
+from utils.pagination import TimestampKeysetPagination
 import csv
 from datetime import datetime
 
 class AuditLogListView(generics.ListAPIView):
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdmin]
+    pagination_class = TimestampKeysetPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['user', 'action', 'entity_type']
     search_fields = ['entity_id', 'user__email']
@@ -21,7 +23,7 @@ class AuditLogListView(generics.ListAPIView):
     ordering = ['-timestamp']
     
     def get_queryset(self):
-        queryset = AuditLog.objects.all()
+        queryset = AuditLog.objects.select_related('user')
         date_range = self.request.query_params.get('date_range')
         
         if date_range:
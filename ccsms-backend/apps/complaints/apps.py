@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class ComplaintsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.complaints'
\ No newline at end of file
+    name = 'apps.complaints'
+
+    def ready(self):
+        import apps.complaints.signals
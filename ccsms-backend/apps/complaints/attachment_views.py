@@ -0,0 +1,56 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from apps.complaints.models import Attachment
+from utils.file_serving import serve_file
+from utils.permissions import IsComplaintOwnerOrAgent
+from utils.thumbnails import VARIANTS, FAILED, ensure_renditions, serve_rendition
+
+
+def _get_attachment(request, pk):
+    """(attachment, None), or (None, error response) if it is missing or not visible to the user"""
+    try:
+        attachment = Attachment.objects.select_related('complaint').get(pk=pk)
+    except Attachment.DoesNotExist:
+        return None, Response({'error': 'Attachment not found'}, status=404)
+    
+    if not IsComplaintOwnerOrAgent().has_object_permission(request, None, attachment.complaint):
+        return None, Response({'error': 'Permission denied'}, status=403)
+    return attachment, None
+
+
+@api_view(['GET', 'HEAD'])
+@permission_classes([IsAuthenticated])
+def download_attachment(request, pk):
+    """Attachment file, with Range/ETag support; sent by the front server when one is configured"""
+    attachment, error = _get_attachment(request, pk)
+    if error:
+        return error
+    
+    try:
+        return serve_file(
+            request, attachment.file.storage, attachment.file.name,
+            filename=attachment.original_filename,
+            content_type=attachment.mime_type or None,
+            as_attachment=request.query_params.get('inline') != '1',
+        )
+    except (FileNotFoundError, ValueError):
+        return Response({'error': 'File not found'}, status=404)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def attachment_rendition(request, pk, variant):
+    """Thumbnail or preview of an image attachment, rendered on first request if the worker has not"""
+    if variant not in VARIANTS:
+        return Response({'error': 'Unknown variant'}, status=404)
+    attachment, error = _get_attachment(request, pk)
+    if error:
+        return error
+    
+    if not attachment.is_image or not attachment.file:
+        return Response({'error': 'No preview available'}, status=404)
+    renditions = ensure_renditions(attachment, 'file', 'renditions')
+    if renditions == FAILED:
+        return Response({'error': 'No preview available'}, status=404)
+    return serve_rendition(request, renditions, variant)
@@ -0,0 +1,379 @@
+"""
+Assign the whole unassigned backlog at once.
+
+auto_assign_best_agent picks the best agent for one complaint at a time, so
+after an outage or a morning spike every complaint lands on the same few
+top-scoring agents, far past their workload threshold. A batch run instead
+solves the backlog as one assignment problem:
+
+- every available agent has `workload_threshold - current_active_cases`
+  free slots, and the k-th slot is worth the workload score the agent has
+  once it holds k more complaints, so an agent gets less attractive as it
+  fills up;
+- a complaint in an agent's slot scores what AIAssignmentEngine would give
+  it: expertise, location and track record in the complaint's category
+  against that agent, plus the slot's workload;
+- a complaint is only worth assigning at AUTO_ASSIGN_CONFIDENCE, the
+  threshold auto_assign_best_agent uses; below it, it stays for an admin.
+
+The assignment with the highest total confidence is a min-cost flow from
+complaints through unit-capacity agent slots, i.e. a rectangular assignment
+problem. solve_assignment() solves it exactly with shortest augmenting paths
+(the Jonker-Volgenant method as in scipy's linear_sum_assignment), one
+NumPy pass over the other side per step. Complaints with the same category
+and pincode score the same against every slot, so scores are kept per
+(category, pincode) group and agent, never as a complaints x slots matrix;
+within a group the most urgent complaints (priority, then age) get the
+best of the agents the group was given.
+
+The plan is applied in one transaction: the agents and complaints are
+locked, complaints taken or changed since planning are skipped, agents keep
+to their threshold with the counters they have then, and the complaints are
+written with one bulk_update, the agents with one counter UPDATE each, the
+AUTO_ASSIGNED timeline with one bulk_create and every agent gets one
+notification.
+"""
+import logging
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from dataclasses import dataclass, field
+from datetime import timedelta
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from apps.notifications.outbox import enqueue, push_event
+from apps.users.models import User
+from utils.agent_index import AGENT_FIELDS, Agent
+from utils.ai_assignment import EPSILON, PERFORMANCE_DAYS, WEIGHTS, AgentScores, AIAssignmentEngine
+from .models import Complaint, Timeline
+from .retriage import _summary
+from .transitions import ACTIVE_STATUSES, assigned_counters
+
+logger = logging.getLogger(__name__)
+
+AUTO_ASSIGN_CONFIDENCE = 0.6  # as auto_assign_best_agent
+PRIORITY_ORDER = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
+
+Row = namedtuple('Row', 'pk complaint_number category pincode priority created_at')
+Group = namedtuple('Group', 'category pincode')  # complaints that score the same against every agent
+Assignment = namedtuple('Assignment', 'complaint agent confidence reasoning')
+
+
+def solve_assignment(cost_row, n_rows, n_cols):
+    """
+    Minimum-cost assignment of every row to a different column (n_rows <=
+    n_cols), where cost_row(i) is row i's costs as an array over the columns.
+    Returns (column of each row, row duals u, column duals v); at the optimum
+    cost[i, j] - u[i] - v[j] is never negative and zero where i gets j.
+    """
+    u = np.zeros(n_rows)
+    v = np.zeros(n_cols)
+    col4row = np.full(n_rows, -1)
+    row4col = np.full(n_cols, -1)
+    path = np.full(n_cols, -1)
+    final = np.zeros(n_cols)  # shortest path cost of each scanned column
+    for current in range(n_rows):
+        # Dijkstra from `current` over the columns, through the rows they are assigned to
+        distance = np.full(n_cols, np.inf)
+        scanned_cols, scanned_rows = [], []
+        i, min_val = current, 0.0
+        while True:
+            reduced = cost_row(i) + (min_val - u[i]) - v
+            better = reduced < distance
+            better[scanned_cols] = False
+            path[better] = i
+            distance[better] = reduced[better]
+            min_val = distance.min()
+            if min_val == np.inf:
+                raise ValueError('No complete assignment exists')
+            ties = np.flatnonzero(distance == min_val)
+            free = ties[row4col[ties] < 0]
+            j = free[0] if len(free) else ties[0]  # an unassigned column ends the path soonest
+            scanned_cols.append(j)
+            final[j] = min_val
+            distance[j] = np.inf
+            if row4col[j] < 0:
+                break
+            i = row4col[j]
+            scanned_rows.append(i)
+
+        u[current] += min_val
+        if scanned_rows:
+            u[scanned_rows] += min_val - final[col4row[scanned_rows]]
+        v[scanned_cols] -= min_val - final[scanned_cols]
+        while True:  # flip the path
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == current:
+                break
+    return col4row, u, v
+
+
+@dataclass
+class AgentPool:
+    """Agents with free slots, ordered by id, and their scoring inputs"""
+    agents: list  # Agent
+    service_types: np.ndarray
+    pincodes: np.ndarray
+    active: np.ndarray  # current_active_cases
+    resolved: dict  # category -> resolved in it per agent, last PERFORMANCE_DAYS
+
+
+@dataclass
+class BatchAssignmentResult:
+    complaints: int = 0  # unassigned complaints considered
+    agents: int = 0  # agents with free slots
+    slots: int = 0
+    assignments: list = field(default_factory=list)
+    conflicts: int = 0  # taken or changed between planning and applying
+    solve_seconds: float = 0.0
+
+    @property
+    def assigned(self):
+        return len(self.assignments)
+
+
+class BatchAssignment:
+    """
+    Plan the assignment of every unassigned active complaint and, unless
+    `dry_run`, apply it. `min_confidence` is the lowest confidence an
+    assignment may have.
+    """
+
+    def __init__(self, engine=None, min_confidence=AUTO_ASSIGN_CONFIDENCE, dry_run=False):
+        self.engine = engine or AIAssignmentEngine()
+        self.min_confidence = min_confidence
+        self.dry_run = dry_run
+        self.result = BatchAssignmentResult()
+
+    def run(self):
+        rows = self.backlog()
+        pool = self.agent_pool()
+        self.result.assignments = self.plan(rows, pool)
+        if self.result.assignments and not self.dry_run:
+            self.apply(self.result.assignments)
+        return self.result
+
+    def backlog(self):
+        """Active complaints without an agent, except those waiting on an agent's answer to a request"""
+        complaints = (
+            Complaint.objects.filter(status__in=ACTIVE_STATUSES, assigned_to__isnull=True)
+            .exclude(agent_assignment_requests__status='PENDING')
+            .order_by('pk')
+        )
+        return [Row(*row) for row in complaints.values_list(*Row._fields)]
+
+    def agent_pool(self):
+        """Active agents who are not offline and under the workload threshold, in two queries"""
+        threshold = self.engine.workload_threshold
+        rows = list(
+            User.objects.filter(role='AGENT', is_active=True, current_active_cases__lt=threshold)
+            .exclude(agent_status='OFFLINE')
+            .order_by('id')
+            .values_list(*AGENT_FIELDS, 'current_active_cases')
+        )
+        agents = [Agent(*row[:-1]) for row in rows]
+        index = {agent.id: i for i, agent in enumerate(agents)}
+
+        resolved = defaultdict(lambda: np.zeros(len(agents), dtype=np.int64))
+        counts = (
+            Complaint.objects.filter(
+                status='RESOLVED', assigned_to__in=list(index),
+                resolved_at__gte=timezone.now() - timedelta(days=PERFORMANCE_DAYS)
+            )
+            .values_list('assigned_to', 'category')
+            .annotate(Count('id'))
+            .order_by()
+        )
+        for agent_id, category, count in counts:
+            resolved[category][index[agent_id]] = count
+
+        return AgentPool(
+            agents=agents,
+            service_types=np.array([agent.service_type or '' for agent in agents], dtype=str),
+            pincodes=np.array([agent.pincode or '' for agent in agents], dtype=str),
+            active=np.array([row[-1] for row in rows], dtype=np.int64),
+            resolved=resolved,
+        )
+
+    def pair_scores(self, groups, pool):
+        """(category, location, performance) per (category, pincode) group and agent: the score without workload"""
+        engine = self.engine
+        by_category, by_pincode = {}, {}
+        for group in groups:
+            if group.category not in by_category:
+                by_category[group.category] = (
+                    engine.category_scores(group, pool.service_types),
+                    engine.performance_scores(pool.resolved.get(group.category, np.zeros(len(pool.agents), dtype=np.int64))),
+                )
+            if group.pincode not in by_pincode:
+                by_pincode[group.pincode] = engine.location_scores(group, pool.pincodes)
+        category = np.array([by_category[group.category][0] for group in groups])
+        performance = np.array([by_category[group.category][1] for group in groups])
+        location = np.array([by_pincode[group.pincode] for group in groups])
+        return category, location, performance
+
+    def plan(self, rows, pool):
+        """The assignments with the highest total confidence, each at least min_confidence"""
+        started = time.perf_counter()
+        engine = self.engine
+        self.result.complaints, self.result.agents = len(rows), len(pool.agents)
+        if not rows or not pool.agents:
+            return []
+
+        # Slots: agent index and workload score of each free slot, emptiest first
+        free = engine.workload_threshold - pool.active
+        slot_agent = np.repeat(np.arange(len(pool.agents)), free)
+        slot_active = pool.active[slot_agent] + (np.arange(len(slot_agent)) - np.repeat(np.cumsum(free) - free, free))
+        slot_value = engine.workload_scores(slot_active) * WEIGHTS['workload']
+        self.result.slots = len(slot_agent)
+
+        # Complaints grouped by (category, pincode), most urgent first within a group
+        members = defaultdict(list)
+        for row in rows:
+            members[Group(row.category, row.pincode or '')].append(row)
+        groups = list(members)
+        category, location, performance = self.pair_scores(groups, pool)
+        pair = category * WEIGHTS['category'] + location * WEIGHTS['location'] + performance * WEIGHTS['performance']
+
+        # Drop the groups and slots that cannot reach the threshold with anyone
+        floor = self.min_confidence - EPSILON
+        first_slot = engine.workload_scores(pool.active) * WEIGHTS['workload']
+        useful_groups = np.flatnonzero((pair + first_slot).max(axis=1) >= floor)
+        useful_slots = np.flatnonzero(pair[useful_groups][:, slot_agent].max(axis=0, initial=-1.0) + slot_value >= floor)
+        if not len(useful_groups) or not len(useful_slots):
+            self.result.solve_seconds = time.perf_counter() - started
+            return []
+        units = np.repeat(useful_groups, [len(members[groups[g]]) for g in useful_groups])
+        slot_agent, slot_value = slot_agent[useful_slots], slot_value[useful_slots]
+
+        # Cost: minus the confidence above the floor, 0 (as good as unassigned) below it
+        if len(slot_agent) <= len(units):
+            pair_by_agent = pair.T.copy()
+
+            def cost_row(s):
+                return -np.maximum(pair_by_agent[slot_agent[s]][units] + (slot_value[s] - floor), 0.0)
+            matched, _, _ = solve_assignment(cost_row, len(slot_agent), len(units))
+            pairs = [(int(unit), s) for s, unit in enumerate(matched)]
+        else:
+            def cost_row(unit):
+                return -np.maximum(pair[units[unit]][slot_agent] + (slot_value - floor), 0.0)
+            matched, _, _ = solve_assignment(cost_row, len(units), len(slot_agent))
+            pairs = [(unit, int(s)) for unit, s in enumerate(matched)]
+
+        # How many of each group every agent takes
+        taken = defaultdict(lambda: defaultdict(int))  # group -> agent index -> complaints
+        for unit, s in pairs:
+            g, a = units[unit], slot_agent[s]
+            if pair[g, a] + slot_value[s] > floor:
+                taken[g][a] += 1
+
+        # The group's most urgent complaints to its best agents, then each agent's best-scoring first
+        by_agent = defaultdict(list)  # agent index -> (pair score, row, group)
+        for g, counts in taken.items():
+            queue = sorted(members[groups[g]], key=lambda row: (PRIORITY_ORDER.get(row.priority, 4), row.created_at))
+            for a in sorted(counts, key=lambda a: (-pair[g, a], a)):
+                for row in queue[:counts[a]]:
+                    by_agent[a].append((pair[g, a], row, g))
+                queue = queue[counts[a]:]
+
+        assignments = []
+        for a in sorted(by_agent):
+            agent = pool.agents[a]
+            taken_rows = sorted(by_agent[a], key=lambda item: -item[0])
+            g = np.array([item[2] for item in taken_rows])
+            workload = engine.workload_scores(pool.active[a] + np.arange(len(taken_rows)))
+            scores = AgentScores(
+                category=category[g, a], workload=workload, location=location[g, a], performance=performance[g, a],
+                total=np.minimum(np.array([item[0] for item in taken_rows]) + workload * WEIGHTS['workload'], 1.0),
+            )
+            for i, (_, row, _) in enumerate(taken_rows):
+                assignments.append(Assignment(
+                    row, agent, float(scores.total[i]), engine.get_assignment_reasoning(agent, scores, i)
+                ))
+        self.result.solve_seconds = time.perf_counter() - started
+        return assignments
+
+    def apply(self, assignments):
+        """Write the plan in one transaction, skipping what changed since it was made"""
+        threshold = self.engine.workload_threshold
+        batch_id = uuid.uuid4().hex
+        now = timezone.now()
+        planned = defaultdict(list)
+        for assignment in assignments:
+            planned[assignment.agent.id].append(assignment)
+
+        with transaction.atomic():
+            active = dict(
+                User.objects.select_for_update()
+                .filter(pk__in=planned, role='AGENT', is_active=True)
+                .exclude(agent_status='OFFLINE')
+                .order_by('pk')
+                .values_list('pk', 'current_active_cases')
+            )
+            complaints = Complaint.objects.select_for_update().filter(
+                pk__in=[assignment.complaint.pk for assignment in assignments],
+                status__in=ACTIVE_STATUSES, assigned_to__isnull=True,
+            ).exclude(agent_assignment_requests__status='PENDING').order_by('pk').only(
+                'id', 'complaint_number', 'title', 'status', 'assigned_to', 'category', 'pincode'
+            )
+            complaints = {complaint.pk: complaint for complaint in complaints}
+
+            applied, updated, timeline, notified = [], [], [], {}
+            for agent_id, agent_assignments in planned.items():
+                room = threshold - active[agent_id] if agent_id in active else 0
+                taken = []
+                for assignment in agent_assignments:  # best first
+                    complaint = complaints.get(assignment.complaint.pk)
+                    if (
+                        len(taken) >= room or complaint is None
+                        or (complaint.category, complaint.pincode or '') != (assignment.complaint.category, assignment.complaint.pincode or '')
+                    ):
+                        self.result.conflicts += 1
+                        continue
+                    complaint.assigned_to_id = agent_id
+                    complaint.status = 'IN_PROGRESS'
+                    complaint.updated_at = now
+                    taken.append(complaint)
+                    applied.append(assignment)
+                    timeline.append(Timeline(
+                        complaint=complaint,
+                        action='AUTO_ASSIGNED',
+                        description=(
+                            f'Auto-assigned to {assignment.agent.email} (Confidence: {assignment.confidence:.0%}) '
+                            f'- {assignment.reasoning}'
+                        ),
+                        performed_by=None,
+                        metadata={
+                            'ai_confidence': assignment.confidence,
+                            'reasoning': assignment.reasoning,
+                            'batch_assignment': batch_id,
+                        }
+                    ))
+                if taken:
+                    updated += taken
+                    notified[agent_id] = taken
+
+            Complaint.objects.bulk_update(updated, ['assigned_to', 'status', 'updated_at'])
+            for agent_id, taken in notified.items():
+                User.objects.filter(pk=agent_id).update(**assigned_counters(len(taken)))
+            Timeline.objects.bulk_create(timeline)
+            enqueue(*[
+                push_event(
+                    [agent_id],
+                    title='New Direct Assignment' if len(taken) == 1 else f'{len(taken)} complaints assigned to you',
+                    message=f'Assigned to you from the backlog: {_summary(taken)}',
+                    notification_type='high',
+                    category='COMPLAINT_ASSIGNED',
+                    complaint=taken[0] if len(taken) == 1 else None,
+                    metadata={'complaint_ids': [str(c.pk) for c in taken]},
+                )
+                for agent_id, taken in notified.items()
+            ])
+        self.result.assignments = applied
+        logger.info('Batch assignment %s: %d complaints assigned, %d skipped as changed',
+                    batch_id, len(applied), self.result.conflicts)
+        return applied
@@ -0,0 +1,370 @@
+"""
+Bulk complaint operations for admins triaging a backlog.
+
+Each endpoint takes up to 1,000 complaint IDs and applies the change in one
+transaction: the complaints are locked and written back with bulk_update,
+assignments and resolves move agent workloads and performance counters with
+one counter UPDATE per agent as single transitions do, timeline rows go in
+with one bulk_create, and every recipient gets a single aggregated notification
+through the outbox.
+Complaints that cannot take the change are reported in `skipped`.
+
+Also the admin endpoint for streaming complaint imports.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from apps.notifications.outbox import enqueue, push_event
+from apps.users.models import User
+from utils.sla_calculator import calculate_sla_deadline
+from .importer import ComplaintImporter, FORMATS, detect_format, open_text, read_rows
+from .models import Complaint, Timeline
+from .models_assignment import AgentAssignmentRequest
+from .transitions import assigned_counters, released_counters, resolved_counters
+from .serializers import BulkAssignSerializer, BulkResolveSerializer, BulkComplaintActionSerializer, BulkPrioritySerializer
+
+
+def _lock_complaints(complaint_ids):
+    """Lock the requested complaints (in pk order to avoid deadlocks); returns (complaints, missing ids)"""
+    complaints = list(Complaint.objects.select_for_update().filter(pk__in=complaint_ids).order_by('pk'))
+    found = {c.pk for c in complaints}
+    return complaints, [str(pk) for pk in complaint_ids if pk not in found]
+
+
+def _summary(complaints, limit=5):
+    numbers = [c.complaint_number for c in complaints[:limit]]
+    if len(complaints) > limit:
+        numbers.append(f'and {len(complaints) - limit} more')
+    return ', '.join(numbers)
+
+
+def _aggregate(recipients, title, message, category, notification_type='info'):
+    """One notification per recipient covering all of their complaints; `recipients` maps user id -> complaints"""
+    return [
+        push_event(
+            [user_id],
+            title=title(complaints),
+            message=f'{message(complaints)}: {_summary(complaints)}',
+            notification_type=notification_type,
+            category=category,
+            complaint=complaints[0] if len(complaints) == 1 else None,
+            metadata={'complaint_ids': [str(c.pk) for c in complaints]},
+        )
+        for user_id, complaints in recipients.items()
+    ]
+
+
+def _plural(complaints, noun='complaint'):
+    return f'{len(complaints)} {noun}' + ('' if len(complaints) == 1 else 's')
+
+
+def _bulk_response(verb, updated, skipped, missing):
+    return Response({
+        'message': f'{_plural(updated)} {verb}',
+        'updated': [str(c.pk) for c in updated],
+        'skipped': skipped,
+        'not_found': missing,
+    })
+
+
+def _validate(request, serializer_class):
+    if request.user.role != 'ADMIN':
+        return None, Response({'error': 'Only admins can run bulk operations'}, status=status.HTTP_403_FORBIDDEN)
+    serializer = serializer_class(data=request.data)
+    if not serializer.is_valid():
+        return None, Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    data['complaint_ids'] = list(dict.fromkeys(data['complaint_ids']))
+    return data, None
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_assign(request):
+    """Directly assign many complaints to one agent"""
+    data, error = _validate(request, BulkAssignSerializer)
+    if error:
+        return error
+    
+    try:
+        agent = User.objects.get(id=data['assigned_to'], role='AGENT')
+    except User.DoesNotExist:
+        return Response({'error': 'Agent not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    now = timezone.now()
+    with transaction.atomic():
+        complaints, missing = _lock_complaints(data['complaint_ids'])
+        updated, skipped = [], []
+        for complaint in complaints:
+            if complaint.status in ('RESOLVED', 'CLOSED'):
+                skipped.append({'id': str(complaint.pk), 'reason': f'Complaint is {complaint.status.lower()}'})
+            elif complaint.assigned_to_id == agent.pk:
+                skipped.append({'id': str(complaint.pk), 'reason': 'Already assigned to this agent'})
+            else:
+                updated.append(complaint)
+        
+        previous = defaultdict(list)
+        for complaint in updated:
+            if complaint.assigned_to_id:
+                previous[complaint.assigned_to_id].append(complaint)
+        
+        # One counter UPDATE per agent, as for single assignments (agent_status, last_activity included)
+        for old_agent_id, moved in previous.items():
+            User.objects.filter(pk=old_agent_id).update(**released_counters(len(moved)))
+        if updated:
+            User.objects.filter(pk=agent.pk).update(**assigned_counters(len(updated)))
+        
+        for complaint in updated:
+            complaint.assigned_to_id = agent.pk
+            if complaint.status == 'OPEN':
+                complaint.status = 'IN_PROGRESS'
+            complaint.updated_at = now
+        Complaint.objects.bulk_update(updated, ['assigned_to', 'status', 'updated_at'])
+        
+        # Pending requests for these complaints are superseded by the direct assignment
+        AgentAssignmentRequest.objects.filter(complaint__in=updated, status='PENDING').update(status='CANCELLED')
+        
+        Timeline.objects.bulk_create([
+            Timeline(
+                complaint=complaint,
+                action='ASSIGNED',
+                description=f'Assigned to {agent.email} by admin (bulk)',
+                performed_by=request.user,
+                metadata={'bulk': True}
+            )
+            for complaint in updated
+        ])
+        
+        customers = defaultdict(list)
+        for complaint in updated:
+            customers[complaint.customer_id].append(complaint)
+        notifications = []
+        if updated:
+            notifications += _aggregate(
+                {agent.pk: updated},
+                title=lambda items: 'New Direct Assignment' if len(items) == 1 else f'{_plural(items)} assigned to you',
+                message=lambda items: f'{_plural(items)} assigned to you by {request.user.first_name or request.user.email}',
+                category='COMPLAINT_ASSIGNED',
+                notification_type='high',
+            )
+        notifications += _aggregate(
+            previous,
+            title=lambda items: 'Assignment Changed',
+            message=lambda items: f'You have been unassigned from {_plural(items)}',
+            category='COMPLAINT_ASSIGNED',
+        )
+        notifications += _aggregate(
+            customers,
+            title=lambda items: 'Agent Assigned to Your Complaint' if len(items) == 1 else 'Agent Assigned to Your Complaints',
+            message=lambda items: f'Agent {agent.first_name} {agent.last_name} has been assigned to {_plural(items)}',
+            category='COMPLAINT_STATUS_CHANGED',
+        )
+        enqueue(*notifications)
+    
+    return _bulk_response('assigned', updated, skipped, missing)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_resolve(request):
+    """Resolve many complaints and update the agents' performance counters"""
+    data, error = _validate(request, BulkResolveSerializer)
+    if error:
+        return error
+    
+    resolution_notes = data['resolution_notes']
+    now = timezone.now()
+    with transaction.atomic():
+        complaints, missing = _lock_complaints(data['complaint_ids'])
+        updated, skipped = [], []
+        for complaint in complaints:
+            if complaint.status in ('RESOLVED', 'CLOSED'):
+                skipped.append({'id': str(complaint.pk), 'reason': f'Complaint already {complaint.status.lower()}'})
+            else:
+                updated.append(complaint)
+        
+        for complaint in updated:
+            complaint.status = 'RESOLVED'
+            complaint.resolution_notes = resolution_notes
+            complaint.resolved_at = now
+            complaint.updated_at = now
+        Complaint.objects.bulk_update(updated, ['status', 'resolution_notes', 'resolved_at', 'updated_at'])
+        
+        resolved_by_agent = defaultdict(list)
+        for complaint in updated:
+            if complaint.assigned_to_id:
+                resolved_by_agent[complaint.assigned_to_id].append(complaint)
+        
+        for agent_id in sorted(resolved_by_agent):  # pk order, as the complaints are locked
+            resolved = resolved_by_agent[agent_id]
+            hours = sum((now - c.created_at).total_seconds() / 3600 for c in resolved if c.created_at)
+            User.objects.filter(pk=agent_id).update(**resolved_counters(len(resolved), hours))
+        
+        Timeline.objects.bulk_create([
+            Timeline(
+                complaint=complaint,
+                action='RESOLVED',
+                description=f'Complaint resolved: {resolution_notes}',
+                performed_by=request.user,
+                metadata={'bulk': True}
+            )
+            for complaint in updated
+        ])
+        
+        customers = defaultdict(list)
+        for complaint in updated:
+            if complaint.customer_id != request.user.pk:
+                customers[complaint.customer_id].append(complaint)
+        recipients = dict(customers)
+        for agent_id, items in resolved_by_agent.items():
+            if agent_id != request.user.pk:
+                recipients.setdefault(agent_id, []).extend(items)
+        resolver = request.user.first_name or request.user.email
+        enqueue(*_aggregate(
+            recipients,
+            title=lambda items: f'Complaint {items[0].complaint_number} Resolved' if len(items) == 1 else f'{_plural(items)} Resolved',
+            message=lambda items: f'Resolved by {resolver}',
+            category='COMPLAINT_RESOLVED',
+            notification_type='success',
+        ))
+    
+    return _bulk_response('resolved', updated, skipped, missing)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_close(request):
+    """Close many complaints"""
+    data, error = _validate(request, BulkComplaintActionSerializer)
+    if error:
+        return error
+    
+    now = timezone.now()
+    with transaction.atomic():
+        complaints, missing = _lock_complaints(data['complaint_ids'])
+        updated, skipped = [], []
+        for complaint in complaints:
+            if complaint.status == 'CLOSED':
+                skipped.append({'id': str(complaint.pk), 'reason': 'Complaint is already closed'})
+            else:
+                updated.append(complaint)
+        
+        for complaint in updated:
+            complaint.status = 'CLOSED'
+            complaint.closed_at = now
+            complaint.updated_at = now
+        Complaint.objects.bulk_update(updated, ['status', 'closed_at', 'updated_at'])
+        
+        Timeline.objects.bulk_create([
+            Timeline(
+                complaint=complaint,
+                action='CLOSED',
+                description=f'Complaint closed by {request.user.email} ({request.user.role})',
+                performed_by=request.user,
+                metadata={'bulk': True}
+            )
+            for complaint in updated
+        ])
+        
+        recipients = defaultdict(list)
+        for complaint in updated:
+            for user_id in {complaint.customer_id, complaint.assigned_to_id} - {None, request.user.pk}:
+                recipients[user_id].append(complaint)
+        closer = request.user.first_name or request.user.email
+        enqueue(*_aggregate(
+            recipients,
+            title=lambda items: f'Complaint {items[0].complaint_number} Closed' if len(items) == 1 else f'{_plural(items)} Closed',
+            message=lambda items: f'Closed by {closer}',
+            category='COMPLAINT_STATUS_CHANGED',
+        ))
+    
+    return _bulk_response('closed', updated, skipped, missing)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_update_priority(request):
+    """Change the priority of many complaints and recalculate their SLA deadlines"""
+    data, error = _validate(request, BulkPrioritySerializer)
+    if error:
+        return error
+    
+    priority = data['priority']
+    now = timezone.now()
+    with transaction.atomic():
+        complaints, missing = _lock_complaints(data['complaint_ids'])
+        updated, skipped = [], []
+        for complaint in complaints:
+            if complaint.status in ('RESOLVED', 'CLOSED'):
+                skipped.append({'id': str(complaint.pk), 'reason': f'Complaint is {complaint.status.lower()}'})
+            elif complaint.priority == priority:
+                skipped.append({'id': str(complaint.pk), 'reason': f'Priority is already {priority}'})
+            else:
+                updated.append(complaint)
+        
+        timeline = []
+        deadlines = {}
+        for complaint in updated:
+            timeline.append(Timeline(
+                complaint=complaint,
+                action='PRIORITY_UPDATED',
+                description=f'Priority changed from {complaint.priority} to {priority}',
+                performed_by=request.user,
+                metadata={'bulk': True}
+            ))
+            if complaint.category not in deadlines:
+                deadlines[complaint.category] = calculate_sla_deadline(priority, complaint.category)
+            complaint.priority = priority
+            complaint.sla_deadline = deadlines[complaint.category]
+            complaint.updated_at = now
+        Complaint.objects.bulk_update(updated, ['priority', 'sla_deadline', 'updated_at'])
+        Timeline.objects.bulk_create(timeline)
+        
+        agents = defaultdict(list)
+        for complaint in updated:
+            if complaint.assigned_to_id and complaint.assigned_to_id != request.user.pk:
+                agents[complaint.assigned_to_id].append(complaint)
+        enqueue(*_aggregate(
+            agents,
+            title=lambda items: 'Priority Changed',
+            message=lambda items: f'Priority set to {priority} on {_plural(items)}',
+            category='COMPLAINT_STATUS_CHANGED',
+        ))
+    
+    return _bulk_response('updated', updated, skipped, missing)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_complaints(request):
+    """Import complaints from an uploaded CSV/JSONL file (see apps.complaints.importer)"""
+    if request.user.role != 'ADMIN':
+        return Response({'error': 'Only admins can import complaints'}, status=status.HTTP_403_FORBIDDEN)
+    
+    upload = request.FILES.get('file')
+    if not upload:
+        return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+    fmt = request.data.get('format') or detect_format(upload.name)
+    if fmt not in FORMATS:
+        return Response({'error': f'format must be one of {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    default_customer = None
+    if request.data.get('customer_email'):
+        default_customer = User.objects.filter(email=request.data['customer_email']).first()
+        if not default_customer:
+            return Response({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    importer = ComplaintImporter(request.user, default_customer=default_customer, source=upload.name)
+    result = importer.run(read_rows(open_text(upload.file), fmt))
+    return Response({
+        'message': f'Imported {result.created} of {result.rows} rows',
+        'rows': result.rows,
+        'created': result.created,
+        'failed': result.failed,
+        'errors': result.errors,
+        'errors_truncated': result.errors_truncated,
+    })
@@ -0,0 +1,197 @@
+"""
+Streaming complaint import from CSV or JSONL.
+
+Rows are read lazily and processed in chunks, so memory stays flat however
+large the input is. Each chunk is validated with ComplaintSerializer, gets a
+block of complaint numbers and its SLA deadlines in one go, and is written
+with two bulk inserts (complaints, CREATED timeline entries) in its own
+transaction. Rows that fail are reported with their row number and errors
+instead of aborting the import.
+
+Columns are the writable ComplaintSerializer fields plus `customer_email`.
+Without `priority`, the priority is derived from `expected_resolution_days`
+as it is for customers creating complaints in the app.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from django.db import transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+from apps.users.models import User
+from utils.complaint_numbers import allocate_complaint_numbers
+from utils.sla_calculator import calculate_sla_deadline
+from .models import Complaint, Timeline
+from .serializers import ComplaintSerializer, priority_for_expected_days
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (row number, row dict) from a text stream; unparsable rows are
+    yielded as (row number, ValueError)
+    """
+    if fmt == 'jsonl':
+        row_number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('Each line must be a JSON object')
+            except ValueError as e:
+                yield row_number, ValueError(f'Invalid JSON: {e}')
+                continue
+            yield row_number, row
+    elif fmt == 'csv':
+        for row_number, row in enumerate(csv.DictReader(stream), start=1):
+            # Empty cells mean "not given", not an empty value
+            yield row_number, {key: value for key, value in row.items() if key and value not in ('', None)}
+    else:
+        raise ValueError(f'Unsupported format {fmt!r}, expected one of {", ".join(FORMATS)}')
+
+
+def open_text(binary_file):
+    """Wrap an uploaded/opened binary file for streaming text reads"""
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+    errors_truncated: bool = False
+
+
+class ComplaintImporter:
+    """
+    Import complaint rows in chunks.
+
+    `on_error(row_number, errors)` is called for every rejected row; the
+    result also keeps the first `max_errors` errors for callers without one.
+    """
+    chunk_size = 1000
+    max_errors = 1000
+
+    def __init__(self, imported_by, default_customer=None, source='', chunk_size=None, on_error=None):
+        self.imported_by = imported_by
+        self.default_customer = default_customer
+        self.source = source
+        self.chunk_size = chunk_size or self.chunk_size
+        self.on_error = on_error
+        # One serializer validates every row, as ListSerializer does with its child
+        self.validator = ComplaintSerializer()
+
+    def run(self, rows):
+        result = ImportResult()
+        chunk = []
+        for row_number, row in rows:
+            result.rows += 1
+            chunk.append((row_number, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk, result)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk, result)
+        return result
+
+    def import_chunk(self, chunk, result):
+        customers = self.load_customers(row for _, row in chunk if isinstance(row, dict))
+
+        valid = []
+        for row_number, row in chunk:
+            if isinstance(row, Exception):
+                self.reject(result, row_number, {'row': [str(row)]})
+                continue
+            customer, customer_errors = self.resolve_customer(row, customers)
+            data, errors = self.validate(row)
+            if customer_errors:
+                errors = {**customer_errors, **(errors or {})}
+            if errors:
+                self.reject(result, row_number, errors)
+                continue
+            valid.append((row_number, customer, data))
+
+        if not valid:
+            return
+
+        deadlines = {}
+        with transaction.atomic():
+            numbers = allocate_complaint_numbers(len(valid))
+            complaints = []
+            for (row_number, customer, data), number in zip(valid, numbers):
+                key = (data['priority'], data['category'])
+                if key not in deadlines:
+                    deadlines[key] = calculate_sla_deadline(*key)
+                complaints.append(Complaint(
+                    complaint_number=number,
+                    customer=customer,
+                    sla_deadline=deadlines[key],
+                    **data
+                ))
+            Complaint.objects.bulk_create(complaints)
+            Timeline.objects.bulk_create([
+                Timeline(
+                    complaint=complaint,
+                    action='CREATED',
+                    description=f'Complaint imported by {self.imported_by.email}',
+                    performed_by=self.imported_by,
+                    metadata={'import_source': self.source, 'import_row': row_number}
+                )
+                for complaint, (row_number, _, _) in zip(complaints, valid)
+            ])
+        result.created += len(complaints)
+
+    def load_customers(self, rows):
+        emails = {row['customer_email'].strip().lower() for row in rows if row.get('customer_email')}
+        if not emails:
+            return {}
+        users = User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+        return {user.email_lower: user for user in users}
+
+    def resolve_customer(self, row, customers):
+        email = row.get('customer_email')
+        if not email:
+            if self.default_customer:
+                return self.default_customer, None
+            return None, {'customer_email': ['This field is required.']}
+        customer = customers.get(email.strip().lower())
+        if not customer:
+            return None, {'customer_email': [f'No user with email {email}']}
+        return customer, None
+
+    def validate(self, row):
+        row = {key: value for key, value in row.items() if key != 'customer_email'}
+        if not row.get('priority'):
+            try:
+                expected_days = int(row.get('expected_resolution_days') or 0)
+            except (TypeError, ValueError):
+                expected_days = 0  # reported by the serializer below
+            row['priority'] = priority_for_expected_days(expected_days)
+        try:
+            return self.validator.run_validation(row), None
+        except serializers.ValidationError as e:
+            return None, e.detail
+
+    def reject(self, result, row_number, errors):
+        result.failed += 1
+        errors = serializers.as_serializer_error(serializers.ValidationError(errors))
+        if self.on_error:
+            self.on_error(row_number, errors)
+        if len(result.errors) < self.max_errors:
+            result.errors.append({'row': row_number, 'errors': errors})
+        else:
+            result.errors_truncated = True
@@ -8,6 +8,7 @@ from datetime import datetime
 import io
 import uuid
 from django.core.cache import cache
+from utils.pagination import KeysetPagination
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -202,14 +203,18 @@ def list_invoices(request):
     user = request.user
     
     if user.role == 'CUSTOMER':
-        complaints = Complaint.objects.filter(customer=user).order_by('-created_at')
+        complaints = Complaint.objects.filter(customer=user)
     elif user.role == 'AGENT':
-        complaints = Complaint.objects.filter(assigned_to=user).order_by('-created_at')
+        complaints = Complaint.objects.filter(assigned_to=user)
     else:  # ADMIN
-        complaints = Complaint.objects.all().order_by('-created_at')
+        complaints = Complaint.objects.all()
+    complaints = complaints.select_related('customer')
+    
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(complaints, request)
     
     invoices = []
-    for complaint in complaints:
+    for complaint in page:
         invoices.append({
             'id': str(complaint.id),
             'invoice_number': f'INV-{complaint.complaint_number}',
@@ -221,4 +226,4 @@ def list_invoices(request):
             'amount': 0,  # Can be calculated based on service charges
         })
     
-    return Response(invoices)
+    return paginator.get_paginated_response(invoices)
@@ -0,0 +1,36 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from apps.complaints.batch_assignment import AUTO_ASSIGN_CONFIDENCE, BatchAssignment
+
+
+class Command(BaseCommand):
+    help = (
+        'Assign every unassigned active complaint at once, for the highest total confidence with no agent '
+        'past the workload threshold, in one transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be assigned')
+        parser.add_argument('--min-confidence', type=float, default=AUTO_ASSIGN_CONFIDENCE,
+                            help='Lowest confidence an assignment may have')
+
+    def handle(self, *args, **options):
+        result = BatchAssignment(min_confidence=options['min_confidence'], dry_run=options['dry_run']).run()
+
+        if options['verbosity'] > 1:
+            for assignment in result.assignments:
+                self.stdout.write(f'  {assignment.complaint.complaint_number} -> {assignment.agent.email} '
+                                  f'({assignment.confidence:.0%}, {assignment.reasoning})')
+        verb = 'would be assigned' if options['dry_run'] else 'assigned'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.complaints} unassigned complaints, {result.agents} agents with {result.slots} free slots: '
+            f'{result.assigned} {verb} (solved in {result.solve_seconds:.2f}s)'
+        ))
+        if result.assignments:
+            loads = Counter(assignment.agent.id for assignment in result.assignments)
+            mean = sum(assignment.confidence for assignment in result.assignments) / result.assigned
+            self.stdout.write(f'  mean confidence {mean:.0%}, {len(loads)} agents, at most {max(loads.values())} each')
+        if result.conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'{result.conflicts} complaints or agents changed while the run was planning and were left alone'
+            ))
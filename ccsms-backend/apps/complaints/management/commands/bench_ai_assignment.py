@@ -0,0 +1,171 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apps.complaints.models import Complaint
+from apps.complaints.synthetic import SERVICE_TYPES
+from apps.users.models import User
+from utils.agent_index import get_agent_index, reset_agent_index
+from utils.ai_assignment import CATEGORY_EXPERTISE, NEARBY_KM, AIAssignmentEngine
+from utils.pincode_geo import distance_km, get_pincode_tree
+
+CATEGORIES = ['TECHNICAL', 'PRODUCT_QUALITY', 'SERVICE']
+STATUSES = ['OPEN', 'IN_PROGRESS', 'RESOLVED', 'RESOLVED', 'CLOSED']
+
+
+def legacy_recommendations(engine, complaint):
+    """The annotated queryset scored one agent at a time, as get_agent_recommendations used to (location by distance)"""
+    agents = User.objects.filter(role='AGENT', is_active=True).order_by('id').annotate(
+        active_complaint_count=Count('assigned_complaints', filter=Q(assigned_complaints__status__in=['OPEN', 'IN_PROGRESS'])),
+        recent_resolved_count=Count('assigned_complaints', filter=Q(
+            assigned_complaints__category=complaint.category,
+            assigned_complaints__status='RESOLVED',
+            assigned_complaints__resolved_at__gte=timezone.now() - timedelta(days=90)
+        )),
+    )
+    expertise = CATEGORY_EXPERTISE.get(complaint.category, ['General'])
+    scored = []
+    for agent in agents:
+        if not agent.service_type:
+            category = 0.5
+        elif agent.service_type in expertise:
+            category = 1.0
+        elif any(name.lower() in agent.service_type.lower() for name in expertise):
+            category = 0.7
+        else:
+            category = 0.4
+        active = agent.active_complaint_count
+        workload = 0.1 if active >= engine.workload_threshold else 1.0 - active / engine.workload_threshold
+        if not complaint.pincode or not agent.pincode:
+            location = 0.5
+        elif complaint.pincode == agent.pincode:
+            location = 1.0
+        elif (km := distance_km(complaint.pincode, agent.pincode)) is not None:
+            location = 0.4 + 0.5 * max(1.0 - km / NEARBY_KM, 0.0)
+        elif len(complaint.pincode) >= 3 and len(agent.pincode) >= 3 and complaint.pincode[:3] == agent.pincode[:3]:
+            location = 0.7
+        else:
+            location = 0.4
+        resolved = agent.recent_resolved_count
+        performance = 1.0 if resolved >= 10 else 0.8 if resolved >= 5 else 0.6 if resolved >= 1 else 0.5
+        score = min(category * 0.4 + workload * 0.3 + location * 0.2 + performance * 0.1, 1.0)
+        if score > 0.3:
+            scored.append((agent.pk, score))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:3]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark agent recommendations with generated agents: per-agent scoring, every agent scored as '
+            'arrays, and the agent index short list. Everything is rolled back; run against a scratch database, '
+            'since its own agents are scored too.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, nargs='+', default=[100, 10_000, 100_000])
+        parser.add_argument('--complaints-per-agent', type=int, default=3)
+        parser.add_argument('--pincodes', type=int, default=500)
+        parser.add_argument('--samples', type=int, default=10, help='Complaints recommended for at each size')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        engine = AIAssignmentEngine()
+        rng = random.Random(options['seed'])
+        pincodes = self.sample_pincodes(rng, options['pincodes'])
+        samples = [
+            Complaint(category=rng.choice(CATEGORIES), pincode=rng.choice(pincodes + ['']))
+            for _ in range(options['samples'])
+        ]
+
+        def pairs(recommendations):
+            return [(rec['agent'].pk, rec['confidence_score']) for rec in recommendations]
+
+        self.stdout.write(
+            f'{"agents":>8} {"per-agent":>12} {"q":>3} {"vectorized":>12} {"q":>3} {"indexed":>10} {"q":>3} '
+            f'{"short list":>10} {"lookup":>9} {"index build":>12}'
+        )
+        for count in options['agents']:
+            with transaction.atomic():
+                self.create_agents(rng, count, pincodes, options['complaints_per_agent'])
+                reset_agent_index()
+                started = time.perf_counter()
+                index = get_agent_index()
+                build_ms = (time.perf_counter() - started) * 1000
+
+                legacy_ms, legacy_queries, legacy_results = self.measure(lambda c: legacy_recommendations(engine, c), samples)
+                full_ms, full_queries, full_results = self.measure(
+                    lambda c: pairs(engine.recommend(c, engine.load_agent_features(c))), samples
+                )
+                indexed_ms, indexed_queries, indexed_results = self.measure(
+                    lambda c: pairs(engine.get_agent_recommendations(c)), samples
+                )
+                lookups, sizes = [], []
+                for complaint in samples:
+                    started = time.perf_counter()
+                    with index.lock:
+                        sizes.append(len(engine.shortlist(complaint, index, 3)))
+                    lookups.append((time.perf_counter() - started) * 1000)
+                transaction.set_rollback(True)
+            reset_agent_index()
+
+            self.stdout.write(
+                f'{count:>8} {legacy_ms:>10.1f}ms {legacy_queries:>3} {full_ms:>10.1f}ms {full_queries:>3} '
+                f'{indexed_ms:>8.1f}ms {indexed_queries:>3} {statistics.median(sizes):>10g} '
+                f'{statistics.median(lookups):>7.2f}ms {build_ms:>10.0f}ms'
+            )
+            for name, results in (('every agent as arrays', full_results), ('the agent index', indexed_results)):
+                mismatches = sum(1 for a, b in zip(legacy_results, results) if a != b)
+                if mismatches:
+                    raise CommandError(f'{mismatches} complaints got different recommendations from {name} than per-agent scoring')
+        self.stdout.write(self.style.SUCCESS(
+            'All three recommended the same agents with the same scores (median per complaint; q = queries)'
+        ))
+
+    def sample_pincodes(self, rng, count):
+        """Mostly neighbouring pincodes from the pincode table (one region), the rest random"""
+        tree = get_pincode_tree()
+        known = tree.sorted_pincodes.tolist() if tree else []
+        start = rng.randrange(max(len(known) - count, 1))
+        pincodes = [str(pincode) for pincode in known[start:start + count * 9 // 10]]
+        return pincodes + [str(rng.randint(110001, 855999)) for _ in range(count - len(pincodes))]
+
+    def create_agents(self, rng, count, pincodes, per_agent):
+        run_id = uuid.uuid4().hex[:6]
+        service_types = SERVICE_TYPES + sorted({name for names in CATEGORY_EXPERTISE.values() for name in names}) + ['']
+        agents = User.objects.bulk_create([
+            User(
+                email=f'bench-agent-{run_id}-{index}@ccsms.local', username=f'bench-agent-{run_id}-{index}',
+                first_name='Bench', last_name=str(index), role='AGENT', is_verified=True, password='!',
+                service_type=rng.choice(service_types), pincode=rng.choice(pincodes),
+            )
+            for index in range(count)
+        ], batch_size=5000)
+        customer = User.objects.create(email=f'bench-customer-{run_id}@ccsms.local', username=f'bench-customer-{run_id}',
+                                       role='CUSTOMER', password='!')
+
+        now = timezone.now()
+        complaints = []
+        for index in range(count * per_agent):
+            status = rng.choice(STATUSES)
+            complaints.append(Complaint(
+                complaint_number=f'B{run_id}{index:08d}', title='Benchmark complaint', description='Benchmark',
+                category=rng.choice(CATEGORIES), priority='MEDIUM', status=status, customer=customer,
+                assigned_to=rng.choice(agents), pincode=rng.choice(pincodes),
+                resolved_at=now - timedelta(days=rng.randint(0, 180)) if status in ('RESOLVED', 'CLOSED') else None,
+            ))
+        Complaint.objects.bulk_create(complaints, batch_size=5000)
+
+    def measure(self, recommend, samples):
+        timings, results = [], []
+        connection.queries_log.clear()  # the inserts above can fill it, and then nothing new is counted
+        with CaptureQueriesContext(connection) as queries:
+            for complaint in samples:
+                started = time.perf_counter()
+                results.append(recommend(complaint))
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(queries) // len(samples), results
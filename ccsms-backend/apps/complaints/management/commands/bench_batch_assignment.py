@@ -0,0 +1,148 @@
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apps.complaints.batch_assignment import PRIORITY_ORDER, BatchAssignment, Group
+from apps.complaints.models import Complaint
+from apps.complaints.synthetic import SERVICE_TYPES
+from apps.users.models import User
+from utils.ai_assignment import CATEGORY_EXPERTISE, EPSILON, WEIGHTS
+
+
+def greedy(batch, rows, pool, capped):
+    """
+    One complaint at a time, most urgent first, to the best-scoring agent, as
+    auto_assign_best_agent does; with `capped`, full agents are skipped.
+    Returns {complaint pk: (agent index, confidence)}.
+    """
+    engine = batch.engine
+    groups = list({Group(row.category, row.pincode or '') for row in rows})
+    position = {group: g for g, group in enumerate(groups)}
+    category, location, performance = batch.pair_scores(groups, pool)
+    pair = category * WEIGHTS['category'] + location * WEIGHTS['location'] + performance * WEIGHTS['performance']
+    load = pool.active.copy()
+    chosen = {}
+    for row in sorted(rows, key=lambda row: (PRIORITY_ORDER.get(row.priority, 4), row.created_at)):
+        scores = pair[position[Group(row.category, row.pincode or '')]] + engine.workload_scores(load) * WEIGHTS['workload']
+        if capped:
+            scores = np.where(load < engine.workload_threshold, scores, -1.0)
+        a = int(np.argmax(scores))
+        if scores[a] >= batch.min_confidence - EPSILON:
+            chosen[row.pk] = (a, float(min(scores[a], 1.0)))
+            load[a] += 1
+    return chosen
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the batch assignment of an unassigned backlog against assigning one complaint at a time, '
+            'on generated complaints and agents. Everything is rolled back; run against a scratch database, '
+            'since its own backlog and agents take part too.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=5000)
+        parser.add_argument('--agents', type=int, default=500)
+        parser.add_argument('--pincodes', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.create(rng, options['complaints'], options['agents'], options['pincodes'])
+            batch = BatchAssignment()
+            rows, pool = batch.backlog(), batch.agent_pool()
+            threshold = batch.engine.workload_threshold
+
+            started = time.perf_counter()
+            one_by_one = greedy(batch, rows, pool, capped=False)
+            greedy_seconds = time.perf_counter() - started
+            capped = greedy(batch, rows, pool, capped=True)
+
+            assignments = batch.plan(rows, pool)
+            planned = {assignment.complaint.pk: assignment for assignment in assignments}
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                applied = batch.apply(assignments)
+                apply_seconds = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        index = {agent.id: a for a, agent in enumerate(pool.agents)}
+        self.stdout.write(
+            f'{len(rows)} unassigned complaints, {len(pool.agents)} agents with {batch.result.slots} free slots '
+            f'(threshold {threshold})'
+        )
+        self.stdout.write(f'{"":<28} {"assigned":>9} {"total":>9} {"mean":>6} {"over":>5} {"max load":>9} {"time":>9}')
+        for name, chosen, seconds in (
+            ('one at a time', one_by_one, greedy_seconds),
+            ('one at a time, capped', capped, None),
+            ('batch (min-cost)', {pk: (index[a.agent.id], a.confidence) for pk, a in planned.items()}, batch.result.solve_seconds),
+        ):
+            load = pool.active + np.bincount([a for a, _ in chosen.values()], minlength=len(pool.agents))
+            total = sum(confidence for _, confidence in chosen.values())
+            self.stdout.write(
+                f'{name:<28} {len(chosen):>9} {total:>9.1f} {total / max(len(chosen), 1):>6.3f} '
+                f'{int((load > threshold).sum()):>5} {int(load.max(initial=0)):>9} '
+                + (f'{seconds * 1000:>7.0f}ms' if seconds is not None else f'{"":>9}')
+            )
+        self.stdout.write(
+            f'Applied {len(applied)} assignments in one transaction: {apply_seconds * 1000:.0f}ms, {len(queries)} queries'
+        )
+
+        loads = Counter(assignment.agent.id for assignment in assignments)
+        if any(pool.active[index[agent_id]] + count > threshold for agent_id, count in loads.items()):
+            raise CommandError('The batch put an agent over the workload threshold')
+        if any(assignment.confidence < batch.min_confidence - EPSILON for assignment in assignments):
+            raise CommandError('The batch made an assignment below the minimum confidence')
+        if sum(a.confidence for a in assignments) < sum(c for _, c in capped.values()) - EPSILON:
+            raise CommandError('The batch scored lower than capped one-at-a-time assignment')
+        if len(applied) != len(assignments):
+            raise CommandError(f'{len(assignments) - len(applied)} planned assignments were not applied')
+        self.stdout.write(self.style.SUCCESS(
+            'No agent over the threshold, every assignment above the minimum confidence, and at least the '
+            'total of capped one-at-a-time assignment (everything rolled back)'
+        ))
+
+    def create(self, rng, complaints, agents, pincodes):
+        run_id = uuid.uuid4().hex[:6]
+        pincodes = [str(rng.randint(110001, 855999)) for _ in range(pincodes)]
+        categories = [value for value, _ in Complaint.CATEGORY_CHOICES]
+        service_types = SERVICE_TYPES + sorted({name for names in CATEGORY_EXPERTISE.values() for name in names})
+        agents = User.objects.bulk_create([
+            User(
+                email=f'bench-agent-{run_id}-{index}@ccsms.local', username=f'bench-agent-{run_id}-{index}',
+                first_name='Bench', last_name=str(index), role='AGENT', is_verified=True, password='!',
+                service_type=rng.choice(service_types), pincode=rng.choice(pincodes),
+                current_active_cases=rng.choice([0, 0, 1, 2, 3, 4]),
+            )
+            for index in range(agents)
+        ], batch_size=5000)
+        customer = User.objects.create(email=f'bench-customer-{run_id}@ccsms.local', username=f'bench-customer-{run_id}',
+                                       role='CUSTOMER', password='!')
+
+        now = timezone.now()
+        history = [
+            Complaint(
+                complaint_number=f'BH{run_id}{index:07d}', title='Benchmark history', description='Benchmark',
+                category=rng.choice(categories), priority='MEDIUM', status='RESOLVED', customer=customer,
+                assigned_to=rng.choice(agents), pincode=rng.choice(pincodes),
+                resolved_at=now - timedelta(days=rng.randint(0, 120)),
+            )
+            for index in range(len(agents) * 10)
+        ]
+        # The spike: most of the backlog from a few busy areas
+        hot = pincodes[:max(len(pincodes) // 10, 1)]
+        backlog = [
+            Complaint(
+                complaint_number=f'BB{run_id}{index:07d}', title='Benchmark backlog', description='Benchmark',
+                category=rng.choice(categories), priority=rng.choice(list(PRIORITY_ORDER)), status='OPEN',
+                customer=customer, pincode=rng.choice(hot if rng.random() < 0.6 else pincodes),
+            )
+            for index in range(complaints)
+        ]
+        Complaint.objects.bulk_create(history + backlog, batch_size=5000)
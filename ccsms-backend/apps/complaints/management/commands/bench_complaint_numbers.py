@@ -0,0 +1,91 @@
+import threading
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connection
+from apps.complaints.models import Complaint
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent complaint creation (complaint number allocation). Run against a scratch database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help='Number of parallel writer threads')
+        parser.add_argument('--per-writer', type=int, default=200, help='Complaints created by each writer')
+        parser.add_argument('--legacy', action='store_true', help='Use the old "sort and take the first" numbering for comparison')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark complaints instead of deleting them')
+
+    def handle(self, *args, **options):
+        writers = options['writers']
+        per_writer = options['per_writer']
+        legacy = options['legacy']
+
+        run_id = uuid.uuid4().hex[:8]
+        customer = User.objects.create(
+            email=f'bench-{run_id}@ccsms.local',
+            username=f'bench-{run_id}',
+            first_name='Bench',
+            last_name='Customer',
+            role='CUSTOMER',
+        )
+
+        results = {'created': 0, 'conflicts': 0, 'errors': 0}
+        results_lock = threading.Lock()
+        start_barrier = threading.Barrier(writers)
+
+        def writer():
+            created = conflicts = errors = 0
+            try:
+                start_barrier.wait()
+                for i in range(per_writer):
+                    complaint = Complaint(
+                        title=f'Benchmark complaint {run_id}',
+                        description='Complaint number allocation benchmark',
+                        category='TECHNICAL',
+                        priority='MEDIUM',
+                        customer=customer,
+                    )
+                    if legacy:
+                        complaint.complaint_number = self.legacy_number()
+                    try:
+                        complaint.save()
+                        created += 1
+                    except IntegrityError:
+                        conflicts += 1
+                    except Exception:
+                        errors += 1
+            finally:
+                connection.close()
+                with results_lock:
+                    results['created'] += created
+                    results['conflicts'] += conflicts
+                    results['errors'] += errors
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        bench_complaints = Complaint.objects.filter(customer=customer)
+        numbers = list(bench_complaints.values_list('complaint_number', flat=True))
+        duplicates = len(numbers) - len(set(numbers))
+
+        self.stdout.write(f"Mode: {'legacy scan' if legacy else 'allocator'} ({connection.vendor})")
+        self.stdout.write(f"Writers: {writers} x {per_writer} complaints")
+        self.stdout.write(f"Created: {results['created']}  Unique conflicts: {results['conflicts']}  Other errors: {results['errors']}")
+        self.stdout.write(f"Duplicate numbers: {duplicates}")
+        self.stdout.write(f"Elapsed: {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Throughput: {results['created'] / elapsed:.1f} creates/sec"))
+
+        if not options['keep']:
+            bench_complaints.delete()
+            customer.delete()
+
+    def legacy_number(self):
+        last_complaint = Complaint.objects.filter(complaint_number__startswith='TKT-').order_by('-complaint_number').first()
+        count = int(last_complaint.complaint_number.split('-')[1]) + 1 if last_complaint else 1
+        return f"TKT-{count:06d}"
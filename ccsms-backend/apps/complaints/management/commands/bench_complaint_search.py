@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from apps.complaints.models import Complaint
+from apps.complaints.search import full_text_search_available, search_complaints
+from apps.users.models import User
+from utils.complaint_numbers import allocate_complaint_numbers
+
+BENCH_EMAIL = 'bench-search@ccsms.local'
+
+WORDS = (
+    'router wifi signal dropped refund invoice charged twice delivery late damaged screen cracked '
+    'battery drains overheating warranty replacement technician visit installation leaking noise '
+    'billing account password reset login error app crash slow network outage cable modem remote '
+    'washing machine refrigerator compressor cooling fan motor pump filter display flicker update'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark complaint search: PostgreSQL full-text search vs the icontains scan. Run against a scratch database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Complaints to have in the table before measuring')
+        parser.add_argument('--runs', type=int, default=5, help='Timed runs per search term')
+        parser.add_argument('--terms', nargs='+', default=['refund', 'router wifi', 'cracked screen', 'thermostat'])
+        parser.add_argument('--cleanup', action='store_true', help='Delete the generated benchmark complaints afterwards')
+
+    def handle(self, *args, **options):
+        customer = self.ensure_rows(options['rows'])
+
+        self.stdout.write(f"Database: {connection.vendor}, complaints: {Complaint.objects.count()}")
+        for term in options['terms']:
+            legacy = self.time_query(options['runs'], lambda: self.legacy_search(term))
+            line = f"{term!r:20} icontains: {legacy['ms']:9.1f} ms ({legacy['rows']} rows)"
+            if full_text_search_available():
+                fts = self.time_query(options['runs'], lambda: self.fts_search(term))
+                line += f"   full-text: {fts['ms']:8.1f} ms ({fts['rows']} rows)   speed-up: {legacy['ms'] / max(fts['ms'], 0.001):.1f}x"
+            self.stdout.write(line)
+
+        if not full_text_search_available():
+            self.stdout.write(self.style.WARNING('Full-text search needs PostgreSQL; only the icontains fallback was measured.'))
+
+        if options['cleanup']:
+            Complaint.objects.filter(customer=customer).delete()
+            customer.delete()
+
+    def legacy_search(self, term):
+        """What SearchFilter on complaint_number/title/description did: one ILIKE per field and word"""
+        queryset = Complaint.objects.all()
+        for word in term.split():
+            queryset = queryset.filter(
+                Q(complaint_number__icontains=word) | Q(title__icontains=word) | Q(description__icontains=word)
+            )
+        return list(queryset.order_by('-created_at').values_list('id', flat=True)[:20])
+
+    def fts_search(self, term):
+        queryset = search_complaints(Complaint.objects.all(), term)
+        return list(queryset.order_by('-search_rank', '-pk').values_list('id', flat=True)[:20])
+
+    def time_query(self, runs, query):
+        query()  # warm up
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            rows = query()
+            timings.append((time.perf_counter() - started) * 1000)
+        return {'ms': statistics.median(timings), 'rows': len(rows)}
+
+    def ensure_rows(self, target, chunk_size=10_000):
+        customer, _ = User.objects.get_or_create(
+            email=BENCH_EMAIL,
+            defaults={'username': BENCH_EMAIL, 'first_name': 'Bench', 'last_name': 'Search', 'role': 'CUSTOMER'}
+        )
+        missing = target - Complaint.objects.count()
+        if missing <= 0:
+            return customer
+
+        self.stdout.write(f'Generating {missing} complaints...')
+        rng = random.Random(42)
+        while missing > 0:
+            size = min(chunk_size, missing)
+            numbers = allocate_complaint_numbers(size)
+            Complaint.objects.bulk_create([
+                Complaint(
+                    complaint_number=number,
+                    title=' '.join(rng.choices(WORDS, k=5)),
+                    description=' '.join(rng.choices(WORDS, k=40)),
+                    category=rng.choice(['TECHNICAL', 'PRODUCT_QUALITY', 'SERVICE']),
+                    priority=rng.choice(['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']),
+                    customer=customer,
+                )
+                for number in numbers
+            ], batch_size=2000)
+            missing -= size
+            self.stdout.write(f'  ...{target - missing} rows', ending='\r')
+        self.stdout.write('')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE complaints_complaint')
+        return customer
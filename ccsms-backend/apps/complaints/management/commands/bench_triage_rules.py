@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.complaints.triage import RuleEngine, RuleSpec
+
+CATEGORIES = ['TECHNICAL', 'PRODUCT_QUALITY', 'SERVICE']
+PRIORITIES = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+# Disjoint letters, so filler text never contains a rule keyword by accident
+KEYWORD_SYLLABLES = 'ba ce di fo gu bad cef dig fob gac abe ebi'.split()
+FILLER_SYLLABLES = 'ra ko mi tel lan vor sen pu qui mor ret sin wal yo hum zy'.split()
+
+
+def legacy_match(rules, category, priority, title, description):
+    """The per-rule, per-keyword loop auto_triage_complaint used to run"""
+    for rule in rules:
+        if rule.category and rule.category != category:
+            continue
+        if rule.priority and rule.priority != priority:
+            continue
+        if rule.keywords:
+            description_lower = description.lower()
+            title_lower = title.lower()
+            matched = False
+            for keyword in rule.keywords:
+                if keyword.lower() in description_lower or keyword.lower() in title_lower:
+                    matched = True
+                    break
+            if not matched:
+                continue
+        return rule
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark triage rule matching: compiled RuleEngine vs the per-keyword loop (in memory, no database).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', type=int, default=1000)
+        parser.add_argument('--keywords', type=int, default=50, help='Keywords per rule')
+        parser.add_argument('--complaints', type=int, default=500)
+        parser.add_argument('--words', type=int, default=150, help='Words per complaint description')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        keyword_words = sorted({''.join(rng.choices(KEYWORD_SYLLABLES, k=rng.randint(2, 4))) for _ in range(30_000)})
+        filler = sorted({''.join(rng.choices(FILLER_SYLLABLES, k=rng.randint(1, 3))) for _ in range(5_000)})
+        rules = [
+            RuleSpec(
+                id=index,
+                category=rng.choice(CATEGORIES + [None]),
+                priority=rng.choice(PRIORITIES + [None, None]),
+                keywords=[' '.join(rng.choices(keyword_words, k=rng.choice([1, 1, 2]))) for _ in range(options['keywords'])],
+            )
+            for index in range(options['rules'])
+        ]
+        complaints = []
+        for _ in range(options['complaints']):
+            description = rng.choices(filler, k=options['words'])
+            # Most complaints mention a keyword of some rule, wherever it sits in the order
+            if rng.random() < 0.7:
+                description.insert(rng.randrange(len(description)), rng.choice(rng.choice(rules).keywords))
+            complaints.append((rng.choice(CATEGORIES), rng.choice(PRIORITIES),
+                               ' '.join(rng.choices(filler, k=8)).title(), ' '.join(description)))
+
+        started = time.perf_counter()
+        engine = RuleEngine(rules)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        legacy_ms, legacy_results = self.time_each(lambda c: legacy_match(rules, *c), complaints)
+        engine_ms, engine_results = self.time_each(lambda c: engine.match(*c), complaints)
+
+        mismatches = sum(1 for a, b in zip(legacy_results, engine_results) if a != b)
+        matched = sum(1 for result in engine_results if result is not None)
+        self.stdout.write(
+            f"{options['rules']} rules x {options['keywords']} keywords, {len(complaints)} complaints "
+            f"({matched} matched a rule)"
+        )
+        self.stdout.write(f'compile:     {compile_ms:9.1f} ms (once per rules change and process)')
+        self.stdout.write(f'legacy loop: {legacy_ms:9.3f} ms per complaint (median)')
+        self.stdout.write(f'compiled:    {engine_ms:9.3f} ms per complaint (median)   speed-up: {legacy_ms / max(engine_ms, 1e-6):.0f}x')
+        if mismatches:
+            raise CommandError(f'{mismatches} complaints matched a different rule than the legacy loop')
+        self.stdout.write(self.style.SUCCESS('Both picked the same rule for every complaint'))
+
+    def time_each(self, match, complaints):
+        timings, results = [], []
+        for complaint in complaints:
+            started = time.perf_counter()
+            results.append(match(complaint))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), results
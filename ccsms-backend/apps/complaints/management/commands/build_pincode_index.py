@@ -0,0 +1,66 @@
+import bz2
+import csv
+import gzip
+import json
+from collections import defaultdict
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from utils.pincode_geo import PincodeTree
+
+# Coordinates outside India are data-entry errors
+LATITUDES = (6.0, 37.5)
+LONGITUDES = (68.0, 97.5)
+
+
+def _open(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_offices(path):
+    """(pincode, latitude, longitude) of every post office in a CSV or JSON-lines (*.json*) copy of the directory"""
+    with _open(path) as f:
+        rows = (json.loads(line) for line in f if line.strip()) if '.json' in path else csv.DictReader(f)
+        for row in rows:
+            row = {key.strip().lower(): value for key, value in row.items()}
+            try:
+                yield int(row['pincode']), float(row['latitude']), float(row['longitude'])
+            except (KeyError, TypeError, ValueError):
+                continue  # no coordinates ('NA', empty)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile pincode centroids (the median position of each pincode's post offices) into the table "
+        "utils.pincode_geo maps. The source is India Post's All India Pincode Directory, as CSV or JSON lines "
+        "(optionally .gz/.bz2) with pincode, latitude and longitude fields."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source')
+        parser.add_argument('--output', default=str(settings.PINCODE_INDEX_PATH))
+
+    def handle(self, *args, **options):
+        offices = defaultdict(list)
+        skipped = 0
+        for pincode, lat, lon in read_offices(options['source']):
+            if not (100000 <= pincode <= 999999 and LATITUDES[0] <= lat <= LATITUDES[1]
+                    and LONGITUDES[0] <= lon <= LONGITUDES[1]):
+                skipped += 1
+                continue
+            offices[pincode].append((lat, lon))
+        if not offices:
+            raise CommandError('No post office with a pincode and coordinates in the source')
+
+        pincodes = sorted(offices)
+        centroids = np.array([np.median(np.array(offices[pincode]), axis=0) for pincode in pincodes])
+        tree = PincodeTree.build(pincodes, centroids[:, 0], centroids[:, 1])
+        tree.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(tree)} pincodes from {sum(map(len, offices.values()))} post offices '
+            f'({skipped} with coordinates outside India skipped) written to {options["output"]}'
+        ))
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+from apps.complaints.models import Attachment, AttachmentBlob
+from utils.storage import BLOB_PREFIX, blob_name, get_attachment_storage, normalized_extension
+
+
+class Command(BaseCommand):
+    help = (
+        'Move attachment files uploaded before content-addressed storage into blobs/, '
+        'merging identical files, and rebuild the blob reference counts. Safe to re-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be merged')
+        parser.add_argument('--recount', action='store_true', help='Only rebuild the reference counts')
+
+    def handle(self, *args, **options):
+        self.storage = get_attachment_storage()
+        self.dry_run = options['dry_run']
+        self.pending = set()  # blobs written (or, with --dry-run, that would be) by this run
+        if not options['recount']:
+            self.migrate_files(options['batch_size'])
+        if not self.dry_run:
+            self.recount()
+
+    def migrate_files(self, batch_size):
+        legacy = Attachment.objects.exclude(file__startswith=f'{BLOB_PREFIX}/').only('id', 'file').order_by('pk')
+        stats = {'rows': 0, 'files': 0, 'duplicates': 0, 'missing': 0, 'bytes_saved': 0}
+        seen = {}  # legacy name -> blob name, for rows sharing a file
+        batch = []
+        for attachment in legacy.iterator(chunk_size=batch_size):
+            stats['rows'] += 1
+            name = attachment.file.name
+            if name not in seen:
+                seen[name] = self.store(name, stats)
+            if seen[name]:
+                attachment.file.name = seen[name]
+                batch.append((attachment, name))
+            if len(batch) >= batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+
+        verb = 'Would merge' if self.dry_run else 'Merged'
+        self.stdout.write(
+            f"{stats['rows']} legacy attachment rows, {stats['files']} files: {verb} {stats['duplicates']} duplicates "
+            f"({stats['bytes_saved'] / 1024 / 1024:.1f} MB)"
+        )
+        if stats['missing']:
+            self.stdout.write(self.style.WARNING(f"{stats['missing']} files are missing from the media root and were left as they are"))
+
+    def store(self, name, stats):
+        """Copy a legacy file into its blob (hard link when possible); returns the blob name"""
+        path = self.storage.path(name)
+        if not os.path.exists(path):
+            stats['missing'] += 1
+            return None
+        stats['files'] += 1
+
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        final = blob_name(sha256.hexdigest(), normalized_extension(name))
+        final_path = self.storage.path(final)
+
+        if os.path.exists(final_path) or final in self.pending:
+            stats['duplicates'] += 1
+            stats['bytes_saved'] += os.path.getsize(path)
+        elif not self.dry_run:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            try:
+                os.link(path, final_path)
+            except OSError:
+                shutil.copyfile(path, final_path)
+        self.pending.add(final)
+        return final
+
+    def flush(self, batch):
+        """Point the rows at their blobs, then remove the legacy files once that is committed"""
+        if not batch or self.dry_run:
+            return
+        with transaction.atomic():
+            Attachment.objects.bulk_update([attachment for attachment, _ in batch], ['file'])
+        for _, old_name in batch:
+            if not Attachment.objects.filter(file=old_name).exists():
+                self.storage.delete(old_name)
+
+    def recount(self):
+        """Rebuild AttachmentBlob from the attachment rows (run while uploads are paused)"""
+        counts = (
+            Attachment.objects.filter(file__startswith=f'{BLOB_PREFIX}/')
+            .values('file').annotate(refs=Count('id'), size=Max('file_size')).order_by()
+        )
+        with transaction.atomic():
+            blobs = AttachmentBlob.objects.select_for_update().in_bulk()
+            changed, created, referenced = [], [], set()
+            for row in counts.iterator():
+                referenced.add(row['file'])
+                blob = blobs.get(row['file'])
+                if blob is None:
+                    created.append(AttachmentBlob(name=row['file'], size=row['size'] or 0, ref_count=row['refs']))
+                elif blob.ref_count != row['refs']:
+                    blob.ref_count = row['refs']
+                    changed.append(blob)
+            AttachmentBlob.objects.bulk_create(created, batch_size=1000)
+            AttachmentBlob.objects.bulk_update(changed, ['ref_count'], batch_size=1000)
+            stale = [name for name in blobs if name not in referenced]
+            AttachmentBlob.objects.filter(pk__in=stale).delete()
+            transaction.on_commit(lambda: AttachmentBlob.objects.delete_files(stale))
+        self.stdout.write(self.style.SUCCESS(
+            f'Reference counts: {len(created)} added, {len(changed)} corrected, {len(stale)} unreferenced removed'
+        ))
@@ -0,0 +1,134 @@
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import timedelta
+from apps.complaints.models import Complaint, Comment, Timeline
+from apps.complaints.search import full_text_search_available, search_complaints
+from apps.notifications.models import Notification
+from apps.audit.models import AuditLog
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot complaint/notification/timeline/audit queries and check the planner uses the intended index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query')
+        parser.add_argument(
+            '--no-force',
+            action='store_true',
+            help='PostgreSQL: do not disable sequential scans (small tables are often seq-scanned regardless of indexes)'
+        )
+
+    def hot_queries(self):
+        """(label, queryset, expected index name or plan fragments that must all appear, is partial index)"""
+        now = timezone.now()
+        some_id = uuid.uuid4()
+        queries = [
+            (
+                'check_sla_breaches',
+                Complaint.objects.filter(
+                    sla_deadline__lt=now,
+                    status__in=['OPEN', 'IN_PROGRESS', 'ESCALATED'],
+                    sla_breached=False
+                ),
+                'cmp_sla_open_idx',
+                True,
+            ),
+            (
+                'agent workload (active complaints of one agent)',
+                Complaint.objects.filter(assigned_to_id=some_id, status__in=['OPEN', 'IN_PROGRESS']),
+                'cmp_assignee_status_idx',
+                False,
+            ),
+            (
+                'auto_escalate_complaints',
+                Complaint.objects.filter(
+                    category='TECHNICAL',
+                    priority='HIGH',
+                    created_at__lt=now - timedelta(hours=24),
+                    status__in=['OPEN', 'IN_PROGRESS']
+                ),
+                'cmp_escalation_idx',
+                True,
+            ),
+            (
+                'admin complaint list (keyset page)',
+                Complaint.objects.order_by('-created_at', '-id')[:21],
+                'cmp_created_id_idx',
+                False,
+            ),
+            (
+                'customer complaint list',
+                Complaint.objects.filter(customer_id=some_id).order_by('-created_at')[:21],
+                'cmp_customer_created_idx',
+                False,
+            ),
+            (
+                'complaint timeline',
+                Timeline.objects.filter(complaint_id=some_id).order_by('-created_at'),
+                'timeline_cmp_created_idx',
+                False,
+            ),
+            (
+                'complaint comments',
+                Comment.objects.filter(complaint_id=some_id).order_by('-created_at')[:21],
+                'comment_cmp_created_idx',
+                False,
+            ),
+            (
+                'notification list',
+                Notification.objects.filter(user_id=some_id).order_by('-sent_at')[:21],
+                'notif_user_sent_idx',
+                False,
+            ),
+            (
+                'complaint audit log',
+                AuditLog.objects.filter(entity_type='Complaint', entity_id=str(some_id)).order_by('-timestamp'),
+                'audit_entity_idx',
+                False,
+            ),
+            (
+                'audit log list (keyset page)',
+                AuditLog.objects.order_by('-timestamp', '-id')[:21],
+                'audit_timestamp_id_idx',
+                False,
+            ),
+        ]
+        if full_text_search_available():
+            queries.append((
+                'complaint search (full text or exact number)',
+                search_complaints(Complaint.objects.all(), 'tkt-000001'),
+                ('cmp_search_vector_gin', 'BitmapOr'),
+                False,
+            ))
+        return queries
+
+    def handle(self, *args, **options):
+        failures = []
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and not options['no_force']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for label, queryset, index_name, partial in self.hot_queries():
+                plan = queryset.explain()
+                expected = (index_name,) if isinstance(index_name, str) else index_name
+                index_name = ' + '.join(expected)
+                if partial and connection.vendor == 'sqlite':
+                    # SQLite only matches partial indexes against literal values, never bound parameters
+                    self.stdout.write(self.style.WARNING(f'- {label}: skipped ({index_name} is partial, check on PostgreSQL)'))
+                    continue
+                uses_index = all(name in plan for name in expected)
+                if uses_index:
+                    self.stdout.write(self.style.SUCCESS(f'✓ {label}: uses {index_name}'))
+                else:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'✗ {label}: expected {index_name}'))
+                if options['verbose_plans'] or not uses_index:
+                    self.stdout.write(f'    {plan}'.replace('\n', '\n    '))
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries are not using their intended index')
+        self.stdout.write(self.style.SUCCESS('\nAll hot queries use their intended indexes'))
@@ -41,11 +41,11 @@ class Command(BaseCommand):
     
     def fix_status_sync(self):
         # OPEN with assignment
-        count = Complaint.objects.filter(status='OPEN', assigned_to__isnull=False).update(status='IN_PROGRESS')
+        count = Complaint.objects.filter(status='OPEN', assigned_to__isnull=False).update(status='IN_PROGRESS', updated_at=timezone.now())
         self.stdout.write(f'Fixed {count} OPEN complaints with agents')
         
         # IN_PROGRESS without assignment
-        count = Complaint.objects.filter(status='IN_PROGRESS', assigned_to__isnull=True).update(status='OPEN')
+        count = Complaint.objects.filter(status='IN_PROGRESS', assigned_to__isnull=True).update(status='OPEN', updated_at=timezone.now())
         self.stdout.write(f'Fixed {count} IN_PROGRESS without agents')
     
     def fix_agent_workload(self):
@@ -0,0 +1,56 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.complaints.synthetic import SyntheticDataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate production-scale synthetic users and complaints (with comments, timelines, feedback and '
+        'notifications) for local performance work. Run against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=10000)
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--agents', type=int, default=100)
+        parser.add_argument('--admins', type=int, default=3)
+        parser.add_argument('--pincodes', type=int, default=300, help='Distinct pincodes users are spread over')
+        parser.add_argument('--days', type=int, default=365, help='Complaints are created over this many past days')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Writer processes (PostgreSQL)')
+        parser.add_argument('--chunk-size', type=int, default=SyntheticDataset.chunk_size)
+        parser.add_argument('--seed', type=int, help='Seed for a reproducible dataset')
+        parser.add_argument('--password', default='password123', help='Password of every generated user')
+
+    def handle(self, *args, **options):
+        if options['complaints'] and not (options['customers'] and options['agents']):
+            raise CommandError('Complaints need at least one customer and one agent')
+
+        started = time.perf_counter()
+
+        def on_progress(done, total):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'  {done:,}/{total:,} complaints ({done / elapsed:,.0f}/s)')
+
+        dataset = SyntheticDataset(
+            customers=options['customers'],
+            agents=options['agents'],
+            admins=options['admins'],
+            complaints=options['complaints'],
+            pincodes=options['pincodes'],
+            days=options['days'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            seed=options['seed'],
+            password=options['password'],
+            on_progress=on_progress if options['verbosity'] > 0 else None,
+        )
+        result = dataset.run()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.complaints:,} complaints in {elapsed:.1f}s: {result.customers:,} customers, '
+            f'{result.agents:,} agents, {result.admins:,} admins, {result.comments:,} comments, '
+            f'{result.timeline:,} timeline entries, {result.feedback:,} feedback, '
+            f'{result.notifications:,} notifications'
+        ))
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.complaints.models import Attachment
+from apps.users.models import User
+from utils.thumbnails import FAILED, render
+
+
+def _render_batch(model_label, file_field, jobs):
+    """Worker: render (pk, name) jobs; no database access"""
+    storage = apps.get_model(model_label)._meta.get_field(file_field).storage
+    return [(pk, name, render(storage, name)) for pk, name in jobs]
+
+
+class Command(BaseCommand):
+    help = (
+        'Render thumbnails and previews for image attachments and avatars that have none yet '
+        '(uploaded before the rendition pipeline), in a pool of worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--batch-size', type=int, default=50, help='Images per worker job')
+        parser.add_argument('--skip-avatars', action='store_true')
+
+    def handle(self, *args, **options):
+        sources = [
+            (Attachment, 'file', 'renditions',
+             Attachment.objects.filter(mime_type__startswith='image/', renditions={})),
+        ]
+        if not options['skip_avatars']:
+            sources.append(
+                (User, 'avatar', 'avatar_renditions', User.objects.exclude(avatar='').filter(avatar_renditions={}))
+            )
+
+        # Workers only decode and encode images; rows are read and updated here
+        close_old_connections()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            for model, file_field, renditions_field, queryset in sources:
+                self.backfill(pool, model, file_field, renditions_field, queryset, options['batch_size'])
+
+    def backfill(self, pool, model, file_field, renditions_field, queryset, batch_size):
+        rows = queryset.exclude(**{file_field: ''}).values_list('pk', file_field).order_by('pk')
+        jobs, batch = [], []
+        for pk, name in rows.iterator(chunk_size=1000):
+            batch.append((pk, name))
+            if len(batch) >= batch_size:
+                jobs.append(batch)
+                batch = []
+        if batch:
+            jobs.append(batch)
+
+        rendered = failed = 0
+        for results in pool.map(partial(_render_batch, model._meta.label, file_field), jobs):
+            for pk, name, renditions in results:
+                # Only if the file was not replaced meanwhile
+                model._default_manager.filter(pk=pk, **{file_field: name}).update(**{renditions_field: renditions})
+                if renditions == FAILED:
+                    failed += 1
+                else:
+                    rendered += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{model._meta.verbose_name_plural}: {rendered} rendered, {failed} could not be decoded'
+        ))
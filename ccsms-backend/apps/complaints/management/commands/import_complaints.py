@@ -0,0 +1,67 @@
+import csv
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from apps.complaints.importer import ComplaintImporter, FORMATS, detect_format, open_text, read_rows
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Stream complaints from a CSV or JSONL file into the database in chunks, with a per-row error report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV/JSONL file to import ('-' for stdin)")
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension)')
+        parser.add_argument('--imported-by', help='Admin email recorded on the timeline (default: first active admin)')
+        parser.add_argument('--customer', help='Customer email for rows without a customer_email column')
+        parser.add_argument('--chunk-size', type=int, default=ComplaintImporter.chunk_size)
+        parser.add_argument('--report', help='Write rejected rows to this CSV file (row, errors)')
+
+    def handle(self, *args, **options):
+        imported_by = self.get_user(options['imported_by'], role='ADMIN')
+        default_customer = self.get_user(options['customer']) if options['customer'] else None
+        fmt = options['format'] or detect_format(options['path'])
+
+        report_file = open(options['report'], 'w', newline='') if options['report'] else None
+        report = csv.writer(report_file) if report_file else None
+        if report:
+            report.writerow(['row', 'errors'])
+
+        def on_error(row_number, errors):
+            if report:
+                report.writerow([row_number, json.dumps(errors)])
+
+        importer = ComplaintImporter(
+            imported_by,
+            default_customer=default_customer,
+            source=options['path'],
+            chunk_size=options['chunk_size'],
+            on_error=on_error,
+        )
+        try:
+            if options['path'] == '-':
+                result = importer.run(read_rows(open_text(sys.stdin.buffer), fmt))
+            else:
+                with open(options['path'], 'rb') as f:
+                    result = importer.run(read_rows(open_text(f), fmt))
+        finally:
+            if report_file:
+                report_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {result.created} of {result.rows} rows'))
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f'{result.failed} rows rejected'))
+            if not report:
+                for error in result.errors[:20]:
+                    self.stdout.write(f"  row {error['row']}: {json.dumps(error['errors'])}")
+                if result.failed > 20:
+                    self.stdout.write('  ... use --report to write every rejected row')
+
+    def get_user(self, email, role=None):
+        users = User.objects.filter(is_active=True)
+        if role:
+            users = users.filter(role=role)
+        user = users.filter(email=email).first() if email else users.order_by('date_joined').first()
+        if not user:
+            raise CommandError(f'No active {(role or "user").lower()} {email or ""}'.strip())
+        return user
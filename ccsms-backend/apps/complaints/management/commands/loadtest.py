@@ -0,0 +1,114 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from apps.users.models import User
+from utils.loadtest import LoadTest, LoadTestError, compare
+
+
+class Command(BaseCommand):
+    help = ('Replay a per-role request mix against a running server and report p50/p95/p99 and req/s '
+            'per endpoint, compared with a saved baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--customers', type=int, default=20, help='Customer virtual users')
+        parser.add_argument('--agents', type=int, default=8, help='Agent virtual users')
+        parser.add_argument('--admins', type=int, default=2, help='Admin virtual users')
+        parser.add_argument('--duration', type=float, default=60, help='Measured seconds')
+        parser.add_argument('--warmup', type=float, default=5, help='Seconds run before measuring')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between requests (seconds)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--password', default='password123', help='Password of the accounts used')
+        parser.add_argument('--baseline', default='loadtest-baseline.json')
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+        parser.add_argument('--tolerance', type=float, default=10.0,
+                            help='Percent p95 increase or req/s drop that counts as a regression')
+        parser.add_argument('--min-requests', type=int, default=20,
+                            help='Endpoints with fewer samples are compared but never flagged')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--output', help='Also write this run as JSON to this file')
+
+    def handle(self, *args, **options):
+        users = {'CUSTOMER': options['customers'], 'AGENT': options['agents'], 'ADMIN': options['admins']}
+        test = LoadTest(
+            options['url'], users, self.accounts(users, options['password']),
+            duration=options['duration'], warmup=options['warmup'], think_time=options['think_time'],
+            seed=options['seed'],
+        )
+        self.stdout.write(f'{sum(users.values())} virtual users against {options["url"]} for '
+                          f'{options["duration"]:g}s (+{options["warmup"]:g}s warm-up)...')
+        try:
+            result = test.run().as_json()
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        baseline = None
+        if os.path.exists(options['baseline']) and not options['save_baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        self.report(result, baseline, options['tolerance'], options['min_requests'], options['fail_on_regression'])
+
+        if options['output']:
+            self.write(options['output'], result)
+        if options['save_baseline']:
+            self.write(options['baseline'], result)
+            self.stdout.write(self.style.SUCCESS(f'Saved as the baseline in {options["baseline"]}'))
+
+    def accounts(self, users, password):
+        """The same accounts every run: customers with the most complaints, agents with the most active cases"""
+        accounts = {}
+        ordering = {
+            'CUSTOMER': User.objects.filter(role='CUSTOMER').annotate(n=Count('complaints')).order_by('-n', 'email'),
+            'AGENT': User.objects.filter(role='AGENT', is_verified=True).order_by('-current_active_cases', 'email'),
+            'ADMIN': User.objects.filter(role='ADMIN').order_by('email'),
+        }
+        for role, count in users.items():
+            emails = ordering[role].filter(is_active=True).values_list('email', flat=True)[:count]
+            accounts[role] = [(email, password) for email in emails]
+        return accounts
+
+    def report(self, result, baseline, tolerance, min_requests, fail_on_regression=False):
+        changes = {change.name: change for change in compare(result, baseline, tolerance, min_requests)} if baseline else {}
+        if baseline and baseline['config'] != result['config']:
+            self.stdout.write(self.style.WARNING(
+                'The baseline was recorded with different settings: '
+                + ', '.join(f'{key}={value}' for key, value in baseline['config'].items()
+                            if result['config'].get(key) != value)
+            ))
+
+        header = f'{"endpoint":<52} {"reqs":>6} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"errors":>6}'
+        self.stdout.write(header + ('   p95 vs base  req/s vs base' if baseline else ''))
+        regressions = []
+        for name, stats in list(result['endpoints'].items()) + [('total', result['total'])]:
+            line = (f'{name:<52} {stats["requests"]:>6} {stats["rps"]:>8.2f} {stats["p50"]:>6.1f}ms '
+                    f'{stats["p95"]:>6.1f}ms {stats["p99"]:>6.1f}ms {stats["errors"]:>6}')
+            change = changes.get(name)
+            if change and change.p95_change is not None:
+                line += f'   {change.p95_change:>+10.1f}% {change.rps_change:>+12.1f}%'
+            elif baseline:
+                line += '   (new)'
+            if change and change.p95_change is not None and min(stats['requests'], change.baseline['requests']) < min_requests:
+                line += '  (few samples)'
+            if change and change.regressed:
+                regressions.append(name)
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
+        for name, change in changes.items():
+            if change.current is None:
+                self.stdout.write(f'{name:<52} not requested in this run')
+
+        if not baseline:
+            return
+        if regressions:
+            message = f'{len(regressions)} endpoint(s) regressed by more than {tolerance:g}%: {", ".join(regressions)}'
+            if fail_on_regression:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'No endpoint regressed by more than {tolerance:g}%'))
+
+    def write(self, path, result):
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
@@ -0,0 +1,41 @@
+import os
+from django.core.management.base import BaseCommand
+from apps.complaints.retriage import BacklogRetriage
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-apply the active triage rules to the open complaints, matching in a pool of worker processes. '
+        'An interrupted run resumes from its checkpoint unless the rules changed meanwhile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--chunk-size', type=int, default=BacklogRetriage.chunk_size)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be assigned')
+        parser.add_argument('--restart', action='store_true', help='Start from the beginning instead of the checkpoint')
+
+    def handle(self, *args, **options):
+        def on_change(row, rule):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {row.complaint_number} -> {rule.auto_assign_to.email} ({rule.name})')
+
+        retriage = BacklogRetriage(
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            restart=options['restart'],
+            on_change=on_change,
+        )
+        result = retriage.run()
+
+        if result.resumed_from:
+            self.stdout.write(f'Resumed after complaint {result.resumed_from}')
+        verb = 'would be assigned' if options['dry_run'] else 'assigned'
+        self.stdout.write(self.style.SUCCESS(f'{result.scanned} open complaints, {result.assigned} {verb}'))
+        for name, count in sorted(result.by_rule.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {name}: {count}')
+        if result.conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'{result.conflicts} complaints changed while the run was matching them and were left alone'
+            ))
@@ -3,6 +3,13 @@
 from django.db import migrations
 
 
+def drop_billing_amount(apps, schema_editor):
+    # The column only ever existed in PostgreSQL databases; SQLite has no DROP COLUMN IF EXISTS
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE complaints_complaint DROP COLUMN IF EXISTS billing_amount;')
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -10,8 +17,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunSQL(
-            sql='ALTER TABLE complaints_complaint DROP COLUMN IF EXISTS billing_amount;',
-            reverse_sql='-- No reverse operation',
-        ),
+        migrations.RunPython(drop_billing_amount, migrations.RunPython.noop),
     ]
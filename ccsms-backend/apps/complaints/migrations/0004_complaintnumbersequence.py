@@ -0,0 +1,36 @@
+# Generated by Django 4.2.9 on 2026-10-17 09:00
+
+from django.db import migrations, models
+
+
+def seed_sequence(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintNumberSequence = apps.get_model('complaints', 'ComplaintNumberSequence')
+
+    last_value = 0
+    numbers = Complaint.objects.filter(complaint_number__startswith='TKT-').values_list('complaint_number', flat=True)
+    for number in numbers.iterator(chunk_size=5000):
+        try:
+            last_value = max(last_value, int(number.split('-')[1]))
+        except (IndexError, ValueError):
+            continue
+
+    ComplaintNumberSequence.objects.update_or_create(name='TKT', defaults={'last_value': last_value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0003_remove_billing_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintNumberSequence',
+            fields=[
+                ('name', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.9 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_complaintnumbersequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['complaint', '-created_at'], name='comment_cmp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-created_at', '-id'], name='cmp_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['customer', '-created_at'], name='cmp_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['assigned_to', 'status'], name='cmp_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('sla_breached', False), ('status__in', ['OPEN', 'IN_PROGRESS', 'ESCALATED'])), fields=['sla_deadline'], name='cmp_sla_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('status__in', ['OPEN', 'IN_PROGRESS'])), fields=['category', 'priority', 'created_at'], name='cmp_escalation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeline',
+            index=models.Index(fields=['complaint', '-created_at'], name='timeline_cmp_created_idx'),
+        ),
+    ]
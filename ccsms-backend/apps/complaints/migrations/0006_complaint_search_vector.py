@@ -0,0 +1,65 @@
+# Generated by Django 4.2.9 on 2026-10-17 10:00
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_DOCUMENT = """
+    setweight(to_tsvector('english', coalesce({row}complaint_number, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'B')
+"""
+
+FORWARD_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION complaints_complaint_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_DOCUMENT.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER complaints_complaint_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF complaint_number, title, description, search_vector ON complaints_complaint
+    FOR EACH ROW EXECUTE PROCEDURE complaints_complaint_search_vector_update();
+    """,
+    f"UPDATE complaints_complaint SET search_vector = {SEARCH_DOCUMENT.format(row='')};",
+    "CREATE INDEX IF NOT EXISTS cmp_search_vector_gin ON complaints_complaint USING gin (search_vector);",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS cmp_search_vector_gin;",
+    "DROP TRIGGER IF EXISTS complaints_complaint_search_vector_trigger ON complaints_complaint;",
+    "DROP FUNCTION IF EXISTS complaints_complaint_search_vector_update();",
+]
+
+
+def create_search_trigger(apps, schema_editor):
+    # Full-text search is PostgreSQL only; other backends fall back to icontains
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in FORWARD_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in REVERSE_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Full-text search document (PostgreSQL trigger + GIN index)', null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-17 04:01
+
+from django.db import migrations, models
+import utils.storage
+import utils.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0006_complaint_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('name', models.CharField(help_text='Storage name, blobs/aa/bb/<sha256><ext>', max_length=255, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='file',
+            field=models.FileField(storage=utils.storage.get_attachment_storage, upload_to='attachments/%Y/%m/%d/', validators=[utils.validators.validate_file_size]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0007_attachment_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, help_text='Thumbnail/preview names for images (utils.thumbnails)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0008_attachment_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagerule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Tells workers their compiled rules are stale (see triage.py)'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_triagerule_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TriageRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('rules_fingerprint', models.CharField(help_text='Rules the run was started with', max_length=64)),
+                ('last_complaint_id', models.UUIDField(blank=True, help_text='Checkpoint: last complaint of the last applied chunk', null=True)),
+                ('scanned', models.IntegerField(default=0)),
+                ('assigned', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -1,13 +1,26 @@
 import uuid
-from django.db import models
+from collections import Counter
+from django.db import IntegrityError, models, transaction
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 from utils.validators import validate_file_size
+from utils.storage import get_attachment_storage, is_blob_name
+from utils.thumbnails import delete_renditions
 
 # Import assignment models
 from .models_assignment import AgentAssignmentRequest
 
+class ComplaintManager(models.Manager):
+    def get_queryset(self):
+        # search_vector is maintained by a database trigger and only used in WHERE clauses
+        return super().get_queryset().defer('search_vector')
+    
+    def touch(self, *pks):
+        """Bump updated_at after a change to rows embedded in complaint responses (their ETag validator)"""
+        return self.filter(pk__in=pks).update(updated_at=timezone.now())
+
 class Complaint(models.Model):
     CATEGORY_CHOICES = [
         ('TECHNICAL', 'Technical'),
@@ -67,16 +80,37 @@ class Complaint(models.Model):
     template_used = models.ForeignKey('ComplaintTemplate', on_delete=models.SET_NULL, null=True, blank=True, related_name='complaints')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False, help_text="Full-text search document (PostgreSQL trigger + GIN index)")
+    
+    objects = ComplaintManager()
+    
+    class Meta:
+        indexes = [
+            # List endpoints (keyset pagination on created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='cmp_created_id_idx'),
+            models.Index(fields=['customer', '-created_at'], name='cmp_customer_created_idx'),
+            # Agent workload and agent dashboards
+            models.Index(fields=['assigned_to', 'status'], name='cmp_assignee_status_idx'),
+            # Changes since a point in time (utils.agent_index)
+            models.Index(fields=['updated_at'], name='cmp_updated_idx'),
+            # check_sla_breaches: only open, not yet breached complaints
+            models.Index(
+                fields=['sla_deadline'],
+                name='cmp_sla_open_idx',
+                condition=models.Q(sla_breached=False, status__in=['OPEN', 'IN_PROGRESS', 'ESCALATED']),
+            ),
+            # auto_escalate_complaints
+            models.Index(
+                fields=['category', 'priority', 'created_at'],
+                name='cmp_escalation_idx',
+                condition=models.Q(status__in=['OPEN', 'IN_PROGRESS']),
+            ),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.complaint_number:
-            last_complaint = Complaint.objects.filter(complaint_number__startswith='TKT-').order_by('-complaint_number').first()
-            if last_complaint:
-                last_number = int(last_complaint.complaint_number.split('-')[1])
-                count = last_number + 1
-            else:
-                count = 1
-            self.complaint_number = f"TKT-{count:06d}"
+            from utils.complaint_numbers import next_complaint_number
+            self.complaint_number = next_complaint_number()
         
         # Set SLA deadline if not set
         if not self.sla_deadline and self.priority:
@@ -88,6 +122,62 @@ class Complaint(models.Model):
     def __str__(self):
         return f"{self.complaint_number} - {self.title}"
 
+class ComplaintNumberSequence(models.Model):
+    """Counter row that hands out complaint numbers (see utils.complaint_numbers)"""
+    name = models.CharField(max_length=20, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+class AttachmentBlobManager(models.Manager):
+    def retain(self, name, size=0):
+        """Count one more reference to a stored blob"""
+        if not is_blob_name(name):
+            return
+        if self.filter(pk=name).update(ref_count=models.F('ref_count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                self.create(name=name, size=size, ref_count=1)
+        except IntegrityError:
+            # A concurrent first upload of the same content created the row
+            self.filter(pk=name).update(ref_count=models.F('ref_count') + 1)
+
+    def release(self, names):
+        """Drop one reference per name; files left without references are deleted after commit"""
+        counts = Counter(name for name in names if is_blob_name(name))
+        if not counts:
+            return
+        with transaction.atomic():
+            blobs = list(self.select_for_update().filter(pk__in=counts).order_by('pk'))
+            unreferenced = [blob.name for blob in blobs if blob.ref_count <= counts[blob.name]]
+            for blob in blobs:
+                blob.ref_count -= counts[blob.name]
+            self.bulk_update([blob for blob in blobs if blob.ref_count > 0], ['ref_count'])
+            if unreferenced:
+                self.filter(pk__in=unreferenced).delete()
+                transaction.on_commit(lambda: self.delete_files(unreferenced))
+
+    def delete_files(self, names):
+        # Skip blobs that were uploaded again since they were released
+        storage = get_attachment_storage()
+        for name in set(names) - set(self.filter(pk__in=names).values_list('name', flat=True)):
+            storage.delete(name)
+            delete_renditions(name)
+
+class AttachmentBlob(models.Model):
+    """Reference count of a content-addressed attachment file (see utils.storage)"""
+    name = models.CharField(max_length=255, primary_key=True, help_text="Storage name, blobs/aa/bb/<sha256><ext>")
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = AttachmentBlobManager()
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
 class Attachment(models.Model):
     ATTACHMENT_TYPE_CHOICES = [
         ('COMPLAINT', 'Complaint Attachment'),
@@ -96,13 +186,19 @@ class Attachment(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='attachments')
-    file = models.FileField(upload_to='attachments/%Y/%m/%d/', validators=[validate_file_size])
+    # Content-addressed: identical uploads share one file, see AttachmentBlob
+    file = models.FileField(upload_to='attachments/%Y/%m/%d/', storage=get_attachment_storage, validators=[validate_file_size])
     original_filename = models.CharField(max_length=255)
     file_size = models.IntegerField()
     mime_type = models.CharField(max_length=100)
     attachment_type = models.CharField(max_length=20, choices=ATTACHMENT_TYPE_CHOICES, default='COMPLAINT')
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    renditions = models.JSONField(default=dict, blank=True, help_text="Thumbnail/preview names for images (utils.thumbnails)")
+    
+    @property
+    def is_image(self):
+        return (self.mime_type or '').startswith('image/')
     
     def __str__(self):
         return f"{self.original_filename} - {self.complaint.complaint_number}"
@@ -116,6 +212,11 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint', '-created_at'], name='comment_cmp_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Comment by {self.user.email} on {self.complaint.complaint_number}"
 
@@ -130,6 +231,9 @@ class Timeline(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['complaint', '-created_at'], name='timeline_cmp_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action} - {self.complaint.complaint_number}"
@@ -209,9 +313,26 @@ class TriageRule(models.Model):
     is_active = models.BooleanField(default=True)
     priority_order = models.IntegerField(default=0, help_text="Higher priority rules are evaluated first")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Tells workers their compiled rules are stale (see triage.py)")
     
     class Meta:
         ordering = ['-priority_order', 'name']
     
     def __str__(self):
-        return f"{self.name} - Priority: {self.priority_order}"
\ No newline at end of file
+        return f"{self.name} - Priority: {self.priority_order}"
+
+class TriageRun(models.Model):
+    """A re-triage of the open backlog (see retriage.py); its checkpoint is where an interrupted run resumes"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    rules_fingerprint = models.CharField(max_length=64, help_text="Rules the run was started with")
+    last_complaint_id = models.UUIDField(null=True, blank=True, help_text="Checkpoint: last complaint of the last applied chunk")
+    scanned = models.IntegerField(default=0)
+    assigned = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"Triage run {self.started_at:%Y-%m-%d %H:%M} ({'finished' if self.finished_at else 'unfinished'})"
@@ -0,0 +1,233 @@
+"""
+Re-apply the triage rules to the open backlog.
+
+Triage normally runs once, when a complaint is created (triage.auto_triage),
+so new or edited rules never reach the complaints already waiting. A run
+streams the OPEN complaints in primary-key order, a chunk at a time, and
+matches the chunks against the rules in a pool of worker processes: the text
+matching is the CPU-bound part, and the workers only get plain tuples, never
+the database. The results are applied in order, one transaction per chunk:
+the complaints a rule assigns are locked and written back with bulk_update,
+agent workloads move with one UPDATE per agent, the AUTO_TRIAGED timeline
+entries go in with one bulk_create and every agent gets one notification.
+(A rule's priority is a filter, as in auto_triage, so it never changes one.)
+
+The same transaction moves the run's checkpoint (TriageRun.last_complaint_id)
+past the chunk, so an interrupted run continues where it stopped as long as
+the rules have not changed since. Assigned complaints leave the backlog, so
+running it again is harmless.
+"""
+import logging
+import multiprocessing
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from apps.notifications.outbox import enqueue, push_event
+from apps.users.models import User
+from .models import Complaint, Timeline, TriageRule, TriageRun
+from .models_assignment import AgentAssignmentRequest
+from .transitions import assigned_counters
+from .triage import RuleEngine, rules_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# What the parent keeps of each complaint to decide on and guard a change
+Row = namedtuple('Row', 'pk complaint_number assigned_to_id category priority')
+
+_worker_engine = None
+
+
+def _start_worker(rules):
+    global _worker_engine
+    _worker_engine = RuleEngine(rules)
+
+
+def _match_chunk(texts, engine=None):
+    """Worker: [(pk, category, priority, title, description)] -> [(pk, rule id)] for complaints a rule matches"""
+    engine = engine or _worker_engine
+    matches = []
+    for pk, category, priority, title, description in texts:
+        rule = engine.match(category, priority, title, description)
+        if rule is not None:
+            matches.append((pk, rule.id))
+    return matches
+
+
+def _fingerprint():
+    rules, changed = rules_fingerprint()
+    return f"{rules}:{changed.isoformat() if changed else ''}"
+
+
+@dataclass
+class RetriageResult:
+    scanned: int = 0
+    assigned: int = 0
+    conflicts: int = 0  # changed by someone else between matching and applying
+    by_rule: dict = field(default_factory=lambda: defaultdict(int))
+    resumed_from: object = None
+
+
+class BacklogRetriage:
+    """
+    Re-triage the OPEN complaints with `workers` processes (0 or 1 matches in
+    this process). With `dry_run` nothing is written; `on_change(row, rule)`
+    is called for every complaint that is (or would be) assigned.
+    """
+    chunk_size = 1000
+
+    def __init__(self, workers=0, chunk_size=None, dry_run=False, restart=False, on_change=None):
+        self.workers = workers
+        self.chunk_size = chunk_size or self.chunk_size
+        self.dry_run = dry_run
+        self.restart = restart
+        self.on_change = on_change
+        self.result = RetriageResult()
+
+    def run(self):
+        # Read before the rules, so a change while loading them makes the checkpoint stale
+        fingerprint = _fingerprint()
+        engine = RuleEngine.from_database()
+        self.rules = TriageRule.objects.select_related('auto_assign_to').in_bulk([rule.id for rule in engine.rules])
+        self.run_record = None if self.dry_run else self.checkpoint(fingerprint)
+        after = self.run_record.last_complaint_id if self.run_record else None
+        self.result.resumed_from = after
+
+        pool = None
+        if self.workers > 1 and engine.rules:
+            if multiprocessing.current_process().daemon:
+                # Celery's prefork children cannot start processes of their own
+                logger.info('Re-triage running in-process: daemonic processes cannot start a pool')
+            else:
+                close_old_connections()
+                pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_start_worker, initargs=(engine.rules,))
+
+        # Chunks waiting for their matches; keeps every worker busy while the parent reads and writes
+        window = 2 * self.workers if pool else 0
+        pending = deque()
+        try:
+            for rows in self.chunks(after):
+                texts = [(pk, category, priority, title, description)
+                         for pk, _, _, category, priority, title, description in rows]
+                if pool:
+                    matches = pool.submit(_match_chunk, texts)
+                else:
+                    matches = Future()
+                    matches.set_result(_match_chunk(texts, engine) if engine.rules else [])
+                pending.append(([Row(*row[:5]) for row in rows], matches))
+                while len(pending) > window:
+                    self.apply(*pending.popleft())
+            while pending:
+                self.apply(*pending.popleft())
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        if self.run_record:
+            self.run_record.finished_at = timezone.now()
+            self.run_record.save(update_fields=['finished_at'])
+        return self.result
+
+    def checkpoint(self, fingerprint):
+        """The run to record progress on: the last one if it was interrupted with the same rules, else a new one"""
+        last = TriageRun.objects.first()
+        if last and not last.finished_at and not self.restart and last.rules_fingerprint == fingerprint:
+            self.result.scanned = last.scanned
+            self.result.assigned = last.assigned
+            return last
+        return TriageRun.objects.create(rules_fingerprint=fingerprint)
+
+    def chunks(self, after=None):
+        """Keyset-paginated OPEN complaints, so each chunk is a short query wherever a run resumes"""
+        backlog = Complaint.objects.filter(status='OPEN').order_by('pk').values_list(
+            'pk', 'complaint_number', 'assigned_to_id', 'category', 'priority', 'title', 'description'
+        )
+        while True:
+            rows = list((backlog.filter(pk__gt=after) if after else backlog)[:self.chunk_size])
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+
+    def apply(self, rows, matches):
+        rows_by_pk = {row.pk: row for row in rows}
+        # Only an unassigned complaint whose winning rule assigns an agent changes (rule priorities are filters)
+        decisions = {}
+        for pk, rule_id in matches.result():
+            rule = self.rules.get(rule_id)
+            if rule and rule.auto_assign_to_id and not rows_by_pk[pk].assigned_to_id:
+                decisions[pk] = rule
+
+        if self.dry_run:
+            for pk, rule in decisions.items():
+                self.record(rows_by_pk[pk], rule)
+            self.result.scanned += len(rows)
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            locked = (
+                Complaint.objects.select_for_update().filter(pk__in=decisions).order_by('pk')
+                .only('id', 'complaint_number', 'status', 'assigned_to', 'category', 'priority')
+            )
+            agents = defaultdict(list)
+            timeline = []
+            for complaint in locked:
+                row = rows_by_pk[complaint.pk]
+                if (complaint.status, complaint.assigned_to_id, complaint.category, complaint.priority) != (
+                    'OPEN', row.assigned_to_id, row.category, row.priority
+                ):
+                    self.result.conflicts += 1
+                    continue
+                rule = decisions[complaint.pk]
+                complaint.assigned_to_id = rule.auto_assign_to_id
+                complaint.status = 'IN_PROGRESS'
+                complaint.updated_at = now
+                agents[complaint.assigned_to_id].append(complaint)
+                timeline.append(Timeline(
+                    complaint=complaint,
+                    action='AUTO_TRIAGED',
+                    description=f'Auto-triaged using rule: {rule.name}',
+                    performed_by=None,
+                    metadata={'rule_id': str(rule.id), 'rule_name': rule.name, 'retriage_run': str(self.run_record.pk)}
+                ))
+                self.record(row, rule)
+
+            updated = [complaint for complaints in agents.values() for complaint in complaints]
+            Complaint.objects.bulk_update(updated, ['assigned_to', 'status', 'updated_at'])
+            for agent_id, complaints in agents.items():
+                User.objects.filter(pk=agent_id).update(**assigned_counters(len(complaints)))
+            AgentAssignmentRequest.objects.filter(complaint__in=updated, status='PENDING').update(status='CANCELLED')
+            Timeline.objects.bulk_create(timeline)
+            enqueue(*[
+                push_event(
+                    [agent_id],
+                    title='New Direct Assignment' if len(complaints) == 1 else f'{len(complaints)} complaints assigned to you',
+                    message=f'Assigned to you by triage rules: {_summary(complaints)}',
+                    notification_type='high',
+                    category='COMPLAINT_ASSIGNED',
+                    complaint=complaints[0] if len(complaints) == 1 else None,
+                    metadata={'complaint_ids': [str(c.pk) for c in complaints]},
+                )
+                for agent_id, complaints in agents.items()
+            ])
+
+            self.result.scanned += len(rows)
+            run = self.run_record
+            run.last_complaint_id = rows[-1].pk
+            run.scanned, run.assigned = self.result.scanned, self.result.assigned
+            run.save(update_fields=['last_complaint_id', 'scanned', 'assigned'])
+
+    def record(self, row, rule):
+        self.result.assigned += 1
+        self.result.by_rule[rule.name] += 1
+        if self.on_change:
+            self.on_change(row, rule)
+
+
+def _summary(complaints, limit=5):
+    numbers = [c.complaint_number for c in complaints[:limit]]
+    if len(complaints) > limit:
+        numbers.append(f'and {len(complaints) - limit} more')
+    return ', '.join(numbers)
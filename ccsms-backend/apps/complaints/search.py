@@ -0,0 +1,53 @@
+"""
+Full-text search for complaints.
+
+On PostgreSQL complaints carry a `search_vector` tsvector column kept up to
+date by a database trigger (complaint_number and title weighted A, description
+weighted B) and indexed with GIN, see migration 0006. Searches are matched with
+websearch_to_tsquery and annotated with a `search_rank`. A search for an exact
+complaint number also matches through the unique complaint_number index (the
+planner ORs the two bitmap index scans; explain_hot_queries checks it).
+
+On other databases (SQLite in development) the regular SearchFilter
+icontains behaviour is used and `search_rank` is a constant.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = 'english'
+
+
+def full_text_search_available():
+    return connection.vendor == 'postgresql'
+
+
+def search_complaints(queryset, terms):
+    """Filter `queryset` by the search string `terms`, annotated with `search_rank` (PostgreSQL only)"""
+    query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(
+        # Numbers are stored upper case: an equality the unique btree index serves, where iexact (UPPER()) can't
+        Q(search_vector=query) | Q(complaint_number=terms.strip().upper())
+    ).annotate(
+        # float8 so the rank survives a round trip through keyset pagination cursors
+        search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+
+
+class ComplaintSearchFilter(SearchFilter):
+    """SearchFilter that uses the tsvector index on PostgreSQL and falls back to icontains elsewhere"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if terms and full_text_search_available():
+            return search_complaints(queryset, terms)
+
+        queryset = super().filter_queryset(request, queryset, view)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    @classmethod
+    def is_ranked(cls, request):
+        """Whether results for this request are ordered by relevance by default"""
+        return full_text_search_available() and bool(request.query_params.get(cls.search_param, '').strip())
@@ -1,29 +1,59 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Complaint, Attachment, Comment, Timeline, Feedback, AssignmentRequest
-from apps.users.serializers import UserSerializer
+from apps.users.serializers import UserSerializer, UserSummarySerializer
 from utils.sla_calculator import calculate_sla_deadline
+from utils.fieldsets import SparseFieldsetSerializerMixin
+from utils.thumbnails import has_renditions
 
 class AttachmentSerializer(serializers.ModelSerializer):
+    # Permission-checked download (supports Range); `file` is the bare media URL
+    download_url = serializers.SerializerMethodField()
+    # Downscaled versions of image attachments (None for other files), rendered on a miss
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+    
     class Meta:
         model = Attachment
-        fields = ('id', 'file', 'original_filename', 'file_size', 'mime_type', 'attachment_type', 'uploaded_by', 'uploaded_at')
+        fields = ('id', 'file', 'original_filename', 'file_size', 'mime_type', 'attachment_type', 'uploaded_by', 'uploaded_at',
+                 'download_url', 'thumbnail_url', 'preview_url')
         read_only_fields = ('id', 'file_size', 'mime_type', 'uploaded_by', 'uploaded_at')
+    
+    def get_download_url(self, obj):
+        return self._url(reverse('download_attachment', args=[obj.pk]))
+    
+    def get_thumbnail_url(self, obj):
+        return self._rendition_url(obj, 'thumbnail')
+    
+    def get_preview_url(self, obj):
+        return self._rendition_url(obj, 'preview')
+    
+    def _rendition_url(self, obj, variant):
+        if not obj.is_image or not has_renditions(obj.file, obj.renditions):
+            return None
+        return self._url(reverse('attachment_rendition', args=[obj.pk, variant]))
+    
+    def _url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
-class CommentSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+class CommentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
     
     class Meta:
         model = Comment
         fields = ('id', 'user', 'content', 'is_internal', 'created_at', 'updated_at')
         read_only_fields = ('id', 'user', 'created_at', 'updated_at')
+        expandable_fields = {'user': UserSerializer}
 
-class TimelineSerializer(serializers.ModelSerializer):
-    performed_by = UserSerializer(read_only=True)
+class TimelineSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    performed_by = UserSummarySerializer(read_only=True)
     
     class Meta:
         model = Timeline
         fields = ('id', 'action', 'description', 'performed_by', 'metadata', 'created_at')
         read_only_fields = ('id', 'performed_by', 'created_at')
+        expandable_fields = {'performed_by': UserSerializer}
 
 class FeedbackSerializer(serializers.ModelSerializer):
     class Meta:
@@ -64,9 +94,22 @@ class AgentAssignmentRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'agent', 'admin', 'expires_at', 'responded_at', 'created_at')
 
 
-class ComplaintSerializer(serializers.ModelSerializer):
-    customer = UserSerializer(read_only=True)
-    assigned_to = UserSerializer(read_only=True)
+def priority_for_expected_days(expected_days):
+    """Convert a customer's expected resolution time (days) to a priority"""
+    if not expected_days:
+        # Default to MEDIUM if not specified
+        return 'MEDIUM'
+    if expected_days <= 1:
+        return 'CRITICAL'
+    if expected_days <= 3:
+        return 'HIGH'
+    if expected_days <= 7:
+        return 'MEDIUM'
+    return 'LOW'
+
+class ComplaintSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    customer = UserSummarySerializer(read_only=True)
+    assigned_to = UserSummarySerializer(read_only=True)
     attachments = AttachmentSerializer(many=True, read_only=True)
     resolution_attachments = serializers.SerializerMethodField()
     comments = CommentSerializer(many=True, read_only=True)
@@ -74,14 +117,17 @@ class ComplaintSerializer(serializers.ModelSerializer):
     feedback = FeedbackSerializer(read_only=True)
     
     def get_resolution_attachments(self, obj):
-        resolution_attachments = obj.attachments.filter(attachment_type='RESOLUTION')
+        # Filter in Python so prefetched attachments are reused instead of queried again
+        resolution_attachments = [a for a in obj.attachments.all() if a.attachment_type == 'RESOLUTION']
         return AttachmentSerializer(resolution_attachments, many=True).data
     
     class Meta:
         model = Complaint
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('id', 'complaint_number', 'customer', 'sla_deadline', 
                            'sla_breached', 'resolved_at', 'closed_at', 'created_at', 'updated_at')
+        expandable_fields = {'customer': UserSerializer, 'assigned_to': UserSerializer}
+        field_sources = {'resolution_attachments': ()}  # prefetched attachments
     
     def create(self, validated_data):
         user = self.context['request'].user
@@ -90,20 +136,7 @@ class ComplaintSerializer(serializers.ModelSerializer):
         # For customers: calculate priority from expected_resolution_days
         # For agents/admins: use provided priority
         if user.role == 'CUSTOMER':
-            expected_days = validated_data.get('expected_resolution_days')
-            if expected_days:
-                # Convert expected days to priority
-                if expected_days <= 1:
-                    validated_data['priority'] = 'CRITICAL'
-                elif expected_days <= 3:
-                    validated_data['priority'] = 'HIGH'
-                elif expected_days <= 7:
-                    validated_data['priority'] = 'MEDIUM'
-                else:
-                    validated_data['priority'] = 'LOW'
-            else:
-                # Default to MEDIUM if not specified
-                validated_data['priority'] = 'MEDIUM'
+            validated_data['priority'] = priority_for_expected_days(validated_data.get('expected_resolution_days'))
         
         # Calculate SLA deadline safely
         try:
@@ -119,14 +152,38 @@ class ComplaintSerializer(serializers.ModelSerializer):
         
         return super().create(validated_data)
 
-class ComplaintListSerializer(serializers.ModelSerializer):
-    customer = UserSerializer(read_only=True)
-    assigned_to = UserSerializer(read_only=True)
+class ComplaintDetailSerializer(ComplaintSerializer):
+    """Complaint detail with only the latest comments/timeline entries embedded, plus links to the full paged lists"""
+    comments = CommentSerializer(source='latest_comments', many=True, read_only=True)
+    timeline = TimelineSerializer(source='latest_timeline', many=True, read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    timeline_count = serializers.IntegerField(read_only=True)
+    comments_url = serializers.SerializerMethodField()
+    timeline_url = serializers.SerializerMethodField()
+    
+    class Meta(ComplaintSerializer.Meta):
+        field_sources = {**ComplaintSerializer.Meta.field_sources, 'comments_url': (), 'timeline_url': ()}
+    
+    def get_comments_url(self, obj):
+        return self._absolute_url('get_comments', obj)
+    
+    def get_timeline_url(self, obj):
+        return self._absolute_url('get_timeline', obj)
+    
+    def _absolute_url(self, name, obj):
+        url = reverse(name, kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class ComplaintListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    customer = UserSummarySerializer(read_only=True)
+    assigned_to = UserSummarySerializer(read_only=True)
     
     class Meta:
         model = Complaint
         fields = ('id', 'complaint_number', 'title', 'description', 'category', 'priority', 'status',
                  'customer', 'assigned_to', 'sla_deadline', 'sla_breached', 'created_at')
+        expandable_fields = {'customer': UserSerializer, 'assigned_to': UserSerializer}
 
 class ComplaintUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -153,4 +210,15 @@ class ComplaintUpdateSerializer(serializers.ModelSerializer):
             if 'priority' in attrs:
                 raise serializers.ValidationError("Only admins can update complaint priority")
         
-        return attrs
\ No newline at end of file
+        return attrs
+class BulkComplaintActionSerializer(serializers.Serializer):
+    complaint_ids = serializers.ListField(child=serializers.UUIDField(), min_length=1, max_length=1000)
+
+class BulkAssignSerializer(BulkComplaintActionSerializer):
+    assigned_to = serializers.UUIDField()
+
+class BulkResolveSerializer(BulkComplaintActionSerializer):
+    resolution_notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+class BulkPrioritySerializer(BulkComplaintActionSerializer):
+    priority = serializers.ChoiceField(choices=Complaint.PRIORITY_CHOICES)
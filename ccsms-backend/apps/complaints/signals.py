@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.users.models import User
+from utils.agent_index import agents_changed, complaints_changed
+from utils.thumbnails import schedule_renditions
+from .models import Attachment, AttachmentBlob, Comment, Complaint, Feedback, Timeline, TriageRule
+from .tasks import generate_attachment_renditions
+from .triage import rules_changed
+
+
+@receiver(post_save, sender=Attachment)
+def attachment_post_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        Complaint.objects.touch(instance.complaint_id)
+    # Attachments share content-addressed files; count the reference
+    if created and not raw:
+        AttachmentBlob.objects.retain(instance.file.name, instance.file_size)
+        if instance.is_image:
+            schedule_renditions(generate_attachment_renditions, str(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Timeline)
+@receiver(post_save, sender=Feedback)
+def complaint_child_post_save(sender, instance, raw=False, **kwargs):
+    # Embedded in complaint responses, whose ETags derive from complaint.updated_at
+    if not raw:
+        Complaint.objects.touch(instance.complaint_id)
+
+
+@receiver(post_delete, sender=Attachment)
+def attachment_post_delete(sender, instance, **kwargs):
+    # Also runs for queryset and cascade deletes; the file goes with its last reference
+    AttachmentBlob.objects.release([instance.file.name])
+
+
+@receiver(post_save, sender=TriageRule)
+@receiver(post_delete, sender=TriageRule)
+def triage_rule_changed(sender, **kwargs):
+    # Other processes notice through the rules fingerprint
+    rules_changed()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def agent_changed(sender, instance, **kwargs):
+    # This process's agent index reads the row again once it is committed
+    if instance.role == 'AGENT':
+        transaction.on_commit(lambda: agents_changed(instance.pk))
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def complaint_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: complaints_changed(instance.pk))
@@ -0,0 +1,437 @@
+"""
+Synthetic production-scale data for local performance work.
+
+SyntheticDataset creates customers, agents spread over pincodes and service
+types, and complaints with a realistic status, priority and SLA mix, each
+with its comments, timeline, feedback and notifications. Faker is only used
+up front to build pools of names, places and texts; rows are assembled from
+those pools with a seeded Random, which is what keeps a million complaints
+to minutes (a Faker call costs more than building the row) and makes runs
+with the same --seed reproducible.
+
+Rows are written with bulk_create, one transaction per chunk of complaints,
+with timestamps spread over the last `days` days: complaints from the last
+week are mostly still open, older ones mostly resolved or closed, and the
+SLA deadline, breach flag, resolution and close times follow from the
+creation time and priority. Building the INSERTs is CPU-bound (Django
+prepares every value of every row), so chunks are generated and written by
+a pool of worker processes, each with its own connection; every chunk has
+its own seeded Random, so the data does not depend on the number of
+workers. Agent workload counters and ratings are totalled from the chunks
+and written at the end.
+"""
+import multiprocessing
+import random
+import re
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+from faker import Faker
+from apps.notifications.models import Notification
+from apps.users.models import User
+from utils.complaint_numbers import allocate_complaint_numbers
+from utils.sla_calculator import SLA_HOURS
+from .models import Comment, Complaint, Feedback, Timeline
+
+SERVICE_TYPES = ['Electronics', 'Appliances', 'Mobile Repair', 'Computer', 'Technical', 'General']
+PRODUCTS = [
+    'television', 'refrigerator', 'washing machine', 'laptop', 'smartphone', 'air conditioner',
+    'microwave', 'Wi-Fi router', 'water purifier', 'printer', 'tablet', 'set-top box',
+]
+TITLES = {
+    'TECHNICAL': [
+        '{product} keeps restarting', '{product} not turning on', '{product} stopped connecting to Wi-Fi',
+        'Error code on {product} display', '{product} app crashes after update', '{product} overheating',
+    ],
+    'PRODUCT_QUALITY': [
+        'Cracked panel on new {product}', '{product} making loud noise', 'Damaged {product} delivered',
+        '{product} remote not working', 'Parts missing from {product} box', '{product} leaking',
+    ],
+    'SERVICE': [
+        'Technician did not arrive for {product} repair', 'Refund pending for {product}',
+        'Wrong invoice for {product} service', '{product} installation delayed', 'Rude staff at {product} service centre',
+    ],
+}
+CATEGORY_WEIGHTS = {'TECHNICAL': 45, 'PRODUCT_QUALITY': 30, 'SERVICE': 25}
+PRIORITY_WEIGHTS = {'LOW': 30, 'MEDIUM': 40, 'HIGH': 22, 'CRITICAL': 8}
+# Complaints from the last RECENT_DAYS are mostly still being worked on; older ones mostly finished
+RECENT_DAYS = 7
+RECENT_STATUS_WEIGHTS = {'OPEN': 30, 'IN_PROGRESS': 38, 'ESCALATED': 6, 'RESOLVED': 22, 'CLOSED': 2, 'REOPENED': 2}
+STATUS_WEIGHTS = {'OPEN': 1, 'IN_PROGRESS': 4, 'ESCALATED': 2, 'RESOLVED': 28, 'CLOSED': 62, 'REOPENED': 3}
+ACTIVE_STATUSES = {'IN_PROGRESS', 'ESCALATED', 'REOPENED'}
+FINISHED_STATUSES = {'RESOLVED', 'CLOSED'}
+AGENT_STATUS_WEIGHTS = {'AVAILABLE': 60, 'BUSY': 25, 'OFFLINE': 15}
+COMMENT_COUNT_WEIGHTS = {0: 15, 1: 25, 2: 25, 3: 18, 4: 12, 6: 5}
+SLA_MET_RATE = 0.85  # finished complaints resolved within their SLA
+FEEDBACK_RATE = 0.6  # finished complaints the customer rated
+SERVICE_MATCH_RATE = 0.8  # complaints assigned to an agent with the required service type
+MAX_ACTIVE_CASES = 5
+
+
+class _Totals:
+    def add(self, other):
+        """Add the fields of `other` (totals of another chunk) to these"""
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+
+@dataclass
+class SyntheticResult(_Totals):
+    admins: int = 0
+    agents: int = 0
+    customers: int = 0
+    complaints: int = 0
+    comments: int = 0
+    timeline: int = 0
+    feedback: int = 0
+    notifications: int = 0
+
+
+@dataclass
+class AgentStats(_Totals):
+    active: int = 0
+    assigned: int = 0
+    resolved: int = 0
+    resolution_hours: float = 0.0
+    ratings: int = 0
+    rating_total: int = 0
+
+
+# What the complaint generator needs of a user; plain tuples are cheap to send to workers
+Person = namedtuple('Person', 'pk email role pincode service_type')
+
+
+@contextmanager
+def backdated(*timestamp_fields):
+    """Let bulk_create write the timestamps set on the objects instead of now() (auto_now/auto_now_add)"""
+    saved = [(f, f.auto_now, f.auto_now_add) for f in timestamp_fields]
+    for f, _, _ in saved:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _weighted(weights):
+    return list(weights), list(weights.values())
+
+
+def _timestamp_fields():
+    return [
+        Complaint._meta.get_field('created_at'), Complaint._meta.get_field('updated_at'),
+        Comment._meta.get_field('created_at'), Comment._meta.get_field('updated_at'),
+        Timeline._meta.get_field('created_at'), Feedback._meta.get_field('created_at'),
+        Notification._meta.get_field('sent_at'),
+    ]
+
+
+_worker_generator = None
+
+
+def _start_worker(generator):
+    global _worker_generator
+    _worker_generator = generator
+
+
+def _generate_chunk(index, count):
+    """Worker: write chunk `index` of `count` complaints; returns (SyntheticResult, {agent pk: AgentStats})"""
+    return _worker_generator.write_chunk(index, count)
+
+
+class SyntheticDataset:
+    """
+    Generate users and complaints in bulk.
+
+    Complaints are spread over the customers and agents created by the same
+    run and written by `workers` processes (0 or 1 writes in this process).
+    `on_progress(done, total)` is called after every chunk of complaints.
+    """
+    chunk_size = 5000
+    pool_size = 1000
+
+    def __init__(self, customers=1000, agents=100, admins=3, complaints=10000, pincodes=300, days=365,
+                 workers=0, chunk_size=None, seed=None, password='password123', on_progress=None):
+        self.counts = {'customers': customers, 'agents': agents, 'admins': admins, 'complaints': complaints}
+        self.pincode_count = pincodes
+        self.days = days
+        self.workers = workers
+        self.chunk_size = chunk_size or self.chunk_size
+        self.seed = seed
+        self.password = password
+        self.on_progress = on_progress
+        self.rng = random.Random(seed)
+        self.people = Faker('en_IN')
+        self.text = Faker('en_US')
+        self.people.seed_instance(seed)
+        self.text.seed_instance(seed)
+        self.now = timezone.now()
+        # Unique per run, even with the same seed, so a second run adds users instead of colliding on email
+        self.tag = uuid.uuid4().hex[:6]
+
+    def run(self):
+        result = SyntheticResult()
+        self.build_pools()
+        result.admins, admins = self.create_users('ADMIN', self.counts['admins'])
+        result.agents, agents = self.create_users('AGENT', self.counts['agents'])
+        result.customers, customers = self.create_users('CUSTOMER', self.counts['customers'])
+
+        generator = ComplaintGenerator(
+            pools=self.pools, customers=customers, agents=[Person(a.pk, a.email, a.role, a.pincode, a.service_type) for a in agents],
+            admins=admins, days=self.days, now=self.now, seed=self.seed,
+        )
+        stats = defaultdict(AgentStats)
+        total = self.counts['complaints']
+        chunks = [(index, min(self.chunk_size, total - start)) for index, start in enumerate(range(0, total, self.chunk_size))]
+        for chunk_result, chunk_stats in self.generate(generator, chunks):
+            result.add(chunk_result)
+            for pk, agent_stats in chunk_stats.items():
+                stats[pk].add(agent_stats)
+            if self.on_progress:
+                self.on_progress(result.complaints, total)
+        self.update_agents(agents, stats)
+        return result
+
+    def generate(self, generator, chunks):
+        """Write the chunks in this process or in a pool; yields each chunk's results as it finishes"""
+        # Forked workers write over SQLite's single file lock in turn, which only adds overhead
+        if self.workers <= 1 or len(chunks) <= 1 or connections['default'].vendor == 'sqlite' \
+                or multiprocessing.current_process().daemon:
+            for index, count in chunks:
+                yield generator.write_chunk(index, count)
+            return
+        # Workers open their own connections; none may inherit this process's
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_start_worker, initargs=(generator,)) as pool:
+            for future in as_completed([pool.submit(_generate_chunk, index, count) for index, count in chunks]):
+                yield future.result()
+
+    def build_pools(self):
+        size = self.pool_size
+        self.first_names = [re.sub(r'\W', '', self.people.first_name()) or 'Asha' for _ in range(size)]
+        self.last_names = [re.sub(r'\W', '', self.people.last_name()) or 'Rao' for _ in range(size)]
+        pincodes = set()
+        while len(pincodes) < self.pincode_count:
+            pincodes.add(self.people.postcode())
+        self.pincodes = sorted(pincodes)
+        self.pools = {
+            'cities': [self.people.city() for _ in range(size // 10)],
+            'descriptions': [self.text.paragraph(nb_sentences=4) for _ in range(size)],
+            'comments': [self.text.sentence(nb_words=12) for _ in range(size)],
+            'resolutions': [self.text.sentence(nb_words=10) for _ in range(size // 5)],
+            'feedback': [self.text.sentence(nb_words=8) for _ in range(size // 5)],
+            'titles': {
+                category: [title.format(product=product).capitalize() for title in titles for product in PRODUCTS]
+                for category, titles in TITLES.items()
+            },
+        }
+
+    def create_users(self, role, count):
+        """(count, [Person]) for `count` new users; agents are returned as User objects for update_agents"""
+        rng = self.rng
+        password = make_password(self.password)
+        statuses = _weighted(AGENT_STATUS_WEIGHTS)
+        created = []
+        for start in range(0, count, self.chunk_size):
+            users = []
+            for index in range(start, min(start + self.chunk_size, count)):
+                first, last = rng.choice(self.first_names), rng.choice(self.last_names)
+                handle = f'{first}.{last}.{self.tag}{role[0]}{index}'.lower()
+                user = User(
+                    email=f'{handle}@example.com', username=handle, first_name=first, last_name=last,
+                    role=role, password=password, phone=f'+91{rng.randrange(6_000_000_000, 10_000_000_000)}',
+                    pincode=rng.choice(self.pincodes), is_staff=role == 'ADMIN',
+                    date_joined=self.now - timedelta(days=self.days + rng.random() * 180),
+                )
+                if role == 'AGENT':
+                    user.service_type = rng.choice(SERVICE_TYPES)
+                    user.is_verified = rng.random() < 0.9
+                    user.service_card_id = f'SC-{self.tag}-{index:07d}' if user.is_verified else None
+                    user.agent_status = rng.choices(*statuses)[0]
+                users.append(user)
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            created.extend(users if role == 'AGENT' else [Person(u.pk, u.email, u.role, u.pincode, '') for u in users])
+        return count, created
+
+    def update_agents(self, agents, stats):
+        """Write the workload counters and ratings the generated complaints imply"""
+        for agent in agents:
+            agent_stats = stats.get(agent.pk, AgentStats())
+            agent.current_active_cases = agent_stats.active
+            agent.total_assigned_cases = agent_stats.assigned
+            agent.total_resolved_cases = agent_stats.resolved
+            agent.average_resolution_time_hours = (
+                round(agent_stats.resolution_hours / agent_stats.resolved, 2) if agent_stats.resolved else 0.0
+            )
+            agent.performance_rating = round(agent_stats.rating_total / agent_stats.ratings, 2) if agent_stats.ratings else 0.0
+            if agent.agent_status == 'AVAILABLE' and agent_stats.active >= MAX_ACTIVE_CASES:
+                agent.agent_status = 'BUSY'
+        User.objects.bulk_update(agents, [
+            'current_active_cases', 'total_assigned_cases', 'total_resolved_cases',
+            'average_resolution_time_hours', 'performance_rating', 'agent_status',
+        ], batch_size=self.chunk_size)
+
+
+class ComplaintGenerator:
+    """Builds and writes one chunk of complaints with their history; sent to the workers as is"""
+
+    def __init__(self, pools, customers, agents, admins, days, now, seed=None):
+        self.pools = pools
+        self.customers = customers
+        self.agents = agents
+        self.admins = admins
+        self.days = days
+        self.now = now
+        self.seed = seed
+        # Agents by service type and by (service type, pincode area), for local assignments
+        self.agents_by_service = defaultdict(list)
+        self.agents_by_area = defaultdict(list)
+        for agent in agents:
+            self.agents_by_service[agent.service_type].append(agent)
+            self.agents_by_area[(agent.service_type, agent.pincode[:3])].append(agent)
+
+    def pick_agent(self, rng, service_type, pincode):
+        if rng.random() < SERVICE_MATCH_RATE:
+            candidates = self.agents_by_area.get((service_type, pincode[:3])) or self.agents_by_service.get(service_type)
+            if candidates:
+                return rng.choice(candidates)
+        return rng.choice(self.agents)
+
+    def write_chunk(self, index, count):
+        """Generate and insert `count` complaints; returns (SyntheticResult, {agent pk: AgentStats})"""
+        rng = random.Random(f'{self.seed}:{index}' if self.seed is not None else None)
+        stats = defaultdict(AgentStats)
+        # Reserved in a transaction of its own, so the counter row is not locked while the chunk is written
+        numbers = allocate_complaint_numbers(count)
+        rows = self.build(rng, numbers, stats)
+        with backdated(*_timestamp_fields()), transaction.atomic():
+            for model, objects in zip((Complaint, Comment, Timeline, Feedback, Notification), rows):
+                model.objects.bulk_create(objects)
+        complaints, comments, timeline, feedback, notifications = map(len, rows)
+        return SyntheticResult(
+            complaints=complaints, comments=comments, timeline=timeline, feedback=feedback, notifications=notifications,
+        ), dict(stats)
+
+    def build(self, rng, numbers, stats):
+        """Unsaved (complaints, comments, timeline, feedback, notifications) for the given complaint numbers"""
+        now = self.now
+        span = self.days * 86400
+        pools = self.pools
+        categories = rng.choices(*_weighted(CATEGORY_WEIGHTS), k=len(numbers))
+        priorities = rng.choices(*_weighted(PRIORITY_WEIGHTS), k=len(numbers))
+        recent_statuses, old_statuses = _weighted(RECENT_STATUS_WEIGHTS), _weighted(STATUS_WEIGHTS)
+        comment_counts = _weighted(COMMENT_COUNT_WEIGHTS)
+
+        complaints, comments, timeline, feedback, notifications = [], [], [], [], []
+        for number, category, priority in zip(numbers, categories, priorities):
+            customer = rng.choice(self.customers)
+            # Skewed towards recent complaints, as volume grows over time
+            created = now - timedelta(seconds=span * rng.random() ** 1.5)
+            status = rng.choices(*(recent_statuses if (now - created).days < RECENT_DAYS else old_statuses))[0]
+            sla = timedelta(hours=SLA_HOURS[priority])
+            deadline = created + sla
+            service_type = rng.choice(SERVICE_TYPES)
+
+            agent = None if status == 'OPEN' else self.pick_agent(rng, service_type, customer.pincode)
+            assigned_at = min(created + sla * rng.uniform(0.02, 0.3), now)
+            resolved_at = closed_at = reopened_at = None
+            if status in FINISHED_STATUSES or status == 'REOPENED':
+                within = rng.random() < SLA_MET_RATE
+                resolved_at = min(created + sla * (rng.uniform(0.2, 1.0) if within else rng.uniform(1.0, 3.0)), now)
+            if status == 'CLOSED':
+                closed_at = min(resolved_at + timedelta(hours=rng.uniform(1, 72)), now)
+            if status == 'REOPENED':
+                reopened_at = min(resolved_at + timedelta(days=rng.uniform(1, 10)), now)
+            breached = (resolved_at if status in FINISHED_STATUSES else now) > deadline
+            updated = max(t for t in (created, agent and assigned_at, resolved_at, closed_at, reopened_at) if t)
+
+            complaint = Complaint(
+                complaint_number=number,
+                title=rng.choice(pools['titles'][category]),
+                description=rng.choice(pools['descriptions']),
+                category=category,
+                priority=priority,
+                status=status,
+                customer_id=customer.pk,
+                assigned_to_id=agent.pk if agent else None,
+                sla_deadline=deadline,
+                sla_breached=breached,
+                resolved_at=resolved_at if status in FINISHED_STATUSES else None,
+                closed_at=closed_at,
+                resolution_notes=rng.choice(pools['resolutions']) if resolved_at else '',
+                location=rng.choice(pools['cities']),
+                pincode=customer.pincode,
+                service_type_required=service_type,
+                created_at=created,
+                updated_at=updated,
+            )
+            complaints.append(complaint)
+
+            events = [('CREATED', customer, created, f'Complaint created by {customer.email}')]
+            notifications.append(self.notification(rng, customer, complaint, 'COMPLAINT_CREATED', created))
+            if agent:
+                admin = rng.choice(self.admins) if self.admins else None
+                events.append(('ASSIGNED', admin, assigned_at, f'Assigned to {agent.email}'))
+                notifications.append(self.notification(rng, agent, complaint, 'COMPLAINT_ASSIGNED', assigned_at))
+                agent_stats = stats[agent.pk]
+                agent_stats.assigned += 1
+                agent_stats.active += status in ACTIVE_STATUSES
+            if status == 'ESCALATED':
+                events.append(('ESCALATED', None, min(deadline, now), 'SLA breached, escalated to admin'))
+            if resolved_at:
+                events.append(('RESOLVED', agent, resolved_at, f'Complaint resolved: {complaint.resolution_notes}'))
+                notifications.append(self.notification(rng, customer, complaint, 'COMPLAINT_RESOLVED', resolved_at))
+                if status in FINISHED_STATUSES:
+                    agent_stats.resolved += 1
+                    agent_stats.resolution_hours += (resolved_at - created).total_seconds() / 3600
+            if closed_at:
+                events.append(('CLOSED', customer, closed_at, f'Complaint closed by {customer.email} (CUSTOMER)'))
+            if reopened_at:
+                events.append(('REOPENED', customer, reopened_at, 'Complaint reopened by customer'))
+
+            for _ in range(rng.choices(*comment_counts)[0]):
+                author = agent if agent and rng.random() < 0.5 else customer
+                at = created + (updated - created) * rng.random()
+                comments.append(Comment(
+                    complaint_id=complaint.pk, user_id=author.pk, content=rng.choice(pools['comments']),
+                    is_internal=author is agent and rng.random() < 0.2, created_at=at, updated_at=at,
+                ))
+                events.append(('COMMENTED', author, at, f'Comment added by {author.email}'))
+
+            timeline.extend(
+                Timeline(complaint_id=complaint.pk, action=action, description=description,
+                         performed_by_id=performer.pk if performer else None, created_at=at)
+                for action, performer, at, description in events
+            )
+
+            if status in FINISHED_STATUSES and rng.random() < FEEDBACK_RATE:
+                low, high = (3, 5) if not breached else (1, 4)
+                rating = rng.randint(low, high)
+                feedback.append(Feedback(
+                    complaint_id=complaint.pk, rating=rating, agent_rating=rating,
+                    agent_professionalism_rating=rng.randint(low, high),
+                    resolution_speed_rating=rng.randint(low, high),
+                    comment=rng.choice(pools['feedback']),
+                    created_at=min(resolved_at + timedelta(hours=rng.uniform(1, 48)), now),
+                ))
+                agent_stats.ratings += 1
+                agent_stats.rating_total += rating
+
+        return complaints, comments, timeline, feedback, notifications
+
+    def notification(self, rng, user, complaint, category, at):
+        title = category.replace('_', ' ').title()
+        return Notification(
+            user_id=user.pk, complaint_id=complaint.pk, notification_type='IN_APP', category=category,
+            module=user.role, title=title, message=f'{title}: {complaint.complaint_number}',
+            # Older notifications have mostly been read
+            is_read=(self.now - at).days > 3 or rng.random() < 0.3, sent_at=at,
+        )
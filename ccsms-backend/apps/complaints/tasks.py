@@ -1,8 +1,10 @@
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from .models import Complaint, Timeline, EscalationRule
+from .models import Attachment, Complaint, Timeline, EscalationRule
 from apps.notifications.models import Notification
 from utils.email_service import send_sla_breach_alert
+from utils.thumbnails import ensure_renditions
 
 @shared_task
 def check_sla_breaches():
@@ -75,4 +77,25 @@ def auto_escalate_complaints():
             
             escalated_count += 1
     
-    return f"Auto-escalated {escalated_count} complaints"
\ No newline at end of file
+    return f"Auto-escalated {escalated_count} complaints"
+
+@shared_task
+def generate_attachment_renditions(attachment_id):
+    """Thumbnail and preview of an uploaded image attachment"""
+    attachment = Attachment.objects.filter(pk=attachment_id).first()
+    if attachment and attachment.is_image:
+        ensure_renditions(attachment, 'file', 'renditions')
+
+@shared_task
+def retriage_open_complaints(dry_run=False):
+    """Re-apply the triage rules to the open backlog, resuming an interrupted run"""
+    from .retriage import BacklogRetriage
+    result = BacklogRetriage(workers=settings.RETRIAGE_WORKERS, dry_run=dry_run).run()
+    return f"Re-triaged {result.scanned} open complaints, {result.assigned} assigned"
+
+@shared_task
+def assign_backlog(dry_run=False):
+    """Assign every unassigned active complaint at once (see batch_assignment.py)"""
+    from .batch_assignment import BatchAssignment
+    result = BatchAssignment(dry_run=dry_run).run()
+    return f"Batch-assigned {result.assigned} of {result.complaints} unassigned complaints"
@@ -0,0 +1,620 @@
+"""
+Complaint state transitions.
+
+Every change of a complaint's status or assignee goes through transition(),
+which runs the same fixed query plan in one transaction whatever the action:
+
+1. one conditional UPDATE of the complaint, guarded on the status and
+   assignee the caller checked the transition against, so a concurrent
+   change fails with TransitionConflict instead of being overwritten;
+2. one UPDATE per affected agent, with F() expressions for the workload
+   and performance counters (no read-modify-write);
+3. one INSERT of the timeline entries;
+4. one INSERT of the outbox events.
+
+QuerySet.update() sends no post_save, so the status/assignment notifications
+the signal handlers add for model saves are added here as well.
+
+The named transitions below hold the rules for each action; views check
+permissions, call one of them and turn TransitionError into a response.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from apps.notifications.outbox import channel_event, email_event, enqueue, push_event
+from apps.notifications.signals import complaint_change_events
+from apps.users.models import User
+from utils.sla_calculator import calculate_sla_deadline
+from .models import AssignmentRequest, Complaint, Timeline
+from .models_assignment import AgentAssignmentRequest
+
+ACTIVE_STATUSES = ('OPEN', 'IN_PROGRESS', 'ESCALATED', 'REOPENED')
+MAX_ACTIVE_CASES = 5  # same limit as User.is_available
+ASSIGNMENT_REQUEST_TTL = timedelta(hours=24)
+
+
+class TransitionError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "This change is not allowed in the complaint's current state."
+    default_code = 'invalid_transition'
+
+
+class TransitionConflict(TransitionError):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The complaint was changed by another request, reload it and try again.'
+    default_code = 'conflict'
+
+
+def _decrement(field, count=1):
+    return Greatest(F(field) - count, 0)
+
+
+def assigned_counters(count=1):
+    """Counter expressions for an agent taking `count` more complaints"""
+    return {
+        'total_assigned_cases': F('total_assigned_cases') + count,
+        'current_active_cases': F('current_active_cases') + count,
+        # Evaluated against the row before the update, so this fills the agent's last free slot
+        'agent_status': Case(
+            When(agent_status='AVAILABLE', current_active_cases__gte=MAX_ACTIVE_CASES - count, then=Value('BUSY')),
+            default=F('agent_status')
+        ),
+        # update() skips auto_now; the agent index notices status changes through it
+        'last_activity': timezone.now(),
+    }
+
+
+def released_counters(count=1):
+    """Counter expressions for an agent handing over `count` active complaints"""
+    return {
+        'current_active_cases': _decrement('current_active_cases', count),
+        # The inverse of assigned_counters: a free slot makes a full agent available again
+        'agent_status': Case(
+            When(agent_status='BUSY', current_active_cases__lte=MAX_ACTIVE_CASES - 1 + count, then=Value('AVAILABLE')),
+            default=F('agent_status')
+        ),
+        'last_activity': timezone.now(),
+    }
+
+
+def resolved_counters(count=1, hours=0.0):
+    """Counter expressions for an agent resolving `count` complaints that took `hours` in total"""
+    return {
+        **released_counters(count),
+        'total_resolved_cases': F('total_resolved_cases') + count,
+        # Running average; the right-hand side sees the counters before this update
+        'average_resolution_time_hours': ExpressionWrapper(
+            (F('average_resolution_time_hours') * F('total_resolved_cases') + hours)
+            / (F('total_resolved_cases') + count),
+            output_field=FloatField()
+        ),
+    }
+
+
+def _full_name(user):
+    return f'{user.first_name} {user.last_name}'
+
+
+def transition(complaint, actor, *, changes=None, agents=None, timeline=(), events=()):
+    """
+    Apply one state change to `complaint` (in place) and record it.
+
+    `changes` are the complaint fields to write (None leaves the row alone),
+    `agents` maps agent id -> counter expressions, `timeline` holds unsaved
+    Timeline entries (complaint and performed_by are filled in) and `events`
+    the outbox events. Runs inside the caller's transaction if there is one.
+    """
+    old_status, old_assigned_to = complaint.status, complaint.assigned_to_id
+    with transaction.atomic(savepoint=False):
+        if changes is not None:
+            changes = {**changes, 'updated_at': timezone.now()}
+            updated = Complaint.objects.filter(
+                pk=complaint.pk, status=old_status, assigned_to_id=old_assigned_to
+            ).update(**changes)
+            if not updated:
+                raise TransitionConflict()
+            for field, value in changes.items():
+                setattr(complaint, field, value)
+
+        for agent_id, counters in (agents or {}).items():
+            User.objects.filter(pk=agent_id).update(**counters)
+
+        for entry in timeline:
+            entry.complaint = complaint
+            entry.performed_by = actor
+        Timeline.objects.bulk_create(timeline)
+        if timeline and changes is None:
+            # bulk_create sends no post_save; keep the detail ETag validator current
+            Complaint.objects.touch(complaint.pk)
+
+        events = list(events)
+        if changes is not None and getattr(settings, 'ENABLE_EMAIL_NOTIFICATIONS', False):
+            events += complaint_change_events(complaint, old_status, old_assigned_to)
+        enqueue(*events)
+    return complaint
+
+
+def resolve(complaint, actor, resolution_notes=''):
+    if complaint.status not in ACTIVE_STATUSES:
+        raise TransitionError(f'Complaint already {complaint.status.lower()}')
+
+    now = timezone.now()
+    agents = {}
+    if complaint.assigned_to_id:
+        hours = (now - complaint.created_at).total_seconds() / 3600 if complaint.created_at else 0
+        agents[complaint.assigned_to_id] = resolved_counters(hours=hours)
+
+    resolved_by = actor.first_name or actor.email
+    title = f'Complaint {complaint.complaint_number} Resolved'
+    return transition(
+        complaint, actor,
+        changes={'status': 'RESOLVED', 'resolution_notes': resolution_notes, 'resolved_at': now},
+        agents=agents,
+        timeline=[Timeline(action='RESOLVED', description=f'Complaint resolved: {resolution_notes}')],
+        events=[
+            push_event(
+                [complaint.customer_id], exclude=[actor],
+                title=title,
+                message=f'Your complaint has been resolved by {resolved_by}',
+                notification_type='success',
+                category='COMPLAINT_RESOLVED',
+                complaint=complaint
+            ),
+            push_event(
+                [complaint.assigned_to_id], exclude=[actor],
+                title=title,
+                message=f'Complaint resolved by {resolved_by}',
+                notification_type='success',
+                category='COMPLAINT_RESOLVED',
+                complaint=complaint
+            ),
+            push_event(
+                admins=True,
+                title=title,
+                message=f'Resolved by {resolved_by}',
+                notification_type='success',
+                category='COMPLAINT_RESOLVED',
+                complaint=complaint
+            ) if actor.role != 'ADMIN' else None,
+        ]
+    )
+
+
+def close(complaint, actor):
+    if complaint.status == 'CLOSED':
+        raise TransitionError('Complaint is already closed')
+
+    closed_by = actor.first_name or actor.email
+    title = f'Complaint {complaint.complaint_number} Closed'
+    return transition(
+        complaint, actor,
+        changes={'status': 'CLOSED', 'closed_at': timezone.now()},
+        timeline=[Timeline(action='CLOSED', description=f'Complaint closed by {actor.email} ({actor.role})')],
+        events=[
+            push_event(
+                [complaint.customer_id], exclude=[actor],
+                title=title,
+                message=f'Your complaint has been closed by {closed_by}',
+                notification_type='info',
+                category='COMPLAINT_CLOSED',
+                complaint=complaint
+            ),
+            push_event(
+                [complaint.assigned_to_id], exclude=[actor],
+                title=title,
+                message=f'Complaint closed by {closed_by}',
+                notification_type='info',
+                category='COMPLAINT_CLOSED',
+                complaint=complaint
+            ),
+            push_event(
+                admins=True,
+                title=title,
+                message=f'Closed by {closed_by}',
+                notification_type='info',
+                category='COMPLAINT_CLOSED',
+                complaint=complaint
+            ) if actor.role != 'ADMIN' else None,
+        ]
+    )
+
+
+def reopen(complaint, actor, reason=''):
+    if not complaint.can_reopen:
+        raise TransitionError('This complaint cannot be reopened')
+    if complaint.resolved_at and (timezone.now() - complaint.resolved_at).days > complaint.reopen_window_days:
+        raise TransitionError(
+            f'Reopen window expired. Complaints can only be reopened within {complaint.reopen_window_days} days of resolution.'
+        )
+    if complaint.status not in ('RESOLVED', 'CLOSED'):
+        raise TransitionError('Only resolved or closed complaints can be reopened')
+
+    agents = {}
+    if complaint.assigned_to_id:
+        agents[complaint.assigned_to_id] = {
+            'current_active_cases': F('current_active_cases') + 1,
+            'total_resolved_cases': _decrement('total_resolved_cases'),
+        }
+
+    old_status = complaint.status
+    title = f'Complaint {complaint.complaint_number} Reopened'
+    return transition(
+        complaint, actor,
+        changes={'status': 'REOPENED', 'resolved_at': None, 'closed_at': None},
+        agents=agents,
+        timeline=[Timeline(
+            action='REOPENED',
+            description=f'Complaint reopened by {actor.email}. Reason: {reason or "Not provided"}',
+            metadata={'reason': reason}
+        )],
+        events=[
+            email_event('status_changed', complaint, old_status=old_status),
+            push_event(
+                [complaint.customer_id], exclude=[actor],
+                title=title,
+                message=f'Your complaint has been reopened and will be reviewed again',
+                notification_type='info',
+                category='COMPLAINT_REOPENED',
+                complaint=complaint
+            ),
+            push_event(
+                [complaint.assigned_to_id],
+                title=title,
+                message=f'A resolved complaint has been reopened. Please review.',
+                notification_type='warning',
+                category='COMPLAINT_REOPENED',
+                complaint=complaint
+            ),
+            push_event(
+                admins=True, exclude=[actor],
+                title=title,
+                message=f'Reopened by {actor.first_name or actor.email}',
+                notification_type='warning',
+                category='COMPLAINT_REOPENED',
+                complaint=complaint
+            ),
+        ]
+    )
+
+
+def unassign(complaint, actor):
+    if not complaint.assigned_to_id:
+        raise TransitionError('Complaint is not assigned to any agent')
+
+    old_agent = complaint.assigned_to
+    agents = {old_agent.pk: released_counters()} if complaint.status in ACTIVE_STATUSES else {}
+    with transaction.atomic():
+        AgentAssignmentRequest.objects.filter(complaint=complaint, status='PENDING').update(status='CANCELLED')
+        return transition(
+            complaint, actor,
+            changes={'assigned_to': None, 'status': 'OPEN'},
+            agents=agents,
+            timeline=[Timeline(
+                action='UNASSIGNED',
+                description=f'Agent {old_agent.email} unassigned by admin. Status reset to OPEN.'
+            )],
+            events=[push_event(
+                [old_agent.pk],
+                title='Assignment Changed',
+                message=f'You have been unassigned from Complaint #{complaint.complaint_number}: {complaint.title}',
+                notification_type='info',
+                category='ASSIGNMENT_CHANGED',
+                complaint=complaint
+            )]
+        )
+
+
+def assign(complaint, agent, actor, recommendation=None):
+    """
+    Assign directly, skipping the agent's accept/reject step. `recommendation`
+    is the AIAssignmentEngine recommendation for auto-assignments.
+    """
+    if complaint.status not in ACTIVE_STATUSES:
+        raise TransitionError(f'Complaint is {complaint.status.lower()}')
+    if complaint.assigned_to_id == agent.pk:
+        raise TransitionError('Complaint is already assigned to this agent')
+
+    agents = {agent.pk: assigned_counters()}
+    if complaint.assigned_to_id:
+        agents[complaint.assigned_to_id] = released_counters()
+
+    if recommendation:
+        entry = Timeline(
+            action='AUTO_ASSIGNED',
+            description=f'Auto-assigned to {agent.email} (Confidence: {recommendation["confidence_score"]:.0%}) - {recommendation["reasoning"]}',
+            metadata={
+                'ai_confidence': recommendation['confidence_score'],
+                'reasoning': recommendation['reasoning']
+            }
+        )
+        verb = 'auto-assigned'
+    else:
+        entry = Timeline(action='ASSIGNED', description=f'Assigned to {agent.email} by {actor.email}')
+        verb = 'assigned'
+
+    with transaction.atomic():
+        # Pending requests are superseded by the direct assignment
+        AgentAssignmentRequest.objects.filter(complaint=complaint, status='PENDING').update(status='CANCELLED')
+        return transition(
+            complaint, actor,
+            changes={'assigned_to': agent, 'status': 'IN_PROGRESS'},
+            agents=agents,
+            timeline=[entry],
+            events=[push_event(
+                [agent.pk],
+                title='New Direct Assignment',
+                message=f'Complaint #{complaint.complaint_number} has been {verb} to you: {complaint.title}',
+                notification_type='high',
+                category='ASSIGNMENT_DIRECT',
+                complaint=complaint
+            )]
+        )
+
+
+def request_assignment(complaint, agent, admin, message=''):
+    """
+    Ask `agent` to take the complaint (they accept or reject it). A current
+    assignee is released first. Returns the AgentAssignmentRequest.
+    """
+    if complaint.status not in ACTIVE_STATUSES:
+        raise TransitionError(f'Complaint is {complaint.status.lower()}')
+
+    changes, agents, timeline = {}, {}, []
+    if complaint.assigned_to_id:
+        old_agent = complaint.assigned_to
+        changes['assigned_to'] = None
+        if complaint.status == 'IN_PROGRESS':
+            changes['status'] = 'OPEN'
+        agents[old_agent.pk] = released_counters()
+        timeline.append(Timeline(
+            action='REASSIGNMENT_INITIATED',
+            description=f'Admin initiating reassignment from {old_agent.email} to {agent.email}'
+        ))
+    timeline.append(Timeline(action='ASSIGNMENT_REQUESTED', description=f'Admin requested assignment to {agent.email}'))
+
+    with transaction.atomic():
+        AgentAssignmentRequest.objects.filter(complaint=complaint, status='PENDING').update(status='CANCELLED')
+        assignment_request = AgentAssignmentRequest.objects.create(
+            complaint=complaint,
+            agent=agent,
+            admin=admin,
+            message=message,
+            expires_at=timezone.now() + ASSIGNMENT_REQUEST_TTL
+        )
+        transition(
+            complaint, admin,
+            changes=changes,
+            agents=agents,
+            timeline=timeline,
+            events=[push_event(
+                [agent.pk],
+                title='New Assignment Request',
+                message=f'Requested to handle complaint #{complaint.complaint_number}',
+                notification_type='info',
+                category='ASSIGNMENT_REQUEST',
+                complaint=complaint
+            )]
+        )
+    return assignment_request
+
+
+def _check_pending(assignment_request):
+    if assignment_request.status != 'PENDING':
+        raise TransitionError(f'Request already {assignment_request.status.lower()}')
+    if assignment_request.expires_at < timezone.now():
+        AgentAssignmentRequest.objects.filter(pk=assignment_request.pk, status='PENDING').update(status='EXPIRED')
+        assignment_request.status = 'EXPIRED'
+        raise TransitionError('Assignment request has expired')
+
+
+def _respond(assignment_request, new_status, agent_response):
+    """Compare-and-set the request from PENDING to `new_status`"""
+    now = timezone.now()
+    updated = AgentAssignmentRequest.objects.filter(pk=assignment_request.pk, status='PENDING').update(
+        status=new_status, agent_response=agent_response, responded_at=now
+    )
+    if not updated:
+        raise TransitionConflict('Request was already responded to')
+    assignment_request.status = new_status
+    assignment_request.agent_response = agent_response
+    assignment_request.responded_at = now
+
+
+def _assignment_response_event(assignment_request, agent, response, message, agent_message):
+    """Realtime message for the admin's websocket (see AdminConsumer.assignment_response)"""
+    return channel_event(f'admin_{assignment_request.admin_id}', 'assignment_response', {
+        'complaint_number': assignment_request.complaint.complaint_number,
+        'agent_name': _full_name(agent),
+        'response': response,
+        'message': message,
+        'agent_message': agent_message,
+    })
+
+
+def accept_assignment(assignment_request, agent, agent_response=''):
+    complaint = assignment_request.complaint
+    _check_pending(assignment_request)
+    if complaint.assigned_to_id:
+        raise TransitionError('Complaint already assigned to another agent')
+
+    message = f'Agent {_full_name(agent)} accepted complaint #{complaint.complaint_number}'
+    with transaction.atomic():
+        _respond(assignment_request, 'ACCEPTED', agent_response)
+        return transition(
+            complaint, agent,
+            changes={
+                'assigned_to': agent,
+                'status': 'IN_PROGRESS' if complaint.status in ('OPEN', 'REOPENED') else complaint.status,
+            },
+            agents={agent.pk: assigned_counters()},
+            timeline=[Timeline(action='ASSIGNED', description=f'Agent {agent.email} accepted assignment request')],
+            events=[
+                push_event(
+                    [assignment_request.admin_id],
+                    title='Assignment Request Accepted',
+                    message=message,
+                    notification_type='success',
+                    category='ASSIGNMENT_ACCEPTED',
+                    complaint=complaint
+                ),
+                push_event(
+                    [complaint.customer_id],
+                    title='Agent Assigned to Your Complaint',
+                    message=f'Agent {_full_name(agent)} has been assigned to your complaint #{complaint.complaint_number}',
+                    notification_type='info',
+                    category='COMPLAINT_STATUS_CHANGED',
+                    complaint=complaint
+                ),
+                _assignment_response_event(assignment_request, agent, 'accept', message, agent_response),
+            ]
+        )
+
+
+def reject_assignment(assignment_request, agent, agent_response=''):
+    complaint = assignment_request.complaint
+    _check_pending(assignment_request)
+    message = (
+        f'Agent {_full_name(agent)} rejected complaint #{complaint.complaint_number}. '
+        f'Reason: {agent_response or "Not specified"}'
+    )
+    with transaction.atomic():
+        _respond(assignment_request, 'REJECTED', agent_response or 'Agent is currently busy')
+        return transition(
+            complaint, agent,
+            timeline=[Timeline(
+                action='ASSIGNMENT_REJECTED',
+                description=f'Agent {agent.email} rejected assignment request: {agent_response}'
+            )],
+            events=[
+                push_event(
+                    [assignment_request.admin_id],
+                    title='Assignment Request Rejected',
+                    message=message,
+                    notification_type='warning',
+                    category='ASSIGNMENT_REJECTED',
+                    complaint=complaint
+                ),
+                _assignment_response_event(assignment_request, agent, 'reject', message, agent_response),
+            ]
+        )
+
+
+def _review(assignment_request, reviewer, new_status):
+    """Compare-and-set an agent's AssignmentRequest from PENDING to `new_status`"""
+    now = timezone.now()
+    updated = AssignmentRequest.objects.filter(pk=assignment_request.pk, status='PENDING').update(
+        status=new_status, reviewed_by=reviewer, reviewed_at=now
+    )
+    if not updated:
+        raise TransitionConflict('Request was already reviewed')
+    assignment_request.status = new_status
+    assignment_request.reviewed_by = reviewer
+    assignment_request.reviewed_at = now
+
+
+def approve_assignment_request(assignment_request, reviewer, description):
+    """Give the complaint to the agent who asked for it (an admin approving, or the agent accepting)"""
+    complaint = assignment_request.complaint
+    agent = assignment_request.requested_by
+    if complaint.assigned_to_id:
+        raise TransitionError('Complaint already assigned')
+    if complaint.status not in ACTIVE_STATUSES:
+        raise TransitionError(f'Complaint is {complaint.status.lower()}')
+
+    with transaction.atomic():
+        _review(assignment_request, reviewer, 'APPROVED')
+        return transition(
+            complaint, reviewer,
+            changes={
+                'assigned_to': agent,
+                'status': 'IN_PROGRESS' if complaint.status == 'OPEN' else complaint.status,
+            },
+            agents={agent.pk: assigned_counters()},
+            timeline=[Timeline(action='ASSIGNED', description=description)]
+        )
+
+
+def reject_assignment_request(assignment_request, reviewer, description):
+    with transaction.atomic():
+        _review(assignment_request, reviewer, 'REJECTED')
+        return transition(
+            assignment_request.complaint, reviewer,
+            timeline=[Timeline(action='ASSIGNMENT_REJECTED', description=description)]
+        )
+
+
+def triage(complaint, rule):
+    """
+    Apply a matched TriageRule (see triage.auto_triage). The rule's priority
+    is one of its filters, so only its assignee changes the complaint.
+    """
+    changes, agents = None, {}
+    agent = rule.auto_assign_to
+    if agent and complaint.assigned_to_id != agent.pk:
+        changes = {'assigned_to': agent}
+        if complaint.status == 'OPEN':
+            changes['status'] = 'IN_PROGRESS'
+        if changes.get('status', complaint.status) in ACTIVE_STATUSES:
+            agents[agent.pk] = assigned_counters()
+        if complaint.assigned_to_id and complaint.status in ACTIVE_STATUSES:
+            agents[complaint.assigned_to_id] = released_counters()
+
+    return transition(
+        complaint, None,
+        changes=changes,
+        agents=agents,
+        timeline=[Timeline(
+            action='AUTO_TRIAGED',
+            description=f'Auto-triaged using rule: {rule.name}',
+            metadata={'rule_id': str(rule.id), 'rule_name': rule.name}
+        )]
+    )
+
+
+def update(complaint, actor, data):
+    """
+    Field edits from ComplaintDetailView (validated ComplaintUpdateSerializer
+    data). Keeps status in step with the assignee, recalculates the SLA on a
+    priority change and moves the workload between agents on reassignment.
+    """
+    changes = dict(data)
+    assigned_to = changes.get('assigned_to', complaint.assigned_to)
+    new_status = changes.get('status', complaint.status)
+    if assigned_to and new_status == 'OPEN':
+        changes['status'] = new_status = 'IN_PROGRESS'
+    elif not assigned_to and new_status == 'IN_PROGRESS':
+        changes['status'] = new_status = 'OPEN'
+
+    old_priority = complaint.priority
+    new_priority = changes.get('priority', old_priority)
+    if new_priority != old_priority:
+        changes['sla_deadline'] = calculate_sla_deadline(new_priority, changes.get('category', complaint.category))
+
+    agents = {}
+    new_agent_id = assigned_to.pk if assigned_to else None
+    if new_agent_id != complaint.assigned_to_id:
+        if complaint.assigned_to_id and complaint.status in ACTIVE_STATUSES:
+            agents[complaint.assigned_to_id] = released_counters()
+        if new_agent_id and new_status in ACTIVE_STATUSES:
+            agents[new_agent_id] = assigned_counters()
+
+    timeline = [Timeline(
+        action='UPDATED',
+        description=f'Complaint updated: {", ".join(f"{field}: {value}" for field, value in data.items())}'
+    )]
+    if new_priority != old_priority:
+        timeline.append(Timeline(
+            action='PRIORITY_UPDATED',
+            description=f'Priority changed from {old_priority} to {new_priority}'
+        ))
+
+    old_status = complaint.status
+    events = []
+    if new_status != old_status:
+        events.append(email_event('status_changed', complaint, old_status=old_status))
+    return transition(complaint, actor, changes=changes, agents=agents, timeline=timeline, events=events)
@@ -0,0 +1,153 @@
+"""
+Compiled triage rules.
+
+The first active TriageRule (highest priority_order) whose category and
+priority filters fit the complaint and one of whose keywords occurs in the
+title or description wins; a rule without keywords matches on the filters
+alone.
+
+Instead of testing every keyword of every rule against the text, the active
+rules are compiled once into a RuleEngine. All keywords become one regex
+shaped like a trie, scanned once over the lowercased text; a lookahead finds
+the longest keyword starting at every position. Since a keyword implies every
+keyword it contains, each keyword maps, per (category, priority) filter, to
+the best rule listing it or anything inside it, resolved at compile time, so
+overlapping and nested keywords are not missed. A complaint then only looks
+at the four filters that can apply to it. Matching costs one C-level scan
+however many rules and keywords there are.
+
+Every process keeps its compiled engine and checks a fingerprint of the
+rules table (row count and latest updated_at, one small query) before using
+it, so a rule edited through any worker is picked up by all of them. The
+TriageRule signals drop the local copy right away. Under gunicorn --preload,
+calling get_engine() before forking shares one copy between the workers.
+"""
+import re
+import threading
+from collections import defaultdict, namedtuple
+from django.db.models import Count, Max
+from . import transitions
+from .models import TriageRule
+
+# What the engine needs of a rule; everything else is read from the database when a rule fires
+RuleSpec = namedtuple('RuleSpec', 'id category priority keywords')
+
+NO_MATCH = float('inf')
+# Joins title and description so a keyword never matches across the two
+SEPARATOR = '\x00'
+
+
+def _trie_pattern(keywords):
+    """Regex matching the longest of `keywords` at the current position"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy: try longer keywords first, settle for the one ending here
+        if '' in node:
+            return ('(?:' + pattern + ')?') if len(branches) == 1 else pattern + '?'
+        return pattern
+
+    return emit(trie)
+
+
+class RuleEngine:
+    def __init__(self, rules):
+        self.rules = list(rules)  # in evaluation order
+        self.always = {}  # filter -> best rule without keywords
+        own = defaultdict(dict)  # keyword -> {filter: best rule listing it}
+        for index, rule in enumerate(self.rules):
+            key = (rule.category or None, rule.priority or None)
+            keywords = {str(keyword).lower().replace(SEPARATOR, '') for keyword in rule.keywords or ()}
+            if not keywords or '' in keywords:
+                self.always[key] = min(self.always.get(key, NO_MATCH), index)
+                continue
+            for keyword in keywords:
+                own[keyword][key] = min(own[keyword].get(key, NO_MATCH), index)
+
+        self.regex = re.compile('(?=(' + _trie_pattern(own) + '))') if own else None
+        # keyword -> {filter: best rule listing it or any keyword it contains}
+        self.best = {}
+        for keyword in sorted(own, key=len):
+            # Shorter keywords are done, and every keyword inside this one is found
+            # with its first or last character cut off
+            best = dict(own[keyword])
+            for part in (keyword[:-1], keyword[1:]):
+                for found in self._scan(part):
+                    for key, index in self.best[found].items():
+                        if index < best.get(key, NO_MATCH):
+                            best[key] = index
+            self.best[keyword] = best
+
+    def _scan(self, text):
+        return {match.group(1) for match in self.regex.finditer(text)} if self.regex and text else ()
+
+    @classmethod
+    def from_database(cls):
+        rules = (
+            TriageRule.objects.filter(is_active=True)
+            .order_by('-priority_order', 'name', 'id')
+            .values_list('id', 'category', 'priority', 'keyword_patterns')
+        )
+        return cls(RuleSpec(*row) for row in rules)
+
+    def match(self, category, priority, title, description):
+        """The first rule that applies, or None"""
+        keys = ((None, None), (category, None), (None, priority), (category, priority))
+        best = min(self.always.get(key, NO_MATCH) for key in keys)
+        for keyword in self._scan(f'{title}{SEPARATOR}{description}'.lower()):
+            candidates = self.best[keyword]
+            for key in keys:
+                if candidates.get(key, NO_MATCH) < best:
+                    best = candidates[key]
+        return self.rules[best] if best != NO_MATCH else None
+
+
+_engine = None
+_fingerprint = None
+_lock = threading.Lock()
+
+
+def rules_fingerprint():
+    """Changes whenever a rule is added, edited or deleted"""
+    state = TriageRule.objects.aggregate(rules=Count('id'), changed=Max('updated_at'))
+    return state['rules'], state['changed']
+
+
+def get_engine():
+    """This process's compiled rules, rebuilt if the rules table changed"""
+    global _engine, _fingerprint
+    fingerprint = rules_fingerprint()
+    if _engine is None or fingerprint != _fingerprint:
+        with _lock:
+            if _engine is None or fingerprint != _fingerprint:
+                _engine = RuleEngine.from_database()
+                _fingerprint = fingerprint
+    return _engine
+
+
+def rules_changed():
+    """Drop the compiled rules (TriageRule signals)"""
+    global _engine
+    _engine = None
+
+
+def auto_triage(complaint):
+    """Apply the first matching triage rule to `complaint`; returns whether one applied"""
+    spec = get_engine().match(complaint.category, complaint.priority, complaint.title, complaint.description)
+    if spec is None:
+        return False
+    rule = TriageRule.objects.select_related('auto_assign_to').filter(pk=spec.id, is_active=True).first()
+    if rule is None:
+        return False
+
+    transitions.triage(complaint, rule)
+    return True
@@ -1,6 +1,8 @@
 from django.urls import path
 from . import views
 from . import invoice_views
+from . import bulk_views
+from . import attachment_views
 
 urlpatterns = [
     path('', views.ComplaintListCreateView.as_view(), name='complaint_list_create'),
@@ -14,7 +16,15 @@ urlpatterns = [
     path('<uuid:pk>/reopen/', views.reopen_complaint, name='reopen_complaint'),
     path('<uuid:pk>/comments/', views.add_comment, name='add_comment'),
     path('<uuid:pk>/comments/list/', views.get_comments, name='get_comments'),
+    path('<uuid:pk>/timeline/', views.get_timeline, name='get_timeline'),
     path('<uuid:pk>/feedback/', views.add_feedback, name='add_feedback'),
+    path('attachments/<uuid:pk>/download/', attachment_views.download_attachment, name='download_attachment'),
+    path('attachments/<uuid:pk>/<str:variant>/', attachment_views.attachment_rendition, name='attachment_rendition'),
+    path('bulk/assign/', bulk_views.bulk_assign, name='bulk_assign'),
+    path('bulk/resolve/', bulk_views.bulk_resolve, name='bulk_resolve'),
+    path('bulk/close/', bulk_views.bulk_close, name='bulk_close'),
+    path('bulk/priority/', bulk_views.bulk_update_priority, name='bulk_update_priority'),
+    path('import/', bulk_views.import_complaints, name='import_complaints'),
     path('assignment-requests/', views.list_assignment_requests, name='list_assignment_requests'),
     path('assignment-requests/<uuid:pk>/review/', views.review_assignment_request, name='review_assignment_request'),
     path('assignment-requests/<uuid:pk>/respond/', views.review_assignment_request, name='respond_assignment_request'),
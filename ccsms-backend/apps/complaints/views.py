@@ -3,30 +3,48 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.conf import settings
-from .models import Complaint, Attachment, Comment, Timeline, Feedback, AssignmentRequest, ComplaintTemplate, TriageRule
-from .serializers import (ComplaintSerializer, ComplaintListSerializer, ComplaintUpdateSerializer,
-                         AttachmentSerializer, CommentSerializer, FeedbackSerializer, AssignmentRequestSerializer)
+from .models import Complaint, Attachment, Comment, Timeline, Feedback, AssignmentRequest, ComplaintTemplate
+from .serializers import (ComplaintSerializer, ComplaintDetailSerializer, ComplaintListSerializer, ComplaintUpdateSerializer,
+                         AttachmentSerializer, CommentSerializer, TimelineSerializer, FeedbackSerializer, AssignmentRequestSerializer)
 from utils.permissions import IsComplaintOwnerOrAgent, IsComplaintOwner
-from utils.email_service import send_complaint_created_email, send_status_changed_email, send_complaint_assigned_email
 from apps.notifications.tasks import send_email_notification
+from apps.notifications.outbox import enqueue, push_event, email_event
 from utils.notification_service import send_real_time_notification
-from utils.sla_calculator import calculate_sla_deadline
+from utils.complaint_numbers import next_complaint_number
+from utils.pagination import KeysetPagination
+from utils.conditional import ConditionalGetMixin, page_validator, values_of
+from utils.fieldsets import SparseFieldsetMixin, fieldset_kwargs, narrow
+from .search import ComplaintSearchFilter
+from . import transitions, triage
 import logging
 
 logger = logging.getLogger(__name__)
 
-class ComplaintListCreateView(generics.ListCreateAPIView):
+# Row values that decide whether a cached complaint response is still current: comments, timeline
+# entries, attachments and feedback bump updated_at (see signals); nested users change with their save()
+COMPLAINT_VALIDATOR_FIELDS = ('id', 'updated_at', 'customer__last_activity', 'customer__last_login',
+                              'assigned_to__last_activity', 'assigned_to__last_login')
+
+class ComplaintListCreateView(ConditionalGetMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
     serializer_class = ComplaintListSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, ComplaintSearchFilter, OrderingFilter]
     filterset_fields = ['status', 'priority', 'category', 'assigned_to', 'sla_breached']
-    search_fields = ['complaint_number', 'title', 'description']
-    ordering_fields = ['created_at', 'priority', 'sla_deadline']
-    ordering = ['-created_at']
+    search_fields = ['complaint_number', 'title', 'description']  # icontains fallback (non-PostgreSQL)
+    ordering_fields = ['created_at', 'priority', 'sla_deadline', 'search_rank']
+    
+    @property
+    def ordering(self):
+        # Searches are ranked by relevance unless the client asks for another ordering
+        if ComplaintSearchFilter.is_ranked(self.request):
+            return ['-search_rank']
+        return ['-created_at']
     
     def get_queryset(self):
         user = self.request.user
@@ -44,6 +62,11 @@ class ComplaintListCreateView(generics.ListCreateAPIView):
             return ComplaintSerializer
         return ComplaintListSerializer
     
+    def get_validator(self):
+        # The requested page, keys only
+        fields = COMPLAINT_VALIDATOR_FIELDS + ('created_at', 'priority', 'sla_deadline')
+        return page_validator(self, self.filter_queryset(self.get_queryset()), fields)
+    
     def create(self, request, *args, **kwargs):
         """Override create to handle attachments and return simple response"""
         serializer = self.get_serializer(data=request.data)
@@ -63,51 +86,44 @@ class ComplaintListCreateView(generics.ListCreateAPIView):
         """Standard creation with attachment handling and auto-assignment"""
         # Save complaint (serializer.create handles customer and SLA)
         user = self.request.user
-        complaint = serializer.save()
-        
-        # Handle attachments
-        attachments = self.request.FILES.getlist('attachments')
-        for file in attachments:
-            try:
-                Attachment.objects.create(
-                    complaint=complaint,
-                    file=file,
-                    original_filename=file.name,
-                    file_size=file.size,
-                    mime_type=file.content_type,
-                    uploaded_by=user
-                )
-            except Exception as e:
-                logger.error(f"Failed to save attachment {file.name}: {e}")
-        
-        # Create timeline entry (non-blocking)
-        try:
+        # Numbered before the transaction, so creates never hold the counter row lock until commit
+        complaint_number = next_complaint_number()
+        with transaction.atomic():
+            complaint = serializer.save(complaint_number=complaint_number)
+            
+            # Handle attachments
+            attachments = self.request.FILES.getlist('attachments')
+            for file in attachments:
+                try:
+                    # Own savepoint: a failed file write must not roll back the complaint
+                    with transaction.atomic():
+                        Attachment.objects.create(
+                            complaint=complaint,
+                            file=file,
+                            original_filename=file.name,
+                            file_size=file.size,
+                            mime_type=file.content_type,
+                            uploaded_by=user
+                        )
+                except Exception as e:
+                    logger.error(f"Failed to save attachment {file.name}: {e}")
+            
             Timeline.objects.create(
                 complaint=complaint,
                 action='CREATED',
                 description=f'Complaint created by {user.email}',
                 performed_by=user
             )
-        except Exception:
-            pass
             
-        # Send Firebase notifications to all admins about new complaint
-        try:
-            from apps.notifications.firebase_service import send_notification_to_user
-            from apps.users.models import User
-            
-            admins = User.objects.filter(role='ADMIN', is_active=True)
-            for admin in admins:
-                send_notification_to_user(
-                    user_id=str(admin.id),
-                    title=f'New Complaint: {complaint.complaint_number}',
-                    message=f'{complaint.title} - {complaint.category} ({complaint.priority} priority)',
-                    notification_type='info',
-                    category='NEW_COMPLAINT',
-                    complaint=complaint
-                )
-        except Exception as e:
-            logger.error(f"Failed to send new complaint notifications: {e}")
+            # Notify all admins about the new complaint (relayed from the outbox)
+            enqueue(push_event(
+                admins=True,
+                title=f'New Complaint: {complaint.complaint_number}',
+                message=f'{complaint.title} - {complaint.category} ({complaint.priority} priority)',
+                notification_type='info',
+                category='NEW_COMPLAINT',
+                complaint=complaint
+            ))
         
         return complaint
     
@@ -170,40 +186,20 @@ class ComplaintListCreateView(generics.ListCreateAPIView):
             return
         
         try:
-            from apps.users.models import User
+            from utils.agent_index import get_agent_index
+            from utils.ai_assignment import NEARBY_KM
             
-            # Find agents with matching or nearby pincode
-            suggested_agents = []
-            
-            # Exact pincode match
-            exact_match = User.objects.filter(
-                role='AGENT',
-                is_verified=True,
-                is_active=True,
-                pincode=complaint.pincode
+            # Verified agents with the same pincode, then nearby ones (within NEARBY_KM, or the same
+            # first 3 digits where a pincode has no known location), least busy first
+            exact_match, nearby_match = get_agent_index().local_agents(
+                complaint.pincode, service_type=complaint.service_type_required or None, km=NEARBY_KM
             )
-            if complaint.service_type_required:
-                exact_match = exact_match.filter(service_type=complaint.service_type_required)
-            
-            # Nearby pincode match (same first 3 digits)
-            if len(complaint.pincode) >= 3:
-                pincode_prefix = complaint.pincode[:3]
-                nearby_match = User.objects.filter(
-                    role='AGENT',
-                    is_verified=True,
-                    is_active=True,
-                    pincode__startswith=pincode_prefix
-                ).exclude(pincode=complaint.pincode)
-                if complaint.service_type_required:
-                    nearby_match = nearby_match.filter(service_type=complaint.service_type_required)
-            else:
-                nearby_match = User.objects.none()
             
             # Create timeline entry with suggestions
             suggestions = []
-            if exact_match.exists():
+            if exact_match:
                 suggestions.append(f"Exact match agents: {', '.join([a.email for a in exact_match[:3]])}")
-            if nearby_match.exists():
+            if nearby_match:
                 suggestions.append(f"Nearby agents: {', '.join([a.email for a in nearby_match[:3]])}")
             
             if suggestions:
@@ -223,115 +219,87 @@ class ComplaintListCreateView(generics.ListCreateAPIView):
             logger.error(f"Error suggesting agents: {e}")
     
     def auto_triage_complaint(self, complaint):
-        """Auto-triage complaint based on rules"""
+        """Auto-triage complaint based on rules (compiled, see triage.py)"""
         try:
-            # Get active triage rules ordered by priority
-            rules = TriageRule.objects.filter(is_active=True).order_by('-priority_order')
-            
-            for rule in rules:
-                # Check category match
-                if rule.category and rule.category != complaint.category:
-                    continue
-                
-                # Check priority match
-                if rule.priority and rule.priority != complaint.priority:
-                    continue
-                
-                # Check keyword patterns
-                if rule.keyword_patterns:
-                    description_lower = complaint.description.lower()
-                    title_lower = complaint.title.lower()
-                    matched = False
-                    for keyword in rule.keyword_patterns:
-                        if keyword.lower() in description_lower or keyword.lower() in title_lower:
-                            matched = True
-                            break
-                    if not matched:
-                        continue
-                
-                # Apply triage rule
-                if rule.auto_assign_to:
-                    complaint.assigned_to = rule.auto_assign_to
-                    if complaint.status == 'OPEN':
-                        complaint.status = 'IN_PROGRESS'
-                
-                if rule.priority:
-                    complaint.priority = rule.priority
-                
-                complaint.save()
-                
-                Timeline.objects.create(
-                    complaint=complaint,
-                    action='AUTO_TRIAGED',
-                    description=f'Auto-triaged using rule: {rule.name}',
-                    performed_by=None,
-                    metadata={'rule_id': str(rule.id), 'rule_name': rule.name}
-                )
-                
-                return True
+            return triage.auto_triage(complaint)
         except Exception as e:
             # Log error but don't fail complaint creation
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"Auto-triage error: {e}")
-        
         return False
 
-class ComplaintDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Complaint.objects.select_related('customer', 'assigned_to').prefetch_related('attachments', 'comments', 'timeline')
-    serializer_class = ComplaintSerializer
+def _count_subquery(queryset):
+    """Scalar subquery counting the rows of `queryset` that belong to the outer complaint"""
+    return Coalesce(models.Subquery(
+        queryset.filter(complaint=models.OuterRef('pk')).order_by().values('complaint')
+        .annotate(total=models.Count('pk')).values('total'),
+        output_field=models.IntegerField()
+    ), 0)
+
+class ComplaintDetailView(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = ComplaintDetailSerializer
     permission_classes = [IsAuthenticated, IsComplaintOwnerOrAgent]
+    # Newest comments/timeline entries embedded in the detail response; the rest are paged
+    # through comments/list/ and timeline/
+    embed_limit = 10
+    
+    def get_queryset(self):
+        queryset = Complaint.objects.select_related('customer', 'assigned_to')
+        if self.request.method != 'GET':
+            return queryset
+        # Only what the requested fieldset shows
+        if self.wants('feedback'):
+            queryset = queryset.select_related('feedback')
+        if self.wants('comments_count'):
+            queryset = queryset.annotate(comments_count=_count_subquery(self.get_comments_queryset()))
+        if self.wants('timeline_count'):
+            queryset = queryset.annotate(timeline_count=_count_subquery(Timeline.objects.all()))
+        if self.wants('attachments') or self.wants('resolution_attachments'):
+            queryset = queryset.prefetch_related('attachments')
+        return queryset
+    
+    def get_comments_queryset(self):
+        comments = Comment.objects.all()
+        if self.request.user.role == 'CUSTOMER':
+            comments = comments.filter(is_internal=False)
+        return comments
+    
+    def get_object(self):
+        # Fixed number of queries however long the history: complaint (with counts and
+        # feedback), attachments, latest comments, latest timeline entries
+        complaint = super().get_object()
+        if self.request.method != 'GET':
+            return complaint
+        fields = self.get_serializer().fields
+        if 'comments' in fields:
+            comments = self.get_comments_queryset().filter(complaint=complaint).select_related('user')
+            complaint.latest_comments = list(
+                narrow(comments, fields['comments']).order_by('-created_at', '-id')[:self.embed_limit]
+            )
+        if 'timeline' in fields:
+            timeline = Timeline.objects.filter(complaint=complaint).select_related('performed_by')
+            complaint.latest_timeline = list(
+                narrow(timeline, fields['timeline']).order_by('-created_at', '-id')[:self.embed_limit]
+            )
+        return complaint
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return ComplaintUpdateSerializer
-        return ComplaintSerializer
+        return ComplaintDetailSerializer
     
-    def perform_update(self, serializer):
-        old_status = self.get_object().status
-        old_priority = self.get_object().priority
-        old_assigned = self.get_object().assigned_to
-        complaint = serializer.save()
-        changes = []
-        for field, value in serializer.validated_data.items():
-            if hasattr(complaint, field):
-                changes.append(f"{field}: {value}")
-        
-        # Fix: Sync status with assignment
-        if complaint.assigned_to and complaint.status == 'OPEN':
-            complaint.status = 'IN_PROGRESS'
-            complaint.save(update_fields=['status'])
-        elif not complaint.assigned_to and complaint.status == 'IN_PROGRESS':
-            complaint.status = 'OPEN'
-            complaint.save(update_fields=['status'])
-        
-        Timeline.objects.create(
-            complaint=complaint,
-            action='UPDATED',
-            description=f'Complaint updated: {", ".join(changes)}',
-            performed_by=self.request.user
+    def get_validator(self):
+        # One small query, permission-checked, before the full object and its history are loaded
+        complaint = generics.get_object_or_404(
+            Complaint.objects.select_related('customer', 'assigned_to').only(*COMPLAINT_VALIDATOR_FIELDS),
+            pk=self.kwargs['pk'],
         )
-        
-        if old_status != complaint.status:
-            try:
-                send_status_changed_email(complaint, old_status)
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to send status change email: {e}")
-        
-        if old_priority != complaint.priority:
-            # Recalculate SLA on priority change
-            from utils.sla_calculator import calculate_sla_deadline
-            complaint.sla_deadline = calculate_sla_deadline(complaint.priority, complaint.category)
-            complaint.save(update_fields=['sla_deadline'])
-            
-            Timeline.objects.create(
-                complaint=complaint,
-                action='PRIORITY_UPDATED',
-                description=f'Priority changed from {old_priority} to {complaint.priority}',
-                performed_by=self.request.user
-            )
+        self.check_object_permissions(self.request, complaint)
+        return values_of(complaint, COMPLAINT_VALIDATOR_FIELDS)
+    
+    def perform_update(self, serializer):
+        # serializer.instance is the object UpdateModelMixin already fetched; the edit is
+        # written with one conditional UPDATE (status sync, SLA and workload included)
+        transitions.update(serializer.instance, self.request.user, serializer.validated_data)
     
     def perform_destroy(self, instance):
         if self.request.user.role != 'ADMIN':
@@ -341,17 +309,20 @@ class ComplaintDetailView(generics.RetrieveUpdateDestroyAPIView):
             from rest_framework.exceptions import ValidationError
             raise ValidationError("Only resolved complaints can be deleted")
         
-        # Delete related objects first
-        instance.attachments.all().delete()
-        instance.comments.all().delete()
-        instance.timeline.all().delete()
-        if hasattr(instance, 'feedback'):
-            try:
-                instance.feedback.delete()
-            except:
-                pass
-        
-        instance.delete()
+        # Delete related objects first. Attachment files can be shared with other complaints
+        # (content-addressed storage): each delete releases one reference and a file is only
+        # removed, after commit, once nothing references it
+        with transaction.atomic():
+            instance.attachments.all().delete()
+            instance.comments.all().delete()
+            instance.timeline.all().delete()
+            if hasattr(instance, 'feedback'):
+                try:
+                    instance.feedback.delete()
+                except:
+                    pass
+            
+            instance.delete()
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -360,77 +331,14 @@ def close_complaint(request, pk):
         complaint = Complaint.objects.get(pk=pk)
         
         # User role logic: Admin can close any, Customer can close their own, Agent can close assigned
-        if request.user.role != 'ADMIN' and complaint.customer != request.user and complaint.assigned_to != request.user:
+        if request.user.role != 'ADMIN' and request.user.pk not in (complaint.customer_id, complaint.assigned_to_id):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
             
-        if complaint.status == 'CLOSED':
-            return Response({'error': 'Complaint is already closed'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        complaint.status = 'CLOSED'
-        complaint.save()
-        
-        Timeline.objects.create(
-            complaint=complaint,
-            action='CLOSED',
-            description=f'Complaint closed by {request.user.email} ({request.user.role})',
-            performed_by=request.user
-        )
-        
-        # Send Firebase notifications to all parties
-        try:
-            from apps.notifications.firebase_service import send_notification_to_user
-            
-            # Notify customer
-            if complaint.customer != request.user:
-                send_notification_to_user(
-                    user_id=str(complaint.customer.id),
-                    title=f'Complaint {complaint.complaint_number} Closed',
-                    message=f'Your complaint has been closed by {request.user.first_name or request.user.email}',
-                    notification_type='info',
-                    category='COMPLAINT_CLOSED',
-                    complaint=complaint
-                )
-            
-            # Notify assigned agent
-            if complaint.assigned_to and complaint.assigned_to != request.user:
-                send_notification_to_user(
-                    user_id=str(complaint.assigned_to.id),
-                    title=f'Complaint {complaint.complaint_number} Closed',
-                    message=f'Complaint closed by {request.user.first_name or request.user.email}',
-                    notification_type='info',
-                    category='COMPLAINT_CLOSED',
-                    complaint=complaint
-                )
-            
-            # Notify admins
-            if request.user.role != 'ADMIN':
-                from apps.users.models import User
-                admins = User.objects.filter(role='ADMIN', is_active=True)
-                for admin in admins:
-                    send_notification_to_user(
-                        user_id=str(admin.id),
-                        title=f'Complaint {complaint.complaint_number} Closed',
-                        message=f'Closed by {request.user.first_name or request.user.email}',
-                        notification_type='info',
-                        category='COMPLAINT_CLOSED',
-                        complaint=complaint
-                    )
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to send closure notifications: {e}")
+        transitions.close(complaint, request.user)
         
-        # Status change notification (controlled by env) - keeping for backward compatibility
-        if getattr(settings, 'ENABLE_EMAIL_NOTIFICATIONS', False):
-            try:
-                from apps.notifications.email_service import send_module_notification
-                send_module_notification(complaint.customer, 'COMPLAINT_STATUS_CHANGED', complaint)
-                if complaint.assigned_to and complaint.assigned_to != request.user:
-                    send_module_notification(complaint.assigned_to, 'COMPLAINT_STATUS_CHANGED', complaint)
-            except Exception:
-                pass
-            
         return Response({'message': 'Complaint closed successfully'})
+    except transitions.TransitionError as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
     except Complaint.DoesNotExist:
         return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -482,7 +390,7 @@ def get_ai_recommendations(request, pk):
 @permission_classes([IsAuthenticated])
 def assign_complaint(request, pk):
     try:
-        complaint = Complaint.objects.get(pk=pk)
+        complaint = Complaint.objects.select_related('assigned_to').get(pk=pk)
         
         if request.user.role != 'ADMIN':
             return Response({'error': 'Only admins can assign complaints'}, status=status.HTTP_403_FORBIDDEN)
@@ -491,48 +399,7 @@ def assign_complaint(request, pk):
 
         # Handle explicit unassignment
         if assigned_to_id == 'unassign':
-            if not complaint.assigned_to:
-                return Response({'error': 'Complaint is not assigned to any agent'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            old_agent = complaint.assigned_to
-            
-            # Reset complaint
-            complaint.assigned_to = None
-            complaint.status = 'OPEN'
-            complaint.save()
-
-            # Update agent workload
-            old_agent.current_active_cases = max(0, (old_agent.current_active_cases or 1) - 1)
-            old_agent.save()
-
-            # Cancel any existing pending requests for this complaint
-            from .models_assignment import AgentAssignmentRequest
-            AgentAssignmentRequest.objects.filter(
-                complaint=complaint,
-                status='PENDING'
-            ).update(status='CANCELLED')
-
-            Timeline.objects.create(
-                complaint=complaint,
-                action='UNASSIGNED',
-                description=f'Agent {old_agent.email} unassigned by admin. Status reset to OPEN.',
-                performed_by=request.user
-            )
-
-            # Notify the agent
-            try:
-                from apps.notifications.firebase_service import send_notification_to_user
-                send_notification_to_user(
-                    user_id=str(old_agent.id),
-                    title='Assignment Changed',
-                    message=f'You have been unassigned from Complaint #{complaint.complaint_number}: {complaint.title}',
-                    notification_type='info',
-                    category='ASSIGNMENT_CHANGED',
-                    complaint=complaint
-                )
-            except Exception:
-                pass
-
+            transitions.unassign(complaint, request.user)
             return Response({'message': 'Agent unassigned successfully'})
         
         if not assigned_to_id:
@@ -549,124 +416,37 @@ def assign_complaint(request, pk):
                 # Get the best recommendation and assign directly
                 best_recommendation = recommendations[0]
                 assigned_user = best_recommendation['agent']
-                confidence = best_recommendation['confidence_score']
-                reasoning = best_recommendation['reasoning']
-                
-                # Direct assignment
-                complaint.assigned_to = assigned_user
-                complaint.status = 'IN_PROGRESS'
-                complaint.save()
-                
-                # Update agent workload
-                assigned_user.current_active_cases = (assigned_user.current_active_cases or 0) + 1
-                assigned_user.save()
-                
-                Timeline.objects.create(
-                    complaint=complaint,
-                    action='AUTO_ASSIGNED',
-                    description=f'Auto-assigned to {assigned_user.email} (Confidence: {confidence:.0%}) - {reasoning}',
-                    performed_by=request.user,
-                    metadata={
-                        'ai_confidence': confidence,
-                        'reasoning': reasoning
-                    }
-                )
-                
-                # Send Firebase notification about direct assignment
-                try:
-                    from apps.notifications.firebase_service import send_notification_to_user
-                    send_notification_to_user(
-                        user_id=str(assigned_user.id),
-                        title='New Direct Assignment',
-                        message=f'Complaint #{complaint.complaint_number} has been auto-assigned to you: {complaint.title}',
-                        notification_type='high',
-                        category='ASSIGNMENT_DIRECT',
-                        complaint=complaint
-                    )
-                except Exception:
-                    pass
+                transitions.assign(complaint, assigned_user, request.user, recommendation=best_recommendation)
                 
                 return Response({
                     'message': f'Successfully auto-assigned to {assigned_user.first_name} {assigned_user.last_name}',
                     'agent_name': f"{assigned_user.first_name} {assigned_user.last_name}",
-                    'confidence_score': round(confidence * 100, 1)
+                    'confidence_score': round(best_recommendation['confidence_score'] * 100, 1)
                 })
                 
+            except transitions.TransitionError:
+                raise
             except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
                 logger.error(f"Auto-assignment failed: {e}")
                 return Response({'error': 'Auto-assignment failed. Please select an agent manually.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # Manual assignment (logic below remains request-based or becomes direct based on preference)
-        # Assuming manual assignment still creates a request for agent to accept
+        # Manual assignment creates a request for the agent to accept
         from apps.users.models import User
         try:
             assigned_user = User.objects.get(id=assigned_to_id, role='AGENT')
         except User.DoesNotExist:
             return Response({'error': 'Agent not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        # If complaint is already assigned, unassign first
-        if complaint.assigned_to:
-            old_agent = complaint.assigned_to
-            old_agent.current_active_cases = max(0, (old_agent.current_active_cases or 1) - 1)
-            old_agent.save()
-            
-            complaint.assigned_to = None
-            complaint.save()
-            
-            Timeline.objects.create(
-                complaint=complaint,
-                action='REASSIGNMENT_INITIATED',
-                description=f'Admin initiating reassignment from {old_agent.email} to {assigned_user.email}',
-                performed_by=request.user
-            )
-        
-        # Create assignment request for manual selection
-        from .models_assignment import AgentAssignmentRequest
-        from datetime import timedelta
-        
-        # Cancel any existing pending requests for this complaint
-        AgentAssignmentRequest.objects.filter(
-            complaint=complaint,
-            status='PENDING'
-        ).update(status='CANCELLED')
-        
-        # Create new assignment request
-        assignment_request = AgentAssignmentRequest.objects.create(
-            complaint=complaint,
-            agent=assigned_user,
-            admin=request.user,
-            message=request.data.get('message', ''),
-            expires_at=timezone.now() + timedelta(hours=24)
-        )
-        
-        Timeline.objects.create(
-            complaint=complaint,
-            action='ASSIGNMENT_REQUESTED',
-            description=f'Admin requested assignment to {assigned_user.email}',
-            performed_by=request.user
+        assignment_request = transitions.request_assignment(
+            complaint, assigned_user, request.user, request.data.get('message', '')
         )
-        
-        # Send Firebase notification
-        try:
-            from apps.notifications.firebase_service import send_notification_to_user
-            send_notification_to_user(
-                user_id=str(assigned_user.id),
-                title='New Assignment Request',
-                message=f'Requested to handle complaint #{complaint.complaint_number}',
-                notification_type='info',
-                category='ASSIGNMENT_REQUEST',
-                complaint=complaint
-            )
-        except Exception:
-            pass
-            
         return Response({
             'message': f'Assignment request sent to {assigned_user.first_name} {assigned_user.last_name} successfully',
             'request_id': str(assignment_request.id)
         })
         
+    except transitions.TransitionError as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
     except Complaint.DoesNotExist:
         return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -783,7 +563,9 @@ def list_assignment_requests(request):
     
     if request.user.role == 'ADMIN':
         # 1. Requests FROM agents TO admin
-        agent_requests = AssignmentRequest.objects.filter(status='PENDING')
+        agent_requests = AssignmentRequest.objects.filter(status='PENDING').select_related(
+            'complaint', 'requested_by', 'reviewed_by'
+        )
         agent_serializer = AssignmentRequestSerializer(agent_requests, many=True)
         
         # 2. Requests FROM admin TO agents
@@ -793,7 +575,7 @@ def list_assignment_requests(request):
             expires_at__gt=timezone.now(),
             complaint__status='OPEN',
             complaint__assigned_to__isnull=True
-        )
+        ).select_related('complaint', 'agent', 'admin')
         admin_serializer = AgentAssignmentRequestSerializer(admin_requests, many=True)
         
         # Return both
@@ -808,7 +590,7 @@ def list_assignment_requests(request):
             agent=request.user,
             status='PENDING',
             expires_at__gt=timezone.now()
-        ).select_related('complaint', 'admin')
+        ).select_related('complaint', 'agent', 'admin')
         
         serializer = AgentAssignmentRequestSerializer(agent_requests, many=True)
         return Response({
@@ -823,7 +605,8 @@ def list_assignment_requests(request):
 @permission_classes([IsAuthenticated])
 def review_assignment_request(request, pk):
     try:
-        assignment_request = AssignmentRequest.objects.get(pk=pk)
+        assignment_request = AssignmentRequest.objects.select_related('complaint', 'requested_by').get(pk=pk)
+        agent = assignment_request.requested_by
         
         # Allow both ADMIN and AGENT (when it's their own request) to review
         if request.user.role == 'ADMIN':
@@ -831,99 +614,38 @@ def review_assignment_request(request, pk):
             action = request.data.get('action')  # 'approve' or 'reject'
             
             if action == 'approve':
-                complaint = assignment_request.complaint
-                if complaint.assigned_to:
-                    return Response({'error': 'Complaint already assigned'}, status=status.HTTP_400_BAD_REQUEST)
-                
-                agent = assignment_request.requested_by
-                complaint.assigned_to = agent
-                if complaint.status == 'OPEN':
-                    complaint.status = 'IN_PROGRESS'
-                complaint.save()
-                
-                # Update agent workload
-                agent.total_assigned_cases += 1
-                agent.current_active_cases += 1
-                agent.save(update_fields=['total_assigned_cases', 'current_active_cases'])
-                
-                assignment_request.status = 'APPROVED'
-                assignment_request.reviewed_by = request.user
-                assignment_request.reviewed_at = timezone.now()
-                assignment_request.save()
-                
-                Timeline.objects.create(
-                    complaint=complaint,
-                    action='ASSIGNED',
-                    description=f'Assignment request approved. Assigned to {assignment_request.requested_by.email}',
-                    performed_by=request.user
+                transitions.approve_assignment_request(
+                    assignment_request, request.user,
+                    f'Assignment request approved. Assigned to {agent.email}'
                 )
-                
                 return Response({'message': 'Assignment request approved'})
             
             elif action == 'reject':
-                assignment_request.status = 'REJECTED'
-                assignment_request.reviewed_by = request.user
-                assignment_request.reviewed_at = timezone.now()
-                assignment_request.save()
-                
-                Timeline.objects.create(
-                    complaint=assignment_request.complaint,
-                    action='ASSIGNMENT_REJECTED',
-                    description=f'Assignment request rejected for {assignment_request.requested_by.email}',
-                    performed_by=request.user
+                transitions.reject_assignment_request(
+                    assignment_request, request.user,
+                    f'Assignment request rejected for {agent.email}'
                 )
-                
                 return Response({'message': 'Assignment request rejected'})
             
             else:
                 return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
         
-        elif request.user.role == 'AGENT' and assignment_request.requested_by == request.user:
+        elif request.user.role == 'AGENT' and agent == request.user:
             # Agent responding to admin's assignment request
             action = request.data.get('action')  # 'accept' or 'reject'
             
             if action == 'accept':
-                complaint = assignment_request.complaint
-                if complaint.assigned_to:
-                    return Response({'error': 'Complaint already assigned'}, status=status.HTTP_400_BAD_REQUEST)
-                
-                complaint.assigned_to = request.user
-                if complaint.status == 'OPEN':
-                    complaint.status = 'IN_PROGRESS'
-                complaint.save()
-                
-                # Update agent workload
-                request.user.total_assigned_cases += 1
-                request.user.current_active_cases += 1
-                request.user.save(update_fields=['total_assigned_cases', 'current_active_cases'])
-                
-                assignment_request.status = 'APPROVED'
-                assignment_request.reviewed_by = request.user
-                assignment_request.reviewed_at = timezone.now()
-                assignment_request.save()
-                
-                Timeline.objects.create(
-                    complaint=complaint,
-                    action='ASSIGNED',
-                    description=f'Agent {request.user.email} accepted assignment request',
-                    performed_by=request.user
+                transitions.approve_assignment_request(
+                    assignment_request, request.user,
+                    f'Agent {request.user.email} accepted assignment request'
                 )
-                
                 return Response({'message': 'Assignment request accepted'})
             
             elif action == 'reject':
-                assignment_request.status = 'REJECTED'
-                assignment_request.reviewed_by = request.user
-                assignment_request.reviewed_at = timezone.now()
-                assignment_request.save()
-                
-                Timeline.objects.create(
-                    complaint=assignment_request.complaint,
-                    action='ASSIGNMENT_REJECTED',
-                    description=f'Agent {request.user.email} rejected assignment request (marked as busy)',
-                    performed_by=request.user
+                transitions.reject_assignment_request(
+                    assignment_request, request.user,
+                    f'Agent {request.user.email} rejected assignment request (marked as busy)'
                 )
-                
                 return Response({'message': 'Assignment request rejected'})
             
             else:
@@ -931,6 +653,8 @@ def review_assignment_request(request, pk):
         else:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
+    except transitions.TransitionError as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
     except AssignmentRequest.DoesNotExist:
         return Response({'error': 'Assignment request not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -941,120 +665,26 @@ def respond_to_agent_assignment(request, pk):
     try:
         from .models_assignment import AgentAssignmentRequest
         
-        assignment_request = AgentAssignmentRequest.objects.select_related(
-            'complaint', 'agent', 'admin', 'complaint__customer'
-        ).get(pk=pk)
+        assignment_request = AgentAssignmentRequest.objects.select_related('complaint').get(pk=pk)
         
         # Only the assigned agent can respond
-        if request.user != assignment_request.agent:
+        if assignment_request.agent_id != request.user.pk:
             return Response({'error': 'Only the assigned agent can respond to this request'}, status=status.HTTP_403_FORBIDDEN)
         
-        if assignment_request.status != 'PENDING':
-            return Response({'error': f'Request already {assignment_request.status.lower()}'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check if expired
-        if assignment_request.expires_at < timezone.now():
-            assignment_request.status = 'EXPIRED'
-            assignment_request.save()
-            return Response({'error': 'Assignment request has expired'}, status=status.HTTP_400_BAD_REQUEST)
-        
         action = request.data.get('action')  # 'accept' or 'reject'
         agent_response = request.data.get('response', '')
         
-        complaint = assignment_request.complaint
-        
         if action == 'accept':
-            # Check if complaint is still available
-            if complaint.assigned_to:
-                return Response({'error': 'Complaint already assigned to another agent'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Assign the complaint
-            complaint.assigned_to = request.user
-            if complaint.status == 'OPEN':
-                complaint.status = 'IN_PROGRESS'
-            complaint.save()
-            
-            # Update agent workload
-            request.user.total_assigned_cases += 1
-            request.user.current_active_cases += 1
-            request.user.save(update_fields=['total_assigned_cases', 'current_active_cases'])
-            
-            # Update request status
-            assignment_request.status = 'ACCEPTED'
-            assignment_request.agent_response = agent_response
-            assignment_request.responded_at = timezone.now()
-            assignment_request.save()
-            
-            Timeline.objects.create(
-                complaint=complaint,
-                action='ASSIGNED',
-                description=f'Agent {request.user.email} accepted assignment request',
-                performed_by=request.user
-            )
-            
-            # Send Firebase notification to admin
-            try:
-                from apps.notifications.firebase_service import send_notification_to_user
-                send_notification_to_user(
-                    user_id=str(assignment_request.admin.id),
-                    title='Assignment Request Accepted',
-                    message=f'Agent {request.user.first_name} {request.user.last_name} accepted complaint #{complaint.complaint_number}',
-                    notification_type='success',
-                    category='ASSIGNMENT_ACCEPTED',
-                    complaint=complaint
-                )
-            except Exception as e:
-                logger.error(f"Failed to send notification to admin: {e}")
-            
-            # Send Firebase notification to customer
-            try:
-                from apps.notifications.firebase_service import send_notification_to_user
-                send_notification_to_user(
-                    user_id=str(complaint.customer.id),
-                    title='Agent Assigned to Your Complaint',
-                    message=f'Agent {request.user.first_name} {request.user.last_name} has been assigned to your complaint #{complaint.complaint_number}',
-                    notification_type='info',
-                    category='COMPLAINT_STATUS_CHANGED',
-                    complaint=complaint
-                )
-            except Exception as e:
-                logger.error(f"Failed to send notification to customer: {e}")
-            
+            transitions.accept_assignment(assignment_request, request.user, agent_response)
             return Response({'message': 'Assignment request accepted successfully'})
-        
         elif action == 'reject':
-            # Update request status
-            assignment_request.status = 'REJECTED'
-            assignment_request.agent_response = agent_response or 'Agent is currently busy'
-            assignment_request.responded_at = timezone.now()
-            assignment_request.save()
-            
-            Timeline.objects.create(
-                complaint=complaint,
-                action='ASSIGNMENT_REJECTED',
-                description=f'Agent {request.user.email} rejected assignment request: {agent_response}',
-                performed_by=request.user
-            )
-            
-            # Send Firebase notification to admin
-            try:
-                from apps.notifications.firebase_service import send_notification_to_user
-                send_notification_to_user(
-                    user_id=str(assignment_request.admin.id),
-                    title='Assignment Request Rejected',
-                    message=f'Agent {request.user.first_name} {request.user.last_name} rejected complaint #{complaint.complaint_number}. Reason: {agent_response or "Not specified"}',
-                    notification_type='warning',
-                    category='ASSIGNMENT_REJECTED',
-                    complaint=complaint
-                )
-            except Exception as e:
-                logger.error(f"Failed to send notification to admin: {e}")
-            
+            transitions.reject_assignment(assignment_request, request.user, agent_response)
             return Response({'message': 'Assignment request rejected'})
-        
         else:
             return Response({'error': 'Invalid action. Use "accept" or "reject"'}, status=status.HTTP_400_BAD_REQUEST)
         
+    except transitions.TransitionError as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
     except AgentAssignmentRequest.DoesNotExist:
         return Response({'error': 'Assignment request not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1068,112 +698,39 @@ def resolve_complaint(request, pk):
         if request.user.role not in ['ADMIN', 'AGENT']:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        if complaint.status == 'RESOLVED':
-            return Response({'error': 'Complaint already resolved'}, status=status.HTTP_400_BAD_REQUEST)
-        
         resolution_notes = request.data.get('resolution_notes', '')
-        complaint.status = 'RESOLVED'
-        complaint.resolution_notes = resolution_notes
-        complaint.resolved_at = timezone.now()
-        complaint.save()
-        
-        # Update agent performance tracking
-        if complaint.assigned_to:
-            agent = complaint.assigned_to
-            agent.total_resolved_cases += 1
-            agent.current_active_cases = max(0, agent.current_active_cases - 1)
-            
-            # Calculate resolution time in hours
-            if complaint.created_at:
-                resolution_time = (complaint.resolved_at - complaint.created_at).total_seconds() / 3600
-                # Update average resolution time
-                if agent.total_resolved_cases == 1:
-                    agent.average_resolution_time_hours = resolution_time
-                else:
-                    agent.average_resolution_time_hours = (
-                        (agent.average_resolution_time_hours * (agent.total_resolved_cases - 1) + resolution_time) / 
-                        agent.total_resolved_cases
-                    )
-            agent.save(update_fields=['total_resolved_cases', 'current_active_cases', 'average_resolution_time_hours'])
-        
-        # Handle resolution attachments (proof of work) with 10MB size limit
-        files = request.FILES.getlist('resolution_files')
-        MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
-        
-        for file in files:
-            try:
-                # Validate file size
-                if file.size > MAX_FILE_SIZE:
-                    logger.warning(f"File {file.name} exceeds 10MB limit ({file.size} bytes)")
-                    continue
-                
-                Attachment.objects.create(
-                    complaint=complaint,
-                    file=file,
-                    original_filename=file.name,
-                    file_size=file.size,
-                    mime_type=file.content_type or 'application/octet-stream',
-                    attachment_type='RESOLUTION',
-                    uploaded_by=request.user
-                )
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Error creating resolution attachment: {e}")
-        
-        Timeline.objects.create(
-            complaint=complaint,
-            action='RESOLVED',
-            description=f'Complaint resolved: {resolution_notes}',
-            performed_by=request.user
-        )
-        
-        # Send Firebase notifications to all parties
-        try:
-            from apps.notifications.firebase_service import send_notification_to_user
+        with transaction.atomic():
+            transitions.resolve(complaint, request.user, resolution_notes)
             
-            # Notify customer
-            if complaint.customer != request.user:
-                send_notification_to_user(
-                    user_id=str(complaint.customer.id),
-                    title=f'Complaint {complaint.complaint_number} Resolved',
-                    message=f'Your complaint has been resolved by {request.user.first_name or request.user.email}',
-                    notification_type='success',
-                    category='COMPLAINT_RESOLVED',
-                    complaint=complaint
-                )
-            
-            # Notify assigned agent if different from resolver
-            if complaint.assigned_to and complaint.assigned_to != request.user:
-                send_notification_to_user(
-                    user_id=str(complaint.assigned_to.id),
-                    title=f'Complaint {complaint.complaint_number} Resolved',
-                    message=f'Complaint resolved by {request.user.first_name or request.user.email}',
-                    notification_type='success',
-                    category='COMPLAINT_RESOLVED',
-                    complaint=complaint
-                )
+            # Handle resolution attachments (proof of work) with 10MB size limit
+            files = request.FILES.getlist('resolution_files')
+            MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
             
-            # Notify admins
-            if request.user.role != 'ADMIN':
-                from apps.users.models import User
-                admins = User.objects.filter(role='ADMIN', is_active=True)
-                for admin in admins:
-                    send_notification_to_user(
-                        user_id=str(admin.id),
-                        title=f'Complaint {complaint.complaint_number} Resolved',
-                        message=f'Resolved by {request.user.first_name or request.user.email}',
-                        notification_type='success',
-                        category='COMPLAINT_RESOLVED',
-                        complaint=complaint
-                    )
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to send resolution notifications: {e}")
+            for file in files:
+                try:
+                    # Validate file size
+                    if file.size > MAX_FILE_SIZE:
+                        logger.warning(f"File {file.name} exceeds 10MB limit ({file.size} bytes)")
+                        continue
+                    
+                    # Own savepoint: a failed file write must not roll back the resolution
+                    with transaction.atomic():
+                        Attachment.objects.create(
+                            complaint=complaint,
+                            file=file,
+                            original_filename=file.name,
+                            file_size=file.size,
+                            mime_type=file.content_type or 'application/octet-stream',
+                            attachment_type='RESOLUTION',
+                            uploaded_by=request.user
+                        )
+                except Exception as e:
+                    logger.error(f"Error creating resolution attachment: {e}")
         
         return Response({'message': 'Complaint resolved successfully'})
         
+    except transitions.TransitionError as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
     except Complaint.DoesNotExist:
         return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1192,62 +749,53 @@ def add_comment(request, pk):
         if not content:
             return Response({'error': 'Content is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        comment = Comment.objects.create(
-            complaint=complaint,
-            user=request.user,
-            content=content,
-            is_internal=is_internal
-        )
-        
-        Timeline.objects.create(
-            complaint=complaint,
-            action='COMMENTED',
-            description=f'Comment added by {request.user.email}',
-            performed_by=request.user
-        )
-        
-        # Send Firebase notifications to relevant parties
-        try:
-            from apps.notifications.firebase_service import send_notification_to_user
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                complaint=complaint,
+                user=request.user,
+                content=content,
+                is_internal=is_internal
+            )
             
-            # Notify customer if comment is from agent/admin
-            if request.user.role in ['AGENT', 'ADMIN'] and complaint.customer != request.user:
-                send_notification_to_user(
-                    user_id=str(complaint.customer.id),
-                    title=f'New Message on {complaint.complaint_number}',
-                    message=f'{request.user.first_name or request.user.email} replied to your complaint',
+            Timeline.objects.create(
+                complaint=complaint,
+                action='COMMENTED',
+                description=f'Comment added by {request.user.email}',
+                performed_by=request.user
+            )
+            
+            # Notify relevant parties (relayed from the outbox)
+            author = request.user.first_name or request.user.email
+            title = f'New Message on {complaint.complaint_number}'
+            enqueue(
+                # Customer, if the comment is from an agent/admin
+                push_event(
+                    [complaint.customer_id], exclude=[request.user],
+                    title=title,
+                    message=f'{author} replied to your complaint',
                     notification_type='info',
                     category='COMMENT_ADDED',
                     complaint=complaint
-                )
-            
-            # Notify assigned agent if comment is from customer/admin
-            if complaint.assigned_to and complaint.assigned_to != request.user:
-                send_notification_to_user(
-                    user_id=str(complaint.assigned_to.id),
-                    title=f'New Message on {complaint.complaint_number}',
-                    message=f'{request.user.first_name or request.user.email} added a comment',
+                ) if request.user.role in ['AGENT', 'ADMIN'] else None,
+                # Assigned agent, if the comment is from the customer/admin
+                push_event(
+                    [complaint.assigned_to_id], exclude=[request.user],
+                    title=title,
+                    message=f'{author} added a comment',
                     notification_type='info',
                     category='COMMENT_ADDED',
                     complaint=complaint
-                )
-            
-            # Notify admin if comment is from customer/agent (for non-internal comments)
-            if not is_internal and request.user.role != 'ADMIN':
-                from apps.users.models import User
-                admins = User.objects.filter(role='ADMIN', is_active=True)
-                for admin in admins:
-                    if admin != request.user:
-                        send_notification_to_user(
-                            user_id=str(admin.id),
-                            title=f'New Comment on {complaint.complaint_number}',
-                            message=f'{request.user.first_name or request.user.email} commented on complaint',
-                            notification_type='info',
-                            category='COMMENT_ADDED',
-                            complaint=complaint
-                        )
-        except Exception as e:
-            logger.error(f"Failed to send comment notifications: {e}")
+                ),
+                # Admins, for non-internal comments from customers/agents
+                push_event(
+                    admins=True, exclude=[request.user],
+                    title=f'New Comment on {complaint.complaint_number}',
+                    message=f'{author} commented on complaint',
+                    notification_type='info',
+                    category='COMMENT_ADDED',
+                    complaint=complaint
+                ) if not is_internal and request.user.role != 'ADMIN' else None,
+            )
         
         serializer = CommentSerializer(comment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -1264,12 +812,36 @@ def get_comments(request, pk):
         if not IsComplaintOwnerOrAgent().has_object_permission(request, None, complaint):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        comments = complaint.comments.all()
+        # Not complaint.comments: a related manager reads complaint_id on every row, which narrow() may defer
+        comments = Comment.objects.filter(complaint=complaint).select_related('user')
         if request.user.role == 'CUSTOMER':
             comments = comments.filter(is_internal=False)
         
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        fieldset = fieldset_kwargs(request)
+        comments = narrow(comments, CommentSerializer(**fieldset), extra=('created_at',))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(comments, request)
+        serializer = CommentSerializer(page, many=True, context={'request': request}, **fieldset)
+        return paginator.get_paginated_response(serializer.data)
+        
+    except Complaint.DoesNotExist:
+        return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_timeline(request, pk):
+    try:
+        complaint = Complaint.objects.get(pk=pk)
+        
+        if not IsComplaintOwnerOrAgent().has_object_permission(request, None, complaint):
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        fieldset = fieldset_kwargs(request)
+        timeline = narrow(Timeline.objects.filter(complaint=complaint).select_related('performed_by'), TimelineSerializer(**fieldset), extra=('created_at',))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(timeline, request)
+        serializer = TimelineSerializer(page, many=True, context={'request': request}, **fieldset)
+        return paginator.get_paginated_response(serializer.data)
         
     except Complaint.DoesNotExist:
         return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -1292,56 +864,40 @@ def add_feedback(request, pk):
         
         serializer = FeedbackSerializer(data=request.data)
         if serializer.is_valid():
-            feedback = serializer.save(complaint=complaint)
-            
-            # Calculate average agent rating from sub-ratings
-            ratings = []
-            if feedback.agent_professionalism_rating:
-                ratings.append(feedback.agent_professionalism_rating)
-            if feedback.resolution_speed_rating:
-                ratings.append(feedback.resolution_speed_rating)
-            if ratings:
-                feedback.agent_rating = round(sum(ratings) / len(ratings))
-                feedback.save()
-            
-            Timeline.objects.create(
-                complaint=complaint,
-                action='FEEDBACK_ADDED',
-                description=f'Feedback added: Overall {feedback.rating}/5, Agent Professionalism {feedback.agent_professionalism_rating or "N/A"}/5, Resolution Speed {feedback.resolution_speed_rating or "N/A"}/5',
-                performed_by=request.user
-            )
+            # Average agent rating from sub-ratings, worked out before the single insert
+            data = serializer.validated_data
+            ratings = [r for r in (data.get('agent_professionalism_rating'), data.get('resolution_speed_rating')) if r]
+            extra = {'agent_rating': round(sum(ratings) / len(ratings))} if ratings else {}
             
-            # Send Firebase notifications to agent and admins
-            try:
-                from apps.notifications.firebase_service import send_notification_to_user
-                from apps.users.models import User
+            with transaction.atomic():
+                feedback = serializer.save(complaint=complaint, **extra)
+                
+                Timeline.objects.create(
+                    complaint=complaint,
+                    action='FEEDBACK_ADDED',
+                    description=f'Feedback added: Overall {feedback.rating}/5, Agent Professionalism {feedback.agent_professionalism_rating or "N/A"}/5, Resolution Speed {feedback.resolution_speed_rating or "N/A"}/5',
+                    performed_by=request.user
+                )
                 
-                # Notify assigned agent about feedback
-                if complaint.assigned_to:
-                    send_notification_to_user(
-                        user_id=str(complaint.assigned_to.id),
+                # Notify the assigned agent and admins (relayed from the outbox)
+                enqueue(
+                    push_event(
+                        [complaint.assigned_to_id],
                         title=f'New Feedback on {complaint.complaint_number}',
                         message=f'Customer rated {feedback.rating}/5 stars for your resolution',
                         notification_type='success' if feedback.rating >= 4 else 'warning',
                         category='FEEDBACK_RECEIVED',
                         complaint=complaint
-                    )
-                
-                # Notify all admins about feedback
-                admins = User.objects.filter(role='ADMIN', is_active=True)
-                for admin in admins:
-                    send_notification_to_user(
-                        user_id=str(admin.id),
+                    ),
+                    push_event(
+                        admins=True,
                         title=f'Feedback Received on {complaint.complaint_number}',
                         message=f'Customer gave {feedback.rating}/5 stars',
                         notification_type='info',
                         category='FEEDBACK_RECEIVED',
                         complaint=complaint
-                    )
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to send feedback notifications: {e}")
+                    ),
+                )
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -1357,103 +913,18 @@ def reopen_complaint(request, pk):
         complaint = Complaint.objects.get(pk=pk)
         
         # Check if customer owns the complaint
-        if complaint.customer != request.user and request.user.role not in ['ADMIN', 'AGENT']:
+        if complaint.customer_id != request.user.pk and request.user.role not in ['ADMIN', 'AGENT']:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        # Check if complaint can be reopened
-        if not complaint.can_reopen:
-            return Response({'error': 'This complaint cannot be reopened'}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check if within reopen window (30 days by default)
-        if complaint.resolved_at:
-            days_since_resolution = (timezone.now() - complaint.resolved_at).days
-            if days_since_resolution > complaint.reopen_window_days:
-                return Response({
-                    'error': f'Reopen window expired. Complaints can only be reopened within {complaint.reopen_window_days} days of resolution.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check if complaint is in a state that can be reopened
-        if complaint.status not in ['RESOLVED', 'CLOSED']:
-            return Response({'error': 'Only resolved or closed complaints can be reopened'}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-        
-        reason = request.data.get('reason', '')
-        
-        # Reopen the complaint
-        complaint.status = 'REOPENED'
-        complaint.resolved_at = None
-        complaint.closed_at = None
-        complaint.save()
-        
-        # Update agent workload if assigned
-        if complaint.assigned_to:
-            agent = complaint.assigned_to
-            agent.current_active_cases += 1
-            agent.total_resolved_cases = max(0, agent.total_resolved_cases - 1)
-            agent.save(update_fields=['current_active_cases', 'total_resolved_cases'])
-        
-        Timeline.objects.create(
-            complaint=complaint,
-            action='REOPENED',
-            description=f'Complaint reopened by {request.user.email}. Reason: {reason or "Not provided"}',
-            performed_by=request.user,
-            metadata={'reason': reason}
-        )
-        
-        
-        # Send notifications
-        try:
-            send_status_changed_email(complaint, 'RESOLVED')
-            
-            # Also send Firebase notifications
-            from apps.notifications.firebase_service import send_notification_to_user
-            from apps.users.models import User
-            
-            # Notify customer (if not the one who reopened)
-            if complaint.customer != request.user:
-                send_notification_to_user(
-                    user_id=str(complaint.customer.id),
-                    title=f'Complaint {complaint.complaint_number} Reopened',
-                    message=f'Your complaint has been reopened and will be reviewed again',
-                    notification_type='info',
-                    category='COMPLAINT_REOPENED',
-                    complaint=complaint
-                )
-            
-            # Notify assigned agent
-            if complaint.assigned_to:
-                send_notification_to_user(
-                    user_id=str(complaint.assigned_to.id),
-                    title=f'Complaint {complaint.complaint_number} Reopened',
-                    message=f'A resolved complaint has been reopened. Please review.',
-                    notification_type='warning',
-                    category='COMPLAINT_REOPENED',
-                    complaint=complaint
-                )
-            
-            # Notify all admins
-            admins = User.objects.filter(role='ADMIN', is_active=True)
-            for admin in admins:
-                if admin != request.user:
-                    send_notification_to_user(
-                        user_id=str(admin.id),
-                        title=f'Complaint {complaint.complaint_number} Reopened',
-                        message=f'Reopened by {request.user.first_name or request.user.email}',
-                        notification_type='warning',
-                        category='COMPLAINT_REOPENED',
-                        complaint=complaint
-                    )
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to send reopen notifications: {e}")
+        transitions.reopen(complaint, request.user, request.data.get('reason', ''))
         
         return Response({
             'message': 'Complaint reopened successfully',
             'complaint': ComplaintSerializer(complaint).data
         })
         
+    except transitions.TransitionError as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
     except Complaint.DoesNotExist:
         return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1512,38 +983,45 @@ def create_from_template(request):
         
         serializer = ComplaintSerializer(data=complaint_data, context={'request': request})
         if serializer.is_valid():
-            complaint = serializer.save()
-            complaint.template_used = template
-            complaint.save()
+            complaint_number = next_complaint_number()  # outside the transaction, see perform_create
+            with transaction.atomic():
+                complaint = serializer.save(complaint_number=complaint_number)
+                complaint.template_used = template
+                complaint.save()
             
-            # Increment template usage
-            template.usage_count += 1
-            template.save()
+                # Increment template usage
+                template.usage_count += 1
+                template.save()
             
-            # Handle file attachments
-            files = request.FILES.getlist('attachments')
-            for file in files:
-                Attachment.objects.create(
-                    complaint=complaint,
-                    file=file,
-                    original_filename=file.name,
-                    file_size=file.size,
-                    mime_type=file.content_type,
-                    uploaded_by=request.user
-                )
+                # Handle file attachments
+                files = request.FILES.getlist('attachments')
+                for file in files:
+                    try:
+                        # Own savepoint: a failed file write must not roll back the complaint
+                        with transaction.atomic():
+                            Attachment.objects.create(
+                                complaint=complaint,
+                                file=file,
+                                original_filename=file.name,
+                                file_size=file.size,
+                                mime_type=file.content_type,
+                                uploaded_by=request.user
+                            )
+                    except Exception as e:
+                        logger.error(f"Failed to save attachment {file.name}: {e}")
             
-            # Auto-triage
-            list_view = ComplaintListCreateView()
-            list_view.auto_triage_complaint(complaint)
+                # Auto-triage
+                list_view = ComplaintListCreateView()
+                list_view.auto_triage_complaint(complaint)
             
-            Timeline.objects.create(
-                complaint=complaint,
-                action='CREATED',
-                description=f'Complaint created from template: {template.name}',
-                performed_by=request.user
-            )
+                Timeline.objects.create(
+                    complaint=complaint,
+                    action='CREATED',
+                    description=f'Complaint created from template: {template.name}',
+                    performed_by=request.user
+                )
             
-            send_complaint_created_email(complaint)
+                enqueue(email_event('complaint_created', complaint))
             
             return Response(ComplaintSerializer(complaint).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
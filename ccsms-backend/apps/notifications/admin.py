@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, NotificationPreference
+from .models import Notification, NotificationPreference, OutboxEvent
 from .fcm_models import FCMToken
 
 @admin.register(Notification)
@@ -20,4 +20,11 @@ class FCMTokenAdmin(admin.ModelAdmin):
     list_filter = ['device_type', 'is_active', 'created_at']
     search_fields = ['user__email', 'token', 'device_name']
     readonly_fields = ['id', 'created_at', 'updated_at', 'last_used']
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    date_hierarchy = 'created_at'
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'status', 'attempts', 'created_at', 'available_at', 'dispatched_at']
+    list_filter = ['event_type', 'status']
+    readonly_fields = ['id', 'created_at', 'dispatched_at']
+    date_hierarchy = 'created_at'
@@ -238,3 +238,53 @@ def send_notification_to_user(user_id, title, message, notification_type='info',
         logger.error(f"Error sending notification to user: {e}")
         return False
 
+
+
+def send_notifications_to_users(notifications):
+    """
+    Send many notifications at once: one bulk insert for the in-app records,
+    one query for the FCM tokens, then one multicast per recipient.
+    Database errors propagate so the outbox relay can retry.
+    
+    Args:
+        notifications: List of dicts with user_id, title, message and optionally
+            notification_type, category, complaint and metadata
+    """
+    from .models import Notification
+    from .fcm_models import FCMToken
+    
+    if not notifications:
+        return 0
+    
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=item['user_id'],
+            notification_type='PUSH',
+            category=item.get('category', 'SYSTEM'),
+            title=item['title'],
+            message=item['message'],
+            complaint=item.get('complaint'),
+            metadata={'type': item.get('notification_type', 'info'), **item.get('metadata', {})}
+        )
+        for item in notifications
+    ])
+    
+    tokens = {}
+    user_ids = {item['user_id'] for item in notifications}
+    for user_id, token in FCMToken.objects.filter(user_id__in=user_ids, is_active=True).values_list('user_id', 'token'):
+        tokens.setdefault(str(user_id), []).append(token)
+    
+    for item in notifications:
+        fcm_tokens = tokens.get(str(item['user_id']))
+        if not fcm_tokens:
+            continue
+        data = {
+            'type': item.get('notification_type', 'info'),
+            'user_id': str(item['user_id']),
+            'category': item.get('category', 'SYSTEM'),
+        }
+        if item.get('complaint'):
+            data['complaint_id'] = str(item['complaint'].id)
+        send_multicast_notification(fcm_tokens, item['title'], item['message'], data)
+    
+    return len(notifications)
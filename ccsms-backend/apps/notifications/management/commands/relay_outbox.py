@@ -0,0 +1,27 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.notifications.outbox import relay_outbox
+
+
+class Command(BaseCommand):
+    help = 'Dispatch pending outbox events (notifications/emails); use --loop to run as a worker without Celery beat'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            claimed = relay_outbox(batch_size)
+            total += claimed
+            if claimed:
+                self.stdout.write(f'Relayed {claimed} events')
+            if claimed < batch_size:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} events relayed'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_fcmtoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-sent_at'], name='notif_user_sent_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.9 on 2026-10-17 03:52
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('PUSH', 'Push / In-App Notification'), ('MODULE_EMAIL', 'Module Notification Email'), ('EMAIL', 'Email')], max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DISPATCHED', 'Dispatched'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not dispatched before this time (retry backoff)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['available_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDING')), fields=['available_at'], name='outbox_pending_idx'), models.Index(fields=['status', 'dispatched_at'], name='outbox_status_dispatched_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='event_type',
+            field=models.CharField(choices=[('PUSH', 'Push / In-App Notification'), ('MODULE_EMAIL', 'Module Notification Email'), ('EMAIL', 'Email'), ('CHANNEL', 'Channels Group Message')], max_length=20),
+        ),
+    ]
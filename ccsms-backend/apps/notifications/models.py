@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Import FCM Token model
 from .fcm_models import FCMToken
@@ -75,6 +76,7 @@ class Notification(models.Model):
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['category', 'sent_at']),
             models.Index(fields=['module', 'user']),
+            models.Index(fields=['user', '-sent_at'], name='notif_user_sent_idx'),
         ]
     
     def __str__(self):
@@ -125,4 +127,41 @@ class NotificationPreference(models.Model):
             'ASSIGNMENT_REQUEST': self.email_assignment_request,
             'SLA_BREACH': self.email_sla_breach,
         }
-        return category_map.get(category, True)
\ No newline at end of file
+        return category_map.get(category, True)
+
+class OutboxEvent(models.Model):
+    """Side effect (push notification, email, websocket message) recorded in the same transaction as the change that caused it"""
+    EVENT_TYPE_CHOICES = [
+        ('PUSH', 'Push / In-App Notification'),
+        ('MODULE_EMAIL', 'Module Notification Email'),
+        ('EMAIL', 'Email'),
+        ('CHANNEL', 'Channels Group Message'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('DISPATCHED', 'Dispatched'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not dispatched before this time (retry backoff)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['available_at']
+        indexes = [
+            # Relay: next pending batch
+            models.Index(fields=['available_at'], name='outbox_pending_idx', condition=models.Q(status='PENDING')),
+            # Purge of old dispatched events
+            models.Index(fields=['status', 'dispatched_at'], name='outbox_status_dispatched_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} ({self.status})"
@@ -0,0 +1,263 @@
+"""
+Transactional outbox for notification side effects.
+
+Write endpoints build events with push_event/module_email_event/email_event/
+channel_event and store them with enqueue() inside the transaction that changes the
+complaint, so an event exists if and only if the change committed and the
+request path never talks to FCM, Firestore, SMTP or the channel layer.
+
+relay_outbox() claims pending events in batches (SELECT ... FOR UPDATE SKIP
+LOCKED, so several relays can run side by side), dispatches them grouped by
+type and retries failures with exponential backoff. It is run by the
+relay_outbox_events Celery task every few seconds, or by the relay_outbox
+management command. Delivery is at-least-once.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def _user_ids(users):
+    return [str(getattr(user, 'pk', user)) for user in users if user]
+
+
+def push_event(users=(), *, title, message, notification_type='info', category='SYSTEM',
+               complaint=None, admins=False, exclude=(), metadata=None):
+    """In-app + FCM notification for `users` (and all active admins if `admins`), minus `exclude`"""
+    if not admins and not _user_ids(users):
+        return None
+    return OutboxEvent(event_type='PUSH', payload={
+        'user_ids': _user_ids(users),
+        'admins': admins,
+        'exclude': _user_ids(exclude),
+        'title': title,
+        'message': message,
+        'notification_type': notification_type,
+        'category': category,
+        'complaint_id': str(complaint.pk) if complaint else None,
+        'metadata': metadata or {},
+    })
+
+
+def module_email_event(category, complaint=None, users=(), admins=False, extra_context=None):
+    """email_service.send_module_notification for `users` (and all active admins if `admins`)"""
+    if not admins and not _user_ids(users):
+        return None
+    return OutboxEvent(event_type='MODULE_EMAIL', payload={
+        'user_ids': _user_ids(users),
+        'admins': admins,
+        'category': category,
+        'complaint_id': str(complaint.pk) if complaint else None,
+        'extra_context': extra_context or {},
+    })
+
+
+def email_event(kind, complaint, **kwargs):
+    """One of the utils.email_service complaint emails, see EMAIL_SENDERS"""
+    return OutboxEvent(event_type='EMAIL', payload={'kind': kind, 'complaint_id': str(complaint.pk), **kwargs})
+
+
+def channel_event(group, message_type, data):
+    """Channels group message, e.g. for the admin/agent websocket consumers"""
+    return OutboxEvent(event_type='CHANNEL', payload={'group': group, 'type': message_type, 'data': data})
+
+
+def enqueue(*events):
+    """Store events in the current transaction (one INSERT)"""
+    events = [event for event in events if event is not None]
+    if events:
+        OutboxEvent.objects.bulk_create(events)
+    return events
+
+
+def handler(event_type):
+    def register(func):
+        HANDLERS[event_type] = func
+        return func
+    return register
+
+
+def relay_outbox(batch_size=None):
+    """Dispatch one batch of due events; returns how many were claimed"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Foreign keys are checked per statement, so a poison event fails inside its group's savepoint
+            # (and is retried with backoff) instead of at COMMIT, which would roll back the whole batch
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now)
+            .order_by('available_at')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        groups = defaultdict(list)
+        for event in events:
+            groups[event.event_type].append(event)
+
+        for event_type, group in groups.items():
+            try:
+                # Handlers get the whole group and return {event pk: error} for events that failed on their own;
+                # the savepoint keeps a database error in one group from aborting the batch
+                with transaction.atomic():
+                    failures = HANDLERS[event_type](group) or {}
+            except Exception as e:
+                logger.error(f"Outbox {event_type} dispatch failed for {len(group)} events: {e}")
+                failures = {event.pk: e for event in group}
+            for event in group:
+                if event.pk in failures:
+                    _mark_failed(event, failures[event.pk], now)
+                else:
+                    event.status = 'DISPATCHED'
+                    event.dispatched_at = now
+                    event.attempts += 1
+
+        OutboxEvent.objects.bulk_update(events, ['status', 'attempts', 'last_error', 'available_at', 'dispatched_at'])
+    return len(events)
+
+
+def _mark_failed(event, error, now):
+    event.attempts += 1
+    event.last_error = str(error)
+    if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        event.status = 'FAILED'
+    else:
+        event.available_at = now + timedelta(seconds=30 * 2 ** (event.attempts - 1))
+
+
+def purge_outbox(days=None):
+    """Delete dispatched events older than OUTBOX_RETENTION_DAYS"""
+    days = settings.OUTBOX_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.filter(status='DISPATCHED', dispatched_at__lt=cutoff).delete()
+    return deleted
+
+
+def _load_context(events):
+    """Recipients (those that still exist) and complaints for a group of events, in one query each"""
+    from apps.complaints.models import Complaint
+    from apps.users.models import User
+
+    admin_ids = []
+    if any(event.payload.get('admins') for event in events):
+        admin_ids = [str(pk) for pk in User.objects.filter(role='ADMIN', is_active=True).values_list('id', flat=True)]
+
+    complaint_ids = {event.payload['complaint_id'] for event in events if event.payload.get('complaint_id')}
+    complaints = {
+        str(pk): complaint
+        for pk, complaint in Complaint.objects.select_related('customer', 'assigned_to').in_bulk(complaint_ids).items()
+    }
+
+    # Recipients deleted since the event was enqueued are dropped (their notifications would violate the FK)
+    named = {user_id for event in events for user_id in event.payload.get('user_ids', [])}
+    existing = {str(pk) for pk in User.objects.filter(pk__in=named).values_list('id', flat=True)} if named else set()
+
+    recipients = {}
+    for event in events:
+        user_ids = [user_id for user_id in event.payload.get('user_ids', []) if user_id in existing]
+        if event.payload.get('admins'):
+            user_ids += admin_ids
+        exclude = set(event.payload.get('exclude', []))
+        recipients[event.pk] = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in exclude]
+    return recipients, complaints
+
+
+@handler('PUSH')
+def dispatch_push(events):
+    from .firebase_service import send_notifications_to_users
+
+    recipients, complaints = _load_context(events)
+    notifications = []
+    for event in events:
+        payload = event.payload
+        for user_id in recipients[event.pk]:
+            notifications.append({
+                'user_id': user_id,
+                'title': payload['title'],
+                'message': payload['message'],
+                'notification_type': payload.get('notification_type', 'info'),
+                'category': payload.get('category', 'SYSTEM'),
+                'complaint': complaints.get(payload.get('complaint_id')),
+                'metadata': payload.get('metadata') or {},
+            })
+    send_notifications_to_users(notifications)
+
+
+@handler('MODULE_EMAIL')
+def dispatch_module_email(events):
+    from apps.users.models import User
+    from .email_service import send_module_notification
+
+    recipients, complaints = _load_context(events)
+    users = User.objects.in_bulk({user_id for ids in recipients.values() for user_id in ids})
+    users = {str(pk): user for pk, user in users.items()}
+    failures = {}
+    for event in events:
+        payload = event.payload
+        complaint = complaints.get(payload.get('complaint_id'))
+        try:
+            for user_id in recipients[event.pk]:
+                if user_id in users:
+                    send_module_notification(users[user_id], payload['category'], complaint, payload.get('extra_context') or None)
+        except Exception as e:
+            failures[event.pk] = e
+    return failures
+
+
+def _send_status_changed(complaint, payload):
+    from utils.email_service import send_status_changed_email
+    send_status_changed_email(complaint, payload['old_status'])
+
+
+def _send_complaint_created(complaint, payload):
+    from utils.email_service import send_complaint_created_email
+    send_complaint_created_email(complaint)
+
+
+EMAIL_SENDERS = {
+    'status_changed': _send_status_changed,
+    'complaint_created': _send_complaint_created,
+}
+
+
+@handler('EMAIL')
+def dispatch_email(events):
+    _, complaints = _load_context(events)
+    failures = {}
+    for event in events:
+        complaint = complaints.get(event.payload['complaint_id'])
+        if not complaint:
+            continue
+        try:
+            EMAIL_SENDERS[event.payload['kind']](complaint, event.payload)
+        except Exception as e:
+            failures[event.pk] = e
+    return failures
+
+
+@handler('CHANNEL')
+def dispatch_channel(events):
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    failures = {}
+    for event in events:
+        payload = event.payload
+        try:
+            async_to_sync(channel_layer.group_send)(payload['group'], {'type': payload['type'], 'data': payload['data']})
+        except Exception as e:
+            failures[event.pk] = e
+    return failures
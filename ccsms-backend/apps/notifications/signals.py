@@ -3,9 +3,8 @@ from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from apps.complaints.models import Complaint, Comment, AssignmentRequest
-from .email_service import send_module_notification, notify_admins
 from .models import NotificationPreference
-from .firebase_service import send_notification_to_user
+from .outbox import enqueue, module_email_event, push_event
 
 User = get_user_model()
 
@@ -13,86 +12,98 @@ User = get_user_model()
 def complaint_pre_save(sender, instance, **kwargs):
     if instance.pk:
         # Store old status for post_save comparison
-        try:
-            instance._old_status = Complaint.objects.get(pk=instance.pk).status
-            instance._old_assigned_to = Complaint.objects.get(pk=instance.pk).assigned_to_id
-        except Complaint.DoesNotExist:
-            instance._old_status = None
-            instance._old_assigned_to = None
+        old = Complaint.objects.filter(pk=instance.pk).values('status', 'assigned_to_id').first()
+        instance._old_status = old['status'] if old else None
+        instance._old_assigned_to = old['assigned_to_id'] if old else None
     else:
         instance._old_status = None
         instance._old_assigned_to = None
 
+def complaint_change_events(instance, old_status, old_assigned_to):
+    """
+    Outbox events for a status/assignee change of an existing complaint. Also
+    used by apps.complaints.transitions, whose QuerySet.update() sends no post_save.
+    """
+    events = []
+    # Handle assignment changes
+    if old_assigned_to != instance.assigned_to_id and instance.assigned_to_id:
+        # Notify the newly assigned agent
+        events.append(push_event(
+            [instance.assigned_to_id],
+            title='New Assignment',
+            message=f'You have been assigned complaint #{instance.id}',
+            notification_type='info',
+            category='COMPLAINT_ASSIGNED',
+            complaint=instance
+        ))
+    
+    # Handle status changes
+    if old_status and old_status != instance.status:
+        if instance.status == 'RESOLVED':
+            events.append(module_email_event('COMPLAINT_RESOLVED', instance, users=[instance.customer_id], extra_context={
+                'resolution_notes': instance.resolution_notes or "Resolved by agent",
+                'reopen_window_days': instance.reopen_window_days
+            }))
+            events.append(push_event(
+                [instance.customer_id],
+                title='Complaint Resolved',
+                message=f'Your complaint #{instance.id} has been resolved.',
+                notification_type='success',
+                category='COMPLAINT_RESOLVED',
+                complaint=instance
+            ))
+        else:
+            events.append(module_email_event('COMPLAINT_STATUS_CHANGED', instance, users=[instance.customer_id]))
+            events.append(push_event(
+                [instance.customer_id],
+                title='Status Updated',
+                message=f'Complaint #{instance.id} status changed to {instance.get_status_display()}',
+                notification_type='info',
+                category='COMPLAINT_STATUS_CHANGED',
+                complaint=instance
+            ))
+        
+        # If assigned to an agent, notify them too
+        if instance.assigned_to_id:
+            events.append(module_email_event('COMPLAINT_STATUS_CHANGED', instance, users=[instance.assigned_to_id]))
+            events.append(push_event(
+                [instance.assigned_to_id],
+                title='Complaint Status Changed',
+                message=f'Complaint #{instance.id} status changed to {instance.get_status_display()}',
+                notification_type='info',
+                category='COMPLAINT_STATUS_CHANGED',
+                complaint=instance
+            ))
+    return events
+
+
 @receiver(post_save, sender=Complaint)
 def complaint_post_save(sender, instance, created, **kwargs):
     # Check if email notifications are enabled
     if not getattr(settings, 'ENABLE_EMAIL_NOTIFICATIONS', False):
         return
     
+    # Side effects go through the outbox, in the transaction that saved the complaint
     if created:
-        # 1. Notify Customer that complaint is registered
-        send_module_notification(instance.customer, 'COMPLAINT_CREATED', instance)
-        send_notification_to_user(
-            instance.customer.id,
-            'Complaint Registered',
-            f'Your complaint #{instance.id} has been registered successfully.',
-            'success'
+        enqueue(
+            # 1. Notify Customer that complaint is registered
+            module_email_event('COMPLAINT_CREATED', instance, users=[instance.customer_id]),
+            push_event(
+                [instance.customer_id],
+                title='Complaint Registered',
+                message=f'Your complaint #{instance.id} has been registered successfully.',
+                notification_type='success'
+            ),
+            # 2. Notify Admins about new complaint
+            module_email_event('COMPLAINT_CREATED', instance, admins=True),
         )
-        
-        # 2. Notify Admins about new complaint
-        notify_admins('COMPLAINT_CREATED', instance)
-    else:
-        # Handle assignment changes
-        old_assigned_to = getattr(instance, '_old_assigned_to', None)
-        if old_assigned_to != instance.assigned_to_id and instance.assigned_to:
-            # Notify the newly assigned agent
-            send_notification_to_user(
-                instance.assigned_to.id,
-                'New Assignment',
-                f'You have been assigned complaint #{instance.id}',
-                'info',
-                category='COMPLAINT_ASSIGNED',
-                complaint=instance
-            )
-        
-        # Handle status changes
-        old_status = getattr(instance, '_old_status', None)
-        if old_status and old_status != instance.status:
-            if instance.status == 'RESOLVED':
-                send_module_notification(instance.customer, 'COMPLAINT_RESOLVED', instance, {
-                    'resolution_notes': instance.resolution_notes or "Resolved by agent",
-                    'reopen_window_days': instance.reopen_window_days
-                })
-                send_notification_to_user(
-                    instance.customer.id,
-                    'Complaint Resolved',
-                    f'Your complaint #{instance.id} has been resolved.',
-                    'success',
-                    category='COMPLAINT_RESOLVED',
-                    complaint=instance
-                )
-            else:
-                send_module_notification(instance.customer, 'COMPLAINT_STATUS_CHANGED', instance)
-                send_notification_to_user(
-                    instance.customer.id,
-                    'Status Updated',
-                    f'Complaint #{instance.id} status changed to {instance.get_status_display()}',
-                    'info',
-                    category='COMPLAINT_STATUS_CHANGED',
-                    complaint=instance
-                )
-            
-            # If assigned to an agent, notify them too
-            if instance.assigned_to:
-                send_module_notification(instance.assigned_to, 'COMPLAINT_STATUS_CHANGED', instance)
-                send_notification_to_user(
-                    instance.assigned_to.id,
-                    'Complaint Status Changed',
-                    f'Complaint #{instance.id} status changed to {instance.get_status_display()}',
-                    'info',
-                    category='COMPLAINT_STATUS_CHANGED',
-                    complaint=instance
-                )
+        return
+    
+    enqueue(*complaint_change_events(
+        instance,
+        getattr(instance, '_old_status', None),
+        getattr(instance, '_old_assigned_to', None)
+    ))
 
 
 @receiver(post_save, sender=Comment)
@@ -106,28 +117,32 @@ def comment_post_save(sender, instance, created, **kwargs):
         # Notify the other party
         if instance.user.role == 'CUSTOMER':
             # Notify Assigned Agent if exists, otherwise Notify Admin
-            if complaint.assigned_to:
-                send_module_notification(complaint.assigned_to, 'COMMENT_ADDED', complaint)
-                send_notification_to_user(
-                    complaint.assigned_to.id,
-                    'New Comment',
-                    f'New comment on complaint #{complaint.id}',
-                    'info',
-                    category='COMMENT_ADDED',
-                    complaint=complaint
+            if complaint.assigned_to_id:
+                enqueue(
+                    module_email_event('COMMENT_ADDED', complaint, users=[complaint.assigned_to_id]),
+                    push_event(
+                        [complaint.assigned_to_id],
+                        title='New Comment',
+                        message=f'New comment on complaint #{complaint.id}',
+                        notification_type='info',
+                        category='COMMENT_ADDED',
+                        complaint=complaint
+                    ),
                 )
             else:
-                notify_admins('COMMENT_ADDED', complaint)
+                enqueue(module_email_event('COMMENT_ADDED', complaint, admins=True))
         else:
             # Notify Customer
-            send_module_notification(complaint.customer, 'COMMENT_ADDED', complaint)
-            send_notification_to_user(
-                complaint.customer.id,
-                'New Comment',
-                f'New comment on your complaint #{complaint.id}',
-                'info',
-                category='COMMENT_ADDED',
-                complaint=complaint
+            enqueue(
+                module_email_event('COMMENT_ADDED', complaint, users=[complaint.customer_id]),
+                push_event(
+                    [complaint.customer_id],
+                    title='New Comment',
+                    message=f'New comment on your complaint #{complaint.id}',
+                    notification_type='info',
+                    category='COMMENT_ADDED',
+                    complaint=complaint
+                ),
             )
 
 
@@ -158,19 +173,20 @@ def assignment_request_post_save(sender, instance, created, **kwargs):
     
     if created:
         # Notify Admin that an agent wants to pick this up
-        notify_admins('ASSIGNMENT_REQUEST', instance.complaint, {
+        enqueue(module_email_event('ASSIGNMENT_REQUEST', instance.complaint, admins=True, extra_context={
             'agent_name': f"{instance.requested_by.first_name} {instance.requested_by.last_name}",
             'request_message': instance.message
-        })
+        }))
     elif instance.status == 'APPROVED':
         # Notify Agent that request was approved
-        send_module_notification(instance.requested_by, 'COMPLAINT_ASSIGNED', instance.complaint)
-        send_notification_to_user(
-            instance.requested_by.id,
-            'Assignment Approved',
-            f'Your request for complaint #{instance.complaint.id} has been approved',
-            'success',
-            category='ASSIGNMENT_APPROVED',
-            complaint=instance.complaint
+        enqueue(
+            module_email_event('COMPLAINT_ASSIGNED', instance.complaint, users=[instance.requested_by_id]),
+            push_event(
+                [instance.requested_by_id],
+                title='Assignment Approved',
+                message=f'Your request for complaint #{instance.complaint_id} has been approved',
+                notification_type='success',
+                category='ASSIGNMENT_APPROVED',
+                complaint=instance.complaint
+            ),
         )
-
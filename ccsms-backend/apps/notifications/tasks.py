@@ -72,4 +72,23 @@ def send_bulk_notifications(user_ids, category, title, message, complaint_id=Non
             complaint_id=complaint_id
         )
     
-    return f"Queued {len(user_ids)} notifications"
\ No newline at end of file
+    return f"Queued {len(user_ids)} notifications"
+
+@shared_task
+def relay_outbox_events(max_batches=50):
+    """Dispatch pending outbox events until the outbox is drained (or max_batches is reached)"""
+    from .outbox import relay_outbox
+    
+    relayed = 0
+    for _ in range(max_batches):
+        claimed = relay_outbox()
+        relayed += claimed
+        if claimed < settings.OUTBOX_BATCH_SIZE:
+            break
+    return f"Relayed {relayed} outbox events"
+
+
+@shared_task
+def purge_outbox_events():
+    from .outbox import purge_outbox
+    return f"Purged {purge_outbox()} dispatched outbox events"
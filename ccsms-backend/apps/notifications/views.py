@@ -7,15 +7,22 @@ from django.utils import timezone
 from .models import Notification
 from .fcm_models import FCMToken
 from .serializers import NotificationSerializer
+from utils.conditional import ConditionalGetMixin, page_validator
+from utils.pagination import SentAtKeysetPagination
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SentAtKeysetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['is_read', 'notification_type']
     
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user)
+    
+    def get_validator(self):
+        # Notifications only change by being read
+        return page_validator(self, self.filter_queryset(self.get_queryset()), ('id', 'sent_at', 'is_read', 'read_at'))
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
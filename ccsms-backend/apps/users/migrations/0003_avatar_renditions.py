@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_agent_status_user_last_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_renditions',
+            field=models.JSONField(blank=True, default=dict, help_text='Thumbnail/preview names for the avatar (utils.thumbnails)'),
+        ),
+    ]
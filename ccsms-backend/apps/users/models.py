@@ -20,6 +20,7 @@ class User(AbstractUser):
     phone = models.CharField(max_length=15, blank=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='CUSTOMER')
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True, help_text="Thumbnail/preview names for the avatar (utils.thumbnails)")
     notification_preferences = models.JSONField(default=dict, blank=True)
     contact_preferences = models.JSONField(default=dict, blank=True)
     profile_visibility = models.CharField(max_length=20, choices=PROFILE_VISIBILITY_CHOICES, default='EVERYONE')
@@ -51,6 +52,12 @@ class User(AbstractUser):
     def is_available(self):
         return self.agent_status == 'AVAILABLE' and self.current_active_cases < 5  # Max 5 active cases
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Agents changed since a point in time (utils.agent_index)
+            models.Index(fields=['last_activity'], name='user_last_activity_idx'),
+        ]
+    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
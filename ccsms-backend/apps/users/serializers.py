@@ -1,6 +1,17 @@
+from django.urls import reverse
 from rest_framework import serializers
+from utils.thumbnails import has_renditions, schedule_renditions, version
 from .models import User
 
+
+def avatar_thumbnail_url(user, request=None, variant='thumbnail'):
+    """Avatar rendition URL, versioned so a new avatar is not served from cache"""
+    if not has_renditions(user.avatar, user.avatar_renditions):
+        return None
+    url = f"{reverse('avatar_rendition', args=[user.pk, variant])}?v={version(user.avatar)}"
+    return request.build_absolute_uri(url) if request else url
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -11,13 +22,26 @@ class UserSerializer(serializers.ModelSerializer):
                  'is_active', 'date_joined', 'last_login')
         read_only_fields = ('id', 'email', 'role', 'is_verified', 'date_joined', 'last_login')
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Compact user nested in complaint, comment and timeline responses (?expand= gives the full user)"""
+    avatar_thumbnail = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = User
+        fields = ('id', 'first_name', 'last_name', 'avatar_thumbnail')
+        field_sources = {'avatar_thumbnail': ('avatar', 'avatar_renditions')}
+    
+    def get_avatar_thumbnail(self, obj):
+        return avatar_thumbnail_url(obj, self.context.get('request'))
+
 class UserProfileSerializer(serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField()
+    avatar_thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = ('id', 'email', 'first_name', 'last_name', 'phone', 'role',
-                 'avatar', 'notification_preferences', 'contact_preferences', 
+                 'avatar', 'avatar_thumbnail', 'notification_preferences', 'contact_preferences', 
                  'profile_visibility', 'share_analytics',
                  'pincode', 'service_type', 'service_card_id', 'is_verified',
                  'date_joined', 'last_login')
@@ -31,17 +55,24 @@ class UserProfileSerializer(serializers.ModelSerializer):
             return obj.avatar.url
         return None
     
+    def get_avatar_thumbnail(self, obj):
+        return avatar_thumbnail_url(obj, self.context.get('request'))
+    
     def update(self, instance, validated_data):
         # Handle avatar upload
         avatar = self.context['request'].FILES.get('avatar')
         if avatar:
             instance.avatar = avatar
+            instance.avatar_renditions = {}
         
         # Update other fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
         instance.save()
+        if avatar:
+            from .tasks import generate_avatar_renditions
+            schedule_renditions(generate_avatar_renditions, str(instance.pk))
         return instance
 
 class AgentListSerializer(serializers.ModelSerializer):
@@ -57,32 +88,21 @@ class AgentListSerializer(serializers.ModelSerializer):
                  'current_active_cases', 'total_resolved_cases', 'is_busy', 'assigned_complaints')
         read_only_fields = ('id', 'first_name', 'last_name', 'email', 'is_verified')
     
+    # The counts, complaints and rejections are annotated and prefetched by AgentListView
     def get_current_active_cases(self, obj):
-        return obj.assigned_complaints.filter(status__in=['OPEN', 'IN_PROGRESS']).count()
+        return obj.active_case_count
     
     def get_total_resolved_cases(self, obj):
-        return obj.assigned_complaints.filter(status='RESOLVED').count()
+        return obj.resolved_case_count
     
     def get_assigned_complaints(self, obj):
-        complaints = obj.assigned_complaints.all().order_by('-created_at')
         return [{
             'id': str(c.id),
             'complaint_number': c.complaint_number,
             'title': c.title,
             'status': c.status,
-        } for c in complaints]
+        } for c in obj.assigned_complaint_list]
     
     def get_is_busy(self, obj):
         """Check if agent has rejected any assignment requests in the last 2 hours"""
-        from apps.complaints.models import AssignmentRequest
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        two_hours_ago = timezone.now() - timedelta(hours=2)
-        recent_rejections = AssignmentRequest.objects.filter(
-            requested_by=obj,
-            status='REJECTED',
-            reviewed_at__gte=two_hours_ago
-        ).exists()
-        
-        return recent_rejections
\ No newline at end of file
+        return obj.recently_rejected
\ No newline at end of file
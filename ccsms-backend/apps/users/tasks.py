@@ -0,0 +1,11 @@
+from celery import shared_task
+from utils.thumbnails import ensure_renditions
+from .models import User
+
+
+@shared_task
+def generate_avatar_renditions(user_id):
+    """Thumbnail and preview of a newly uploaded avatar"""
+    user = User.objects.filter(pk=user_id).only('id', 'avatar', 'avatar_renditions').first()
+    if user:
+        ensure_renditions(user, 'avatar', 'avatar_renditions')
@@ -5,6 +5,7 @@ urlpatterns = [
     path('me/', views.UserProfileView.as_view(), name='user_profile'),
     path('', views.UserListView.as_view(), name='user_list'),
     path('<uuid:pk>/', views.UserDetailView.as_view(), name='user_detail'),
+    path('<uuid:pk>/avatar/<str:variant>/', views.avatar_rendition, name='avatar_rendition'),
     path('<uuid:pk>/toggle-active/', views.toggle_user_active, name='toggle_user_active'),
     path('<uuid:pk>/verify-agent/', views.verify_agent, name='verify_agent'),
     path('agents/', views.AgentListView.as_view(), name='agent_list'),
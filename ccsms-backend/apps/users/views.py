@@ -4,17 +4,28 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
+from datetime import timedelta
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q
+from django.utils import timezone
+from apps.complaints.models import AssignmentRequest, Complaint
 from .models import User
 from .serializers import UserSerializer, UserProfileSerializer, AgentListSerializer
+from utils.conditional import ConditionalGetMixin
 from utils.permissions import IsAdmin
+from utils.thumbnails import VARIANTS, FAILED, ensure_renditions, serve_rendition
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
         return self.request.user
     
+    def get_validator(self):
+        # request.user was just loaded by authentication: no query needed
+        user = self.request.user
+        return [getattr(user, field.attname) for field in user._meta.concrete_fields if field.name != 'password']
+    
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -58,11 +69,23 @@ class AgentListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        # Show all active agents (registered agents)
+        # Show all active agents (registered agents), with the case counts and assigned
+        # complaints AgentListSerializer shows computed for the whole page at once
+        two_hours_ago = timezone.now() - timedelta(hours=2)
         return User.objects.filter(
             role='AGENT', 
             is_active=True
-        ).order_by('first_name', 'last_name')
+        ).annotate(
+            active_case_count=Count('assigned_complaints', filter=Q(assigned_complaints__status__in=['OPEN', 'IN_PROGRESS'])),
+            resolved_case_count=Count('assigned_complaints', filter=Q(assigned_complaints__status='RESOLVED')),
+            recently_rejected=Exists(AssignmentRequest.objects.filter(
+                requested_by=OuterRef('pk'), status='REJECTED', reviewed_at__gte=two_hours_ago
+            )),
+        ).prefetch_related(Prefetch(
+            'assigned_complaints',
+            queryset=Complaint.objects.only('id', 'complaint_number', 'title', 'status', 'assigned_to_id').order_by('-created_at'),
+            to_attr='assigned_complaint_list',
+        )).order_by('first_name', 'last_name')
 
 @api_view(['POST'])
 @permission_classes([IsAdmin])
@@ -96,4 +119,23 @@ def toggle_agent_status(request):
     return Response({
         'message': f'Status updated to {new_status}',
         'status': new_status
-    })
\ No newline at end of file
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def avatar_rendition(request, pk, variant):
+    """Avatar thumbnail/preview, rendered on first request if the worker has not"""
+    if variant not in VARIANTS:
+        return Response({'error': 'Unknown variant'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        user = User.objects.only('id', 'avatar', 'avatar_renditions').get(pk=pk)
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not user.avatar:
+        return Response({'error': 'No avatar'}, status=status.HTTP_404_NOT_FOUND)
+    renditions = ensure_renditions(user, 'avatar', 'avatar_renditions')
+    if renditions == FAILED:
+        return Response({'error': 'No avatar'}, status=status.HTTP_404_NOT_FOUND)
+    # The URL carries ?v=<content version>, so a replaced avatar gets a new URL
+    return serve_rendition(request, renditions, variant, max_age=7 * 24 * 60 * 60)
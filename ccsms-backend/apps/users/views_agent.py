@@ -19,10 +19,13 @@ def agent_detail(request, agent_id):
     agent = get_object_or_404(User, id=agent_id, role='AGENT')
     
     from apps.complaints.models import Complaint
-    from apps.complaints.serializers import ComplaintSerializer
+    from apps.complaints.serializers import ComplaintListSerializer
+    from utils.pagination import KeysetPagination
     
-    # Get assigned complaints
-    assigned_complaints = Complaint.objects.filter(assigned_to=agent).order_by('-created_at')
+    # Get assigned complaints (one keyset page, use assigned_complaints_next for more)
+    assigned_complaints = Complaint.objects.filter(assigned_to=agent).select_related('customer', 'assigned_to')
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(assigned_complaints, request)
     
     data = {
         'id': str(agent.id),
@@ -39,7 +42,9 @@ def agent_detail(request, agent_id):
         'total_resolved_cases': agent.total_resolved_cases,
         'performance_rating': agent.performance_rating,
         'last_activity': agent.last_activity,
-        'assigned_complaints': ComplaintSerializer(assigned_complaints, many=True).data
+        'assigned_complaints': ComplaintListSerializer(page, many=True).data,
+        'assigned_complaints_next': paginator.get_next_link(),
+        'assigned_complaints_previous': paginator.get_previous_link(),
     }
     
     return Response(data)
@@ -115,56 +120,22 @@ def respond_to_assignment(request):
     response_type = request.data.get('response')  # 'accept' or 'reject'
     agent_message = request.data.get('message', '')
     
+    from apps.complaints import transitions
     from apps.complaints.models_assignment import AgentAssignmentRequest
-    assignment_request = get_object_or_404(AgentAssignmentRequest, id=request_id, agent=request.user)
-    
-    if assignment_request.status != 'PENDING':
-        return Response({'error': 'Request already responded to'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    if timezone.now() > assignment_request.expires_at:
-        assignment_request.status = 'EXPIRED'
-        assignment_request.save()
-        return Response({'error': 'Request has expired'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Update assignment request
-    assignment_request.status = 'ACCEPTED' if response_type == 'accept' else 'REJECTED'
-    assignment_request.agent_response = agent_message
-    assignment_request.responded_at = timezone.now()
-    assignment_request.save()
-    
-    complaint = assignment_request.complaint
-    
-    if response_type == 'accept':
-        # Assign complaint to agent
-        complaint.assigned_to = request.user
-        complaint.status = 'IN_PROGRESS'
-        complaint.save()
-        
-        # Update agent stats
-        request.user.current_active_cases += 1
-        request.user.agent_status = 'BUSY' if request.user.current_active_cases >= 5 else 'AVAILABLE'
-        request.user.save()
-        
-        notification_message = f"Agent {request.user.first_name} {request.user.last_name} accepted complaint {complaint.complaint_number}"
-    else:
-        notification_message = f"Agent {request.user.first_name} {request.user.last_name} rejected complaint {complaint.complaint_number}. Please assign it to another agent."
-    
-    # Send real-time notification to admin
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"admin_{assignment_request.admin.id}",
-        {
-            'type': 'assignment_response',
-            'data': {
-                'complaint_number': complaint.complaint_number,
-                'agent_name': f"{request.user.first_name} {request.user.last_name}",
-                'response': response_type,
-                'message': notification_message,
-                'agent_message': agent_message
-            }
-        }
+    assignment_request = get_object_or_404(
+        AgentAssignmentRequest.objects.select_related('complaint'), id=request_id, agent=request.user
     )
     
+    # Same transition as the complaints respond endpoint; the admin's websocket gets the
+    # assignment_response message through the outbox
+    try:
+        if response_type == 'accept':
+            transitions.accept_assignment(assignment_request, request.user, agent_message)
+        else:
+            transitions.reject_assignment(assignment_request, request.user, agent_message)
+    except transitions.TransitionError as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
+    
     return Response({
         'message': f'Assignment request {response_type}ed successfully',
         'status': assignment_request.status
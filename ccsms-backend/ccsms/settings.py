@@ -49,6 +49,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'utils.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -191,6 +192,14 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.complaints.tasks.auto_escalate_complaints',
         'schedule': timedelta(minutes=30),
     },
+    'relay-outbox': {
+        'task': 'apps.notifications.tasks.relay_outbox_events',
+        'schedule': timedelta(seconds=config('OUTBOX_RELAY_INTERVAL_SECONDS', default=5, cast=int)),
+    },
+    'purge-outbox': {
+        'task': 'apps.notifications.tasks.purge_outbox_events',
+        'schedule': timedelta(days=1),
+    },
 }
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -203,10 +212,58 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@example.com')
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB (Total request limit)
 FILE_UPLOAD_MAX_MEMORY_SIZE = 512000   # 500KB (Single file memory limit)
+# Same as Django's defaults, plus a SHA-256 of each upload for the content-addressed attachment storage
+FILE_UPLOAD_HANDLERS = [
+    'utils.storage.HashingMemoryFileUploadHandler',
+    'utils.storage.HashingTemporaryFileUploadHandler',
+]
+
+# Attachment downloads: '' serves from Django (FileResponse), 'nginx' hands off via X-Accel-Redirect to an
+# internal location aliasing MEDIA_ROOT at ATTACHMENT_SENDFILE_URL, 'apache'/'lighttpd' via X-Sendfile
+ATTACHMENT_SENDFILE_BACKEND = config('ATTACHMENT_SENDFILE_BACKEND', default='')
+ATTACHMENT_SENDFILE_URL = config('ATTACHMENT_SENDFILE_URL', default='/protected-media/')
+
+# Complaint numbers reserved per worker process at a time (1 = strictly sequential)
+COMPLAINT_NUMBER_BLOCK_SIZE = config('COMPLAINT_NUMBER_BLOCK_SIZE', default=20, cast=int)
+
+# Worker processes for the retriage_open_complaints task (in-process under Celery's prefork pool,
+# whose children cannot start processes; run the worker with --pool=solo or threads to use them)
+RETRIAGE_WORKERS = config('RETRIAGE_WORKERS', default=4, cast=int)
+
+# Per-request instrumentation (utils.instrumentation): requests over their view's budget are logged,
+# and with DEBUG the numbers are sent in a Server-Timing header. Budgets are keyed by URL name and
+# merged over 'default'; 'duplicates' is how often a single query shape may run in one request.
+REQUEST_INSTRUMENTATION = config('REQUEST_INSTRUMENTATION', default=True, cast=bool)
+REQUEST_BUDGETS = {
+    'default': {
+        'queries': config('REQUEST_BUDGET_QUERIES', default=20, cast=int),
+        'duplicates': config('REQUEST_BUDGET_DUPLICATES', default=3, cast=int),
+        'db_ms': config('REQUEST_BUDGET_DB_MS', default=200, cast=int),
+        'view_ms': config('REQUEST_BUDGET_VIEW_MS', default=800, cast=int),
+    },
+    # Streams an uploaded file in chunks; its cost grows with the file
+    'import_complaints': {'queries': None, 'duplicates': None, 'db_ms': None, 'view_ms': None},
+}
+
+# Transactional outbox for notification side effects (apps.notifications.outbox)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
+# Process-local agent index (utils.agent_index): changes made by other processes are read before
+# a lookup once it is this many seconds old, and it is rebuilt from scratch this often
+AGENT_INDEX_MAX_AGE = config('AGENT_INDEX_MAX_AGE', default=1.0, cast=float)
+AGENT_INDEX_REBUILD_SECONDS = config('AGENT_INDEX_REBUILD_SECONDS', default=600, cast=int)
+# Agent recommendations kept per process (utils.ai_assignment), each until the agent index changes
+AGENT_RECOMMENDATIONS_CACHE_SIZE = config('AGENT_RECOMMENDATIONS_CACHE_SIZE', default=10000, cast=int)
+
+# Pincode centroids (utils.pincode_geo), mapped read-only by every process; see build_pincode_index
+PINCODE_INDEX_PATH = config('PINCODE_INDEX_PATH', default=str(BASE_DIR / 'utils' / 'data' / 'pincodes.npy'))
 
 # Production Security Settings
 if not DEBUG:
-    SECURE_SSL_REDIRECT = True
+    # Off for a local production-like server without TLS (load tests)
+    SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=True, cast=bool)
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
@@ -0,0 +1,222 @@
+"""
+Seeded data for the query-count tests.
+
+seed(scale) builds a realistic tree in bulk: admins, agents and customers,
+complaints in every status with comments, timelines, attachments and
+feedback, notifications, audit logs and assignment requests. Everything that
+a list endpoint can return grows with `scale`, so a query issued per row
+shows up as a different count at scale 10. The objects the endpoints are
+called with (one user per role, one complaint per state) are the same at
+every scale and returned as a Fixture.
+"""
+import io
+import itertools
+from dataclasses import dataclass
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image
+from apps.audit.models import AuditLog
+from apps.complaints.models import (
+    AssignmentRequest, Attachment, AttachmentBlob, Comment, Complaint, ComplaintTemplate, Feedback,
+    Timeline, TriageRule,
+)
+from apps.complaints.models_assignment import AgentAssignmentRequest
+from apps.notifications.models import FCMToken, Notification
+from apps.users.models import User
+from utils.storage import get_attachment_storage
+
+CATEGORIES = ['TECHNICAL', 'PRODUCT_QUALITY', 'SERVICE']
+PRIORITIES = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+STATUSES = ['OPEN', 'IN_PROGRESS', 'RESOLVED', 'CLOSED', 'ESCALATED', 'REOPENED']
+SERVICE_TYPES = ['Electronics', 'Appliances', 'Mobile', 'Computer']
+
+_numbers = itertools.count(1)
+
+
+@dataclass
+class Fixture:
+    admin: User
+    agent: User
+    customer: User
+    other_agent: User  # verified and available
+    other_customer: User
+    open: Complaint  # unassigned
+    unclaimed: Complaint  # unassigned, no assignment requests
+    active: Complaint  # assigned to `agent`, in progress
+    resolved: Complaint
+    closed: Complaint
+    attachment: Attachment  # image on `active`, renditions recorded
+    notification: Notification
+    agent_request: AgentAssignmentRequest  # admin -> `agent`, pending, on `open`
+    assignment_request: AssignmentRequest  # `agent` -> admins, pending, on `open`
+    template: ComplaintTemplate
+
+
+def _users(role, count, prefix, **fields):
+    password = make_password('password123')
+    users = [
+        User(
+            email=f'{prefix}{next(_numbers)}@example.com', username=f'{prefix}{next(_numbers)}',
+            first_name=prefix.title(), last_name=str(index), role=role, password=password,
+            pincode=f'5600{index % 10:02d}', **fields
+        )
+        for index in range(count)
+    ]
+    return User.objects.bulk_create(users)
+
+
+def _complaint(customer, status='OPEN', assigned_to=None, index=0, **fields):
+    now = timezone.now()
+    return Complaint(
+        complaint_number=f'QC{next(_numbers):08d}',
+        title=f'Complaint {index}: screen flickers',
+        description='The screen flickers after the update and the device restarts on its own.',
+        category=CATEGORIES[index % len(CATEGORIES)],
+        priority=PRIORITIES[index % len(PRIORITIES)],
+        status=status,
+        customer=customer,
+        assigned_to=assigned_to,
+        sla_deadline=now + timedelta(hours=24 + index % 48),
+        resolved_at=now - timedelta(days=1) if status in ('RESOLVED', 'CLOSED') else None,
+        closed_at=now if status == 'CLOSED' else None,
+        pincode=f'5600{index % 10:02d}',
+        service_type_required=SERVICE_TYPES[index % len(SERVICE_TYPES)],
+        **fields
+    )
+
+
+def _image_blob():
+    """A small JPEG stored once in the attachment storage; every attachment row shares it"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (200, 40, 40)).save(buffer, 'JPEG')
+    storage = get_attachment_storage()
+    name = storage.save('photo.jpg', ContentFile(buffer.getvalue()))
+    AttachmentBlob.objects.create(name=name, size=buffer.tell())
+    return name, buffer.tell()
+
+
+def seed(scale=1):
+    admins = _users('ADMIN', 2 * scale, 'admin')
+    agents = _users('AGENT', 8 * scale, 'agent', is_verified=True)
+    for index, agent in enumerate(agents):
+        agent.service_type = SERVICE_TYPES[index % len(SERVICE_TYPES)]
+        agent.agent_status = ['AVAILABLE', 'AVAILABLE', 'BUSY', 'OFFLINE'][index % 4]
+        agent.current_active_cases = index % 5
+        agent.total_assigned_cases = 10 + index
+        agent.total_resolved_cases = index
+    User.objects.bulk_update(agents, ['service_type', 'agent_status', 'current_active_cases',
+                                      'total_assigned_cases', 'total_resolved_cases'])
+    customers = _users('CUSTOMER', 6 * scale, 'customer')
+    admin, agent, customer = admins[0], agents[0], customers[0]
+
+    # The complaints the endpoints are called with
+    main = Complaint.objects.bulk_create([
+        _complaint(customer, 'OPEN'),
+        _complaint(customer, 'IN_PROGRESS', agent, index=1),
+        _complaint(customer, 'RESOLVED', agent, index=2),
+        _complaint(customer, 'CLOSED', agent, index=3),
+        _complaint(customer, 'OPEN', index=4),
+    ])
+
+    # The backlog: every user, in every status; the main customer and agent get their share
+    complaints = Complaint.objects.bulk_create([
+        _complaint(
+            customer if index % 3 == 0 else customers[index % len(customers)],
+            STATUSES[index % len(STATUSES)],
+            None if index % len(STATUSES) == 0 else (agent if index % 4 == 0 else agents[index % len(agents)]),
+            index=index,
+        )
+        for index in range(40 * scale)
+    ]) + main
+    name, size = _image_blob()
+    User.objects.filter(pk=agent.pk).update(avatar=name, avatar_renditions={'thumbnail': name, 'preview': name})
+
+    users = admins + agents + customers
+    Comment.objects.bulk_create([
+        Comment(complaint=complaint, user=author, content=f'Update {n} on the issue', is_internal=n == 2)
+        for complaint in complaints
+        for n, author in enumerate([complaint.customer, complaint.assigned_to or admin, admin])
+    ])
+    Timeline.objects.bulk_create([
+        Timeline(complaint=complaint, action=action, description=f'{action.title()} by {performer.email}',
+                 performed_by=performer, metadata={'source': 'fixture'})
+        for complaint in complaints
+        for action, performer in [('CREATED', complaint.customer), ('ASSIGNED', admin), ('COMMENTED', complaint.customer)]
+    ])
+
+    attachments = Attachment.objects.bulk_create([
+        Attachment(complaint=complaint, file=name, original_filename='photo.jpg', file_size=size,
+                   mime_type='image/jpeg', uploaded_by=complaint.customer,
+                   renditions={'thumbnail': name, 'preview': name})
+        for complaint in complaints
+    ])
+    AttachmentBlob.objects.filter(name=name).update(ref_count=len(attachments))
+
+    Feedback.objects.bulk_create([
+        Feedback(complaint=complaint, rating=1 + index % 5, agent_professionalism_rating=1 + index % 5,
+                 resolution_speed_rating=1 + (index + 2) % 5, agent_rating=1 + index % 5, comment='Thanks')
+        for index, complaint in enumerate(complaints)
+        if complaint.status in ('RESOLVED', 'CLOSED') and complaint.pk != main[2].pk
+    ])
+
+    notifications = Notification.objects.bulk_create([
+        Notification(user=user, complaint=complaints[n % len(complaints)], notification_type='IN_APP',
+                     category='COMPLAINT_STATUS_CHANGED', title=f'Update {n}', message='Status changed',
+                     is_read=n % 2 == 0)
+        for user in users
+        for n in range(4)
+    ])
+    FCMToken.objects.bulk_create([FCMToken(user=user, token=f'fcm-{user.pk}') for user in users])
+    AuditLog.objects.bulk_create([
+        AuditLog(user=user, action=action, entity_type='Complaint', entity_id=str(complaint.pk),
+                 changes={'status': complaint.status}, ip_address='127.0.0.1')
+        for complaint, user in zip(complaints, itertools.cycle(users))
+        for action in ('CREATE', 'VIEW')
+    ])
+
+    open_complaint = main[0]
+    expires = timezone.now() + timedelta(hours=1)
+    agent_requests = AgentAssignmentRequest.objects.bulk_create(
+        [AgentAssignmentRequest(complaint=open_complaint, agent=agent, admin=admin, expires_at=expires)] + [
+            AgentAssignmentRequest(complaint=complaint, agent=agents[index % len(agents)], admin=admin, expires_at=expires)
+            for index, complaint in enumerate(complaints[:-len(main)])
+            if complaint.status == 'OPEN' and not complaint.assigned_to_id
+        ]
+    )
+    assignment_requests = AssignmentRequest.objects.bulk_create(
+        [AssignmentRequest(complaint=open_complaint, requested_by=agent, message='I can take this')] + [
+            AssignmentRequest(complaint=complaint, requested_by=agents[index % len(agents)], message='Mine')
+            for index, complaint in enumerate(complaints[:-len(main)])
+            if complaint.status == 'OPEN'
+        ]
+    )
+    templates = ComplaintTemplate.objects.bulk_create([
+        ComplaintTemplate(name=f'Template {index}', category=CATEGORIES[index % len(CATEGORIES)],
+                          title_template='Device not working', description_template='My device stopped working.')
+        for index in range(3 * scale)
+    ])
+    TriageRule.objects.bulk_create([
+        TriageRule(name=f'Rule {index}', keyword_patterns=['flicker', f'keyword{index}'],
+                   auto_assign_to=agents[index % len(agents)] if index % 2 else None, priority_order=index)
+        for index in range(2 * scale)
+    ])
+
+    return Fixture(
+        admin=admin,
+        agent=agent,
+        customer=customer,
+        other_agent=agents[1],
+        other_customer=customers[1],
+        open=open_complaint,
+        active=main[1],
+        resolved=main[2],
+        closed=main[3],
+        unclaimed=main[4],
+        attachment=next(a for a in attachments if a.complaint_id == main[1].pk),
+        notification=next(n for n in notifications if n.user_id == customer.pk),
+        agent_request=agent_requests[0],
+        assignment_request=assignment_requests[0],
+        template=templates[0],
+    )
@@ -0,0 +1,67 @@
+"""
+solve_assignment against brute force on small cost matrices.
+"""
+import itertools
+import random
+import numpy as np
+from django.test import SimpleTestCase
+from apps.complaints.batch_assignment import solve_assignment
+
+
+def brute_force(cost):
+    """Lowest total cost of giving every row a different column"""
+    n_rows, n_cols = cost.shape
+    return min(
+        cost[range(n_rows), list(columns)].sum()
+        for columns in itertools.permutations(range(n_cols), n_rows)
+    )
+
+
+class SolveAssignmentTests(SimpleTestCase):
+    def solve(self, cost):
+        return solve_assignment(lambda i: cost[i], *cost.shape)
+
+    def assertOptimal(self, cost):
+        columns, u, v = self.solve(cost)
+        n_rows = cost.shape[0]
+        self.assertEqual(len(set(columns.tolist())), n_rows, 'a column was given to two rows')
+        self.assertTrue(((columns >= 0) & (columns < cost.shape[1])).all())
+        self.assertAlmostEqual(cost[range(n_rows), columns].sum(), brute_force(cost))
+        # Dual feasibility and complementary slackness prove optimality on their own
+        reduced = cost - u[:, None] - v[None, :]
+        self.assertGreaterEqual(reduced.min(), -1e-9)
+        np.testing.assert_allclose(reduced[range(n_rows), columns], 0, atol=1e-9)
+
+    def test_random_matrices(self):
+        rng = np.random.default_rng(7)
+        for _ in range(200):
+            n_rows = int(rng.integers(1, 6))
+            n_cols = int(rng.integers(n_rows, 7))
+            with self.subTest(shape=(n_rows, n_cols)):
+                self.assertOptimal(rng.random((n_rows, n_cols)))
+
+    def test_ties(self):
+        # Small integer costs make many assignments equally good
+        rng = random.Random(3)
+        for _ in range(100):
+            n_rows, n_cols = rng.randint(1, 5), rng.randint(5, 6)
+            cost = np.array([[rng.randint(0, 2) for _ in range(n_cols)] for _ in range(n_rows)], dtype=float)
+            with self.subTest(cost=cost.tolist()):
+                self.assertOptimal(cost)
+
+    def test_forbidden_pairs(self):
+        cost = np.array([
+            [np.inf, 1.0, 5.0],
+            [2.0, np.inf, np.inf],
+            [np.inf, 3.0, 1.0],
+        ])
+        columns, _, _ = self.solve(cost)
+        self.assertEqual(columns.tolist(), [1, 0, 2])
+
+    def test_no_complete_assignment(self):
+        cost = np.array([
+            [1.0, np.inf],
+            [2.0, np.inf],
+        ])
+        with self.assertRaises(ValueError):
+            self.solve(cost)
@@ -0,0 +1,55 @@
+"""
+Bulk assign/resolve move agent counters and availability as single transitions do.
+"""
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.complaints.models import Complaint
+from apps.complaints.transitions import MAX_ACTIVE_CASES
+from apps.users.models import User
+from .fixtures import _complaint, _users
+
+
+@override_settings(ENABLE_EMAIL_NOTIFICATIONS=False)
+class BulkCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, = _users('ADMIN', 1, 'admin')
+        cls.customer, = _users('CUSTOMER', 1, 'customer')
+        cls.busy, cls.free = _users('AGENT', 2, 'agent', is_verified=True)
+        User.objects.filter(pk=cls.busy.pk).update(
+            agent_status='BUSY', current_active_cases=MAX_ACTIVE_CASES,
+            total_resolved_cases=2, average_resolution_time_hours=10.0,
+        )
+        User.objects.filter(pk=cls.free.pk).update(current_active_cases=MAX_ACTIVE_CASES - 2)
+        cls.complaints = Complaint.objects.bulk_create([
+            _complaint(cls.customer, 'IN_PROGRESS', cls.busy, index) for index in range(2)
+        ])
+        # created_at is auto_now_add, so age the rows afterwards
+        Complaint.objects.filter(pk__in=[c.pk for c in cls.complaints]).update(
+            created_at=timezone.now() - timedelta(hours=4)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.ids = [str(c.pk) for c in self.complaints]
+
+    def test_bulk_resolve_frees_a_busy_agent(self):
+        response = self.client.post(reverse('bulk_resolve'), {'complaint_ids': self.ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        agent = User.objects.get(pk=self.busy.pk)
+        self.assertEqual((agent.current_active_cases, agent.total_resolved_cases), (MAX_ACTIVE_CASES - 2, 4))
+        self.assertAlmostEqual(agent.average_resolution_time_hours, (2 * 10.0 + 2 * 4.0) / 4, places=2)
+        self.assertTrue(agent.is_available)
+
+    def test_bulk_assign_moves_the_slots(self):
+        response = self.client.post(
+            reverse('bulk_assign'), {'complaint_ids': self.ids, 'assigned_to': str(self.free.pk)}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        busy, free = User.objects.get(pk=self.busy.pk), User.objects.get(pk=self.free.pk)
+        self.assertEqual((busy.current_active_cases, busy.agent_status), (MAX_ACTIVE_CASES - 2, 'AVAILABLE'))
+        self.assertEqual((free.current_active_cases, free.agent_status), (MAX_ACTIVE_CASES, 'BUSY'))
@@ -0,0 +1,43 @@
+"""
+Range header parsing for attachment downloads.
+"""
+from django.test import SimpleTestCase
+from utils.file_serving import parse_range
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        size = 1000
+        cases = [
+            # Whole file
+            (None, None),
+            ('', None),
+            ('bytes=-', None),
+            ('bytes=0-99,200-299', None),  # multi-range gets a 200
+            ('items=0-99', None),
+            ('bytes=abc-', None),
+            ('bytes=-5-', None),
+            # Satisfiable
+            ('bytes=0-99', (0, 99)),
+            ('bytes=0-0', (0, 0)),
+            (' bytes=10-19 ', (10, 19)),
+            ('bytes=500-', (500, 999)),
+            ('bytes=999-', (999, 999)),
+            ('bytes=900-5000', (900, 999)),
+            ('bytes=-100', (900, 999)),
+            ('bytes=-1000', (0, 999)),
+            ('bytes=-5000', (0, 999)),
+            # Unsatisfiable
+            ('bytes=1000-', False),
+            ('bytes=1000-1100', False),
+            ('bytes=50-10', False),
+            ('bytes=-0', False),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, size), expected)
+
+    def test_empty_file(self):
+        self.assertIs(parse_range('bytes=0-', 0), False)
+        self.assertIs(parse_range('bytes=-10', 0), False)
+        self.assertIsNone(parse_range('', 0))
@@ -0,0 +1,69 @@
+"""
+Complaint import: bad rows are reported by row number and the rest are imported.
+"""
+import io
+from django.test import TestCase
+from apps.complaints.importer import ComplaintImporter, read_rows
+from apps.complaints.models import Complaint, Timeline
+from apps.users.models import User
+
+NO_CUSTOMER = '{"title": "No customer", "description": "x", "category": "SERVICE"}\n'
+CSV = """title,description,category,priority,customer_email
+Screen flickers,After the update,TECHNICAL,LOW,Customer@Example.com
+No description,,TECHNICAL,LOW,customer@example.com
+Unknown customer,Nobody has this email,SERVICE,HIGH,nobody@example.com
+Bad category,The category is made up,WEATHER,LOW,customer@example.com
+Derived priority,Priority from expected days,SERVICE,,customer@example.com
+"""
+
+
+class ComplaintImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', username='admin', role='ADMIN')
+        cls.customer = User.objects.create(email='customer@example.com', username='customer')
+
+    def test_reports_bad_rows_and_imports_the_rest(self):
+        reported = []
+        importer = ComplaintImporter(
+            self.admin, chunk_size=2, on_error=lambda row, errors: reported.append((row, errors)),
+        )
+        result = importer.run(read_rows(io.StringIO(CSV), 'csv'))
+
+        self.assertEqual((result.rows, result.created, result.failed), (5, 2, 3))
+        self.assertFalse(result.errors_truncated)
+        self.assertEqual([error['row'] for error in result.errors], [2, 3, 4])
+        self.assertEqual(set(result.errors[0]['errors']), {'description'})
+        self.assertEqual(result.errors[1]['errors']['customer_email'], ['No user with email nobody@example.com'])
+        self.assertEqual(set(result.errors[2]['errors']), {'category'})
+        self.assertEqual(reported, [(error['row'], error['errors']) for error in result.errors])
+
+        complaints = Complaint.objects.filter(customer=self.customer).order_by('title')
+        self.assertEqual([c.title for c in complaints], ['Derived priority', 'Screen flickers'])
+        self.assertEqual(len({c.complaint_number for c in complaints}), 2)
+        self.assertEqual(
+            sorted(Timeline.objects.filter(complaint__in=complaints).values_list('metadata__import_row', flat=True)),
+            [1, 5],
+        )
+
+    def test_unparsable_and_customerless_rows(self):
+        rows = read_rows(io.StringIO(NO_CUSTOMER + '[1, 2]\n'), 'jsonl')
+        result = ComplaintImporter(self.admin).run(rows)
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.errors[0], {'row': 1, 'errors': {'customer_email': ['This field is required.']}})
+        self.assertEqual(result.errors[1]['row'], 2)
+        self.assertIn('Invalid JSON', result.errors[1]['errors']['row'][0])
+
+    def test_default_customer(self):
+        rows = read_rows(io.StringIO(NO_CUSTOMER), 'jsonl')
+        result = ComplaintImporter(self.admin, default_customer=self.customer).run(rows)
+        self.assertEqual((result.created, result.failed), (1, 0))
+
+    def test_error_list_is_capped(self):
+        rows = ((number, ValueError('bad')) for number in range(1, 8))
+        importer = ComplaintImporter(self.admin)
+        importer.max_errors = 5
+        result = importer.run(rows)
+        self.assertEqual(result.failed, 7)
+        self.assertEqual(len(result.errors), 5)
+        self.assertTrue(result.errors_truncated)
@@ -0,0 +1,75 @@
+"""
+Outbox relay: dispatch, per-event and per-group failures, retry backoff.
+"""
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from apps.notifications.models import OutboxEvent
+from apps.notifications.outbox import HANDLERS, channel_event, enqueue, relay_outbox
+
+
+def events(*groups):
+    return [channel_event(group, 'test.message', {'n': index}) for index, group in enumerate(groups)]
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=4)
+class RelayOutboxTests(TestCase):
+    def relay(self, handlers):
+        with mock.patch.dict(HANDLERS, handlers):
+            return relay_outbox()
+
+    def make_due(self):
+        OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_dispatches_each_group_once(self):
+        enqueue(*events('a', 'b'))
+        calls = []
+        self.assertEqual(self.relay({'CHANNEL': calls.append}), 2)
+        self.assertEqual([len(group) for group in calls], [2])
+        self.assertEqual(set(OutboxEvent.objects.values_list('status', 'attempts')), {('DISPATCHED', 1)})
+        self.assertEqual(self.relay({'CHANNEL': calls.append}), 0)
+
+    def test_failed_events_back_off_then_fail(self):
+        bad, good = enqueue(*events('bad', 'good'))
+        handler = lambda group: {event.pk: RuntimeError('boom') for event in group if event.payload['group'] == 'bad'}
+
+        delays = []
+        for attempt in range(1, 5):
+            started = timezone.now()
+            self.relay({'CHANNEL': handler})
+            bad.refresh_from_db()
+            self.assertEqual(bad.attempts, attempt)
+            self.assertEqual(bad.last_error, 'boom')
+            if attempt < 4:
+                self.assertEqual(bad.status, 'PENDING')
+                delays.append(round((bad.available_at - started).total_seconds()))
+                self.assertEqual(self.relay({'CHANNEL': handler}), 0, 'retried before its backoff')
+                self.make_due()
+        self.assertEqual(bad.status, 'FAILED')
+        self.assertEqual(delays, [30, 60, 120])
+        good.refresh_from_db()
+        self.assertEqual((good.status, good.attempts), ('DISPATCHED', 1))
+
+        self.make_due()
+        self.assertEqual(self.relay({'CHANNEL': handler}), 0, 'a FAILED event was claimed again')
+
+    def test_raising_handler_fails_only_its_group(self):
+        enqueue(*events('a'), OutboxEvent(event_type='EMAIL', payload={'kind': 'status_changed', 'complaint_id': None}))
+
+        def broken(group):
+            raise RuntimeError('handler down')
+
+        self.assertEqual(self.relay({'CHANNEL': broken, 'EMAIL': lambda group: {}}), 2)
+        self.assertEqual(
+            dict(OutboxEvent.objects.values_list('event_type', 'status')),
+            {'CHANNEL': 'PENDING', 'EMAIL': 'DISPATCHED'},
+        )
+        self.assertEqual(OutboxEvent.objects.get(event_type='CHANNEL').last_error, 'handler down')
+
+    def test_batch_size(self):
+        enqueue(*events(*'abcde'))
+        with mock.patch.dict(HANDLERS, {'CHANNEL': lambda group: {}}):
+            self.assertEqual(relay_outbox(batch_size=3), 3)
+            self.assertEqual(relay_outbox(batch_size=3), 2)
+        self.assertFalse(OutboxEvent.objects.filter(status='PENDING').exists())
@@ -0,0 +1,91 @@
+"""
+KeysetPagination cursors: walking next links visits every row once in order,
+and walking previous links back returns the same pages.
+"""
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.users.models import User
+from utils.pagination import KeysetPagination
+
+factory = APIRequestFactory()
+
+
+def paginator(ordering, size):
+    return type('Pagination', (KeysetPagination,), {'ordering': ordering, 'page_size': size})()
+
+
+def page(pagination, url):
+    """(pks, next link, previous link) of the page at `url`"""
+    rows = pagination.paginate_queryset(User.objects.all(), Request(factory.get(url)))
+    return [row.pk for row in rows], pagination.get_next_link(), pagination.get_previous_link()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now().replace(microsecond=123456)
+        users = []
+        for index in range(23):
+            # Runs of equal keys, so pages break inside ties, and NULLs for last_login
+            last_login = None if index % 5 == 0 else now - timedelta(minutes=index // 3)
+            users.append(User(
+                email=f'page{index}@example.com', username=f'page{index}', first_name='Page', last_name=str(index),
+                last_login=last_login, performance_rating=float(index % 4),
+            ))
+        User.objects.bulk_create(users)
+
+    def expected(self, field, descending):
+        rows = list(User.objects.values_list(field, 'pk'))
+        present = sorted((row for row in rows if row[0] is not None), reverse=descending)
+        return [pk for _, pk in present] + sorted((pk for value, pk in rows if value is None), reverse=descending)
+
+    def walk(self, ordering, size):
+        forward, previous_links = [], []
+        url = '/api/items/'
+        while url:
+            pks, url, previous = page(paginator(ordering, size), url)
+            forward.append(pks)
+            previous_links.append(previous)
+        backward = []
+        url = previous_links[-1]
+        while url:
+            pks, _, url = page(paginator(ordering, size), url)
+            backward.append(pks)
+        return forward, previous_links, backward
+
+    def test_round_trip(self):
+        for ordering in ('-last_login', 'last_login', '-performance_rating', 'performance_rating', 'email'):
+            for size in (1, 4, 7, 23, 50):
+                with self.subTest(ordering=ordering, size=size):
+                    forward, previous_links, backward = self.walk(ordering, size)
+                    flat = [pk for pks in forward for pk in pks]
+                    self.assertEqual(flat, self.expected(ordering.lstrip('-'), ordering.startswith('-')))
+                    self.assertTrue(all(len(pks) == size for pks in forward[:-1]))
+                    self.assertIsNone(previous_links[0])
+                    self.assertEqual(backward[::-1], forward[:-1])
+
+    def test_cursor_keeps_microseconds(self):
+        pagination = paginator('-last_login', 3)
+        _, next_link, _ = page(pagination, '/api/items/')
+        request = Request(factory.get(next_link))
+        cursor = pagination.decode_cursor(request, User)
+        self.assertEqual(cursor['value'], pagination.page[-1].last_login)
+        self.assertEqual(cursor['pk'], pagination.page[-1].pk)
+        self.assertFalse(cursor['reverse'])
+
+    def test_links_keep_other_query_parameters(self):
+        _, next_link, _ = page(paginator('email', 5), '/api/items/?status=OPEN&page_size=5')
+        query = parse_qs(urlparse(next_link).query)
+        self.assertEqual(query['status'], ['OPEN'])
+        self.assertEqual(query['page_size'], ['5'])
+        self.assertIn('cursor', query)
+
+    def test_invalid_cursor(self):
+        for token in ('not-base64!', 'e30=', 'eyJ2IjoxfQ=='):  # garbage, {}, {"v": 1}
+            with self.subTest(token=token), self.assertRaises(NotFound):
+                page(paginator('-last_login', 5), f'/api/items/?cursor={token}')
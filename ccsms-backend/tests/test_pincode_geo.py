@@ -0,0 +1,87 @@
+"""
+PincodeTree lookups and radius queries against brute force.
+"""
+import os
+import tempfile
+import numpy as np
+from django.test import SimpleTestCase
+from utils.pincode_geo import LEAF_SIZE, PincodeTree, kilometres, to_xyz
+
+
+class PincodeTreeTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(11)
+        count = 40 * LEAF_SIZE  # several levels of split nodes above the leaves
+        cls.pincodes = 110001 + np.sort(rng.choice(800_000, size=count, replace=False))
+        cls.lat = rng.uniform(8.0, 35.0, size=count)
+        cls.lon = rng.uniform(68.0, 97.0, size=count)
+        # A few duplicated centroids, as pincodes sharing a post office have
+        cls.lat[1:4], cls.lon[1:4] = cls.lat[0], cls.lon[0]
+        cls.tree = PincodeTree.build(cls.pincodes, cls.lat, cls.lon)
+        cls.xyz = to_xyz(cls.lat, cls.lon)
+
+    def brute_force(self, origin, km):
+        distances = kilometres(self.xyz, origin)
+        inside = distances <= km
+        return dict(zip(self.pincodes[inside].tolist(), distances[inside]))
+
+    def assertWithin(self, origin, km):
+        pincodes, distances = self.tree.within(origin, km)
+        found = dict(zip(pincodes.tolist(), distances))
+        expected = self.brute_force(origin, km)
+        # float32 storage moves a point by centimetres, so only compare away from the boundary
+        boundary = {pincode for pincode, d in {**expected, **found}.items() if abs(d - km) < 0.01}
+        self.assertEqual(set(found) - boundary, set(expected) - boundary)
+        for pincode in set(found) & set(expected):
+            self.assertAlmostEqual(found[pincode], expected[pincode], delta=0.01)
+
+    def test_within_matches_brute_force(self):
+        rng = np.random.default_rng(5)
+        for index in rng.choice(len(self.pincodes), size=25, replace=False):
+            for km in (0.5, 10, 50, 250, 1000):
+                with self.subTest(pincode=int(self.pincodes[index]), km=km):
+                    self.assertWithin(self.xyz[index], km)
+
+    def test_within_off_the_points(self):
+        for lat, lon, km in ((20.0, 78.0, 120), (51.5, -0.1, 100), (51.5, -0.1, 8000), (-33.9, 151.2, 25000)):
+            with self.subTest(lat=lat, lon=lon, km=km):
+                self.assertWithin(to_xyz(lat, lon), km)
+
+    def test_within_zero_radius_finds_shared_centroids(self):
+        pincodes, distances = self.tree.within(self.xyz[0], 0.001)
+        self.assertEqual(sorted(pincodes.tolist()), self.pincodes[:4].tolist())
+        self.assertLess(distances.max(), 0.001)
+
+    def test_locate(self):
+        for index in (0, 17, len(self.pincodes) - 1):
+            located = self.tree.locate(str(self.pincodes[index]))
+            np.testing.assert_allclose(located, self.xyz[index], atol=1e-6)
+        missing = next(p for p in range(110001, 999999) if p not in set(self.pincodes.tolist()))
+        for value in (str(missing), '999999', '100000', '012345', '11000', '1100011', '11o001', '', None):
+            with self.subTest(pincode=value):
+                self.assertIsNone(self.tree.locate(value))
+
+    def test_locate_many_agrees_with_locate(self):
+        invalid = ['999999', '012345', 'abcdef', '', '1100011', '११०००१']
+        values = [str(p) for p in self.pincodes[:50]] + invalid
+        found, xyz = self.tree.locate_many(values)
+        for value, hit, point in zip(values, found, xyz):
+            with self.subTest(pincode=value):
+                located = self.tree.locate(value)
+                self.assertEqual(bool(hit), located is not None)
+                if located is None:
+                    self.assertFalse(point.any())
+                else:
+                    np.testing.assert_allclose(point, located, atol=1e-6)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'pincodes.npy')
+            self.tree.save(path)
+            loaded = PincodeTree.load(path)
+            self.assertEqual(len(loaded), len(self.tree))
+            origin = self.xyz[42]
+            np.testing.assert_array_equal(loaded.within(origin, 100)[0], self.tree.within(origin, 100)[0])
+            del loaded  # release the memory map before the directory goes
@@ -0,0 +1,314 @@
+"""
+Query-count regression tests for every API endpoint.
+
+Each URL in apps/*/urls.py is called, with every HTTP method it accepts, as
+an admin, an agent and a customer; the response must have the expected
+status and the number of database queries must stay within the bound
+recorded below. The same bounds are checked against a
+fixture ten times larger (QueryCountAt10xTests), so a query issued per row
+(an N+1) fails the suite instead of reaching production.
+
+Every request runs twice inside a rolled-back savepoint and the second run
+is counted, so per-process caches warmed by the first run (compiled triage
+rules, complaint number blocks, content types) do not make the counts
+depend on test order. Cases that must count a cold cache clear it in
+`prepare`. When an endpoint gets cheaper, lower its bound; when a
+change adds a query on purpose, raise it in the same commit.
+"""
+import csv
+import io
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Callable
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.models import User
+from utils.agent_index import reset_agent_index
+from utils.ai_assignment import _recommendations
+from utils.instrumentation import fingerprint
+from .fixtures import seed
+
+ROLES = ('ADMIN', 'AGENT', 'CUSTOMER')
+METHODS = ('get', 'post', 'put', 'patch', 'delete')
+
+
+@dataclass
+class Case:
+    name: str  # URL name
+    method: str
+    bounds: tuple  # most queries allowed for (admin, agent, customer)
+    statuses: tuple = (200, 200, 200)  # expected response status for (admin, agent, customer)
+    kwargs: Callable = lambda f: {}
+    data: Callable = lambda f, user: None
+    format: str = 'json'
+    prepare: Callable = None  # called with the fixture before each request
+
+
+def _complaint_csv(f, user):
+    rows = io.StringIO()
+    writer = csv.writer(rows)
+    writer.writerow(['title', 'description', 'category', 'priority', 'customer_email'])
+    for index in range(3):
+        writer.writerow([f'Imported {index}', 'Imported from the old system', 'TECHNICAL', 'LOW', f.customer.email])
+    return {'file': io.BytesIO(rows.getvalue().encode()), 'format': 'csv'}
+
+
+def _invoice_token(f):
+    cache.set('invoice_token_fixture', str(f.resolved.pk), timeout=60)
+
+
+def _uncached_recommendations(f):
+    _recommendations.clear()
+
+
+def _cold_recommendations(f):
+    _recommendations.clear()
+    reset_agent_index()
+
+
+def _complaint_ids(f, user):
+    return [str(c.pk) for c in (f.open, f.active, f.resolved, f.closed)]
+
+
+CASES = [
+    # apps/authentication
+    Case('register', 'post', (7, 7, 7), (201, 201, 201), data=lambda f, user: {
+        'email': 'new.customer@example.com', 'password': 'Str0ng!Pass', 'confirm_password': 'Str0ng!Pass',
+        'first_name': 'New', 'last_name': 'Customer', 'role': 'CUSTOMER',
+    }),
+    Case('login', 'post', (3, 3, 3), data=lambda f, user: {'email': user.email, 'password': 'password123'}),
+    Case('token_refresh', 'post', (0, 0, 0), data=lambda f, user: {'refresh': str(RefreshToken.for_user(user))}),
+    Case('change_password', 'post', (2, 2, 2), data=lambda f, user: {
+        'old_password': 'password123', 'new_password': 'N3w!Passw0rd',
+    }),
+
+    # apps/users
+    Case('user_profile', 'get', (0, 0, 0)),
+    Case('user_profile', 'put', (1, 1, 1), data=lambda f, user: {
+        'first_name': 'Renamed', 'last_name': user.last_name, 'email': user.email, 'username': user.username,
+    }),
+    Case('user_profile', 'patch', (1, 1, 1), data=lambda f, user: {'first_name': 'Renamed'}),
+    Case('user_list', 'get', (2, 0, 0), (200, 403, 403)),
+    Case('user_detail', 'get', (1, 0, 0), (200, 403, 403), kwargs=lambda f: {'pk': f.agent.pk}),
+    Case('avatar_rendition', 'get', (1, 1, 1), kwargs=lambda f: {'pk': f.agent.pk, 'variant': 'thumbnail'}),
+    Case('toggle_user_active', 'put', (2, 0, 0), (200, 403, 403), kwargs=lambda f: {'pk': f.other_customer.pk}),
+    Case('verify_agent', 'post', (2, 0, 0), (200, 403, 403), kwargs=lambda f: {'pk': f.other_agent.pk}),
+    Case('agent_list', 'get', (3, 3, 3)),
+    Case('toggle_agent_status', 'post', (0, 1, 0), (403, 200, 403), data=lambda f, user: {'status': 'BUSY'}),
+    Case('agent-detail', 'get', (2, 0, 0), (200, 403, 403), kwargs=lambda f: {'agent_id': f.agent.pk}),
+    Case('assign-complaint', 'post', (4, 0, 0), (200, 403, 403), data=lambda f, user: {
+        'complaint_id': str(f.open.pk), 'agent_id': str(f.other_agent.pk),
+    }),
+    Case('respond-assignment', 'post', (0, 8, 0), (403, 200, 403), data=lambda f, user: {
+        'request_id': str(f.agent_request.pk), 'response': 'accept',
+    }),
+    Case('pending-requests', 'get', (0, 7, 0), (403, 200, 403)),
+
+    # apps/complaints
+    Case('complaint_list_create', 'get', (2, 2, 2)),
+    Case('complaint_list_create', 'post', (11, 11, 11), (201, 201, 201), data=lambda f, user: {
+        'title': 'Screen flickers', 'description': 'The screen flickers after the update.',
+        'category': 'TECHNICAL', 'priority': 'MEDIUM', 'pincode': '560001',
+    }),
+    Case('complaint_detail', 'get', (5, 5, 5), kwargs=lambda f: {'pk': f.active.pk}),
+    # PUT needs priority, which only admins may set, and customers can only edit OPEN complaints
+    Case('complaint_detail', 'put', (3, 1, 1), (200, 400, 400), kwargs=lambda f: {'pk': f.active.pk},
+         data=lambda f, user: {
+        'title': 'Screen still flickers', 'description': 'Still flickering.', 'category': 'TECHNICAL',
+        **({'priority': 'HIGH'} if user.role == 'ADMIN' else {}),
+    }),
+    Case('complaint_detail', 'patch', (3, 3, 1), (200, 200, 400), kwargs=lambda f: {'pk': f.active.pk},
+         data=lambda f, user: {'priority': 'HIGH'} if user.role == 'ADMIN' else {'root_cause': 'Loose cable'}),
+    Case('complaint_detail', 'delete', (20, 1, 1), (204, 403, 403), kwargs=lambda f: {'pk': f.resolved.pk}),
+    # Cached recommendations, then scoring with the agent index warm, then with the index built from scratch
+    Case('get_ai_recommendations', 'get', (1, 1, 1), (200, 200, 403), kwargs=lambda f: {'pk': f.open.pk}),
+    Case('get_ai_recommendations', 'get', (3, 3, 1), (200, 200, 403), kwargs=lambda f: {'pk': f.open.pk},
+         prepare=_uncached_recommendations),
+    Case('get_ai_recommendations', 'get', (5, 5, 1), (200, 200, 403), kwargs=lambda f: {'pk': f.open.pk},
+         prepare=_cold_recommendations),
+    Case('assign_complaint', 'post', (9, 1, 1), (200, 403, 403), kwargs=lambda f: {'pk': f.open.pk},
+         data=lambda f, user: {'assigned_to': str(f.other_agent.pk)}),
+    Case('request_assignment', 'post', (1, 5, 1), (403, 201, 403), kwargs=lambda f: {'pk': f.unclaimed.pk},
+         data=lambda f, user: {'message': 'I can take this'}),
+    Case('request_agent_assignment', 'post', (6, 1, 1), (201, 403, 403), kwargs=lambda f: {'pk': f.open.pk},
+         data=lambda f, user: {'agent_id': str(f.other_agent.pk)}),
+    Case('resolve_complaint', 'post', (7, 7, 1), (200, 200, 403), kwargs=lambda f: {'pk': f.active.pk},
+         data=lambda f, user: {'resolution_notes': 'Replaced the display'}),
+    Case('close_complaint', 'post', (4, 4, 4), kwargs=lambda f: {'pk': f.active.pk}),
+    Case('reopen_complaint', 'post', (19, 19, 19), kwargs=lambda f: {'pk': f.resolved.pk},
+         data=lambda f, user: {'reason': 'It is back'}),
+    Case('add_comment', 'post', (8, 8, 9), (201, 201, 201), kwargs=lambda f: {'pk': f.active.pk},
+         data=lambda f, user: {'content': 'Any update?'}),
+    Case('get_comments', 'get', (2, 2, 3), kwargs=lambda f: {'pk': f.active.pk}),
+    Case('get_timeline', 'get', (2, 2, 3), kwargs=lambda f: {'pk': f.active.pk}),
+    Case('add_feedback', 'post', (2, 2, 10), (403, 403, 201), kwargs=lambda f: {'pk': f.resolved.pk},
+         data=lambda f, user: {
+        'rating': 5, 'agent_professionalism_rating': 5, 'resolution_speed_rating': 4, 'comment': 'Great',
+    }),
+    Case('download_attachment', 'get', (1, 1, 2), kwargs=lambda f: {'pk': f.attachment.pk}),
+    Case('attachment_rendition', 'get', (1, 1, 2), kwargs=lambda f: {'pk': f.attachment.pk, 'variant': 'thumbnail'}),
+    Case('bulk_assign', 'post', (10, 0, 0), (200, 403, 403), data=lambda f, user: {
+        'complaint_ids': _complaint_ids(f, user), 'assigned_to': str(f.other_agent.pk),
+    }),
+    Case('bulk_resolve', 'post', (8, 0, 0), (200, 403, 403), data=lambda f, user: {
+        'complaint_ids': _complaint_ids(f, user), 'resolution_notes': 'Fixed in bulk',
+    }),
+    Case('bulk_close', 'post', (6, 0, 0), (200, 403, 403),
+         data=lambda f, user: {'complaint_ids': _complaint_ids(f, user)}),
+    Case('bulk_update_priority', 'post', (6, 0, 0), (200, 403, 403), data=lambda f, user: {
+        'complaint_ids': _complaint_ids(f, user), 'priority': 'CRITICAL',
+    }),
+    Case('import_complaints', 'post', (9, 0, 0), (200, 403, 403), data=_complaint_csv, format='multipart'),
+    Case('list_assignment_requests', 'get', (2, 1, 0), (200, 200, 403)),
+    Case('review_assignment_request', 'post', (9, 9, 1), (200, 200, 403),
+         kwargs=lambda f: {'pk': f.assignment_request.pk},
+         data=lambda f, user: {'action': 'approve' if user.role == 'ADMIN' else 'accept'}),
+    Case('respond_assignment_request', 'post', (6, 6, 1), (200, 200, 403),
+         kwargs=lambda f: {'pk': f.assignment_request.pk},
+         data=lambda f, user: {'action': 'reject'}),
+    Case('respond_agent_assignment', 'post', (1, 8, 1), (403, 200, 403), kwargs=lambda f: {'pk': f.agent_request.pk},
+         data=lambda f, user: {'action': 'accept'}),
+    Case('list_complaint_templates', 'get', (1, 1, 1)),
+    Case('get_complaint_template', 'get', (1, 1, 1), kwargs=lambda f: {'pk': f.template.pk}),
+    Case('create_from_template', 'post', (22, 22, 22), (201, 201, 201),
+         data=lambda f, user: {'template_id': str(f.template.pk)}),
+    Case('list_invoices', 'get', (1, 1, 1)),
+    Case('download_invoice', 'get', (1, 1, 1), kwargs=lambda f: {'pk': f.resolved.pk}),
+    Case('generate_invoice_token', 'get', (1, 1, 1), kwargs=lambda f: {'pk': f.resolved.pk}),
+    Case('get_invoice_by_token', 'get', (3, 3, 3), kwargs=lambda f: {'token': 'fixture'}, prepare=_invoice_token),
+
+    # apps/notifications
+    Case('notification_list', 'get', (2, 2, 2)),
+    # The fixture notification belongs to the customer
+    Case('mark_notification_read', 'put', (1, 1, 2), (404, 404, 200), kwargs=lambda f: {'pk': f.notification.pk}),
+    Case('mark_all_notifications_read', 'put', (1, 1, 1)),
+    Case('unread_count', 'get', (1, 1, 1)),
+    Case('register_fcm_token', 'post', (6, 6, 6), (201, 201, 201),
+         data=lambda f, user: {'token': 'new-device-token', 'device_type': 'WEB'}),
+    Case('unregister_fcm_token', 'delete', (2, 2, 2), data=lambda f, user: {'token': f'fcm-{user.pk}'}),
+    Case('list_fcm_tokens', 'get', (1, 1, 1)),
+
+    # apps/analytics
+    Case('dashboard_stats', 'get', (7, 3, 4)),
+    Case('complaints_by_category', 'get', (1, 1, 1)),
+    Case('complaints_by_status', 'get', (1, 1, 1)),
+    Case('complaints_by_priority', 'get', (1, 1, 1)),
+    Case('agent_performance', 'get', (2, 2, 0), (200, 200, 403)),
+    Case('sla_report', 'get', (4, 4, 4)),
+    Case('feedback_analysis', 'get', (1, 1, 0), (200, 200, 403)),
+    Case('export_report', 'get', (1, 1, 1)),
+    Case('trend_detection', 'get', (8, 8, 0), (200, 200, 403)),
+    Case('schedule_report', 'post', (0, 0, 0), (200, 403, 403),
+         data=lambda f, user: {'type': 'all', 'frequency': 'weekly'}),
+    Case('complaints_volume_chart', 'get', (1, 1, 1)),
+
+    # apps/audit
+    Case('audit_log_list', 'get', (1, 0, 0), (200, 403, 403)),
+    Case('complaint_audit_logs', 'get', (4, 0, 0), (200, 403, 403), kwargs=lambda f: {'complaint_id': f.active.pk}),
+    Case('export_user_data', 'get', (1, 0, 0), (200, 403, 403)),
+    Case('export_access_logs', 'get', (1, 0, 0), (200, 403, 403)),
+    Case('export_retention_report', 'get', (6, 0, 0), (200, 403, 403)),
+    Case('export_gdpr_report', 'get', (3, 0, 0), (200, 403, 403)),
+]
+
+def app_endpoints():
+    """(URL name, method) for every view routed from an apps.*.urls module"""
+    def walk(patterns, in_app):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                module = getattr(pattern.urlconf_module, '__name__', '')
+                yield from walk(pattern.url_patterns, in_app or module.startswith('apps.'))
+            elif in_app:
+                view = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+                for method in METHODS:
+                    if hasattr(view, method):
+                        yield pattern.name, method
+    return set(walk(get_resolver().url_patterns, False))
+
+
+class _Rollback(Exception):
+    pass
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    REQUEST_INSTRUMENTATION=False,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    ENABLE_EMAIL_NOTIFICATIONS=False,
+    AGENT_INDEX_MAX_AGE=3600,  # no timed refresh of the agent index between the two runs
+)
+class QueryCountTests(TestCase):
+    scale = 1
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.addClassCleanup(media.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = seed(cls.scale)
+        reset_agent_index()  # it may still hold another fixture's agents
+        cls.users = {'ADMIN': cls.fixture.admin, 'AGENT': cls.fixture.agent, 'CUSTOMER': cls.fixture.customer}
+
+    def measure(self, case, role):
+        """Queries of the second of two identical requests, both rolled back"""
+        url = reverse(case.name, kwargs=case.kwargs(self.fixture))
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    user = User.objects.get(pk=self.users[role].pk)
+                    client = APIClient()
+                    client.force_authenticate(user)
+                    data = case.data(self.fixture, user)
+                    if case.prepare:
+                        case.prepare(self.fixture)
+                    kwargs = {'format': case.format} if case.method != 'get' else {}
+                    with CaptureQueriesContext(connection) as queries:
+                        response = getattr(client, case.method)(url, data, **kwargs)
+                        response.close()
+                    raise _Rollback
+            except _Rollback:
+                pass
+        return queries, response
+
+    def test_every_endpoint_has_a_case(self):
+        covered = {(case.name, case.method) for case in CASES}
+        self.assertEqual(app_endpoints() - covered, set(), 'Add a Case with query bounds for these endpoints')
+        self.assertEqual(covered - app_endpoints(), set(), 'These cases no longer match an endpoint')
+
+    def test_query_counts(self):
+        for case in CASES:
+            for role, bound, expected in zip(ROLES, case.bounds, case.statuses):
+                with self.subTest(endpoint=case.name, method=case.method, role=role):
+                    queries, response = self.measure(case, role)
+                    # A view that starts failing early would otherwise pass with fewer queries
+                    self.assertEqual(response.status_code, expected, self.report(case, role, queries, response, bound))
+                    self.assertLessEqual(len(queries), bound, self.report(case, role, queries, response, bound))
+
+    def report(self, case, role, queries, response, bound):
+        shapes = {}
+        for query in queries.captured_queries:
+            key, shape = fingerprint(query['sql'])
+            count, _ = shapes.get(key, (0, shape))
+            shapes[key] = (count + 1, shape)
+        repeated = ''.join(f'\n  {count}x {shape[:200]}' for count, shape in shapes.values() if count > 1)
+        return (
+            f'{case.method.upper()} {case.name} as {role} (scale {self.scale}, status {response.status_code}): '
+            f'{len(queries)} queries, bound {bound}{repeated}'
+        )
+
+
+class QueryCountAt10xTests(QueryCountTests):
+    """The same bounds with ten times the data"""
+    scale = 10
@@ -0,0 +1,92 @@
+"""
+Complaint transitions: agent counters and availability, and the state guards.
+"""
+from django.test import TestCase, override_settings
+from apps.complaints import transitions
+from apps.complaints.models import Complaint, Timeline
+from apps.complaints.transitions import MAX_ACTIVE_CASES, TransitionConflict, TransitionError, resolved_counters
+from apps.users.models import User
+from .fixtures import _complaint, _users
+
+
+@override_settings(ENABLE_EMAIL_NOTIFICATIONS=False)
+class TransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, = _users('ADMIN', 1, 'admin')
+        cls.customer, = _users('CUSTOMER', 1, 'customer')
+        cls.agent, cls.other_agent = _users('AGENT', 2, 'agent', is_verified=True)
+        User.objects.filter(pk=cls.agent.pk).update(current_active_cases=MAX_ACTIVE_CASES - 1, total_assigned_cases=10)
+
+    def setUp(self):
+        self.complaint = _complaint(self.customer)
+        self.complaint.save()
+
+    def agent_state(self, agent=None):
+        return User.objects.get(pk=(agent or self.agent).pk)
+
+    def test_last_slot_makes_the_agent_busy_and_resolving_frees_it(self):
+        transitions.assign(self.complaint, self.agent, self.admin)
+        agent = self.agent_state()
+        self.assertEqual((agent.current_active_cases, agent.total_assigned_cases), (MAX_ACTIVE_CASES, 11))
+        self.assertEqual(agent.agent_status, 'BUSY')
+        self.assertFalse(agent.is_available)
+
+        transitions.resolve(self.complaint, agent, 'Fixed')
+        agent = self.agent_state()
+        self.assertEqual((agent.current_active_cases, agent.total_resolved_cases), (MAX_ACTIVE_CASES - 1, 1))
+        self.assertEqual(agent.agent_status, 'AVAILABLE')
+        self.assertTrue(agent.is_available)
+        self.assertEqual(Complaint.objects.get(pk=self.complaint.pk).status, 'RESOLVED')
+
+    def test_unassigning_frees_the_slot(self):
+        transitions.assign(self.complaint, self.agent, self.admin)
+        transitions.unassign(Complaint.objects.get(pk=self.complaint.pk), self.admin)
+        agent = self.agent_state()
+        self.assertEqual((agent.current_active_cases, agent.agent_status), (MAX_ACTIVE_CASES - 1, 'AVAILABLE'))
+
+    def test_reassigning_moves_the_slot(self):
+        transitions.assign(self.complaint, self.agent, self.admin)
+        transitions.assign(Complaint.objects.get(pk=self.complaint.pk), self.other_agent, self.admin)
+        agent, other = self.agent_state(), self.agent_state(self.other_agent)
+        self.assertEqual((agent.current_active_cases, agent.agent_status), (MAX_ACTIVE_CASES - 1, 'AVAILABLE'))
+        self.assertEqual((other.current_active_cases, other.agent_status), (1, 'AVAILABLE'))
+
+    def test_offline_agent_stays_offline(self):
+        User.objects.filter(pk=self.agent.pk).update(agent_status='OFFLINE')
+        transitions.assign(self.complaint, self.agent, self.admin)
+        transitions.resolve(Complaint.objects.get(pk=self.complaint.pk), self.admin)
+        self.assertEqual(self.agent_state().agent_status, 'OFFLINE')
+
+    def test_counters_do_not_go_negative(self):
+        User.objects.filter(pk=self.other_agent.pk).update(**resolved_counters(3, hours=30.0))
+        other = self.agent_state(self.other_agent)
+        self.assertEqual((other.current_active_cases, other.total_resolved_cases), (0, 3))
+        self.assertAlmostEqual(other.average_resolution_time_hours, 10.0)
+
+    def test_running_average(self):
+        User.objects.filter(pk=self.agent.pk).update(total_resolved_cases=2, average_resolution_time_hours=4.0)
+        User.objects.filter(pk=self.agent.pk).update(**resolved_counters(2, hours=16.0))
+        agent = self.agent_state()
+        self.assertEqual(agent.total_resolved_cases, 4)
+        self.assertAlmostEqual(agent.average_resolution_time_hours, 6.0)
+
+    def test_guards(self):
+        transitions.resolve(self.complaint, self.admin)
+        with self.assertRaises(TransitionError):
+            transitions.resolve(self.complaint, self.admin)
+        with self.assertRaises(TransitionError):
+            transitions.assign(self.complaint, self.agent, self.admin)
+        self.assertEqual(self.agent_state().current_active_cases, MAX_ACTIVE_CASES - 1)
+
+    def test_stale_complaint_conflicts_and_changes_nothing(self):
+        stale = Complaint.objects.get(pk=self.complaint.pk)
+        transitions.assign(self.complaint, self.other_agent, self.admin)
+        with self.assertRaises(TransitionConflict):
+            transitions.assign(stale, self.agent, self.admin)
+        self.assertEqual(Complaint.objects.get(pk=self.complaint.pk).assigned_to_id, self.other_agent.pk)
+        self.assertEqual(self.agent_state().current_active_cases, MAX_ACTIVE_CASES - 1)
+        self.assertEqual(
+            list(Timeline.objects.filter(complaint=self.complaint).values_list('action', flat=True)), ['ASSIGNED'],
+        )
+
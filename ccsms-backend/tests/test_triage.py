@@ -0,0 +1,77 @@
+"""
+The compiled RuleEngine picks the same rule as the per-keyword loop it replaced.
+"""
+import random
+from django.test import SimpleTestCase
+from apps.complaints.management.commands.bench_triage_rules import CATEGORIES, PRIORITIES, legacy_match
+from apps.complaints.triage import RuleEngine, RuleSpec
+
+# Few short fragments, so keywords overlap, nest and occur inside each other and inside the text
+FRAGMENTS = ['disk', 'isk', 'full', 'disk full', 'sk f', 'battery', 'bat', 'tery', 'screen', 'scr', 'en ', 'a']
+FILLER = ['my', 'the', 'phone', 'is', 'broken', 'since', 'update', 'Disk', 'BATTERY', 'ful', 'di', 'sk']
+
+
+def random_rules(rng, count):
+    return [
+        RuleSpec(
+            id=index,
+            category=rng.choice([None, '', *CATEGORIES]),
+            priority=rng.choice([None, '', *PRIORITIES]),
+            keywords=rng.choice([[], None, rng.sample(FRAGMENTS, rng.randint(1, 3))]),
+        )
+        for index in range(count)
+    ]
+
+
+def random_text(rng):
+    words = rng.choices(FILLER + FRAGMENTS, k=rng.randint(0, 8))
+    return ' '.join(word.upper() if rng.random() < 0.2 else word for word in words)
+
+
+class RuleEngineTests(SimpleTestCase):
+    def assertSameRule(self, rules, category, priority, title, description):
+        expected = legacy_match(rules, category, priority, title, description)
+        actual = RuleEngine(rules).match(category, priority, title, description)
+        self.assertIs(actual, expected, f'{category} {priority} {title!r} {description!r}')
+
+    def test_matches_the_loop(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            rules = random_rules(rng, rng.randint(1, 12))
+            engine = RuleEngine(rules)
+            for _ in range(20):
+                complaint = (rng.choice(CATEGORIES), rng.choice(PRIORITIES), random_text(rng), random_text(rng))
+                self.assertIs(engine.match(*complaint), legacy_match(rules, *complaint), complaint)
+
+    def test_nested_keyword_of_an_earlier_rule(self):
+        # 'isk' sits inside the longest keyword found at that position, 'disk full'
+        rules = [
+            RuleSpec(1, None, None, ['isk']),
+            RuleSpec(2, None, None, ['disk full']),
+        ]
+        self.assertSameRule(rules, 'TECHNICAL', 'LOW', 'Disk full again', '')
+        self.assertEqual(RuleEngine(rules).match('TECHNICAL', 'LOW', 'Disk full again', '').id, 1)
+
+    def test_keyword_does_not_span_title_and_description(self):
+        rules = [RuleSpec(1, None, None, ['disk full'])]
+        self.assertSameRule(rules, 'TECHNICAL', 'LOW', 'disk', 'full')
+        self.assertIsNone(RuleEngine(rules).match('TECHNICAL', 'LOW', 'disk', 'full'))
+
+    def test_filters(self):
+        rules = [
+            RuleSpec(1, 'SERVICE', 'HIGH', ['late']),
+            RuleSpec(2, 'SERVICE', None, []),
+            RuleSpec(3, None, None, ['late']),
+        ]
+        for category, priority in (('SERVICE', 'HIGH'), ('SERVICE', 'LOW'), ('TECHNICAL', 'HIGH')):
+            with self.subTest(category=category, priority=priority):
+                self.assertSameRule(rules, category, priority, 'Technician was late', '')
+                self.assertSameRule(rules, category, priority, 'No show', '')
+
+    def test_empty_keyword_matches_everything(self):
+        rules = [RuleSpec(1, None, 'LOW', ['']), RuleSpec(2, None, None, ['x'])]
+        self.assertSameRule(rules, 'TECHNICAL', 'LOW', '', '')
+        self.assertSameRule(rules, 'TECHNICAL', 'HIGH', 'x', '')
+
+    def test_no_rules(self):
+        self.assertIsNone(RuleEngine([]).match('TECHNICAL', 'LOW', 'anything', 'at all'))
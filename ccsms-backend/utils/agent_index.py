@@ -0,0 +1,292 @@
+"""
+Process-local index of assignable agents.
+
+Finding local agents used to mean scanning the agent table (pincode,
+pincode__startswith, service_type) for every complaint. Each process instead
+keeps the active agents in memory:
+
+- a pincode trie: every node holds the ids of the agents whose pincode
+  starts with its prefix and of those whose pincode ends there, so an exact
+  or prefix lookup is a walk of a few characters, whatever the number of
+  agents;
+- service-type buckets: agent ids per service type;
+- the agents whose pincode is not in the pincode table (utils.pincode_geo),
+  which are only ever compared by pincode; the others are found by distance
+  (`within`);
+- the live workload: open and in-progress complaints per agent, kept with
+  the assignee of every active complaint so a reassignment moves one unit of
+  workload from one agent to the other.
+
+It is built once (two queries) and then refreshed incrementally: before a
+lookup older than AGENT_INDEX_MAX_AGE seconds, the users changed since the
+last refresh (last_activity) and the complaints changed since then
+(updated_at) are read again, both through an index, so every process sees
+the changes made by the others. Rows are read again from a few seconds
+before the last refresh, since a transaction can commit after a later one.
+User and complaint signals mark the rows this process saved, so they are
+read on the next lookup without waiting. What neither notices (rows deleted
+by another process, raw SQL) is picked up by a full rebuild every
+AGENT_INDEX_REBUILD_SECONDS.
+
+`index.version` changes whenever an agent's scoring inputs (pincode,
+service type, status, verification) or an agent's workload change, and keeps
+increasing across rebuilds, so results computed from the index can be kept
+until it moves (the recommendation cache in utils.ai_assignment).
+
+Lookups hold `index.lock`; the sets they return are live and must not be
+modified.
+"""
+import itertools
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from apps.complaints.models import Complaint
+from apps.users.models import User
+from .pincode_geo import get_pincode_tree
+
+ACTIVE_STATUSES = ('OPEN', 'IN_PROGRESS')
+OVERLAP = timedelta(seconds=5)
+EMPTY = frozenset()
+_versions = itertools.count(1)
+
+Agent = namedtuple('Agent', 'id email pincode service_type agent_status is_verified')
+AGENT_FIELDS = ('id', 'email', 'pincode', 'service_type', 'agent_status', 'is_verified')
+
+
+class _Node:
+    __slots__ = ('below', 'here', 'children')
+
+    def __init__(self):
+        self.below = set()  # agents whose pincode starts with this prefix
+        self.here = set()  # agents whose pincode is this prefix
+        self.children = {}
+
+
+class PincodeTrie:
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, pincode, agent_id):
+        node = self.root
+        node.below.add(agent_id)
+        for char in pincode:
+            node = node.children.setdefault(char, _Node())
+            node.below.add(agent_id)
+        node.here.add(agent_id)
+
+    def remove(self, pincode, agent_id):
+        node = self.root
+        path = [node]
+        for char in pincode:
+            node = node.children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        node.here.discard(agent_id)
+        for node in path:
+            node.below.discard(agent_id)
+        # Drop the branches no agent is under any more
+        for parent, char in zip(reversed(path[:-1]), reversed(pincode)):
+            if parent.children[char].below:
+                break
+            del parent.children[char]
+
+    def _find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def exact(self, pincode):
+        """Ids of the agents with this pincode ('' for agents without one)"""
+        node = self._find(pincode)
+        return node.here if node else EMPTY
+
+    def prefix(self, prefix):
+        """Ids of the agents whose pincode starts with `prefix`"""
+        node = self._find(prefix)
+        return node.below if node else EMPTY
+
+
+class AgentIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.agents = {}  # id -> Agent, active agents only
+        self.pincodes = PincodeTrie()
+        self.service_types = defaultdict(set)  # service type ('' for none) -> ids
+        self.unlocated = set()  # ids of agents with a pincode missing from the pincode table
+        self.assignees = {}  # active complaint id -> agent id
+        self.workload = defaultdict(int)  # agent id -> active complaints
+        self.dirty_agents = set()
+        self.dirty_complaints = set()
+        self.since = None  # changes from here on are still to be read
+        self.built = self.refreshed = 0.0  # time.monotonic()
+        self.version = next(_versions)
+
+    def build(self):
+        with self.lock:
+            started = timezone.now()
+            for row in User.objects.filter(role='AGENT', is_active=True).values_list(*AGENT_FIELDS):
+                self._put(Agent(*row))
+            active = Complaint.objects.filter(status__in=ACTIVE_STATUSES, assigned_to__isnull=False)
+            for complaint_id, agent_id in active.values_list('id', 'assigned_to'):
+                self._assign(complaint_id, agent_id)
+            self.since = started - OVERLAP
+            self.built = self.refreshed = time.monotonic()
+
+    def refresh(self):
+        """Read the users and complaints changed since the last refresh"""
+        with self.lock:
+            started = timezone.now()
+            dirty_agents, self.dirty_agents = self.dirty_agents, set()
+            dirty_complaints, self.dirty_complaints = self.dirty_complaints, set()
+
+            users = User.objects.filter(Q(last_activity__gte=self.since) | Q(pk__in=dirty_agents))
+            for row in users.values_list('role', 'is_active', *AGENT_FIELDS):
+                role, is_active, agent = row[0], row[1], Agent(*row[2:])
+                dirty_agents.discard(agent.id)
+                if role == 'AGENT' and is_active:
+                    self._put(agent)
+                else:
+                    self._remove(agent.id)
+            for agent_id in dirty_agents:  # deleted
+                self._remove(agent_id)
+
+            complaints = Complaint.objects.filter(Q(updated_at__gte=self.since) | Q(pk__in=dirty_complaints))
+            for complaint_id, agent_id, status in complaints.values_list('id', 'assigned_to', 'status'):
+                dirty_complaints.discard(complaint_id)
+                self._assign(complaint_id, agent_id if status in ACTIVE_STATUSES else None)
+            for complaint_id in dirty_complaints:  # deleted
+                self._assign(complaint_id, None)
+
+            self.since = started - OVERLAP
+            self.refreshed = time.monotonic()
+
+    def is_stale(self):
+        return (
+            bool(self.dirty_agents or self.dirty_complaints)
+            or time.monotonic() - self.refreshed >= settings.AGENT_INDEX_MAX_AGE
+        )
+
+    def _put(self, agent):
+        if self.agents.get(agent.id) == agent:
+            return  # read again without a change that matters here
+        self._remove(agent.id)
+        self.version = next(_versions)
+        self.agents[agent.id] = agent
+        self.pincodes.add(agent.pincode or '', agent.id)
+        self.service_types[agent.service_type or ''].add(agent.id)
+        if agent.pincode:
+            tree = get_pincode_tree()
+            if tree is None or tree.locate(agent.pincode) is None:
+                self.unlocated.add(agent.id)
+
+    def _remove(self, agent_id):
+        agent = self.agents.pop(agent_id, None)
+        if agent is None:
+            return
+        self.version = next(_versions)
+        self.pincodes.remove(agent.pincode or '', agent_id)
+        self.unlocated.discard(agent_id)
+        bucket = self.service_types[agent.service_type or '']
+        bucket.discard(agent_id)
+        if not bucket:
+            del self.service_types[agent.service_type or '']
+
+    def _assign(self, complaint_id, agent_id):
+        """Record the complaint's current assignee (None: not active or unassigned)"""
+        if self.assignees.get(complaint_id) == agent_id:
+            return
+        self.version = next(_versions)
+        previous = self.assignees.pop(complaint_id, None)
+        if previous is not None:
+            self.workload[previous] -= 1
+            if not self.workload[previous]:
+                del self.workload[previous]
+        if agent_id is not None:
+            self.assignees[complaint_id] = agent_id
+            self.workload[agent_id] += 1
+
+    def within(self, pincode, km):
+        """
+        {agent id: distance} of the agents whose pincode centroid is within
+        `km` of `pincode`'s; None if `pincode` is not in the pincode table.
+        """
+        tree = get_pincode_tree()
+        origin = tree.locate(pincode) if tree else None
+        if origin is None:
+            return None
+        codes, distances = tree.within(origin, km)
+        with self.lock:
+            return {
+                agent_id: distance
+                for code, distance in zip(codes.tolist(), distances.tolist())
+                for agent_id in self.pincodes.exact(str(code))
+            }
+
+    def local_agents(self, pincode, service_type=None, verified=True, km=None):
+        """
+        (same pincode, nearby) verified agents, optionally of one service
+        type, least busy first. Nearby is within `km` of the pincode, or for
+        pincodes without a centroid (or without `km`) the same area: the
+        first 3 digits of the pincode.
+        """
+        with self.lock:
+            exact = self.pincodes.exact(pincode)
+            area = self.pincodes.prefix(pincode[:3]) if len(pincode) >= 3 else EMPTY
+            nearby = self.within(pincode, km) if km is not None else None
+            if nearby is not None:
+                area = nearby.keys() | (area & self.unlocated)
+            area = area - exact
+            if service_type:
+                bucket = self.service_types.get(service_type, EMPTY)
+                exact, area = exact & bucket, area & bucket
+            return tuple(
+                sorted(
+                    (self.agents[agent_id] for agent_id in ids if self.agents[agent_id].is_verified or not verified),
+                    key=lambda agent: (self.workload.get(agent.id, 0), agent.id)
+                )
+                for ids in (exact, area)
+            )
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_agent_index():
+    """This process's agent index, refreshed if older than AGENT_INDEX_MAX_AGE"""
+    global _index
+    with _lock:
+        if _index is None or time.monotonic() - _index.built >= settings.AGENT_INDEX_REBUILD_SECONDS:
+            index = AgentIndex()
+            index.build()
+            _index = index
+        elif _index.is_stale():
+            _index.refresh()
+        return _index
+
+
+def reset_agent_index():
+    """Drop this process's index; the next lookup builds it again"""
+    global _index
+    with _lock:
+        _index = None
+
+
+def agents_changed(*pks):
+    """Read these users again on the next lookup (User signals)"""
+    if _index is not None:
+        _index.dirty_agents.update(pks)
+
+
+def complaints_changed(*pks):
+    """Read these complaints again on the next lookup (Complaint signals)"""
+    if _index is not None:
+        _index.dirty_complaints.update(pks)
@@ -1,200 +1,423 @@
-from apps.users.models import User
-from apps.complaints.models import Complaint
-from django.db.models import Count, Avg, Q
-from datetime import datetime, timedelta
+"""
+Rule-based agent recommendations with confidence scores.
+
+An agent's score is a weighted sum of four sub-scores: expertise (service
+type against the complaint category), workload (open and in-progress
+complaints), location and track record (complaints of this category
+resolved in the last 90 days). Agents are scored as NumPy arrays in one
+pass, and the reasoning text is built from the sub-scores already computed
+for the chosen agents.
+
+Location is the distance between the centroids of the complaint's and the
+agent's pincodes (utils.pincode_geo): the same pincode scores 1.0, and
+another one from 0.9 next door down to the 0.4 of anywhere else at
+NEARBY_KM. Pincodes missing from the pincode table are compared as before,
+by their first 3 digits (the postal district).
+
+Only a short list is scored. The process-local agent index
+(utils.agent_index) knows every agent's pincode, service type and workload,
+which settle 90% of the score; the track record can add at most 0.05 more
+than its neutral value. The index hands out agents in groups of equal
+location and expertise (pincode trie, agents within NEARBY_KM from the
+pincode KD-tree, service-type buckets), best possible score first, until no remaining group can reach the top `limit`; only the
+agents that still can get their track record counted, in one query.
+load_agent_features() scores every agent from the database instead (two
+queries) and gives the same recommendations.
+
+Admins open the same complaints again and again, so each process keeps the
+recommendations per complaint, for the agent index version, category and
+pincode they were computed at. The index version moves on any change to an
+agent's pincode, service type, status, verification or workload (also made
+by other processes: the index reads those before a lookup), so a repeated
+view costs one dictionary read until something it depends on changes.
+"""
+import heapq
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
 import logging
+import uuid
+import numpy as np
+from django.conf import settings
+from django.db.models import CharField, Count, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+from apps.complaints.models import Complaint
+from apps.users.models import User
+from .agent_index import EMPTY, agents_changed, get_agent_index
+from .pincode_geo import get_pincode_tree, kilometres
 
 logger = logging.getLogger(__name__)
 
+# Service types that count as expertise for each complaint category
+CATEGORY_EXPERTISE = {
+    'ELECTRONICS': ['Electronics', 'Technical', 'IT'],
+    'APPLIANCES': ['Appliances', 'Home', 'Repair'],
+    'PLUMBING': ['Plumbing', 'Water', 'Maintenance'],
+    'ELECTRICAL': ['Electrical', 'Power', 'Wiring'],
+    'BILLING': ['Billing', 'Finance', 'Account'],
+    'TECHNICAL': ['Technical', 'IT', 'Software'],
+    'OTHER': ['General', 'Support']
+}
+ACTIVE_STATUSES = ['OPEN', 'IN_PROGRESS']
+PERFORMANCE_DAYS = 90
+WEIGHTS = {'category': 0.4, 'workload': 0.3, 'location': 0.2, 'performance': 0.1}
+NEUTRAL_PERFORMANCE = 0.5  # the lowest performance score
+# Slack for comparing bounds summed in a different order than the scores
+EPSILON = 1e-9
+# Larger short lists count the track record of every agent rather than list them in the query
+MAX_SHORTLIST_PARAMS = 500
+# Distance at which another pincode scores no better than anywhere else
+NEARBY_KM = 50
+
+
+@dataclass
+class AgentFeatures:
+    """Column arrays for agents, ordered by id"""
+    ids: list  # as text
+    service_types: np.ndarray  # str, '' when unset
+    pincodes: np.ndarray  # str, '' when unset
+    active: np.ndarray  # open and in-progress complaints
+    resolved: np.ndarray  # resolved in the complaint's category, last PERFORMANCE_DAYS
+
+
+@dataclass
+class AgentScores:
+    category: np.ndarray
+    workload: np.ndarray
+    location: np.ndarray
+    performance: np.ndarray
+    total: np.ndarray
+
+
+class RecommendationCache:
+    """Least recently used recommendations per complaint, each valid for one key"""
+
+    def __init__(self):
+        self.entries = OrderedDict()  # complaint pk -> (key, recommendations)
+        self.lock = threading.Lock()
+
+    def get(self, pk, key):
+        with self.lock:
+            entry = self.entries.get(pk)
+            if entry is None or entry[0] != key:
+                return None
+            self.entries.move_to_end(pk)
+            return entry[1]
+
+    def put(self, pk, key, recommendations):
+        with self.lock:
+            self.entries[pk] = (key, recommendations)
+            self.entries.move_to_end(pk)
+            while len(self.entries) > settings.AGENT_RECOMMENDATIONS_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_recommendations = RecommendationCache()
+
+
 class AIAssignmentEngine:
     """Simple AI-based assignment engine with rule-based logic and confidence scoring"""
-    
+
     def __init__(self):
         self.workload_threshold = 5  # Max active complaints per agent
-        
-    def get_agent_recommendations(self, complaint):
-        """Get AI recommendations for agent assignment"""
+        self.min_confidence = 0.3
+
+    def get_agent_recommendations(self, complaint, limit=3):
+        """Get AI recommendations for agent assignment: the best `limit` agents above the minimum confidence"""
         try:
-            recommendations = []
-            
-            # Get all active agents
-            agents = User.objects.filter(
-                role='AGENT',
-                is_active=True
+            index = get_agent_index()
+            key = (
+                index.version, complaint.category, complaint.pincode or '',
+                limit, self.workload_threshold, self.min_confidence
             )
-            
-            for agent in agents:
-                score = self.calculate_assignment_score(complaint, agent)
-                if score > 0.3:  # Minimum confidence threshold
-                    recommendations.append({
-                        'agent': agent,
-                        'confidence_score': score,
-                        'reasoning': self.get_assignment_reasoning(complaint, agent, score)
-                    })
-            
-            # Sort by confidence score
-            recommendations.sort(key=lambda x: x['confidence_score'], reverse=True)
-            return recommendations[:3]  # Top 3 recommendations
-            
+            recommendations = _recommendations.get(complaint.pk, key)
+            if recommendations is None:
+                recommendations = self.recommend(complaint, self.candidate_features(complaint, limit, index), limit)
+                _recommendations.put(complaint.pk, key, recommendations)
+            return list(recommendations)
         except Exception as e:
             logger.error(f"AI Assignment error: {e}")
             return []
-    
-    def calculate_assignment_score(self, complaint, agent):
-        """Calculate confidence score for agent assignment (0-1)"""
-        score = 0.0
-        
-        # 1. Category/Expertise Match (40% weight)
-        category_score = self.get_category_match_score(complaint, agent)
-        score += category_score * 0.4
-        
-        # 2. Workload Factor (30% weight)
-        workload_score = self.get_workload_score(agent)
-        score += workload_score * 0.3
-        
-        # 3. Location Proximity (20% weight)
-        location_score = self.get_location_score(complaint, agent)
-        score += location_score * 0.2
-        
-        # 4. Historical Performance (10% weight)
-        performance_score = self.get_performance_score(agent, complaint.category)
-        score += performance_score * 0.1
-        
-        return min(score, 1.0)  # Cap at 1.0
-    
-    def get_category_match_score(self, complaint, agent):
-        """Score based on category/expertise match"""
-        if not hasattr(agent, 'service_type') or not agent.service_type:
-            return 0.5  # General agent gets neutral score
-            
-        # Direct category mapping
-        category_mapping = {
-            'ELECTRONICS': ['Electronics', 'Technical', 'IT'],
-            'APPLIANCES': ['Appliances', 'Home', 'Repair'],
-            'PLUMBING': ['Plumbing', 'Water', 'Maintenance'],
-            'ELECTRICAL': ['Electrical', 'Power', 'Wiring'],
-            'BILLING': ['Billing', 'Finance', 'Account'],
-            'TECHNICAL': ['Technical', 'IT', 'Software'],
-            'OTHER': ['General', 'Support']
-        }
-        
-        complaint_categories = category_mapping.get(complaint.category, ['General'])
-        if agent.service_type in complaint_categories:
-            return 1.0  # Perfect match
-        elif any(cat.lower() in agent.service_type.lower() for cat in complaint_categories):
-            return 0.7  # Partial match
-        else:
-            return 0.4  # No match but still possible
-    
-    def get_workload_score(self, agent):
-        """Score based on current workload"""
-        active_complaints = Complaint.objects.filter(
-            assigned_to=agent,
-            status__in=['OPEN', 'IN_PROGRESS']
-        ).count()
-        
-        if active_complaints >= self.workload_threshold:
-            return 0.1  # Overloaded
-        elif active_complaints == 0:
-            return 1.0  # Available
+
+    def recommend(self, complaint, features, limit=3):
+        """The best `limit` agents of `features` above the minimum confidence"""
+        scores = self.score_agents(complaint, features)
+        best = self.top_agents(scores.total, limit)
+        agent_ids = {i: uuid.UUID(features.ids[i]) for i in best}
+        agents = User.objects.in_bulk(agent_ids.values())
+
+        missing = [agent_id for agent_id in agent_ids.values() if agent_id not in agents]
+        if missing:
+            agents_changed(*missing)  # deleted since the index read them
+        recommendations = []
+        for i in best:
+            agent = agents.get(agent_ids[i])
+            if agent is None:
+                continue
+            agent.active_complaint_count = int(features.active[i])
+            agent.recent_resolved_count = int(features.resolved[i])
+            recommendations.append({
+                'agent': agent,
+                'confidence_score': float(scores.total[i]),
+                'reasoning': self.get_assignment_reasoning(agent, scores, i)
+            })
+        return recommendations
+
+    def load_agent_features(self, complaint):
+        """The scoring inputs of every active agent, in two queries"""
+        # Ids are compared as text: building a UUID per row costs more than the queries
+        rows = list(
+            User.objects.filter(role='AGENT', is_active=True)
+            .order_by('id')
+            .values_list(Cast('id', CharField()), 'service_type', 'pincode')
+        )
+        ids = [row[0] for row in rows]
+        index = {agent_id: i for i, agent_id in enumerate(ids)}
+
+        active = np.zeros(len(ids), dtype=np.int64)
+        resolved = np.zeros(len(ids), dtype=np.int64)
+        is_active = Q(status__in=ACTIVE_STATUSES)
+        is_recent = Q(
+            status='RESOLVED',
+            category=complaint.category,
+            resolved_at__gte=timezone.now() - timedelta(days=PERFORMANCE_DAYS)
+        )
+        counts = (
+            Complaint.objects.filter(is_active | is_recent, assigned_to__isnull=False)
+            .values(agent=Cast('assigned_to', CharField()))
+            .annotate(active=Count('id', filter=is_active), resolved=Count('id', filter=is_recent))
+            .order_by()
+        )
+        for row in counts:
+            i = index.get(row['agent'])
+            if i is not None:  # assigned to someone who is no longer an active agent
+                active[i] = row['active']
+                resolved[i] = row['resolved']
+
+        return AgentFeatures(
+            ids=ids,
+            service_types=np.array([row[1] or '' for row in rows], dtype=str),
+            pincodes=np.array([row[2] or '' for row in rows], dtype=str),
+            active=active,
+            resolved=resolved,
+        )
+
+    def candidate_features(self, complaint, limit, index=None):
+        """Features of the agents from the agent index that can make the top `limit`"""
+        index = index or get_agent_index()
+        with index.lock:
+            agents = [index.agents[agent_id] for agent_id in sorted(self.shortlist(complaint, index, limit))]
+            active = [index.workload.get(agent.id, 0) for agent in agents]
+
+        is_recent = Q(
+            status='RESOLVED',
+            category=complaint.category,
+            resolved_at__gte=timezone.now() - timedelta(days=PERFORMANCE_DAYS)
+        )
+        counts = Complaint.objects.filter(is_recent)
+        if len(agents) <= MAX_SHORTLIST_PARAMS:
+            counts = counts.filter(assigned_to__in=[agent.id for agent in agents])
+        resolved = dict(counts.values_list('assigned_to').annotate(Count('id')).order_by())
+
+        return AgentFeatures(
+            ids=[str(agent.id) for agent in agents],
+            service_types=np.array([agent.service_type or '' for agent in agents], dtype=str),
+            pincodes=np.array([agent.pincode or '' for agent in agents], dtype=str),
+            active=np.array(active, dtype=np.int64),
+            resolved=np.array([resolved.get(agent.id, 0) for agent in agents], dtype=np.int64),
+        )
+
+    def shortlist(self, complaint, index, limit):
+        """
+        Ids of the agents in `index` whose score can make the top `limit`.
+        Call with index.lock held.
+        """
+        # Expertise of every service type, and the agents by location class
+        names = list(index.service_types)
+        expertise = dict(zip(names, self.category_scores(complaint, np.array(names, dtype=str)).tolist())) if names else {}
+        pincode = getattr(complaint, 'pincode', None) or ''
+        if pincode:
+            exact = index.pincodes.exact(pincode)
+            area = index.pincodes.prefix(pincode[:3]) if len(pincode) >= 3 else EMPTY
+            unknown = index.pincodes.exact('')
+            distances = index.within(pincode, NEARBY_KM)
+            # (best location score, agents, location score per agent or None, agents scored under another location)
+            if distances is None:  # not in the pincode table: compared by pincode only
+                places = [(1.0, exact, None, ()), (0.7, area, None, (exact,)), (0.5, unknown, None, ())]
+                local = (area, exact, unknown)
+            else:
+                ids = [agent_id for agent_id in distances if agent_id not in exact]
+                nearby = dict(zip(ids, self.distance_scores(np.array([distances[i] for i in ids])).tolist()))
+                area = area & index.unlocated  # the others are scored by distance
+                places = [
+                    (1.0, exact, None, ()), (max(nearby.values(), default=0.4), nearby, nearby, ()),
+                    (0.7, area, None, ()), (0.5, unknown, None, ()),
+                ]
+                local = (exact, nearby, area, unknown)
+            elsewhere = 0.4
         else:
-            return 1.0 - (active_complaints / self.workload_threshold)
-    
-    def get_location_score(self, complaint, agent):
-        """Score based on location proximity"""
-        if not hasattr(complaint, 'pincode') or not hasattr(agent, 'pincode'):
-            return 0.5  # Neutral if no location data
-            
-        if not complaint.pincode or not agent.pincode:
-            return 0.5  # Neutral if no location data
-            
-        if complaint.pincode == agent.pincode:
-            return 1.0  # Same pincode
-        elif len(complaint.pincode) >= 3 and len(agent.pincode) >= 3 and complaint.pincode[:3] == agent.pincode[:3]:
-            return 0.7  # Same area (first 3 digits)
+            places, elsewhere, local = [], 0.5, ()
+
+        # (best possible score without workload and track record, group key, location score, agents,
+        #  location score per agent, skip)
+        groups = [
+            (WEIGHTS['category'] * category + WEIGHTS['location'] * location, ('place', n), location, ids, scores, skip)
+            for n, (location, ids, scores, skip) in enumerate(places)
+            for category in set(expertise.values())
+        ] + [
+            (WEIGHTS['category'] * expertise[name] + WEIGHTS['location'] * elsewhere, ('bucket', name), elsewhere,
+             bucket, None, local)
+            for name, bucket in index.service_types.items()
+        ]
+        groups.sort(key=lambda group: -group[0])
+        best_extra = WEIGHTS['workload'] + WEIGHTS['performance']
+
+        partial = {}  # agent id -> score without the track record
+        floors = []  # heap of the `limit` best guaranteed scores
+        visited = set()
+        for bound, key, best, ids, scores, skip in groups:
+            if len(floors) == limit and bound + best_extra < floors[0] - EPSILON:
+                break  # neither this group nor any later one can make it
+            if key in visited:
+                continue  # the agents of a location class are taken at once, whatever their expertise
+            visited.add(key)
+            for agent_id in ids:
+                if any(agent_id in other for other in skip):
+                    continue
+                agent = index.agents[agent_id]
+                active = index.workload.get(agent_id, 0)
+                workload = 0.1 if active >= self.workload_threshold else 1.0 - active / self.workload_threshold
+                score = (
+                    expertise[agent.service_type or ''] * WEIGHTS['category']
+                    + workload * WEIGHTS['workload']
+                    + (scores[agent_id] if scores is not None else best) * WEIGHTS['location']
+                )
+                partial[agent_id] = score
+                floor = score + NEUTRAL_PERFORMANCE * WEIGHTS['performance']
+                if len(floors) < limit:
+                    heapq.heappush(floors, floor)
+                elif floor > floors[0]:
+                    heapq.heapreplace(floors, floor)
+
+        cutoff = floors[0] if len(floors) == limit else -1.0
+        ceiling = WEIGHTS['performance']
+        return [
+            agent_id for agent_id, score in partial.items()
+            if score + ceiling >= cutoff - EPSILON and score + ceiling > self.min_confidence
+        ]
+
+    def score_agents(self, complaint, features):
+        """Sub-scores and confidence (0-1) of every agent in `features`"""
+        category = self.category_scores(complaint, features.service_types)
+        workload = self.workload_scores(features.active)
+        location = self.location_scores(complaint, features.pincodes)
+        performance = self.performance_scores(features.resolved)
+        total = (
+            category * WEIGHTS['category'] + workload * WEIGHTS['workload']
+            + location * WEIGHTS['location'] + performance * WEIGHTS['performance']
+        )
+        return AgentScores(category, workload, location, performance, np.minimum(total, 1.0))
+
+    def top_agents(self, total, limit):
+        """Indexes of the `limit` best scores above the minimum, best first; ties keep id order"""
+        candidates = np.flatnonzero(total > self.min_confidence)
+        if len(candidates) > limit:
+            # Only sort the candidates that can make the cut
+            cutoff = np.partition(total[candidates], -limit)[-limit]
+            candidates = candidates[total[candidates] >= cutoff]
+        order = np.argsort(-total[candidates], kind='stable')
+        return candidates[order][:limit].tolist()
+
+    def category_scores(self, complaint, service_types):
+        """Expertise: exact service type 1.0, partial (substring) 0.7, other 0.4, none set 0.5"""
+        expertise = CATEGORY_EXPERTISE.get(complaint.category, ['General'])
+        lowered = np.char.lower(service_types)
+        partial = np.zeros(len(service_types), dtype=bool)
+        for name in expertise:
+            partial |= np.char.find(lowered, name.lower()) >= 0
+        scores = np.where(np.isin(service_types, expertise), 1.0, np.where(partial, 0.7, 0.4))
+        return np.where(service_types == '', 0.5, scores)
+
+    def workload_scores(self, active):
+        """Available 1.0, falling linearly with active complaints; 0.1 at the threshold"""
+        return np.where(active >= self.workload_threshold, 0.1, 1.0 - active / self.workload_threshold)
+
+    def location_scores(self, complaint, pincodes):
+        """
+        Same pincode 1.0, others by distance (distance_scores); where either
+        pincode is not in the pincode table, same area (first 3 digits) 0.7,
+        elsewhere 0.4. Unknown 0.5.
+        """
+        pincode = getattr(complaint, 'pincode', None)
+        if not pincode:
+            return np.full(len(pincodes), 0.5)
+        if len(pincode) >= 3:
+            # Casting to U3 keeps the first 3 characters
+            same_area = (np.char.str_len(pincodes) >= 3) & (pincodes.astype('U3') == pincode[:3])
         else:
-            return 0.4  # Different area but still workable
-    
-    def get_performance_score(self, agent, category):
-        """Score based on historical performance"""
-        try:
-            # Get agent's performance in this category
-            resolved_complaints = Complaint.objects.filter(
-                assigned_to=agent,
-                category=category,
-                status='RESOLVED',
-                resolved_at__gte=datetime.now() - timedelta(days=90)
-            )
-            
-            if not resolved_complaints.exists():
-                return 0.5  # Neutral if no history
-                
-            # Calculate average resolution time
-            avg_resolution_time = resolved_complaints.aggregate(
-                avg_time=Avg('resolved_at') - Avg('created_at')
-            )
-            
-            # Simple scoring based on resolution count (more = better)
-            resolution_count = resolved_complaints.count()
-            if resolution_count >= 10:
-                return 1.0
-            elif resolution_count >= 5:
-                return 0.8
-            elif resolution_count >= 1:
-                return 0.6
-            else:
-                return 0.4
-                
-        except Exception:
-            return 0.5
-    
-    def get_assignment_reasoning(self, complaint, agent, score):
-        """Generate human-readable reasoning for assignment"""
+            same_area = np.zeros(len(pincodes), dtype=bool)
+        scores = np.where(same_area, 0.7, 0.4)
+        tree = get_pincode_tree()
+        origin = tree.locate(pincode) if tree else None
+        if origin is not None:
+            found, xyz = tree.locate_many(pincodes)
+            scores = np.where(found, self.distance_scores(kilometres(xyz, origin)), scores)
+        scores = np.where(pincodes == pincode, 1.0, scores)
+        return np.where(pincodes == '', 0.5, scores)
+
+    def distance_scores(self, km):
+        """0.9 at the same place, falling linearly to 0.4 at NEARBY_KM and beyond"""
+        return 0.4 + 0.5 * np.clip(1.0 - km / NEARBY_KM, 0.0, 1.0)
+
+    def performance_scores(self, resolved):
+        """Track record in the category: 10+ resolved 1.0, 5+ 0.8, 1+ 0.6, no history 0.5"""
+        return np.select([resolved >= 10, resolved >= 5, resolved >= 1], [1.0, 0.8, 0.6], 0.5)
+
+    def get_assignment_reasoning(self, agent, scores, i):
+        """Generate human-readable reasoning from agent `i`'s sub-scores"""
         reasons = []
-        
-        # Category match
-        category_score = self.get_category_match_score(complaint, agent)
-        if category_score >= 0.7:
+
+        if scores.category[i] >= 0.7:
             reasons.append(f"Expertise match: {agent.service_type}")
-        
-        # Workload
-        workload_score = self.get_workload_score(agent)
-        if workload_score >= 0.8:
+
+        if scores.workload[i] >= 0.8:
             reasons.append("Low workload")
-        elif workload_score < 0.3:
+        elif scores.workload[i] < 0.3:
             reasons.append("High workload")
-        
-        # Location
-        location_score = self.get_location_score(complaint, agent)
-        if location_score >= 0.7:
+
+        if scores.location[i] >= 0.7:
             reasons.append("Local agent")
-        
-        # Performance
-        performance_score = self.get_performance_score(agent, complaint.category)
-        if performance_score >= 0.8:
+
+        if scores.performance[i] >= 0.8:
             reasons.append("Strong track record")
-        
+
         return " • ".join(reasons) if reasons else "General assignment"
-    
+
     def auto_assign_best_agent(self, complaint):
         """Automatically assign to the best agent if confidence is high enough"""
         try:
             recommendations = self.get_agent_recommendations(complaint)
-            
+
             if recommendations and recommendations[0]['confidence_score'] >= 0.6:  # Lower threshold for better assignment
                 best_agent = recommendations[0]['agent']
                 complaint.assigned_to = best_agent
                 complaint.status = 'IN_PROGRESS'
                 complaint.save()
-                
+
                 return {
                     'assigned': True,
                     'agent': best_agent,
                     'confidence': recommendations[0]['confidence_score'],
                     'reasoning': recommendations[0]['reasoning']
                 }
-            
+
             return {'assigned': False, 'recommendations': recommendations}
         except Exception as e:
             logger.error(f"Auto assignment failed: {e}")
-            return {'assigned': False, 'recommendations': []}
\ No newline at end of file
+            return {'assigned': False, 'recommendations': []}
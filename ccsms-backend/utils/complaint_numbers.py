@@ -0,0 +1,94 @@
+import os
+import threading
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+PREFIX = 'TKT'
+
+# Per-process block of pre-reserved numbers: [next, end]
+_block = {'pid': None, 'next': 1, 'end': 0}
+_lock = threading.Lock()
+
+
+def format_complaint_number(value):
+    """Render a sequence value in the TKT-000123 format"""
+    return f"{PREFIX}-{value:06d}"
+
+
+def current_max_complaint_number():
+    """Highest numeric suffix among existing TKT- complaint numbers (0 if none)"""
+    from apps.complaints.models import Complaint
+
+    last_value = 0
+    numbers = Complaint.objects.filter(complaint_number__startswith=f'{PREFIX}-').values_list('complaint_number', flat=True)
+    for number in numbers.iterator(chunk_size=5000):
+        try:
+            last_value = max(last_value, int(number.split('-')[1]))
+        except (IndexError, ValueError):
+            continue
+    return last_value
+
+
+def _reserve(count):
+    """
+    Reserve `count` consecutive values from the counter row.
+    Returns the (first, last) values of the reserved range.
+
+    The UPDATE takes the row lock before the value is read back, so two
+    writers can never receive overlapping ranges on PostgreSQL or SQLite.
+    """
+    from apps.complaints.models import ComplaintNumberSequence
+
+    with transaction.atomic():
+        updated = ComplaintNumberSequence.objects.filter(name=PREFIX).update(last_value=F('last_value') + count)
+        if not updated:
+            # Counter row missing (e.g. table truncated) - seed it from existing complaints
+            ComplaintNumberSequence.objects.get_or_create(
+                name=PREFIX,
+                defaults={'last_value': current_max_complaint_number()}
+            )
+            ComplaintNumberSequence.objects.filter(name=PREFIX).update(last_value=F('last_value') + count)
+        last = ComplaintNumberSequence.objects.filter(name=PREFIX).values_list('last_value', flat=True).get()
+    return last - count + 1, last
+
+
+def next_complaint_number():
+    """
+    Return the next complaint number.
+
+    Outside a transaction each worker process reserves a block of
+    COMPLAINT_NUMBER_BLOCK_SIZE numbers at once and hands them out from
+    memory, so most creates do not touch the counter row at all. Inside an
+    atomic block the numbers left in that block are still handed out (their
+    reservation is committed, a rollback only leaves a gap), but a new block
+    is never reserved: it would roll back with the transaction while the
+    process kept handing it out. When the block is empty a single number is
+    reserved instead, which holds the counter row lock until the outer
+    transaction commits, so request handlers call this before opening theirs.
+    Numbers are unique but may have gaps (rollbacks, unused block tails on
+    restart).
+    """
+    block_size = max(1, getattr(settings, 'COMPLAINT_NUMBER_BLOCK_SIZE', 1))
+    with _lock:
+        # Forked workers must not share the parent's block
+        if _block['pid'] != os.getpid() or _block['next'] > _block['end']:
+            if connection.in_atomic_block:
+                first, _ = _reserve(1)
+                return format_complaint_number(first)
+            first, last = _reserve(block_size)
+            _block.update(pid=os.getpid(), next=first, end=last)
+        value = _block['next']
+        _block['next'] += 1
+    return format_complaint_number(value)
+
+
+def allocate_complaint_numbers(count):
+    """
+    Reserve `count` consecutive complaint numbers in one round trip (bulk imports).
+    Returns a list of formatted numbers.
+    """
+    if count <= 0:
+        return []
+    first, last = _reserve(count)
+    return [format_complaint_number(value) for value in range(first, last + 1)]
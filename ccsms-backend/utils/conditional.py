@@ -0,0 +1,80 @@
+"""
+Conditional GET for the endpoints the frontend polls.
+
+A view computes a validator first: a few ids/timestamps from one small query
+(or none at all), never the serialized payload. If the request's
+If-None-Match carries the matching ETag the view answers 304 without
+fetching related rows or running serializers.
+
+The ETag hashes the validator together with everything else the body
+depends on (user, role, query string, renderer), so equal tags mean
+identical bodies: a strong validator. Responses are `private, no-cache`,
+so browsers keep them and revalidate on every poll.
+"""
+import hashlib
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(request, validator):
+    renderer = getattr(request, 'accepted_renderer', None)
+    parts = [
+        str(request.user.pk), getattr(request.user, 'role', ''),
+        request.get_full_path(), getattr(renderer, 'format', ''),
+        *validator,
+    ]
+    return quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+
+def if_none_match(request):
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return [tag.removeprefix('W/') for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+
+
+def page_validator(view, queryset, fields):
+    """Validator for a keyset-paginated list: `fields` of the rows on the requested page"""
+    paginator = view.pagination_class()
+    related = {field.split('__')[0] for field in fields if '__' in field}
+    queryset = queryset.select_related(*related).only(*fields)
+    rows = paginator.paginate_queryset(queryset, view.request, view=view)
+    return [paginator.total, paginator.has_next, paginator.has_previous] + [values_of(row, fields) for row in rows]
+
+
+def values_of(obj, fields):
+    """Values of `fields` (`__` follows relations, None past a missing one)"""
+    values = []
+    for path in fields:
+        value = obj
+        for attr in path.split('__'):
+            value = getattr(value, attr, None) if value is not None else None
+        values.append(value)
+    return tuple(values)
+
+
+class ConditionalGetMixin:
+    """
+    For generic views: GET answers If-None-Match with 304 when get_validator()
+    matches. get_validator() must apply the view's permission checks itself;
+    returning None turns the check off for that request.
+    """
+    
+    def get_validator(self):
+        raise NotImplementedError
+    
+    def get(self, request, *args, **kwargs):
+        validator = self.get_validator()
+        if validator is None:
+            return super().get(request, *args, **kwargs)
+        
+        etag = make_etag(request, validator)
+        if etag in if_none_match(request):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,149 @@
+"""
+Sparse fieldsets for read endpoints: ?fields= and ?expand=.
+
+`?fields=id,title,status` keeps only those top-level fields. Related users are
+nested as compact summaries by default; `?expand=customer` swaps in the
+serializer declared for that field in Meta.expandable_fields, and a dotted
+path (`?expand=comments.user`) expands a field of a nested serializer.
+
+Views using SparseFieldsetMixin also narrow the queryset with .only() to the
+columns the resulting serializer reads, dropping select_related joins nobody
+asked for. Method fields declare what they read in Meta.field_sources;
+without that no narrowing is done.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def parse_list(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def fieldset_kwargs(request):
+    """`fields`/`expand` serializer kwargs from the query string (none for writes)"""
+    if request.method not in ('GET', 'HEAD'):
+        return {}
+    return {
+        'fields': parse_list(request.query_params.get('fields')) or None,
+        'expand': parse_list(request.query_params.get('expand')),
+    }
+
+
+class SparseFieldsetSerializerMixin:
+    """Serializer side: accepts `fields` and `expand` keyword arguments"""
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for path in expand:
+            self.expand(path)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def expand(self, path):
+        name, _, rest = path.partition('.')
+        if name not in self.fields:
+            return
+        field = self.fields[name]
+        if rest:
+            nested = getattr(field, 'child', field)
+            if isinstance(nested, SparseFieldsetSerializerMixin):
+                nested.expand(rest)
+            return
+        serializer_class = getattr(self.Meta, 'expandable_fields', {}).get(name)
+        if serializer_class is None:
+            return
+        options = {'read_only': True}
+        if field.source != name:
+            options['source'] = field.source
+        self.fields[name] = serializer_class(**options)
+
+
+def model_fields(serializer, model):
+    """Paths for .only() that cover what `serializer` reads from `model`, or None if unknown"""
+    serializer = getattr(serializer, 'child', serializer)
+    declared = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+    paths = []
+    for name, field in serializer.fields.items():
+        if name in declared:
+            paths.extend(declared[name])
+            continue
+        if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            return None
+        attr = field.source_attrs[0]
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            continue  # annotation, or an attribute the view sets
+        if model_field.auto_created and not model_field.concrete:
+            continue  # reverse relation: prefetched or loaded separately
+        if model_field.many_to_many:
+            continue
+        paths.append(attr)
+        nested = getattr(field, 'child', field)
+        if model_field.is_relation and isinstance(nested, serializers.BaseSerializer):
+            related = model_fields(nested, model_field.related_model)
+            if related is None:
+                continue
+            paths.extend(f'{attr}__{path}' for path in related)
+    return paths
+
+
+class SparseFieldsetMixin:
+    """View side: passes ?fields=/?expand= to the serializer and narrows the queryset to match"""
+
+    def get_serializer(self, *args, **kwargs):
+        return super().get_serializer(*args, **{**fieldset_kwargs(self.request), **kwargs})
+
+    def wants(self, name):
+        """Whether the response includes top-level field `name`"""
+        fields = fieldset_kwargs(self.request).get('fields')
+        return not fields or name in fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in ('GET', 'HEAD'):
+            return queryset
+        # Keyset pagination reads the ordering field of the first and last rows
+        extra = ()
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering:
+            extra = (get_ordering(self.request, queryset, self)[0],)
+        return narrow(queryset, self.get_serializer(), extra)
+
+
+def narrow(queryset, serializer, extra=()):
+    """`queryset` loading only the columns `serializer` (plus `extra` paths) reads"""
+    paths = model_fields(serializer, queryset.model)
+    if paths is None:
+        return queryset
+    paths = [path for path in dict.fromkeys([*paths, *extra]) if _is_model_path(queryset.model, path)]
+
+    # A join that is not read would make .only() fail (and cost a join)
+    related = queryset.query.select_related
+    if isinstance(related, dict):
+        used = {path.split('__')[0] for path in paths}
+        keep = [name for name in related if name in used or not _is_forward(queryset.model, name)]
+        queryset = queryset.select_related(None)
+        if keep:
+            queryset = queryset.select_related(*keep)
+    return queryset.only(*paths)
+
+
+def _is_model_path(model, path):
+    for attr in path.split('__'):
+        if model is None:
+            return False
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return False
+        model = field.related_model
+    return True
+
+
+def _is_forward(model, name):
+    try:
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
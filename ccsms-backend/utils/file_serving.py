@@ -0,0 +1,122 @@
+"""
+Serving stored files from permission-checked views.
+
+The view does the authorization; the bytes are then handed off:
+
+- ATTACHMENT_SENDFILE_BACKEND = 'nginx': an empty response with
+  X-Accel-Redirect to an `internal` location (ATTACHMENT_SENDFILE_URL) that
+  aliases MEDIA_ROOT, e.g.
+
+      location /protected-media/ { internal; alias /srv/ccsms/media/; }
+
+- 'apache' / 'lighttpd': X-Sendfile with the absolute path (mod_xsendfile).
+- unset: FileResponse, which the WSGI server sends with sendfile() via
+  wsgi.file_wrapper. Range requests are answered here with a 206 stream.
+
+The front server handles Range itself when offloading. Either way the ETag
+and If-None-Match check happen here, so a revalidation never touches the
+file. Content-addressed blobs use their SHA-256 as the ETag.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_etags, quote_etag
+from .storage import is_blob_name
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(name, stat):
+    """Strong ETag: the content hash for blobs, else size and mtime"""
+    if is_blob_name(name):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0])
+    return quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime * 1000):x}')
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None to send everything, or False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        # Absent, malformed or multi-range: a full 200 is a valid answer
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _ranged_chunks(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, storage, name, *, filename=None, content_type=None, as_attachment=False,
+               cache_control='private, max-age=0, must-revalidate'):
+    """Response for a stored file the caller has already authorized; raises FileNotFoundError"""
+    path = storage.path(name)
+    stat = os.stat(path)
+    etag = file_etag(name, stat)
+    content_type = content_type or mimetypes.guess_type(filename or name)[0] or 'application/octet-stream'
+
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    if_none_match = [tag.removeprefix('W/') for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+    if etag in if_none_match or if_none_match == ['*']:
+        response = HttpResponseNotModified()
+    else:
+        response = _transfer(request, name, path, stat, etag, content_type)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename or os.path.basename(name))
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _transfer(request, name, path, stat, etag, content_type):
+    backend = settings.ATTACHMENT_SENDFILE_BACKEND
+    if backend == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.ATTACHMENT_SENDFILE_URL.rstrip('/') + '/' + name)
+        return response
+    if backend in ('apache', 'lighttpd'):
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range == etag:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if byte_range and byte_range != (0, stat.st_size - 1):
+        start, end = byte_range
+        response = StreamingHttpResponse(_ranged_chunks(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
+
+    response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['Content-Length'] = str(stat.st_size)
+    return response
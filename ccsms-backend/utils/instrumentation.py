@@ -0,0 +1,124 @@
+"""
+Per-request query and latency budgets.
+
+RequestInstrumentationMiddleware wraps every database connection for the
+duration of a request (connection.execute_wrapper, so it works with DEBUG
+off) and records the number of queries, the time spent in them, how often
+each query shape ran and how long the view took. Query shapes are the SQL
+with literals and IN lists collapsed, so the same lookup repeated once per
+row (an N+1) shows up as one fingerprint with a high count.
+
+Each view is checked against REQUEST_BUDGETS: the 'default' entry merged
+with the entry for its URL name, if any. Requests over budget are logged as
+warnings with their worst duplicated queries. With DEBUG on, the numbers are
+also sent as a Server-Timing header, which browser dev tools show per request.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """(id, normalized SQL) of a query's shape, ignoring parameter values and IN list lengths"""
+    shape = _SPACE.sub(' ', _IN_LISTS.sub('IN (...)', _LITERALS.sub('?', sql))).strip()
+    return hashlib.sha1(shape.encode()).hexdigest()[:12], shape
+
+
+class QueryRecorder:
+    """execute_wrapper recording the count, time and shapes of the queries run"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key, shape = fingerprint(sql)
+            self.shapes[key] += 1
+            self.samples.setdefault(key, shape)
+
+    def duplicates(self, limit=3):
+        """The most repeated query shapes that ran more than once: [(fingerprint, count, sql)]"""
+        return [(key, count, self.samples[key]) for key, count in self.shapes.most_common(limit) if count > 1]
+
+
+def budget_for(view_name):
+    budgets = getattr(settings, 'REQUEST_BUDGETS', {})
+    return {**budgets.get('default', {}), **budgets.get(view_name, {})}
+
+
+def over_budget(budget, measured):
+    """Names of the budget limits `measured` exceeds"""
+    return [name for name, limit in budget.items() if limit is not None and measured.get(name, 0) > limit]
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_INSTRUMENTATION', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        view_start = getattr(request, '_instrumentation_view_start', None)
+        duplicates = recorder.duplicates()
+        measured = {
+            'queries': recorder.count,
+            'db_ms': recorder.duration * 1000,
+            'duplicates': duplicates[0][1] if duplicates else 0,
+            'view_ms': (time.perf_counter() - view_start) * 1000 if view_start else 0,
+            'total_ms': total * 1000,
+        }
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None  # URL name, or the view's dotted path
+        if view_name:
+            exceeded = over_budget(budget_for(view_name), measured)
+            if exceeded:
+                self.log(request, response, view_name, measured, exceeded, duplicates)
+
+        if settings.DEBUG:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={measured["db_ms"]:.1f};desc="{recorder.count} queries"',
+                f'view;dur={measured["view_ms"]:.1f}',
+                f'total;dur={measured["total_ms"]:.1f}',
+            ] + [f'dup{index};desc="{count}x {key}"' for index, (key, count, _) in enumerate(duplicates, start=1)])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation_view_start = time.perf_counter()
+
+    def log(self, request, response, view_name, measured, exceeded, duplicates):
+        logger.warning(
+            f'Over budget ({", ".join(exceeded)}): {request.method} {request.path} [{view_name}] '
+            f'status={response.status_code} queries={measured["queries"]} db={measured["db_ms"]:.1f}ms '
+            f'view={measured["view_ms"]:.1f}ms total={measured["total_ms"]:.1f}ms'
+            + ''.join(f'\n  {count}x [{key}] {sql[:300]}' for key, count, sql in duplicates)
+        )
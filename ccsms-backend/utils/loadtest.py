@@ -0,0 +1,354 @@
+"""
+HTTP load test of the API with a realistic request mix per role.
+
+Virtual users run in threads against a running server (runserver, gunicorn)
+for a fixed duration, each with a keep-alive connection and the token of a
+real account: customers create complaints and poll them and their
+notifications, agents work through their assigned complaints (list, read,
+comment, resolve) and admins load the dashboards and analytics. Every user
+picks its next action from its role's weighted mix with its own seeded
+Random, so two runs with the same users and seed send the same mix.
+
+Latencies are recorded per endpoint (method and URL pattern, ids replaced by
+{id}) after a warm-up period, and summarized as requests/s, p50/p95/p99 and
+error counts. A summary saved as a baseline can be compared with a later
+run; an endpoint regresses when its p95 grows, or its throughput drops, by
+more than the tolerance.
+"""
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+from dataclasses import dataclass, field
+from urllib.parse import urlencode, urlsplit
+
+# run(session) sends one request (or a short sequence) through session.request
+Action = namedtuple('Action', 'name weight run')
+
+
+class Session:
+    """One virtual user: a keep-alive connection, an account and the ids it has seen"""
+
+    def __init__(self, test, role, email, password, rng):
+        self.test = test
+        self.role = role
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.token = None
+        self.connection = None
+        self.complaints = []  # ids from the last list the user loaded
+        self.in_progress = []  # agents: assigned complaints they can resolve
+
+    def connect(self):
+        url = self.test.url
+        cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.connection = cls(url.hostname, url.port, timeout=self.test.timeout)
+
+    def request(self, method, path, name, body=None, query=None, authenticated=True):
+        """Send a request and record its latency under `name`; returns (status, parsed JSON or None)"""
+        if self.connection is None:
+            self.connect()
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if authenticated and self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        target = self.test.url.path.rstrip('/') + path + (f'?{urlencode(query)}' if query else '')
+
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, target, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # Dropped keep-alive connection or timeout: counts as an error, reconnect next time
+            self.connection.close()
+            self.connection = None
+            self.test.record(name, time.perf_counter() - start, 0)
+            return 0, None
+        self.test.record(name, time.perf_counter() - start, status)
+
+        if status == 401 and authenticated and path != LOGIN_PATH:
+            self.login()  # access token expired during a long run
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    def login(self):
+        status, data = self.request('POST', LOGIN_PATH, f'POST {LOGIN_PATH}',
+                                    body={'email': self.email, 'password': self.password}, authenticated=False)
+        if status in (301, 302, 307, 308):
+            raise LoadTestError(f'Login was redirected (HTTP {status}); a local server with DEBUG=False '
+                                'needs SECURE_SSL_REDIRECT=False')
+        if status != 200:
+            raise LoadTestError(f'Login failed for {self.email} (HTTP {status})')
+        self.token = data['access_token']
+
+    def complaint_id(self):
+        """A complaint id the user has seen, loading its list first if it has none"""
+        if not self.complaints:
+            list_complaints(self)
+        return self.rng.choice(self.complaints) if self.complaints else None
+
+
+class LoadTestError(Exception):
+    pass
+
+
+LOGIN_PATH = '/api/auth/login/'
+
+
+def list_complaints(session, **query):
+    status, data = session.request('GET', '/api/complaints/', _name('GET', '/api/complaints/', query), query=query)
+    if status == 200 and data:
+        ids = [complaint['id'] for complaint in data.get('results', data if isinstance(data, list) else [])]
+        if ids:
+            session.complaints = ids
+        return ids
+    return []
+
+
+def _name(method, path, query=None):
+    return f'{method} {path}' + (f'?{urlencode(sorted(query.items()))}' if query else '')
+
+
+def _get(path):
+    return lambda session: session.request('GET', path, _name('GET', path))
+
+
+def _on_complaint(method, suffix, body=None):
+    """Request on one of the user's complaints, recorded as /api/complaints/{id}/<suffix>"""
+    name = _name(method, f'/api/complaints/{{id}}/{suffix}')
+
+    def run(session):
+        complaint_id = session.complaint_id()
+        if complaint_id:
+            session.request(method, f'/api/complaints/{complaint_id}/{suffix}', name,
+                            body=body(session) if body else None)
+    return run
+
+
+def create_complaint(session):
+    rng = session.rng
+    session.request('POST', '/api/complaints/', 'POST /api/complaints/', body={
+        'title': f'Load test: {rng.choice(["router", "laptop", "refrigerator", "television"])} not working',
+        'description': 'Created by the load test. The device stopped working after the latest update.',
+        'category': rng.choice(['TECHNICAL', 'PRODUCT_QUALITY', 'SERVICE']),
+        'priority': rng.choice(['LOW', 'MEDIUM', 'HIGH']),
+    })
+
+
+def list_assigned(session):
+    ids = list_complaints(session, status='IN_PROGRESS')
+    session.in_progress = ids
+
+
+def resolve_complaint(session):
+    if not session.in_progress:
+        list_assigned(session)
+    if session.in_progress:
+        complaint_id = session.in_progress.pop()
+        session.request('POST', f'/api/complaints/{complaint_id}/resolve/', 'POST /api/complaints/{id}/resolve/',
+                        body={'resolution_notes': 'Resolved during the load test'})
+
+
+def _comment(session):
+    return {'content': 'Checked the logs, waiting for the customer to confirm.'}
+
+
+MIXES = {
+    'CUSTOMER': [
+        Action('list complaints', 25, list_complaints),
+        Action('complaint detail', 25, _on_complaint('GET', '')),
+        Action('complaint timeline', 5, _on_complaint('GET', 'timeline/')),
+        Action('unread count', 20, _get('/api/notifications/unread-count/')),
+        Action('notifications', 10, _get('/api/notifications/')),
+        Action('create complaint', 10, create_complaint),
+        Action('comment', 5, _on_complaint('POST', 'comments/', _comment)),
+    ],
+    'AGENT': [
+        Action('list assigned', 25, list_assigned),
+        Action('complaint detail', 20, _on_complaint('GET', '')),
+        Action('comments', 15, _on_complaint('GET', 'comments/list/')),
+        Action('comment', 10, _on_complaint('POST', 'comments/', _comment)),
+        Action('resolve', 5, resolve_complaint),
+        Action('pending requests', 10, _get('/api/users/agent-management/pending-requests/')),
+        Action('unread count', 15, _get('/api/notifications/unread-count/')),
+    ],
+    'ADMIN': [
+        Action('dashboard', 25, _get('/api/analytics/dashboard/')),
+        Action('by category', 8, _get('/api/analytics/complaints-by-category/')),
+        Action('by status', 8, _get('/api/analytics/complaints-by-status/')),
+        Action('sla report', 8, _get('/api/analytics/sla-report/')),
+        Action('agent performance', 8, _get('/api/analytics/agent-performance/')),
+        Action('volume chart', 5, _get('/api/analytics/complaints-volume/')),
+        Action('open complaints', 20, lambda session: list_complaints(session, status='OPEN')),
+        Action('complaint detail', 10, _on_complaint('GET', '')),
+        Action('agents', 8, _get('/api/users/agents/')),
+    ],
+}
+
+
+@dataclass
+class EndpointStats:
+    requests: int
+    rps: float
+    p50: float
+    p95: float
+    p99: float
+    errors: int
+
+    @classmethod
+    def from_samples(cls, samples, elapsed):
+        latencies = sorted(ms for ms, _ in samples)
+        return cls(
+            requests=len(samples),
+            rps=round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            p50=round(percentile(latencies, 50), 1),
+            p95=round(percentile(latencies, 95), 1),
+            p99=round(percentile(latencies, 99), 1),
+            errors=sum(1 for _, status in samples if not 200 <= status < 400),
+        )
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+@dataclass
+class LoadTestResult:
+    config: dict
+    elapsed: float
+    endpoints: dict = field(default_factory=dict)  # name -> EndpointStats
+    total: EndpointStats = None
+
+    def as_json(self):
+        return {
+            'config': self.config,
+            'elapsed': round(self.elapsed, 2),
+            'total': self.total.__dict__,
+            'endpoints': {name: stats.__dict__ for name, stats in sorted(self.endpoints.items())},
+        }
+
+
+class LoadTest:
+    """
+    Run `users` ({role: count}) virtual users for `duration` seconds.
+
+    `accounts` is {role: [(email, password)]}; virtual users take the
+    accounts of their role in turn. Requests in the first `warmup` seconds
+    are not counted.
+    """
+
+    def __init__(self, url, users, accounts, duration=60, warmup=5, think_time=0.0, seed=0, timeout=30):
+        self.url = urlsplit(url)
+        self.users = users
+        self.accounts = accounts
+        self.duration = duration
+        self.warmup = warmup
+        self.think_time = think_time
+        self.seed = seed
+        self.timeout = timeout
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+        self.measuring = False
+
+    def record(self, name, seconds, status):
+        if self.measuring:
+            with self.lock:
+                self.samples[name].append((seconds * 1000, status))
+
+    def run(self):
+        sessions = []
+        for role, count in self.users.items():
+            accounts = self.accounts.get(role) or []
+            if count and not accounts:
+                raise LoadTestError(f'No {role.lower()} accounts to run {count} virtual users with')
+            for index in range(count):
+                email, password = accounts[index % len(accounts)]
+                rng = random.Random(f'{self.seed}:{role}:{index}')
+                sessions.append(Session(self, role, email, password, rng))
+
+        # Log in before the clock starts; sessions sharing an account share its token
+        tokens = {}
+        for session in sessions:
+            if session.email not in tokens:
+                session.login()
+                tokens[session.email] = session.token
+            session.token = tokens[session.email]
+
+        start = time.perf_counter()
+        measure_from = start + self.warmup
+        stop = measure_from + self.duration
+        threads = [threading.Thread(target=self.user_loop, args=(session, stop), daemon=True) for session in sessions]
+        for thread in threads:
+            thread.start()
+        time.sleep(max(0.0, measure_from - time.perf_counter()))
+        self.measuring = True
+        measured_from = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        self.measuring = False
+        elapsed = time.perf_counter() - measured_from
+        return self.summarize(elapsed)
+
+    def user_loop(self, session, stop):
+        actions = MIXES[session.role]
+        weights = [action.weight for action in actions]
+        while time.perf_counter() < stop:
+            action = session.rng.choices(actions, weights)[0]
+            action.run(session)
+            if self.think_time:
+                time.sleep(session.rng.expovariate(1 / self.think_time))
+        if session.connection:
+            session.connection.close()
+
+    def summarize(self, elapsed):
+        result = LoadTestResult(config={
+            'url': self.url.geturl(), 'users': self.users, 'duration': self.duration,
+            'warmup': self.warmup, 'think_time': self.think_time, 'seed': self.seed,
+        }, elapsed=elapsed)
+        for name, samples in self.samples.items():
+            result.endpoints[name] = EndpointStats.from_samples(samples, elapsed)
+        result.total = EndpointStats.from_samples([s for samples in self.samples.values() for s in samples], elapsed)
+        return result
+
+
+Change = namedtuple('Change', 'name baseline current p95_change rps_change regressed')
+
+
+def compare(result, baseline, tolerance=10.0, min_requests=20):
+    """
+    [Change] per endpoint of `result` (LoadTestResult.as_json()) against
+    `baseline` (the same format); changes are in percent, None where the
+    baseline has no such endpoint. Endpoints with fewer than `min_requests`
+    samples in either run are too noisy to call regressed.
+    """
+    def change(new, old):
+        return round((new - old) / old * 100, 1) if old else None
+
+    changes = []
+    names = sorted(set(result['endpoints']) | set(baseline['endpoints']))
+    for name in names + ['total']:
+        current = result['total'] if name == 'total' else result['endpoints'].get(name)
+        before = baseline['total'] if name == 'total' else baseline['endpoints'].get(name)
+        if current is None or before is None:
+            changes.append(Change(name, before, current, None, None, False))
+            continue
+        p95_change = change(current['p95'], before['p95'])
+        rps_change = change(current['rps'], before['rps'])
+        regressed = min(current['requests'], before['requests']) >= min_requests and (
+            (p95_change or 0) > tolerance or (rps_change or 0) < -tolerance or current['errors'] > before['errors']
+        )
+        changes.append(Change(name, before, current, p95_change, rps_change, regressed))
+    return changes
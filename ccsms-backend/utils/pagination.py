@@ -0,0 +1,179 @@
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on `(ordering field, id)`.
+
+    Pages are located with a WHERE clause on the last row of the previous page
+    instead of OFFSET, so page 10,000 costs the same as page 1 as long as an
+    index covers the ordering. Cursors are opaque base64 tokens. The total
+    row count is only computed when the client asks for it (`?include_total=true`).
+
+    If the view uses OrderingFilter, the first requested ordering field is
+    used as the key (nullable fields are ordered with NULLs last).
+    """
+    ordering = '-created_at'
+    page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE', 20)
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    include_total_query_param = 'include_total'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        self.total = queryset.count() if self.include_total(request) else None
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = cursor['reverse'] if cursor else False
+
+        queryset = queryset.order_by(*self.order_by(reverse))
+        if cursor:
+            queryset = queryset.filter(self.after(cursor['value'], cursor['pk'], reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.total is not None:
+            payload['count'] = self.total
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def include_total(self, request):
+        return request.query_params.get(self.include_total_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = self.ordering
+        if view is not None:
+            for backend in getattr(view, 'filter_backends', []):
+                if issubclass(backend, OrderingFilter):
+                    requested = backend().get_ordering(request, queryset, view)
+                    if requested:
+                        ordering = requested[0]
+                    break
+        if isinstance(ordering, (list, tuple)):
+            ordering = ordering[0]
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def order_by(self, reverse):
+        descending = self.descending != reverse
+        # Forward pages keep NULLs last; reversed pages mirror that
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        if descending:
+            return [F(self.field).desc(**nulls), '-pk']
+        return [F(self.field).asc(**nulls), 'pk']
+
+    def after(self, value, pk, reverse):
+        """Q object selecting the rows that come after (value, pk) in the current direction"""
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        nulls_last = not reverse
+        pk_after = Q(**{f'pk__{lookup}': pk})
+
+        if value is None:
+            in_null_tail = Q(**{f'{self.field}__isnull': True}) & pk_after
+            return in_null_tail if nulls_last else in_null_tail | Q(**{f'{self.field}__isnull': False})
+
+        condition = Q(**{f'{self.field}__{lookup}': value}) | (Q(**{self.field: value}) & pk_after)
+        if nulls_last:
+            condition |= Q(**{f'{self.field}__isnull': True})
+        return condition
+
+    def encode_cursor(self, row, reverse):
+        value = getattr(row, self.field)
+        payload = {
+            'v': value.isoformat() if hasattr(value, 'isoformat') else value,
+            'k': str(row.pk),
+            'r': 1 if reverse else 0,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            value = payload['v']
+            if value is not None:
+                try:
+                    value = model._meta.get_field(self.field).to_python(value)
+                except FieldDoesNotExist:
+                    pass  # annotation (e.g. search_rank), JSON value is already usable
+            return {
+                'value': value,
+                'pk': model._meta.pk.to_python(payload['k']),
+                'reverse': bool(payload.get('r')),
+            }
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class TimestampKeysetPagination(KeysetPagination):
+    """Keyset pagination on `(timestamp, id)` for audit logs"""
+    ordering = '-timestamp'
+
+
+class SentAtKeysetPagination(KeysetPagination):
+    """Keyset pagination on `(sent_at, id)` for notifications"""
+    ordering = '-sent_at'
@@ -0,0 +1,188 @@
+"""
+Pincode centroids and distances between them.
+
+The bundled table (utils/data/pincodes.npy, PINCODE_INDEX_PATH) holds the
+centroid of every Indian pincode: the median position of its post offices
+in India Post's All India Pincode Directory, as packaged by the `indiapins`
+project (MIT). `python manage.py build_pincode_index <directory>` compiles
+it again from a newer copy of the directory.
+
+Centroids are stored as unit vectors, where the straight-line (chord)
+distance grows with the great-circle distance, so a plain KD-tree answers
+"pincodes within N km" exactly. The tree is implicit: records are laid out
+so that the node of a range [lo, hi) is its middle record, with the records
+left of it on one side of its split plane and those right of it on the
+other; ranges of LEAF_SIZE records or fewer are leaves, scanned with NumPy.
+Every record also holds one entry of the pincode lookup (pincodes in
+ascending order with the tree position of each), so a pincode is found by
+binary search. Both are one structured array in one file, which every
+process maps read-only (np.load with mmap_mode): the pages are shared by
+all the workers on a machine and nothing is parsed at startup.
+"""
+import bisect
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 64
+NO_SPLIT = 255  # axis of the records in a leaf
+DTYPE = np.dtype([
+    # KD-tree, in tree order
+    ('pincode', '<i4'),
+    ('xyz', '<f4', (3,)),
+    ('axis', 'u1'),
+    # Lookup, in ascending pincode order
+    ('sorted_pincode', '<i4'),
+    ('position', '<i4'),
+])
+
+
+def to_xyz(lat, lon):
+    """Unit vectors of latitudes/longitudes in degrees"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def kilometres(xyz, origin):
+    """Great-circle distances from the unit vector `origin` to each of `xyz`"""
+    chord = np.sqrt(((np.asarray(xyz, dtype=np.float64) - origin) ** 2).sum(axis=-1))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+def is_pincode(value):
+    """Six ASCII digits, not starting with 0 (how pincodes are stored and looked up)"""
+    return len(value) == 6 and value.isascii() and value.isdigit() and value[0] != '0'
+
+
+class PincodeTree:
+    def __init__(self, records):
+        self.records = records
+        # Plain views of the mapped fields: indexing a memmap costs more than the lookups themselves
+        self.pincodes = np.asarray(records['pincode'])
+        self.xyz = np.asarray(records['xyz'])
+        self.axis = np.asarray(records['axis'])
+        self.sorted_pincodes = np.asarray(records['sorted_pincode'])
+        self.positions = np.asarray(records['position'])
+
+    @classmethod
+    def build(cls, pincodes, lat, lon):
+        """A tree of unique `pincodes` (ints) at the given latitudes/longitudes"""
+        pincodes = np.asarray(pincodes, dtype=np.int64)
+        xyz = to_xyz(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        order = np.empty(len(pincodes), dtype=np.int64)
+        axis = np.full(len(pincodes), NO_SPLIT, dtype=np.uint8)
+        stack = [(0, len(pincodes), np.arange(len(pincodes)))]
+        while stack:
+            lo, hi, members = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                order[lo:hi] = members
+                continue
+            points = xyz[members]
+            split = int(np.argmax(points.max(axis=0) - points.min(axis=0)))  # widest dimension
+            middle = (hi - lo) // 2
+            members = members[np.argpartition(points[:, split], middle)]
+            order[lo + middle], axis[lo + middle] = members[middle], split
+            stack.append((lo, lo + middle, members[:middle]))
+            stack.append((lo + middle + 1, hi, members[middle + 1:]))
+
+        records = np.zeros(len(pincodes), dtype=DTYPE)
+        records['pincode'] = pincodes[order]
+        records['xyz'] = xyz[order]
+        records['axis'] = axis
+        ranked = np.argsort(records['pincode'], kind='stable')
+        records['sorted_pincode'] = records['pincode'][ranked]
+        records['position'] = ranked
+        return cls(records)
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path, mmap_mode='r'))
+
+    def save(self, path):
+        np.save(path, np.asarray(self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def locate(self, pincode):
+        """Unit vector of `pincode`'s centroid, None if it is not in the table"""
+        if not pincode or not is_pincode(pincode):
+            return None
+        value = int(pincode)
+        at = bisect.bisect_left(self.sorted_pincodes, value)
+        if at == len(self.records) or self.sorted_pincodes[at] != value:
+            return None
+        return np.asarray(self.xyz[self.positions[at]], dtype=np.float64)
+
+    def locate_many(self, pincodes):
+        """(found, unit vectors) for an array of pincode strings; rows not found are zeros"""
+        pincodes = np.asarray(pincodes, dtype=str)
+        valid = (
+            (np.char.str_len(pincodes) == 6)
+            & (np.char.strip(pincodes, '0123456789') == '')
+            & (pincodes.astype('U1') != '0')
+        )
+        values = np.where(valid, pincodes, '0').astype(np.int64)
+        at = np.minimum(np.searchsorted(self.sorted_pincodes, values), len(self.records) - 1)
+        found = valid & (self.sorted_pincodes[at] == values)
+        xyz = np.where(found[:, None], self.xyz[self.positions[at]], 0.0)
+        return found, xyz
+
+    def within(self, origin, km):
+        """(pincodes, distances) of the pincodes within `km` of the unit vector `origin`"""
+        radius = 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)  # as a chord
+        found = []
+        stack = [(0, len(self.records))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            middle = lo + (hi - lo) // 2
+            split = self.axis[middle]
+            if split == NO_SPLIT:
+                chords = np.sqrt(((np.asarray(self.xyz[lo:hi], dtype=np.float64) - origin) ** 2).sum(axis=1))
+                found.extend(lo + np.flatnonzero(chords <= radius))
+                continue
+            point = np.asarray(self.xyz[middle], dtype=np.float64)
+            if np.sqrt(((point - origin) ** 2).sum()) <= radius:
+                found.append(middle)
+            offset = origin[split] - point[split]
+            if offset - radius <= 0:
+                stack.append((lo, middle))
+            if offset + radius >= 0:
+                stack.append((middle + 1, hi))
+        found = np.sort(np.array(found, dtype=np.int64))
+        return self.pincodes[found], kilometres(self.xyz[found], origin)
+
+
+_tree = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_pincode_tree():
+    """The pincode table mapped from PINCODE_INDEX_PATH, None when there is none"""
+    global _tree, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                try:
+                    _tree = PincodeTree.load(settings.PINCODE_INDEX_PATH)
+                except (OSError, ValueError) as e:
+                    logger.warning(f'No pincode table, locations are compared by pincode only: {e}')
+                _loaded = True
+    return _tree
+
+
+def distance_km(a, b):
+    """Kilometres between the centroids of two pincodes, None unless both are in the table"""
+    tree = get_pincode_tree()
+    origin = tree.locate(a) if tree else None
+    other = tree.locate(b) if origin is not None else None
+    if other is None:
+        return None
+    return float(kilometres(other[None, :], origin)[0])
@@ -1,6 +1,13 @@
 from datetime import datetime, timedelta
 from django.utils import timezone
 
+SLA_HOURS = {
+    'CRITICAL': 4,
+    'HIGH': 24,
+    'MEDIUM': 48,
+    'LOW': 72,
+}
+
 def calculate_sla_deadline(priority, category):
     """
     Calculate SLA deadline based on priority and category
@@ -12,12 +19,5 @@ def calculate_sla_deadline(priority, category):
     MEDIUM: 48 hours
     LOW: 72 hours
     """
-    sla_hours = {
-        'CRITICAL': 4,
-        'HIGH': 24,
-        'MEDIUM': 48,
-        'LOW': 72,
-    }
-    
-    hours = sla_hours.get(priority, 72)  # Default to 72 hours
+    hours = SLA_HOURS.get(priority, 72)  # Default to 72 hours
     return timezone.now() + timedelta(hours=hours)
\ No newline at end of file
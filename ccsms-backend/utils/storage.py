@@ -0,0 +1,127 @@
+"""
+Content-addressed file storage.
+
+Every distinct upload is stored once, as blobs/<aa>/<bb>/<sha256><ext>, so the
+same screenshot or invoice attached to many complaints takes the space of
+one file. The SHA-256 is computed while the upload streams in (see the
+hashing upload handlers below) or while it is copied to disk, never by
+reading a stored file back.
+
+Because a name can be shared, deleting a row must not delete its file; the
+complaints app keeps a reference count per blob (AttachmentBlob) and only
+removes the file when the last reference goes.
+"""
+import hashlib
+import os
+import tempfile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(f'{BLOB_PREFIX}/')
+
+
+def normalized_extension(name):
+    # Kept so the file is served with the right Content-Type; capped to stay a plain suffix
+    extension = os.path.splitext(name or '')[1].lower()
+    return extension if len(extension) <= 10 and extension[1:].isalnum() else ''
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save(); identical content is meant to collide
+        return name
+
+    def _save(self, name, content):
+        extension = normalized_extension(name)
+        digest = getattr(content, 'sha256', None)
+
+        if digest and hasattr(content, 'temporary_file_path'):
+            # Hashed by the upload handler while it was written to /tmp: move it into place
+            final = blob_name(digest, extension)
+            if not self.exists(final):
+                self._place(content.temporary_file_path(), final, move=True)
+            return final
+
+        if digest and self.exists(blob_name(digest, extension)):
+            return blob_name(digest, extension)
+
+        # Stream to a temporary file under the media root, hashing on the way
+        tmp_dir = self.path(os.path.join(BLOB_PREFIX, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            sha256 = hashlib.sha256()
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks(self.chunk_size):
+                    sha256.update(chunk)
+                    tmp.write(chunk)
+            final = blob_name(sha256.hexdigest(), extension)
+            if self.exists(final):
+                os.remove(tmp_path)
+            else:
+                self._place(tmp_path, final)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return final
+
+    def _place(self, source, name, move=False):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if move:
+            file_move_safe(source, path, allow_overwrite=True)
+        else:
+            # Same filesystem, so this is atomic: readers never see a partial blob
+            os.replace(source, path)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+
+
+attachment_storage = ContentAddressedStorage()
+
+
+def get_attachment_storage():
+    return attachment_storage
+
+
+class HashingUploadMixin:
+    """Computes the SHA-256 of an upload as its chunks arrive and sets it as `file.sha256`"""
+
+    def new_file(self, *args, **kwargs):
+        # Before super(): MemoryFileUploadHandler.new_file raises StopFutureHandlers
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
@@ -0,0 +1,143 @@
+"""
+Downscaled renditions of uploaded images (attachment photos, avatars).
+
+Each image gets a small `thumbnail` for lists and a web-sized `preview`,
+both progressive JPEGs. They are rendered off the request path by Celery
+workers right after upload (schedule_renditions), in bulk by the
+generate_thumbnails command (a process pool) for images uploaded before
+this existed, and on first request by the lazy rendition endpoints as a
+fallback.
+
+Rendition names are derived from the source: from the SHA-256 for
+content-addressed blobs, so identical uploads share their renditions too,
+otherwise from the source name. Which renditions exist is recorded on the
+model (a JSON field) so serializers never touch the filesystem. Clients get
+them through permission-checked endpoints that render on a miss.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .file_serving import serve_file
+from .storage import is_blob_name
+
+logger = logging.getLogger(__name__)
+
+RENDITION_PREFIX = 'renditions'
+
+# Largest first: each rendition is downscaled from the previous one
+VARIANTS = {
+    'preview': {'size': (1600, 1600), 'quality': 85},
+    'thumbnail': {'size': (320, 320), 'quality': 80},
+}
+
+# Recorded instead of rendition names when the source cannot be decoded, so it is not retried
+FAILED = {'failed': True}
+
+
+def rendition_key(source_name):
+    if is_blob_name(source_name):
+        return os.path.splitext(os.path.basename(source_name))[0]
+    return hashlib.sha256(source_name.encode()).hexdigest()
+
+
+def rendition_name(source_name, variant):
+    key = rendition_key(source_name)
+    return f'{RENDITION_PREFIX}/{variant}/{key[:2]}/{key}.jpg'
+
+
+def _flatten(image):
+    """RGB copy for JPEG, with transparency composited onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _write(name, image, quality):
+    """Encode and move into place atomically (concurrent renders of the same source are harmless)"""
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, 'JPEG', quality=quality, optimize=True, progressive=True)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render(storage, source_name):
+    """Render every variant of an image; returns {variant: rendition name}, or FAILED"""
+    names = {variant: rendition_name(source_name, variant) for variant in VARIANTS}
+    if all(default_storage.exists(name) for name in names.values()):
+        return names
+
+    try:
+        with storage.open(source_name, 'rb') as source:
+            image = Image.open(source)
+            largest = VARIANTS[next(iter(VARIANTS))]['size']
+            # Let the JPEG decoder scale down by a power of two while decoding
+            image.draft('RGB', largest)
+            image = _flatten(ImageOps.exif_transpose(image))
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"Cannot render {source_name}: {e}")
+        return FAILED
+
+    for variant, options in VARIANTS.items():
+        image.thumbnail(options['size'], Image.Resampling.LANCZOS, reducing_gap=3.0)
+        _write(names[variant], image, options['quality'])
+    return names
+
+
+def ensure_renditions(instance, file_field, renditions_field):
+    """Render the renditions of `instance.<file_field>` unless they are recorded already"""
+    renditions = getattr(instance, renditions_field)
+    file = getattr(instance, file_field)
+    if renditions or not file:
+        return renditions
+    renditions = render(file.storage, file.name)
+    type(instance)._default_manager.filter(pk=instance.pk, **{file_field: file.name}).update(
+        **{renditions_field: renditions}
+    )
+    setattr(instance, renditions_field, renditions)
+    return renditions
+
+
+def delete_renditions(source_name):
+    for variant in VARIANTS:
+        default_storage.delete(rendition_name(source_name, variant))
+
+
+def has_renditions(file, renditions):
+    """False for missing files and sources that could not be decoded"""
+    return bool(file) and renditions != FAILED
+
+
+def version(file):
+    """Short cache-busting token for URLs of renditions that change with the source"""
+    return rendition_key(file.name)[:12]
+
+
+def schedule_renditions(task, *args):
+    """Queue `task` once the current transaction commits; the lazy endpoints cover a missing worker"""
+    def send():
+        try:
+            task.delay(*args)
+        except Exception as e:
+            logger.warning(f"Could not queue {task.name}: {e}")
+    transaction.on_commit(send)
+
+
+def serve_rendition(request, renditions, variant, max_age=24 * 60 * 60):
+    """Send a rendered JPEG; private because the URLs are permission-checked"""
+    return serve_file(request, default_storage, renditions[variant], content_type='image/jpeg',
+                      cache_control=f'private, max-age={max_age}')
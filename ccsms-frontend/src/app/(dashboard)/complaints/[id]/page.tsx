@@ -10,6 +10,17 @@ import FeedbackForm from '@/components/complaints/FeedbackForm';
 
 import React from 'react';
 
+type HistoryKind = 'comments' | 'timeline';
+
+// Embedded latest entries plus the older pages loaded so far, newest first, without duplicates
+function mergeHistory(latest: any[] = [], older: any[] = []) {
+  const byId = new Map<string, any>();
+  [...latest, ...older].forEach((entry) => byId.set(entry.id, entry));
+  return Array.from(byId.values()).sort(
+    (a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
+  );
+}
+
 function ComplaintDetailPageContent({ params }: { params: { id: string } }) {
   const { user } = useAuthStore();
   const queryClient = useQueryClient();
@@ -28,6 +39,25 @@ function ComplaintDetailPageContent({ params }: { params: { id: string } }) {
     queryFn: () => complaintsService.getById(params.id),
   });
 
+  // The detail response embeds only the latest comments and timeline entries; older ones are
+  // paged from comments_url / timeline_url
+  const [olderHistory, setOlderHistory] = useState<Record<HistoryKind, any[]>>({ comments: [], timeline: [] });
+  const [historyNext, setHistoryNext] = useState<Partial<Record<HistoryKind, string | null>>>({});
+  const [loadingHistory, setLoadingHistory] = useState<HistoryKind | null>(null);
+
+  const loadOlder = async (kind: HistoryKind) => {
+    setLoadingHistory(kind);
+    try {
+      const page = await complaintsService.getPage(historyNext[kind] || complaint[`${kind}_url`]);
+      setOlderHistory((prev) => ({ ...prev, [kind]: [...prev[kind], ...page.results] }));
+      setHistoryNext((prev) => ({ ...prev, [kind]: page.next }));
+    } catch (error) {
+      console.error(`Failed to load older ${kind}:`, error);
+    } finally {
+      setLoadingHistory(null);
+    }
+  };
+
   const { data: agents } = useQuery({
     queryKey: ['agents'],
     queryFn: usersService.getAgents,
@@ -145,6 +175,12 @@ function ComplaintDetailPageContent({ params }: { params: { id: string } }) {
   const isAgent = user?.role === 'AGENT';
   const isAdmin = user?.role === 'ADMIN';
 
+  const timeline = mergeHistory(complaint.timeline, olderHistory.timeline);
+  const comments = mergeHistory(complaint.comments, olderHistory.comments).reverse(); // oldest first, as a chat
+  // More to load until a page says there is no next one (or everything counted is shown)
+  const hasOlder = (kind: HistoryKind, shown: number) =>
+    historyNext[kind] !== null && (historyNext[kind] !== undefined || shown < (complaint[`${kind}_count`] ?? 0));
+
   return (
     <div className="space-y-6">
       {/* Header */}
@@ -502,7 +538,7 @@ function ComplaintDetailPageContent({ params }: { params: { id: string } }) {
               {activeTab === 'activity' && (
                 <div className="space-y-4">
                   <h3 className="font-semibold dark:text-white">Activity Timeline</h3>
-                  {complaint.timeline?.map((event: any) => (
+                  {timeline.map((event: any) => (
                     <div key={event.id} className="flex gap-3 pb-4 border-b dark:border-gray-700 last:border-0">
                       <div className="w-2 h-2 bg-blue-600 dark:bg-blue-400 rounded-full mt-2"></div>
                       <div className="flex-1">
@@ -512,6 +548,15 @@ function ComplaintDetailPageContent({ params }: { params: { id: string } }) {
                       </div>
                     </div>
                   ))}
+                  {hasOlder('timeline', timeline.length) && (
+                    <button
+                      onClick={() => loadOlder('timeline')}
+                      disabled={loadingHistory === 'timeline'}
+                      className="text-sm text-[#1da9c3] hover:text-[#178a9f] font-medium disabled:opacity-50"
+                    >
+                      {loadingHistory === 'timeline' ? 'Loading...' : 'Load older activity'}
+                    </button>
+                  )}
                 </div>
               )}
             </div>
@@ -553,7 +598,18 @@ function ComplaintDetailPageContent({ params }: { params: { id: string } }) {
             )}
 
             <div className="space-y-4 mb-4 max-h-96 overflow-y-auto">
-              {complaint.comments?.map((c: any) => (
+              {hasOlder('comments', comments.length) && (
+                <div className="text-center">
+                  <button
+                    onClick={() => loadOlder('comments')}
+                    disabled={loadingHistory === 'comments'}
+                    className="text-xs text-[#1da9c3] hover:text-[#178a9f] font-medium disabled:opacity-50"
+                  >
+                    {loadingHistory === 'comments' ? 'Loading...' : 'Load older messages'}
+                  </button>
+                </div>
+              )}
+              {comments.map((c: any) => (
                 <div key={c.id} className={`flex gap-3 ${c.user.id === user?.id ? 'flex-row-reverse' : ''}`}>
                   <div className="w-8 h-8 bg-gray-200 dark:bg-gray-700 rounded-full flex items-center justify-center dark:text-white">
                     {c.user.first_name[0]}
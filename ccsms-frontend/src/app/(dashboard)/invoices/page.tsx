@@ -12,7 +12,7 @@ export default function InvoicesPage() {
     queryKey: ['invoices'],
     queryFn: async () => {
       const response = await api.get('/complaints/invoices/');
-      return response.data;
+      return response.data.results || response.data;
     },
   });
 
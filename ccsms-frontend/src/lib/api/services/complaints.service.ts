@@ -7,7 +7,14 @@ export const complaintsService = {
   },
 
   getById: async (id: string) => {
-    const response = await api.get(`/complaints/${id}/`);
+    // The detail page shows the customer's contact details; other users are nested as summaries
+    const response = await api.get(`/complaints/${id}/`, { params: { expand: 'customer' } });
+    return response.data;
+  },
+
+  // A page of a paged list by its URL (comments_url/timeline_url of the detail response, or a page's `next` link)
+  getPage: async (url: string) => {
+    const response = await api.get(url);
     return response.data;
   },
 